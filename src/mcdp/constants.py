@@ -71,6 +71,41 @@ class MCDPConstants(object):
     log_cache_writes = False
 
     InvPlus2Nat_max_antichain_size = 100000
+
+    # Operations on UpperSets/LowerSets of products of Rcomp/Nat use
+    # the array representation when there are at least these many points.
+    numeric_antichain_min_size = 16
+
+    # DPLoop2: start the iteration for f1 from the cached fixpoint of
+    # some f1' <= f1 rather than from the bottom.
+    loop2_warm_start = True
+
+    # Maximum number of nodes expanded by the exact search of the
+    # connections to cut when making a model canonical, for each strongly
+    # connected component (see mocdp.comp.feedback_arc_set).
+    feedback_arc_set_max_nodes = 20000
+
+    # Abstract each strongly connected component of a model with cycles
+    # to its own DPLoop2, rather than all of them to a single DPLoop2
+    # (see mocdp.comp.composite_abstraction).
+    loops_per_scc = True
+
+    # Series: apply the chains of single-valued maps at the two ends
+    # directly, rather than one DP at a time (see mcdp_dp.dp_series_fused).
+    series_fuse_maps = True
+
+    # Bounds for the cache of solve() results shared by all DPs
+    # (see mcdp_dp.solve_cache). None means unbounded.
+    solve_cache_max_entries = 100000
+    solve_cache_max_bytes = 256 * 1024 * 1024
+    # 'lru' or 'lfu'
+    solve_cache_policy = 'lru'
+
+    # Number of results of TypesUniverse (check_leq, get_embedding,
+    # get_super_conversion, ...) memoized, for pairs of spaces compared
+    # by identity (see mcdp_posets.types_universe). 0 disables it.
+    types_universe_memo_max_entries = 20000
+
     InvMult2Nat_memory_limit = 10000
 
     # Actually write to disk the reports
@@ -80,6 +115,15 @@ class MCDPConstants(object):
     # are all relative.
     diagrams_fontsize = 14
 
+    # Rendering with graphviz (see mcdp_report.graphviz_render): maximum
+    # number of concurrent graphviz processes, bound for the size of the
+    # cached outputs, directory for a copy of the cache (or None), and
+    # maximum time in seconds waiting for a graphviz run.
+    graphviz_max_workers = 4
+    graphviz_cache_max_bytes = 128 * 1024 * 1024
+    graphviz_cache_dir = None
+    graphviz_timeout = 600
+
     diagrams_smallimagesize_rel = 0.4
     diagrams_leqimagesize_rel = 0.3
     diagrams_bigimagesize_rel = 60
@@ -94,6 +138,44 @@ class MCDPConstants(object):
     # for (1) manual and (2) mcdp-render
     manual_link_css_instead_of_including = True
 
+    # Prerender each equation separately, using a persistent node process,
+    # and keep the SVG in a cache directory (None: in the mcdp tmp dir).
+    # The process is restarted if it does not answer in worker_timeout
+    # seconds. See mcdp_docs.prerender_math_cache.
+    mathjax_prerender_worker = True
+    mathjax_cache_dir = None
+    mathjax_worker_timeout = 60
+
+    # Cache of the snippets (models, figures, highlighted code) evaluated
+    # in the documents, shared by the documents rendered by a process,
+    # and number of processes used to compute the figures of a document.
+    # See mcdp_docs.snippets.
+    docs_snippet_cache_max_entries = 2000
+    docs_snippet_processes = 1
+
+    # Commit the changes to the hdb repos in batches, in a background
+    # thread, after max_events events or max_delay seconds; and push in
+    # another thread, retrying after retry_delay seconds (doubled up to
+    # retry_max_delay). The writers wait if max_pending events are not
+    # committed or max_unpushed commits are not pushed.
+    # See mcdp_hdb.write_behind. If False, each event is committed
+    # and pushed before returning.
+    hdb_write_behind = False
+    hdb_commit_max_events = 50
+    hdb_commit_max_delay = 2.0
+    hdb_write_behind_max_pending = 1000
+    hdb_push_max_unpushed = 20
+    hdb_push_retry_delay = 1.0
+    hdb_push_retry_max_delay = 60.0
+
+    # Mount the hdb repos lazily: the entries of the hashes are read from
+    # disk when first accessed, and the ones not used recently are
+    # forgotten when there are more than max_entries or max_bytes.
+    # See mcdp_hdb.lazy_hash.
+    hdb_lazy_mount = True
+    hdb_lazy_max_entries = 20000
+    hdb_lazy_max_bytes = 200 * 1000 * 1000
+
     pdf_to_png_dpi = 300  # dots per inch
 #     pdf_to_png_dpi = 100 # dots per inch
 
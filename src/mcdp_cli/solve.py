@@ -1,13 +1,16 @@
 # -*- coding: utf-8 -*-
 import logging
 import os
+import sys
 
 from contracts import disable_all
 from decent_params import UserError
-from mcdp import logger
+from mcdp import logger, MCDPConstants
+from mcdp_dp.executor import make_dp_executor, use_dp_executor
+from mcdp_dp.solve_cache import SolveCache, get_solve_cache, set_solve_cache
 from quickapp import QuickAppBase
 
-from .solve_meat import solve_main
+from .solve_meat import solve_anytime_main, solve_batch_main, solve_main
 
 
 class SolveDP(QuickAppBase):
@@ -53,6 +56,24 @@ class SolveDP(QuickAppBase):
         
         params.add_flag('contracts', 
                         help='Activate contracts.')
+        params.add_int('workers', default=None,
+                       help='Solve independent sub-problems in parallel '
+                       'using this number of workers.')
+        params.add_string('executor', default='process',
+                          help='Type of workers: "process" or "thread".')
+        params.add_int('solve_cache_max_entries', default=None,
+                       help='Maximum number of entries in the solve cache.')
+        params.add_flag('solve_cache_stats',
+                        help='Display the statistics of the solve cache.')
+        params.add_float('tolerance', default=None,
+                         help='Refine the approximations until the gap '
+                         'between lower and upper bound is below this.')
+        params.add_float('deadline', default=None,
+                         help='Refine the approximations for at most '
+                         'this number of seconds.')
+        params.add_string('batch', default=None,
+                          help='Solve all the queries in this CSV file '
+                          '(one per row) and write the results to stdout.')
 
 
     def go(self):
@@ -109,9 +130,41 @@ class SolveDP(QuickAppBase):
         else:
             cache_dir = None
 
-        solve_main(logger, config_dirs, maindir, cache_dir, model_name, lower, upper, out_dir, max_steps, query_strings,
-                   intervals, _exp_advanced, expect_nres, imp, expect_nimp, plot, do_movie,
-                   expect_res,
-                   make)
+        if options.solve_cache_max_entries is not None:
+            cache = SolveCache(max_entries=options.solve_cache_max_entries,
+                               max_bytes=MCDPConstants.solve_cache_max_bytes,
+                               policy=MCDPConstants.solve_cache_policy)
+            set_solve_cache(cache)
+
+        if options.workers is not None:
+            executor = make_dp_executor(options.executor, options.workers)
+            logger.info('Using %s' % executor)
+        else:
+            executor = None
+
+        with use_dp_executor(executor):
+            if options.batch is not None:
+                if query_strings:
+                    msg = 'Cannot give both a query and --batch.'
+                    raise UserError(msg)
+                solve_batch_main(logger, config_dirs, maindir, cache_dir,
+                                 model_name, lower, upper, options.batch,
+                                 sys.stdout)
+            elif options.tolerance is not None or options.deadline is not None:
+                if lower is not None or upper is not None:
+                    msg = 'Cannot use --lower/--upper with --tolerance/--deadline.'
+                    raise UserError(msg)
+                solve_anytime_main(logger, config_dirs, maindir, cache_dir,
+                                   model_name, query_strings,
+                                   tolerance=options.tolerance,
+                                   deadline=options.deadline)
+            else:
+                solve_main(logger, config_dirs, maindir, cache_dir, model_name, lower, upper, out_dir, max_steps, query_strings,
+                           intervals, _exp_advanced, expect_nres, imp, expect_nimp, plot, do_movie,
+                           expect_res,
+                           make)
+
+        if options.solve_cache_stats:
+            logger.info(get_solve_cache().format_stats())
 
 mcdp_solve_main = SolveDP.get_sys_main()
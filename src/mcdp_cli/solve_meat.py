@@ -1,17 +1,22 @@
 # -*- coding: utf-8 -*-
+import csv
 import os
 
 from decent_params.utils import UserError
 from reprep import Report
 
 from contracts.utils import raise_desc, raise_wrapped
+import mcdp
+from mcdp import MCDPConstants
 from mcdp_dp.dp_transformations import get_dp_bounds
+from mcdp_dp.solver_anytime import solve_anytime
 from mcdp_dp.tracer import Tracer
-from mcdp_library import Librarian
+from mcdp_library import Librarian, dependencies_digest, record_dependencies
 from mcdp_posets import (NotLeq, UpperSets,
                          express_value_in_isomorphic_space, get_types_universe)
 from mcdp_posets import LowerSets
 from mcdp_report.image_source import ImagesFromPaths
+from mcdp_utils_misc import memo_disk_cache2
 from mocdp.comp.recursive_name_labeling import (get_imp_as_recursive_dict,
                                                 get_labelled_version, ndp_make)
 
@@ -38,41 +43,17 @@ def solve_main(logger, config_dirs, maindir, cache_dir, model_name, lower, upper
 
     logger.info('Using output dir %r' % out)
 
-    librarian = Librarian()
-    logger.info('Looking for libraries in %s...' % config_dirs)
-    for e in config_dirs:
-        librarian.find_libraries(e)
-    logger.info('Found %d libraries.' % len(librarian.get_libraries()))
-
-    library = librarian.get_library_by_dir(maindir)
-    if cache_dir is not None:
-        library.use_cache_dir(cache_dir)
-
-    ndp = library.load_ndp(model_name)
-    basename = model_name
-
-    if make or (plot and imp):
-        ndp_labelled = get_labelled_version(ndp)
-    else:
-        ndp_labelled = ndp
-
-    basename, dp = solve_get_dp_from_ndp(basename=basename, ndp=ndp_labelled,
-                                         lower=lower, upper=upper)
-
+    labelled = make or (plot and imp)
+    library, ndp, basename, dp = solve_load_dp(logger, config_dirs, maindir,
+                                               cache_dir, model_name,
+                                               lower, upper, labelled)
 
     F = dp.get_fun_space()
     R = dp.get_res_space()
     UR = UpperSets(R)
 
     query = " ".join(query_strings)
-    c = library.parse_constant(query)
-    tu = get_types_universe()
-    try:
-        tu.check_leq(c.unit, F)
-    except NotLeq as e:
-        msg = 'The value given cannot be converted to functionality space.'
-        raise_wrapped(UserError, e, msg, unit=c.unit, F=F, compact=True)
-    fg = express_value_in_isomorphic_space(c.unit, c.value, F)
+    fg = solve_parse_query(library, query, F)
 
     logger.info('query: %s' % F.format(fg))
 
@@ -221,6 +202,134 @@ def solve_meat_solve_rtof(trace, ndp, dp, r, intervals, max_steps, exp_advanced)
 
     return res, trace
 
+def solve_load_dp(logger, config_dirs, maindir, cache_dir, model_name,
+                  lower, upper, labelled):
+    """ Returns library, ndp, basename, dp """
+    librarian = Librarian()
+    logger.info('Looking for libraries in %s...' % config_dirs)
+    for e in config_dirs:
+        librarian.find_libraries(e)
+    logger.info('Found %d libraries.' % len(librarian.get_libraries()))
+
+    library = librarian.get_library_by_dir(maindir)
+    if cache_dir is not None:
+        library.use_cache_dir(cache_dir)
+
+    with record_dependencies() as dependencies:
+        ndp = library.load_ndp(model_name)
+    basename = model_name
+
+    if labelled:
+        ndp_labelled = get_labelled_version(ndp)
+    else:
+        ndp_labelled = ndp
+
+    if cache_dir is not None:
+        basename, dp = solve_get_dp_from_ndp_cached(cache_dir, dependencies,
+                                                    basename=basename,
+                                                    ndp=ndp_labelled,
+                                                    lower=lower, upper=upper,
+                                                    labelled=labelled)
+    else:
+        basename, dp = solve_get_dp_from_ndp(basename=basename, ndp=ndp_labelled,
+                                             lower=lower, upper=upper)
+    return library, ndp, basename, dp
+
+def solve_parse_query(library, query, F):
+    """ Parses the query string and returns a value in F. """
+    c = library.parse_constant(query)
+    tu = get_types_universe()
+    try:
+        tu.check_leq(c.unit, F)
+    except NotLeq as e:
+        msg = 'The value given cannot be converted to functionality space.'
+        raise_wrapped(UserError, e, msg, unit=c.unit, F=F, compact=True)
+    return express_value_in_isomorphic_space(c.unit, c.value, F)
+
+def solve_batch_main(logger, config_dirs, maindir, cache_dir, model_name,
+                     lower, upper, batch_file, out, chunk_size=1000):
+    """
+        Reads the query points from the CSV file batch_file and writes
+        to the stream out the CSV rows with the query followed by the
+        minimal resources.
+
+        Each row contains the values of the functionalities, such as
+        "1 hour, 0.1 kg, 1 W". Empty lines and lines starting
+        with "#" are ignored.
+
+        The points are solved with dp.solve_batch(), chunk_size
+        at a time, and the results are written as soon as
+        each chunk is done.
+    """
+    library, _, _, dp = solve_load_dp(logger, config_dirs, maindir,
+                                      cache_dir, model_name,
+                                      lower, upper, labelled=False)
+    F = dp.get_fun_space()
+    UR = UpperSets(dp.get_res_space())
+
+    writer = csv.writer(out)
+
+    def flush(rows, fgs):
+        results = dp.solve_batch(fgs)
+        for cells, res in zip(rows, results):
+            s = UR.format(res)
+            if isinstance(s, unicode):
+                s = s.encode('utf-8')
+            writer.writerow(cells + [s])
+        out.flush()
+
+    rows = []
+    fgs = []
+    nqueries = 0
+    with open(batch_file) as f:
+        for lineno, cells in enumerate(csv.reader(f)):
+            cells = [_.strip() for _ in cells]
+            if not cells or not any(cells) or cells[0].startswith('#'):
+                continue
+            if len(cells) == 1:
+                query = cells[0]
+            else:
+                query = '<%s>' % ", ".join(cells)
+            try:
+                fg = solve_parse_query(library, query, F)
+            except UserError as e:
+                msg = 'Invalid query at line %d of %s.' % (lineno + 1, batch_file)
+                raise_wrapped(UserError, e, msg, compact=True)
+            rows.append(cells)
+            fgs.append(fg)
+            if len(fgs) >= chunk_size:
+                flush(rows, fgs)
+                nqueries += len(fgs)
+                rows, fgs = [], []
+    if fgs:
+        flush(rows, fgs)
+        nqueries += len(fgs)
+    logger.info('Solved %d queries.' % nqueries)
+
+def solve_anytime_main(logger, config_dirs, maindir, cache_dir, model_name,
+                       query_strings, tolerance, deadline):
+    """
+        Solves by successive refinement of the approximations
+        (see solve_anytime()) and logs the bounds found at each step.
+    """
+    library, ndp, _, dp = solve_load_dp(logger, config_dirs, maindir,
+                                        cache_dir, model_name,
+                                        lower=None, upper=None, labelled=False)
+    F = dp.get_fun_space()
+    UR = UpperSets(dp.get_res_space())
+    query = " ".join(query_strings)
+    fg = solve_parse_query(library, query, F)
+    logger.info('query: %s' % F.format(fg))
+
+    x = ", ".join(ndp.get_rnames())
+    bounds = None
+    for bounds in solve_anytime(dp, fg, tolerance=tolerance, deadline=deadline):
+        logger.info('n = %d (%.2f s): gap %s' % (bounds.n, bounds.elapsed,
+                                                  bounds.gap))
+        logger.info('  lower bound: %s = %s' % (x, UR.format(bounds.lower)))
+        logger.info('  upper bound: %s = %s' % (x, UR.format(bounds.upper)))
+    return bounds
+
 def solve_meat_solve_ftor(trace, ndp, dp, fg, intervals, max_steps, exp_advanced):
     R = dp.get_res_space()
     UR = UpperSets(R)
@@ -275,6 +384,24 @@ def solve_get_dp_from_ndp(basename, ndp, lower, upper, flatten=True):
 
     return basename, dp
 
+def solve_get_dp_from_ndp_cached(cache_dir, dependencies, basename, ndp,
+                                 lower, upper, labelled):
+    """
+        Same as solve_get_dp_from_ndp(), but the result is stored in
+        cache_dir, keyed by the hash of the sources of the model and of all
+        its dependencies (see record_dependencies()) and the parameters.
+    """
+    key = dependencies_digest(dependencies, basename=basename,
+                              lower=lower, upper=upper, labelled=labelled,
+                              loops_per_scc=MCDPConstants.loops_per_scc,
+                              version=mcdp.__version__)  # @UndefinedVariable
+    cache_file = os.path.join(cache_dir, 'compiled_dp', '%s.cached' % key)
+
+    def compile_dp():
+        return solve_get_dp_from_ndp(basename, ndp, lower, upper)
+
+    return memo_disk_cache2(cache_file, key, compile_dp)
+
 def solve_get_output_dir(prefix):
     last = prefix + '-last'
     for i in range(1000):
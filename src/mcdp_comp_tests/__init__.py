@@ -5,3 +5,5 @@ from .test_conversion_to_dp import *
 from .test_operations import *
 from .test_new_loop import *
 from .test_imp_space import *
+from .test_feedback_arc_set import *
+from .test_loops_per_scc import *
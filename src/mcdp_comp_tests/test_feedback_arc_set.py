@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+import random
+
+from networkx import DiGraph, is_directed_acyclic_graph
+from nose.tools import assert_equal
+
+from comptests.registrar import comptest
+from mocdp.comp.composite_makecanonical import enumerate_minimal_solution
+from mocdp.comp.feedback_arc_set import minimal_feedback_arc_set
+
+
+def random_graph(seed, n, m):
+    r = random.Random(seed)
+    G = DiGraph()
+    weights = {}
+    for _ in range(m):
+        a = 'n%d' % r.randint(0, n - 1)
+        b = 'n%d' % r.randint(0, n - 1)
+        G.add_edge(a, b)
+        weights[(a, b)] = r.choice([1, 1, 2, 3])
+    return G, weights
+
+
+@comptest
+def check_feedback_arc_set_optimal():
+    for seed in range(20):
+        G, weights = random_graph(seed, n=6, m=12)
+        if is_directed_acyclic_graph(G):
+            continue
+        res = minimal_feedback_arc_set(G, weights.__getitem__,
+                                       max_nodes=10 ** 6)
+        H = G.copy()
+        H.remove_edges_from(res)
+        assert is_directed_acyclic_graph(H), (seed, res)
+        expected = enumerate_minimal_solution(G, weights.__getitem__)
+        assert_equal(sum(weights[e] for e in res),
+                     sum(weights[e] for e in expected))
+
+
+@comptest
+def check_feedback_arc_set_budget():
+    # with no budget for the exact search, the heuristic solution is used
+    G, weights = random_graph(100, n=30, m=120)
+    res = minimal_feedback_arc_set(G, weights.__getitem__, max_nodes=0)
+    H = G.copy()
+    H.remove_edges_from(res)
+    assert is_directed_acyclic_graph(H)
+    # the same with a small budget, every time
+    res1 = minimal_feedback_arc_set(G, weights.__getitem__, max_nodes=5)
+    res2 = minimal_feedback_arc_set(G, weights.__getitem__, max_nodes=5)
+    assert_equal(res1, res2)
+    # not optimal, so not used for another budget
+    res3 = minimal_feedback_arc_set(G, weights.__getitem__, max_nodes=200)
+    assert sum(weights[e] for e in res3) <= sum(weights[e] for e in res1)
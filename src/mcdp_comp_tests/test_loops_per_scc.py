@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+from nose.tools import assert_equal
+
+from comptests.registrar import comptest
+from mcdp import MCDPConstants
+from mcdp_dp import DPLoop2
+from mcdp_lang import parse_ndp
+from mocdp.comp.composite import CompositeNamedDP
+from mocdp.comp.context import Connection
+
+
+def count_loops(dp):
+    children = []
+    for a in ['dp', 'dp1', 'dp2']:
+        if hasattr(dp, a):
+            children.append(getattr(dp, a))
+    children.extend(getattr(dp, 'dps', ()))
+    n = sum(count_loops(_) for _ in children)
+    return n + (1 if isinstance(dp, DPLoop2) else 0)
+
+
+def get_dp_with_mode(ndp, loops_per_scc):
+    before = MCDPConstants.loops_per_scc
+    try:
+        MCDPConstants.loops_per_scc = loops_per_scc
+        return ndp.get_dp()
+    finally:
+        MCDPConstants.loops_per_scc = before
+
+
+@comptest
+def check_loops_per_scc():
+    # two loops, the second one depending on the first one
+    ndp = parse_ndp("""
+mcdp {
+  provides f [Nat]
+  provides g [Nat]
+  requires r [Nat]
+  requires s [Nat]
+  variable x, y, z, w [Nat]
+  x >= max(provided f, min(y + Nat:1, Nat:10))
+  y >= min(x * Nat:2, Nat:12)
+  z >= max(provided g + x, min(w + Nat:2, Nat:20))
+  w >= min(z + Nat:1, Nat:21)
+  required r >= x + y
+  required s >= w
+}""")
+    ndp = ndp.flatten()
+    dp1 = get_dp_with_mode(ndp, False)
+    dp2 = get_dp_with_mode(ndp, True)
+    assert_equal(count_loops(dp1), 1)
+    assert_equal(count_loops(dp2), 2)
+
+    for f in [(0, 0), (1, 0), (3, 5), (11, 0), (0, 30)]:
+        assert_equal(dp1.solve(f).minimals, dp2.solve(f).minimals)
+    for r in [(0, 0), (10, 21), (30, 30)]:
+        assert_equal(dp1.solve_r(r).maximals, dp2.solve_r(r).maximals)
+
+
+@comptest
+def check_loops_per_scc_names():
+    # the names of the encapsulated loops must not collide with the nodes
+    ndp = parse_ndp("""
+mcdp {
+  provides f [Nat]
+  requires r [Nat]
+  variable x, y [Nat]
+  x >= max(provided f, min(y + Nat:1, Nat:10))
+  y >= min(x * Nat:2, Nat:12)
+  required r >= x + y
+}""")
+    ndp = ndp.flatten()
+    name2ndp = ndp.get_name2ndp()
+    rename = dict((n, n) for n in name2ndp)
+    inner = [n for n in sorted(name2ndp)
+             if not n.startswith('_fun_') and not n.startswith('_res_')]
+    rename[inner[0]] = '_loop1'
+    rename[inner[1]] = '_loop2'
+    connections = set(Connection(rename[c.dp1], c.s1, rename[c.dp2], c.s2)
+                      for c in ndp.get_connections())
+    name2ndp2 = dict((rename[k], v) for k, v in name2ndp.items())
+    ndp2 = CompositeNamedDP.from_parts(name2ndp2, connections,
+                                       ndp.get_fnames(), ndp.get_rnames())
+    dp1 = get_dp_with_mode(ndp, False)
+    dp2 = get_dp_with_mode(ndp2, True)
+    assert_equal(count_loops(dp2), 1)
+    for f in [0, 1, 3, 11]:
+        assert_equal(dp1.solve(f).minimals, dp2.solve(f).minimals)
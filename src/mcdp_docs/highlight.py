@@ -11,20 +11,19 @@ from contracts.utils import raise_desc, raise_wrapped, indent
 from mcdp import logger, MCDPConstants
 from mcdp.development import mcdp_dev_warning
 from mcdp.exceptions import DPSemanticError, DPSyntaxError, DPInternalError
-from mcdp_figures import MakeFiguresNDP, MakeFiguresTemplate, MakeFiguresPoset
 from mcdp_lang.parse_actions import parse_wrap
 from mcdp_lang.parse_interface import (parse_template_refine, parse_poset_refine,
                                        parse_ndp_refine)
 from mcdp_lang.suggestions import get_suggestions, apply_suggestions, get_suggested_identifier
 from mcdp_lang.syntax import Syntax
-from mcdp_library.specs_def import SPEC_TEMPLATES
 from mcdp_report.html import ast_to_html
-from mcdp_report.image_source import ImagesFromPaths
 from mcdp_utils_xml import add_class, create_img_png_base64, create_a_to_data, note_error, to_html_stripping_fragment, describe_tag, project_html
 from mocdp.comp.context import Context
 
 from .make_plots_imp import make_plots
 from .pdf_ops import crop_pdf, get_ast_as_pdf
+from .snippets import (evaluate_figures, get_figure_cached, get_figure_kinds,
+                       get_figure_selector, get_snippet, get_snippet_cache)
 
 
 def html_interpret(library, soup, raise_errors=False,
@@ -252,13 +251,20 @@ def highlight_mcdp_code(library, soup, realpath, generate_pdf=False, raise_error
 
                 do_apply_suggestions = (not tag.has_attr('noprettify') and
                                         not tag.has_attr('np'))
+                # the results depend only on the syntax and the source code
+                cache = get_snippet_cache()
+                refine_name = refine.__name__ if refine is not None else None
+                key = (extension, refine_name, source_code)
                 # then apply suggestions
                 try:
                     if do_apply_suggestions:
-                        x = parse_wrap(parse_expr, source_code)[0]
-                        xr = parse_ndp_refine(x, Context())
-                        suggestions = get_suggestions(xr)
-                        source_code = apply_suggestions(source_code, suggestions)
+                        def suggest():
+                            x = parse_wrap(parse_expr, source_code)[0]
+                            xr = parse_ndp_refine(x, Context())
+                            suggestions = get_suggestions(xr)
+                            return apply_suggestions(source_code, suggestions)
+                        source_code = cache.get(None, ('suggestions',) + key,
+                                                suggest)
                 except DPSyntaxError as e:
                     if raise_errors:
                         raise
@@ -270,21 +276,24 @@ def highlight_mcdp_code(library, soup, realpath, generate_pdf=False, raise_error
 
                 # we are not using it
                 _realpath = realpath
-                context = Context()
-                def postprocess(x):
-                    if refine is not None:
-                        return refine(x, context=context)
-                    else:
-                        return x
-#                 print('rendering source code %r' % source_code)
-                html = ast_to_html(source_code, parse_expr=parse_expr,
-                                                add_line_gutter=False,
-                                                postprocess=postprocess)
-
-                for w in context.warnings:
-                    if w.where is not None:
-                        from mcdp_web.editor_fancy.app_editor_fancy_generic import html_mark
-                        html = html_mark(html, w.where, "language_warning")
+                def highlight():
+                    context = Context()
+                    def postprocess(x):
+                        if refine is not None:
+                            return refine(x, context=context)
+                        else:
+                            return x
+                    html = ast_to_html(source_code, parse_expr=parse_expr,
+                                                    add_line_gutter=False,
+                                                    postprocess=postprocess)
+
+                    for w in context.warnings:
+                        if w.where is not None:
+                            from mcdp_web.editor_fancy.app_editor_fancy_generic import html_mark
+                            html = html_mark(html, w.where, "language_warning")
+                    return html
+                key = (extension, refine_name, source_code)
+                html = cache.get(None, ('highlight',) + key, highlight)
 
                 frag2 = BeautifulSoup(html, 'lxml', from_encoding='utf-8')
 
@@ -511,7 +520,7 @@ def make_figures(library, soup, raise_error_dp, raise_error_others, realpath, ge
                         note_error(tag, e)
                         continue
 
-    def make_tag(tag0, klass, data, ndp=None, template=None, poset=None):
+    def make_tag(tag0, klass, data, load_name=None):
         svg = data['svg']
 
         tag_svg = BeautifulSoup(svg, 'lxml', from_encoding='utf-8').svg
@@ -546,15 +555,10 @@ def make_figures(library, soup, raise_error_dp, raise_error_others, realpath, ge
 
             div = Tag(name='div')
 
-            att = MCDPConstants.ATTR_LOAD_NAME
             if tag0.has_attr('id'):
                 basename = tag0['id']
-            elif ndp is not None and hasattr(ndp, att):
-                basename = getattr(ndp, att)
-            elif template is not None and hasattr(template, att):
-                basename = getattr(template, att)
-            elif poset is not None and hasattr(poset, att):
-                basename = getattr(poset, att)
+            elif load_name is not None:
+                basename = load_name
             else:
                 hashcode = hashlib.sha224(tag0.string).hexdigest()[-8:]
                 basename = 'code-%s' % (hashcode)
@@ -570,68 +574,23 @@ def make_figures(library, soup, raise_error_dp, raise_error_others, realpath, ge
         else:
             return tag_svg
     
-    image_source = ImagesFromPaths(library.get_images_paths())
-
-    mf = MakeFiguresNDP(None, None, None)
-    available_ndp = set(mf.available()) | set(mf.aliases)
-    for which in available_ndp:
-        def callback(tag0):
-            assert tag0.parent is not None
-            context = Context()
-            load = lambda x: library.load_ndp(x, context=context)
-            parse = lambda x: library.parse_ndp(x, realpath=realpath, context=context)
-            ndp = load_or_parse_from_tag(tag0, load, parse)
-
-            mf = MakeFiguresNDP(ndp=ndp, image_source=image_source, yourname=None) # XXX
-            formats = ['svg']
-            if generate_pdf:
-                formats.append('pdf')
-            data = mf.get_figure(which,formats)
-            tag = make_tag(tag0, which, data, ndp=ndp, template=None)
-            return tag
-        selector = 'render.%s,pre.%s,img.%s' % (which, which, which)
-        go(selector, callback)
-
-
-    mf = MakeFiguresTemplate(None,None,None)
-    available_template = set(mf.available()) | set(mf.aliases)
-    for which in available_template:
-        def callback(tag0):
-            context = Context()
-            load = lambda x: library.load_spec(SPEC_TEMPLATES, x, context=context)
-            parse = lambda x: library.parse_template(x, realpath=realpath, context=context)
-            template = load_or_parse_from_tag(tag0, load, parse)
-
-            mf = MakeFiguresTemplate(template=template, library=library, yourname=None) # XXX
-            formats = ['svg']
-            if generate_pdf:
-                formats.append('pdf')
-            data = mf.get_figure(which,formats)
-            tag = make_tag(tag0, which, data, ndp=None, template=template)
-            return tag
-
-        selector = 'render.%s,pre.%s,img.%s' % (which, which, which)
-        go(selector, callback)
-
-
-    mf = MakeFiguresPoset(None, None)
-    available_poset = set(mf.available()) | set(mf.aliases)
-    for which in available_poset:
-        def callback(tag0):
-            context = Context()
-            load = lambda x: library.load_poset(x, context=context)
-            parse = lambda x: library.parse_poset(x, realpath=realpath, context=context)
-            poset = load_or_parse_from_tag(tag0, load, parse)
-
-            mf = MakeFiguresPoset(poset=poset, image_source=image_source)
-            formats = ['svg']
-            if generate_pdf:
-                formats.append('pdf')
-            data = mf.get_figure(which, formats)
-            tag = make_tag(tag0, which, data, ndp=None, template=None, poset=poset)
-            return tag
-        selector = 'render.%s,pre.%s,img.%s' % (which, which, which)
-        go(selector, callback)
+    formats = ['svg']
+    if generate_pdf:
+        formats.append('pdf')
+    nprocesses = MCDPConstants.docs_snippet_processes
+    evaluate_figures(library, soup, realpath, formats, nprocesses)
+
+    kinds = get_figure_kinds(library, realpath)
+    for kind in kinds:
+        for which in kind.available:
+            def callback(tag0):
+                assert tag0.parent is not None
+                snippet = get_snippet(tag0)
+                figure = get_figure_cached(library, kind, which, formats, snippet)
+                tag = make_tag(tag0, which, figure['data'],
+                               load_name=figure['load_name'])
+                return tag
+            go(get_figure_selector(which), callback)
 
     unsure = list(soup.select('render'))
     unsure = [_ for _ in unsure if not 'errored' in _.attrs.get('class','')]
@@ -639,9 +598,9 @@ def make_figures(library, soup, raise_error_dp, raise_error_others, realpath, ge
         msg = 'Invalid "render" elements.'
         msg += '\n\n' + '\n\n'.join(str(_) for _ in unsure)
 
-        msg += '\n\n' + " Available for NDPs: %s." % ", ".join(sorted(available_ndp))
-        msg += '\n\n' + " Available for templates: %s." % ", ".join(sorted(available_template))
-        msg += '\n\n' + " Available for posets: %s." % ", ".join(sorted(available_poset))
+        for kind, name in zip(kinds, ['NDPs', 'templates', 'posets']):
+            available = ", ".join(sorted(kind.available))
+            msg += '\n\n' + " Available for %s: %s." % (name, available)
         raise ValueError(msg)
     return to_html_stripping_fragment(soup)
 
@@ -23,7 +23,7 @@ def make_plots(library, soup, raise_errors, realpath):
     
     """ 
 
-    def go(selector, plotter, load, parse):
+    def go(selector, plotter, kind, load, parse):
         for tag in soup.select(selector):
 
             try:
@@ -33,8 +33,9 @@ def make_plots(library, soup, raise_errors, realpath):
                     context = Context()
                     return parse(source_code, realpath=realpath, context=context)
                     
-                from mcdp_docs.highlight import load_or_parse_from_tag
-                vu = load_or_parse_from_tag(tag, load, parsing) 
+                from mcdp_docs.snippets import get_snippet, load_or_parse_cached
+                vu = load_or_parse_cached(library, kind, get_snippet(tag),
+                                          load, parsing)
                 
                 rendered = plotter(tag, vu)
 
@@ -92,8 +93,9 @@ def make_plots(library, soup, raise_errors, realpath):
         return ndp.__str__()
     
     # parse(string, realpath)
-    const = dict(load=library.load_constant, parse=library.parse_constant)
-    mcdp = dict(load=library.load_ndp, parse=library.parse_ndp)
+    const = dict(kind='value', load=library.load_constant,
+                 parse=library.parse_constant)
+    mcdp = dict(kind='ndp', load=library.load_ndp, parse=library.parse_ndp)
     go("img.plot_value_generic", plot_value_generic, **const)
     go("render.plot_value_generic", plot_value_generic, **const)
     go("pre.print_value", print_value, **const)
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+    Cache of the documents rendered by mcdp-render-manual.
+
+    For each document it records the digest of the source, of the
+    options, and of every file read while rendering it (the models,
+    posets, templates and images loaded from the libraries; see
+    mcdp_library.record_files_read). A document is rendered again only
+    if one of these changed.
+"""
+import os
+
+from mcdp import logger
+from mcdp_utils_misc import get_md5, safe_pickle_dump, safe_pickle_load
+
+
+__all__ = [
+    'DocumentBuildCache',
+]
+
+
+class DocumentBuildCache(object):
+    # increase to invalidate the entries written by older versions
+    generation = 1
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def get(self, realpath, source, options):
+        """ Returns the HTML, or None if the entry is missing or stale. """
+        fn = self._get_filename(realpath)
+        if not os.path.exists(fn):
+            return None
+        try:
+            entry = safe_pickle_load(fn)
+        except Exception as e:
+            logger.error('Cannot read %s: %s' % (fn, e))
+            return None
+        if entry['generation'] != self.generation:
+            return None
+        if entry['source'] != get_md5(source):
+            return None
+        if entry['options'] != get_options_digest(options):
+            return None
+        for fn_read, digest in entry['files'].items():
+            if get_file_digest(fn_read) != digest:
+                logger.info('%s: %s changed.' % (os.path.basename(realpath),
+                                                 fn_read))
+                return None
+        return entry['html']
+
+    def put(self, realpath, source, options, files_read, html):
+        """ files_read: the realpaths of the files read while rendering. """
+        files = {}
+        for fn_read in files_read:
+            digest = get_file_digest(fn_read)
+            if digest is None:
+                # not from a file; cannot check it later
+                return
+            files[fn_read] = digest
+        entry = dict(generation=self.generation,
+                     source=get_md5(source),
+                     options=get_options_digest(options),
+                     files=files,
+                     html=html)
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        safe_pickle_dump(entry, self._get_filename(realpath))
+
+    def _get_filename(self, realpath):
+        basename = os.path.splitext(os.path.basename(realpath))[0]
+        return os.path.join(self.cache_dir, '%s-%s.pickle' %
+                            (basename, get_md5(realpath)[:8]))
+
+
+def get_options_digest(options):
+    """ options: a dict of values with a deterministic repr """
+    return get_md5(repr(sorted(options.items())))
+
+
+def get_file_digest(fn):
+    if fn is None or not os.path.exists(fn):
+        return None
+    with open(fn, 'rb') as f:
+        return get_md5(f.read())
@@ -32,6 +32,8 @@ class Render(QuickAppBase):
         params.add_flag('pdf')
         params.add_flag('forgiving')
         params.add_int('mathjax', help='Use MathJax (requires node)', default=1)
+        params.add_int('processes', help='Render the documents in parallel',
+                       default=1)
         params.add_string('stylesheet', default='v_mcdp_render_default')
         params.add_string('symbols', default=None)
         params.add_flag('pdf_figures', help='Generate PDF version of code and figures.')
@@ -87,6 +89,11 @@ class Render(QuickAppBase):
             msg = 'At least one argument required.'
             raise_desc(UserError, msg)
 
+        generate_pdf = options.pdf_figures
+        raise_errors = not options.forgiving
+        use_mathjax = bool(options.mathjax)
+
+        documents = []  # (docname, data, realpath)
         for docname in docs:
             if '/' in docname:
                 docname0 = os.path.split(docname)[-1]
@@ -97,22 +104,29 @@ class Render(QuickAppBase):
                 docname = docname.replace(suffix, '')
             basename = docname + suffix
             f = library._get_file_data(basename)
-            data = f['data']
-            realpath = f['realpath']
-
-            generate_pdf = options.pdf_figures
+            documents.append((docname, f['data'], f['realpath']))
+
+        from mcdp_docs.pipeline import render_complete_many
+        contents = render_complete_many(library=library,
+                                        documents=[(realpath, data) for
+                                                   _, data, realpath in documents],
+                                        nprocesses=options.processes,
+                                        raise_errors=raise_errors,
+                                        generate_pdf=generate_pdf,
+                                        symbols=symbols,
+                                        use_mathjax=use_mathjax)
+
+        for (docname, data, realpath), html_contents in zip(documents, contents):
             if out_dir is None:
                 use_out_dir = os.path.dirname(realpath)
             else:
                 use_out_dir = os.path.join('out', 'mcdp_render')
 
-            raise_errors = not options.forgiving
-            use_mathjax = bool(options.mathjax)
-
             html_filename = render(library, docname, data, realpath, use_out_dir,
                                    generate_pdf, stylesheet=stylesheet,
                                    symbols=symbols, raise_errors=raise_errors,
-                                   use_mathjax=use_mathjax)
+                                   use_mathjax=use_mathjax,
+                                   html_contents=html_contents)
             if options.pdf:
                 run_prince(html_filename)
 
@@ -137,7 +151,8 @@ def run_prince(html_filename):
 
 
 def render(library, docname, data, realpath, out_dir, generate_pdf, stylesheet,
-           symbols, raise_errors, use_mathjax):
+           symbols, raise_errors, use_mathjax, html_contents=None):
+    """ html_contents: the output of render_complete(), if already computed """
 
     if MCDPConstants.pdf_to_png_dpi < 300:
         msg = ('Note that pdf_to_png_dpi is set to %d, which is not suitable for printing'
@@ -148,13 +163,14 @@ def render(library, docname, data, realpath, out_dir, generate_pdf, stylesheet,
 
     out = os.path.join(out_dir, docname + '.html')
 
-    html_contents = render_complete(library=library,
-                                    s=data,
-                                    raise_errors=raise_errors,
-                                    realpath=realpath,
-                                    generate_pdf=generate_pdf,
-                                    symbols=symbols,
-                                    use_mathjax=use_mathjax)
+    if html_contents is None:
+        html_contents = render_complete(library=library,
+                                        s=data,
+                                        raise_errors=raise_errors,
+                                        realpath=realpath,
+                                        generate_pdf=generate_pdf,
+                                        symbols=symbols,
+                                        use_mathjax=use_mathjax)
 
     title = docname
 
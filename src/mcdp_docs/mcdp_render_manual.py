@@ -10,7 +10,7 @@ from contracts.utils import raise_wrapped
 from mcdp import logger
 from mcdp.constants import MCDPConstants
 from mcdp.exceptions import DPSyntaxError
-from mcdp_library import MCDPLibrary
+from mcdp_library import MCDPLibrary, record_files_read
 from mcdp_library.stdlib import get_test_librarian
 from mcdp_utils_misc import expand_all, locate_files, get_md5, write_data_to_file
 from quickapp import QuickApp
@@ -19,6 +19,7 @@ from reprep.utils import natsorted
 from .check_bad_input_files import check_bad_input_file_presence
 from .github_edit_links import add_edit_links
 from .manual_constants import MCDPManualConstants
+from .manual_build_cache import DocumentBuildCache
 from .manual_join_imp import DocToJoin, manual_join
 from .minimal_doc import get_minimal_document
 from .read_bibtex import run_bibtex2html
@@ -44,6 +45,7 @@ class RenderManual(QuickApp):
                           ' (so it does not mess indexing)',
                           default=None)
         params.add_flag('no_resolve_references')
+        params.add_flag('no_build_cache', help='Render again all the documents')
         params.add_flag('mcdp_settings')
 
     def define_jobs_context(self, context):
@@ -83,6 +85,11 @@ class RenderManual(QuickApp):
 
         resolve_references = not options.no_resolve_references
 
+        if options.no_build_cache:
+            build_cache_dir = None
+        else:
+            build_cache_dir = os.path.join(out_dir, 'build_cache')
+
         manual_jobs(context,
                     src_dirs=src_dirs,
                     output_file=output_file,
@@ -93,7 +100,8 @@ class RenderManual(QuickApp):
                     raise_errors=raise_errors,
                     symbols=symbols,
                     resolve_references=resolve_references,
-                    do_last_modified=do_last_modified
+                    do_last_modified=do_last_modified,
+                    build_cache_dir=build_cache_dir,
                     )
 
 
@@ -151,10 +159,13 @@ def look_for_files(srcdirs, pattern):
 def manual_jobs(context, src_dirs, output_file, generate_pdf, stylesheet,
                 use_mathjax, raise_errors, resolve_references=True,
                 remove=None, filter_soup=None, extra_css=None, symbols=None,
-                do_last_modified=False):
+                do_last_modified=False, build_cache_dir=None):
     """
         src_dirs: list of sources
         symbols: a TeX preamble (or None)
+        build_cache_dir: if not None, the documents whose sources and
+            dependencies did not change are not rendered again
+            (see DocumentBuildCache)
     """
     filenames = get_markdown_files(src_dirs)
     print('using:')
@@ -198,6 +209,7 @@ def manual_jobs(context, src_dirs, output_file, generate_pdf, stylesheet,
                                    out_part_basename=out_part_basename,
                                    filter_soup=filter_soup,
                                    extra_css=extra_css,
+                                   build_cache_dir=build_cache_dir,
                                    job_id=job_id)
 
         doc = DocToJoin(docname=out_part_basename, contents=html_contents,
@@ -304,9 +316,22 @@ def render_book(src_dirs, generate_pdf,
                 main_file, use_mathjax, out_part_basename,
                 raise_errors,
                  filter_soup=None,
-                extra_css=None, symbols=None):
+                extra_css=None, symbols=None, build_cache_dir=None):
     from mcdp_docs.pipeline import render_complete
 
+    options = dict(src_dirs=src_dirs, generate_pdf=generate_pdf,
+                   use_mathjax=use_mathjax, raise_errors=raise_errors,
+                   filter_soup=getattr(filter_soup, '__name__', None),
+                   extra_css=extra_css, symbols=symbols)
+    if build_cache_dir is not None:
+        build_cache = DocumentBuildCache(build_cache_dir)
+        html_contents = build_cache.get(realpath, data, options)
+        if html_contents is not None:
+            logger.info('Using the cached rendering of %s' %
+                        friendly_path(realpath))
+            write_part(html_contents, main_file, out_part_basename, extra_css)
+            return html_contents
+
     librarian = get_test_librarian()
     # XXX: these might need to be changed
     if not MCDPConstants.softy_mode:
@@ -327,18 +352,30 @@ def render_book(src_dirs, generate_pdf,
         add_edit_links(soup, realpath)
 
     try:
-        html_contents = render_complete(library=library,
-                                    s=data,
-                                    raise_errors=raise_errors,
-                                    realpath=realpath,
-                                    use_mathjax=use_mathjax,
-                                    symbols=symbols,
-                                    generate_pdf=generate_pdf,
-                                    filter_soup=filter_soup0)
+        with record_files_read() as files_read:
+            html_contents = render_complete(library=library,
+                                        s=data,
+                                        raise_errors=raise_errors,
+                                        realpath=realpath,
+                                        use_mathjax=use_mathjax,
+                                        symbols=symbols,
+                                        generate_pdf=generate_pdf,
+                                        filter_soup=filter_soup0)
     except DPSyntaxError as e:
         msg = 'Could not compile %s' % realpath
         raise_wrapped(DPSyntaxError, e, msg, compact=True)
 
+    # the documents with errors are rendered again (for example, the
+    # error might be a missing model)
+    if build_cache_dir is not None and not 'class="error' in html_contents:
+        files_read.add(realpath)
+        build_cache.put(realpath, data, options, files_read, html_contents)
+
+    write_part(html_contents, main_file, out_part_basename, extra_css)
+    return html_contents
+
+
+def write_part(html_contents, main_file, out_part_basename, extra_css):
     doc = get_minimal_document(html_contents,
                                add_markdown_css=True, extra_css=extra_css)
     dirname = main_file + '.parts'
@@ -350,7 +387,5 @@ def render_book(src_dirs, generate_pdf,
     fn = os.path.join(dirname, '%s.html' % out_part_basename)
     write_data_to_file(doc, fn)
 
-    return html_contents
-
 
 mcdp_render_manual_main = RenderManual.get_sys_main()
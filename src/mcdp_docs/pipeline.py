@@ -1,6 +1,9 @@
 # -*- coding: utf-8 -*-
+from collections import OrderedDict, namedtuple
 from getpass import getuser
 import itertools
+import multiprocessing
+import time
 
 from contracts import contract
 from contracts.utils import raise_desc, indent
@@ -31,6 +34,7 @@ from .videos import make_videos
 
 __all__ = [
     'render_complete',
+    'render_complete_many',
 ]
 
 
@@ -47,23 +51,142 @@ def render_complete(library, s, raise_errors, realpath, generate_pdf=False,
 
         filter_soup(library, soup)
     """
-    s0 = s
-    check_good_use_of_special_paragraphs(s0, realpath)
-    raise_missing_image_errors = raise_errors
-
-    # Imports here because of circular dependencies
-    from .latex.latex_preprocess import extract_maths, extract_tabular
-    from .latex.latex_preprocess import latex_preprocessing
-    from .latex.latex_preprocess import replace_equations
-    from .macro_col2 import col_macros, col_macros_prepare_before_markdown
-    from .mark.markd import render_markdown
-    from .preliminary_checks import do_preliminary_checks_and_fixes
-    from .prerender_math import prerender_mathjax
-
     if isinstance(s, unicode):
         msg = 'I expect a str encoded with utf-8, not unicode.'
         raise_desc(TypeError, msg, s=s)
 
+    context = PipelineContext(library=library, s0=s,
+                              raise_errors=raise_errors, realpath=realpath,
+                              generate_pdf=generate_pdf, check_refs=check_refs,
+                              use_mathjax=use_mathjax, filter_soup=filter_soup,
+                              symbols=symbols)
+    s = run_pipeline(pipeline_stages, s, context)
+    logger.debug('Timing for %s:\n%s' % (realpath, context.format_timings()))
+    return s
+
+
+def render_complete_many(library, documents, nprocesses, **kwargs):
+    """
+        Renders several documents, in parallel if nprocesses > 1.
+
+        documents: list of (realpath, s)
+        kwargs: the other arguments of render_complete()
+
+        Returns the list of the HTML strings.
+    """
+    if nprocesses <= 1 or len(documents) <= 1:
+        return [render_complete(library=library, s=s, realpath=realpath,
+                                **kwargs) for realpath, s in documents]
+    # inherited by the workers (so that filter_soup can be a closure)
+    _Worker.library = library
+    _Worker.kwargs = kwargs
+    pool = multiprocessing.Pool(nprocesses)
+    try:
+        return pool.map(_render_in_worker, documents, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+
+class _Worker(object):
+    library = None
+    kwargs = None
+
+
+def _render_in_worker(document):
+    realpath, s = document
+    return render_complete(library=_Worker.library, s=s, realpath=realpath,
+                           **_Worker.kwargs)
+
+
+class PipelineContext(object):
+    """ The options and the state of render_complete() for a document. """
+
+    def __init__(self, library, s0, raise_errors, realpath, generate_pdf,
+                 check_refs, use_mathjax, filter_soup, symbols):
+        self.library = library
+        # the original markdown
+        self.s0 = s0
+        self.raise_errors = raise_errors
+        self.realpath = realpath
+        self.generate_pdf = generate_pdf
+        self.check_refs = check_refs
+        self.use_mathjax = use_mathjax
+        self.filter_soup = filter_soup
+        self.symbols = symbols
+        # placeholder -> math, extracted before markdown
+        self.maths = None
+        # placeholder -> html, substituted after the first tree stages
+        self.mcdpenvs = None
+        self.substitutions = OrderedDict()
+        # list of (stage name, seconds)
+        self.timings = []
+
+    def format_timings(self):
+        total = sum(t for _, t in self.timings)
+        lines = ['%6.3f s  %s' % (t, name) for name, t in self.timings]
+        lines.append('%6.3f s  total' % total)
+        return '\n'.join(lines)
+
+
+TEXT = 'text'
+SOUP = 'soup'
+
+Stage = namedtuple('Stage', 'name kind function')
+
+# The stages of render_complete(), in order.
+# The text stages have signature f(s, context) -> s; the soup stages
+# f(soup, context) modify the tree and can return a new one.
+pipeline_stages = []
+
+
+def pipeline_stage(kind):
+    """ Decorator that appends the function to pipeline_stages. """
+    assert kind in [TEXT, SOUP], kind
+
+    def register(f):
+        pipeline_stages.append(Stage(f.__name__, kind, f))
+        return f
+
+    return register
+
+
+def run_pipeline(stages, s, context):
+    """
+        Runs the stages on the string s; the document is parsed or
+        serialized only when a stage needs the other representation.
+    """
+    kind = TEXT
+    data = s
+    for stage in stages:
+        if stage.kind != kind:
+            t0 = time.time()
+            if stage.kind == SOUP:
+                data = bs(data)
+                context.timings.append(('(parse)', time.time() - t0))
+            else:
+                data = to_html_stripping_fragment(data)
+                context.timings.append(('(serialize)', time.time() - t0))
+            kind = stage.kind
+
+        t0 = time.time()
+        res = stage.function(data, context)
+        if kind == TEXT or res is not None:
+            data = res
+        context.timings.append((stage.name, time.time() - t0))
+
+    if kind == SOUP:
+        data = to_html_stripping_fragment(data)
+    return data
+
+
+@pipeline_stage(TEXT)
+def preliminary_checks(s, context):
+    from .preliminary_checks import do_preliminary_checks_and_fixes
+    from .latex.latex_preprocess import extract_tabular
+
+    check_good_use_of_special_paragraphs(s, context.realpath)
+
     # need to do this before do_preliminary_checks_and_fixes
     # because of & char
     s, tabulars = extract_tabular(s)
@@ -73,13 +196,18 @@ def render_complete(library, s, raise_errors, realpath, generate_pdf=False,
     for k, v in tabulars.items():
         assert k in s
         s = s.replace(k, v)
+    return s
+
+
+@pipeline_stage(TEXT)
+def extract_maths(s, context):
+    from .latex.latex_preprocess import extract_maths
 
     # copy all math content,
     #  between $$ and $$
     #  between various limiters etc.
     # returns a dict(string, substitution)
     s, maths = extract_maths(s)
-#     print('maths = %s' % maths)
     for k, v in maths.items():
         if v[0] == '$' and v[1] != '$$':
             if '\n\n' in v:
@@ -87,6 +215,13 @@ def render_complete(library, s, raise_errors, realpath, generate_pdf=False,
                 logger.error(maths)
                 logger.error(msg)
                 raise ValueError(msg)
+    context.maths = maths
+    return s
+
+
+@pipeline_stage(TEXT)
+def latex_preprocessing(s, context):  # @UnusedVariable
+    from .latex.latex_preprocess import latex_preprocessing
 
     s = latex_preprocessing(s)
     s = '<div style="display:none">Because of mathjax bug</div>\n\n\n' + s
@@ -95,17 +230,29 @@ def render_complete(library, s, raise_errors, realpath, generate_pdf=False,
     # invalid html, (in particular '$   ciao <ciao>' and make it work)
 
     s = s.replace('*}', '\*}')
+    return s
+
+
+@pipeline_stage(TEXT)
+def protect_envs(s, context):
+    s, context.mcdpenvs = protect_my_envs(s)
+    return s
+
 
-    s, mcdpenvs = protect_my_envs(s)
-#     print('mcdpenvs = %s' % maths)
+@pipeline_stage(TEXT)
+def markdown(s, context):  # @UnusedVariable
+    from .macro_col2 import col_macros_prepare_before_markdown
+    from .mark.markd import render_markdown
 
     s = col_macros_prepare_before_markdown(s)
+    return render_markdown(s)
 
-#     print(indent(s, 'before markdown | '))
-    s = render_markdown(s)
-#     print(indent(s, 'after  markdown | '))
 
-    for k, v in maths.items():
+@pipeline_stage(TEXT)
+def put_back_maths(s, context):
+    from .latex.latex_preprocess import replace_equations
+
+    for k, v in context.maths.items():
         if not k in s:
             msg = 'Cannot find %r (= %r)' % (k, v)
             raise_desc(DPInternalError, msg, s=s)
@@ -114,7 +261,6 @@ def render_complete(library, s, raise_errors, realpath, generate_pdf=False,
             # this gets mathjax confused
             x = x.replace('>', '\\gt{}')  # need brace; think a<b -> a\lt{}b
             x = x.replace('<', '\\lt{}')
-#             print('replaced equation %r by %r ' % (x0, x))
             return x
 
         v = preprocess_equations(v)
@@ -122,29 +268,38 @@ def render_complete(library, s, raise_errors, realpath, generate_pdf=False,
 
     s = replace_equations(s)
     s = s.replace('\\*}', '*}')
+    return s
 
-    # this parses the XML
-    soup = bs(s)
 
+@pipeline_stage(SOUP)
+def abbrevs(soup, context):  # @UnusedVariable
     other_abbrevs(soup)
 
+
+@pipeline_stage(SOUP)
+def prerender_math(soup, context):
+    """ The SVGs are substituted by the next stage. """
+    if not context.use_mathjax:
+        return
+    from .prerender_math import prerender_mathjax_soup
+
     # need to process tabular before mathjax
     escape_for_mathjax(soup)
-
-#     print(indent(s, 'before prerender_mathjax | '))
     # mathjax must be after markdown because of code blocks using "$"
+    soup, substitutions = prerender_mathjax_soup(soup, context.symbols)
+    context.substitutions.update(substitutions)
+    escape_for_mathjax_back(soup)
+    return soup
 
-    s = to_html_stripping_fragment(soup)
 
-    if use_mathjax:
-        s = prerender_mathjax(s, symbols)
+@pipeline_stage(TEXT)
+def substitute_envs(s, context):
+    """ Substitutions that need the HTML parser to fix the structure. """
+    from .prerender_math_cache import substitute_placeholders
 
-    soup = bs(s)
-    escape_for_mathjax_back(soup)
-    s = to_html_stripping_fragment(soup)
+    s = substitute_placeholders(s, context.substitutions)
 
-#     print(indent(s, 'after prerender_mathjax | '))
-    for k, v in mcdpenvs.items():
+    for k, v in context.mcdpenvs.items():
         # there is this case:
         # ~~~
         # <pre> </pre>
@@ -154,8 +309,11 @@ def render_complete(library, s, raise_errors, realpath, generate_pdf=False,
     s = s.replace('<p>DRAFT</p>', '<div class="draft">')
 
     s = s.replace('<p>/DRAFT</p>', '</div>')
+    return s
 
-    soup = bs(s)
+
+@pipeline_stage(SOUP)
+def console_and_github(soup, context):
     mark_console_pres(soup)
 
     try:
@@ -167,24 +325,37 @@ def render_complete(library, s, raise_errors, realpath, generate_pdf=False,
         logger.warn(msg)
 
     # must be before make_figure_from_figureid_attr()
-    display_files(soup, defaults={}, raise_errors=raise_errors)
+    display_files(soup, defaults={}, raise_errors=context.raise_errors)
+
+
+@pipeline_stage(SOUP)
+def figures(soup, context):  # @UnusedVariable
+    from .macro_col2 import col_macros
 
     make_figure_from_figureid_attr(soup)
     col_macros(soup)
     fix_subfig_references(soup)
 
-    library = get_library_from_document(soup, default_library=library)
+
+@pipeline_stage(SOUP)
+def mcdp_code(soup, context):
     from mcdp_docs.highlight import html_interpret
-    html_interpret(library, soup, generate_pdf=generate_pdf,
-                   raise_errors=raise_errors, realpath=realpath)
-    if filter_soup is not None:
-        filter_soup(library=library, soup=soup)
 
+    library = get_library_from_document(soup, default_library=context.library)
+    html_interpret(library, soup, generate_pdf=context.generate_pdf,
+                   raise_errors=context.raise_errors, realpath=context.realpath)
+    if context.filter_soup is not None:
+        context.filter_soup(library=library, soup=soup)
+
+    raise_missing_image_errors = context.raise_errors
     embed_images_from_library2(soup=soup, library=library,
                                raise_errors=raise_missing_image_errors)
     make_videos(soup=soup)
 
-    if check_refs:
+
+@pipeline_stage(SOUP)
+def checks_and_fixes(soup, context):
+    if context.check_refs:
         check_if_any_href_is_invalid(soup)
 
     if getuser() == 'andrea':
@@ -201,20 +372,24 @@ def render_complete(library, s, raise_errors, realpath, generate_pdf=False,
         syntax_highlighting(soup)
 
     if MCDPManualConstants.enforce_status_attribute:
-        check_status_codes(soup, realpath)
+        check_status_codes(soup, context.realpath)
     if MCDPManualConstants.enforce_lang_attribute:
         check_lang_codes(soup)
 
+
+@pipeline_stage(SOUP)
+def ids(soup, context):
     # Fixes the IDs (adding 'sec:'); add IDs to missing ones
-    globally_unique_id_part = 'autoid-DO-NOT-USE-THIS-VERY-UNSTABLE-LINK-' + get_md5(s0)[:5]
+    globally_unique_id_part = ('autoid-DO-NOT-USE-THIS-VERY-UNSTABLE-LINK-' +
+                               get_md5(context.s0)[:5])
     fix_ids_and_add_missing(soup, globally_unique_id_part)
 
     check_no_patently_wrong_links(soup)
 
-    s = to_html_stripping_fragment(soup)
-    s = replace_macros(s)
 
-    return s
+@pipeline_stage(TEXT)
+def macros(s, context):  # @UnusedVariable
+    return replace_macros(s)
 
 
 def get_document_properties(soup):
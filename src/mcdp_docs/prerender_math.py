@@ -6,13 +6,14 @@ from system_cmd import CmdException, system_cmd_result
 
 from contracts import contract
 from contracts.utils import raise_wrapped, indent, raise_desc
-from mcdp import logger
+from mcdp import MCDPConstants, logger
 from mcdp_utils_misc import dir_from_package_name, get_mcdp_tmp_dir, memoize_simple
 from mcdp_utils_xml import bs, to_html_stripping_fragment
 
 
 __all__ = [
     'prerender_mathjax',
+    'prerender_mathjax_soup',
 ]
 
       
@@ -57,7 +58,45 @@ class PrerenderError(Exception):
     pass
 
 def prerender_mathjax(s, symbols):
-    
+    """ Returns the html with the equations prerendered as SVG. """
+    from .prerender_math_cache import substitute_placeholders
+    soup, substitutions = prerender_mathjax_soup(bs(s), symbols)
+    s = to_html_stripping_fragment(soup)
+    return substitute_placeholders(s, substitutions)
+
+
+def prerender_mathjax_soup(soup, symbols):
+    """
+        Returns (soup, substitutions), where soup might be a new tree.
+
+        The equations are replaced by placeholders, and substitutions is
+        a dict placeholder -> html, to apply to the serialized document.
+    """
+    if MCDPConstants.mathjax_prerender_worker:
+        from .prerender_math_cache import prerender_mathjax_placeholders
+        preamble = get_symbols_tex()
+        if symbols:
+            preamble += '\n' + symbols
+        try:
+            substitutions = prerender_mathjax_placeholders(soup, preamble)
+        except PrerenderError: # pragma: no cover
+            if 'CIRCLECI' in os.environ:
+                msg = 'Ignoring PrerenderError because of CircleCI.'
+                logger.error(msg)
+                return soup, {}
+            else:
+                raise
+        if substitutions is not None:
+            return soup, substitutions
+        logger.debug('Some equations span several elements; '
+                     'prerendering the whole document.')
+
+    s = prerender_mathjax_document(to_html_stripping_fragment(soup), symbols)
+    return bs(s), {}
+
+
+def prerender_mathjax_document(s, symbols):
+    """ Prerenders the whole document with prerender.js. """
     if symbols:
         lines = symbols.split('\n')
         lines = [l for l in lines if l.strip()]
@@ -104,12 +143,17 @@ def prerender_mathjax(s, symbols):
 
 
 @memoize_simple
-def get_mathjax_preamble():
+def get_symbols_tex():
     package = dir_from_package_name('mcdp_docs')
     fn = os.path.join(package, 'symbols.tex')
     if not os.path.exists(fn): # pragma: no cover
         raise ValueError(fn)
-    tex = open(fn).read()
+    return open(fn).read()
+
+
+@memoize_simple
+def get_mathjax_preamble():
+    tex = get_symbols_tex()
     f = '$$'+tex+'$$'
     f += """
 <script type="text/x-mathjax-config">
@@ -0,0 +1,459 @@
+# -*- coding: utf-8 -*-
+"""
+    Prerendering of the equations one at a time, with a cache.
+
+    The equations are found in the text of the document (as MathJax would
+    find them), and each one is converted to SVG by a long-lived node
+    process (prerender_worker.js) that receives the requests over a pipe.
+    The SVGs are stored in a directory, keyed by the hash of the equation,
+    its format (display or inline), the preamble, the macros defined by
+    the previous equations of the document and the worker script;
+    so rebuilding a document only typesets the new or changed equations.
+"""
+import atexit
+from collections import OrderedDict
+import json
+import os
+import re
+import select
+import subprocess
+import threading
+import time
+
+from bs4.element import NavigableString
+from contracts.utils import indent, raise_desc
+
+from mcdp import MCDPConstants, logger
+from mcdp_utils_misc import get_mcdp_tmp_dir, memoize_simple
+from mcdp_utils_misc.string_utils import get_sha1
+from mcdp_utils_xml import bs, to_html_stripping_fragment
+
+from .prerender_math import PrerenderError, get_nodejs_bin, get_prerender_js
+
+
+__all__ = [
+    'prerender_mathjax_cached',
+    'prerender_mathjax_placeholders',
+    'substitute_placeholders',
+    'find_math',
+    'MathJaxWorker',
+    'MathCache',
+]
+
+FORMAT_DISPLAY = 'TeX'
+FORMAT_INLINE = 'inline-TeX'
+
+# the elements whose content is ignored by MathJax, and the ones
+# protected by escape_for_mathjax()
+skip_tags = ['script', 'noscript', 'style', 'textarea', 'pre', 'code',
+             'mcdp-poset', 'mcdp-value', 'mcdp-fvalue', 'mcdp-rvalue',
+             'render']
+
+_opening = re.compile(r'\\\$|\$\$|\$|\\\[|\\\(|\\begin\{([a-zA-Z*]+)\}')
+_closing = {
+    '$$': (re.compile(r'(?<!\\)\$\$'), FORMAT_DISPLAY),
+    '$': (re.compile(r'(?<!\\)\$'), FORMAT_INLINE),
+    '\\[': (re.compile(r'\\\]'), FORMAT_DISPLAY),
+    '\\(': (re.compile(r'\\\)'), FORMAT_INLINE),
+}
+
+# the commands that define macros for the following equations
+_defines_macros = re.compile(r'\\(newcommand|renewcommand|newenvironment|'
+                             r'renewenvironment|def|let|DeclareMathOperator)'
+                             r'(?![a-zA-Z])')
+
+
+def find_math(text):
+    """
+        Splits the text in a list of strings and (format, tex) tuples.
+
+        Returns None if a delimiter is not closed, as it happens if the
+        equation continues in another element.
+    """
+    res = []
+    i = 0
+    n = 0
+    while True:
+        m = _opening.search(text, n)
+        if m is None:
+            break
+        delimiter = m.group(0)
+        if delimiter == '\\$':
+            n = m.end()
+            continue
+        if m.group(1) is not None:
+            end = re.compile(r'\\end\{%s\}' % re.escape(m.group(1)))
+            m2 = end.search(text, m.end())
+            if m2 is None:
+                return None
+            math = (FORMAT_DISPLAY, text[m.start():m2.end()])
+        else:
+            end, math_format = _closing[delimiter]
+            m2 = end.search(text, m.end())
+            if m2 is None:
+                return None
+            math = (math_format, text[m.end():m2.start()])
+        if m.start() > i:
+            res.append(text[i:m.start()])
+        res.append(math)
+        i = n = m2.end()
+    if i < len(text):
+        res.append(text[i:])
+    return res
+
+
+def prerender_mathjax_cached(html, preamble, cache=None):
+    """
+        Returns the html with the equations replaced by their SVG.
+
+        Returns None if some equations cannot be separated from the
+        elements around them; in that case the caller should render the
+        whole document at once.
+
+        Raises PrerenderError.
+    """
+    soup = bs(html)
+    substitutions = prerender_mathjax_placeholders(soup, preamble, cache)
+    if substitutions is None:
+        return None
+    if not substitutions:
+        return html
+    s = to_html_stripping_fragment(soup)
+    return substitute_placeholders(s, substitutions)
+
+
+def prerender_mathjax_placeholders(soup, preamble, cache=None):
+    """
+        Replaces the equations in the soup with placeholders.
+
+        Returns a dict placeholder -> html (the SVG), to substitute in the
+        serialized document, or None if some equations cannot be
+        separated from the elements around them (in that case the soup
+        is unchanged).
+
+        Raises PrerenderError.
+    """
+    maths = []  # (placeholder, format, tex)
+    replacements = []
+    for element in soup.find_all(text=True):
+        if type(element) is not NavigableString:
+            continue  # comments, CDATA
+        if any(p.name in skip_tags for p in element.parents):
+            continue
+        parts = find_math(unicode(element))
+        if parts is None:
+            return None
+        if all(isinstance(p, unicode) for p in parts):
+            continue
+        s = u''
+        for p in parts:
+            if isinstance(p, tuple):
+                placeholder = u'MATHPRERENDER%dEND' % len(maths)
+                maths.append((placeholder, p[0], p[1]))
+                s += placeholder
+            else:
+                s += p
+        replacements.append((element, s))
+
+    if not maths:
+        return {}
+
+    if cache is None:
+        cache = get_math_cache(preamble)
+    svgs = cache.render([(f, tex) for _, f, tex in maths])
+
+    for element, s in replacements:
+        element.replace_with(NavigableString(s))
+
+    substitutions = OrderedDict()
+    for (placeholder, math_format, _), svg in zip(maths, svgs):
+        svg = svg.encode('utf-8') if isinstance(svg, unicode) else svg
+        substitutions[str(placeholder)] = wrap_svg(svg, math_format)
+    placeholder = 'MATHPRERENDERSTYLEEND'
+    soup.append(NavigableString(placeholder))
+    substitutions[placeholder] = mathjax_svg_style
+    return substitutions
+
+
+def substitute_placeholders(s, substitutions):
+    for k, v in substitutions.items():
+        s = s.replace(k, v, 1)
+    return s
+
+
+def wrap_svg(svg, math_format):
+    """ Uses the same elements and classes as MathJax in the page. """
+    span = '<span class="MathJax_SVG" style="font-size: 100%%; ' \
+           'display: inline-block;">%s</span>' % svg
+    if math_format == FORMAT_DISPLAY:
+        return ('<div class="MathJax_SVG_Display" style="text-align: '
+                'center;">%s</div>' % span)
+    return span
+
+
+mathjax_svg_style = """
+<style id="MathJax_SVG_styles">
+.MathJax_SVG_Display {text-align: center; margin: 1em 0em; position: relative; display: block!important; text-indent: 0; max-width: none; max-height: none; min-width: 0; min-height: 0; width: 100%}
+.MathJax_SVG {display: inline; font-style: normal; font-weight: normal; line-height: normal; font-size: 100%; font-size-adjust: none; text-indent: 0; text-align: left; text-transform: none; letter-spacing: normal; word-spacing: normal; word-wrap: normal; white-space: nowrap; float: none; direction: ltr; max-width: none; max-height: none; min-width: 0; min-height: 0; border: 0; padding: 0; margin: 0}
+.MathJax_SVG * {transition: none; -webkit-transition: none; -moz-transition: none; -ms-transition: none; -o-transition: none}
+</style>"""
+
+
+class MathCache(object):
+    """
+        The SVGs of the equations, in a directory.
+
+        get_worker: returns an object with a method typeset(format, tex)
+        that returns the SVG, and a method reset() that forgets the
+        macros defined by the equations typeset so far;
+        called only if some SVG is missing.
+
+        Each call to render() is one document: the macros defined by its
+        equations are part of the keys of the following ones.
+    """
+
+    def __init__(self, cache_dir, preamble, get_worker):
+        self.cache_dir = cache_dir
+        self.preamble_hash = get_sha1(get_prerender_worker_js_source() +
+                                      '\n' + preamble)
+        self.get_worker = get_worker
+        self.ntypeset = 0
+
+    def get_key(self, math_format, tex, defs_hash=''):
+        """ defs_hash: hash of the macro definitions that precede tex. """
+        if isinstance(tex, unicode):
+            tex = tex.encode('utf-8')
+        return get_sha1('%s\n%s\n%s\n%s' % (self.preamble_hash, defs_hash,
+                                           math_format, tex))
+
+    def render(self, maths):
+        """ maths: list of (format, tex). Returns the list of SVGs. """
+        res = []
+        # the equations that define macros so far, and their hash
+        defs = []
+        defs_hash = ''
+        worker = None
+        # the number of defs that the worker has seen
+        nsent = 0
+        for math_format, tex in maths:
+            key = self.get_key(math_format, tex, defs_hash)
+            fn = os.path.join(self.cache_dir, key)
+            typeset = not os.path.exists(fn)
+            if not typeset:
+                with open(fn) as f:
+                    svg = f.read()
+            else:
+                w = self.get_worker()
+                if w is not worker:
+                    # the macros of the previous documents are forgotten
+                    worker = w
+                    worker.reset()
+                    nsent = 0
+                # the definitions in the equations found in the cache
+                for d in defs[nsent:]:
+                    worker.typeset(*d)
+                nsent = len(defs)
+                svg = worker.typeset(math_format, tex)
+                self.ntypeset += 1
+                if isinstance(svg, unicode):
+                    svg = svg.encode('utf-8')
+                if not os.path.exists(self.cache_dir):
+                    os.makedirs(self.cache_dir)
+                tmp = fn + '.tmp%s' % os.getpid()
+                with open(tmp, 'w') as f:
+                    f.write(svg)
+                os.rename(tmp, fn)
+            res.append(svg)
+            if _defines_macros.search(tex):
+                defs.append((math_format, tex))
+                defs_hash = get_sha1(defs_hash + '\n' + key)
+                if typeset:
+                    nsent = len(defs)
+        if self.ntypeset:
+            logger.debug('Typeset %d of %d equations.' %
+                         (self.ntypeset, len(maths)))
+        return res
+
+
+def get_math_cache(preamble):
+    cache_dir = MCDPConstants.mathjax_cache_dir
+    if cache_dir is None:
+        cache_dir = os.path.join(get_mcdp_tmp_dir(), 'mathjax_cache')
+    return MathCache(cache_dir, preamble,
+                     lambda: get_mathjax_worker(preamble))
+
+
+class MathJaxWorker(object):
+    """
+        A node process running prerender_worker.js.
+
+        The preamble (macro definitions) is typeset first, and again
+        after reset().
+
+        If a response does not arrive within timeout seconds, the process
+        is killed and PrerenderError is raised; get_mathjax_worker() then
+        starts a new one.
+    """
+
+    def __init__(self, preamble, timeout=None):
+        self.preamble = preamble
+        if timeout is None:
+            timeout = MCDPConstants.mathjax_worker_timeout
+        self.timeout = timeout
+        self.nrequests = 0
+        # whether some equations were typeset after the preamble
+        self.dirty = False
+        self.buffer = ''
+        d = get_mcdp_tmp_dir()
+        self.stderr_fn = os.path.join(d, 'prerender_worker-%s.stderr'
+                                      % os.getpid())
+        self.stderr = open(self.stderr_fn, 'w')
+        self.process = subprocess.Popen(self.get_command(),
+                                        stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE,
+                                        stderr=self.stderr)
+        self._typeset(FORMAT_DISPLAY, preamble)
+
+    def get_command(self):
+        return [get_nodejs_bin(), get_prerender_worker_js()]
+
+    def typeset(self, math_format, tex):
+        """ Returns the SVG as unicode. Raises PrerenderError. """
+        self.dirty = True
+        return self._typeset(math_format, tex)
+
+    def reset(self):
+        """ Forgets the macros defined by the equations typeset so far. """
+        if not self.dirty:
+            return
+        self._request(dict(reset=True), tex=None)
+        self.dirty = False
+        self._typeset(FORMAT_DISPLAY, self.preamble)
+
+    def _typeset(self, math_format, tex):
+        if isinstance(tex, str):
+            tex = tex.decode('utf-8')
+        response = self._request(dict(math=tex, format=math_format), tex)
+        if response['errors']:
+            msg = 'LaTeX conversion errors:\n\n' + \
+                  '\n'.join(response['errors'])
+            raise_desc(PrerenderError, msg, tex=tex)
+        if response['svg'] is None:
+            msg = 'No output from MathJax.'
+            raise_desc(PrerenderError, msg, tex=tex)
+        return response['svg']
+
+    def _request(self, request, tex):
+        self.nrequests += 1
+        request = dict(request, id=self.nrequests)
+        deadline = time.time() + self.timeout
+        try:
+            self.process.stdin.write(json.dumps(request) + '\n')
+            self.process.stdin.flush()
+            while True:
+                line = self._readline(deadline)
+                if line is None:
+                    self.kill()
+                    msg = ('The MathJax process did not answer in %s seconds.'
+                           % self.timeout)
+                    raise_desc(PrerenderError, msg, tex=tex)
+                if not line:
+                    self.raise_terminated()
+                if not line.startswith('{'):
+                    continue
+                response = json.loads(line)
+                if response['id'] == self.nrequests:
+                    return response
+        except (IOError, OSError):
+            self.raise_terminated()
+
+    def _readline(self, deadline):
+        """ Returns the next line from the process, '' if it terminated,
+            or None if the deadline passed. """
+        fd = self.process.stdout.fileno()
+        while not '\n' in self.buffer:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                continue
+            data = os.read(fd, 65536)
+            if not data:
+                line, self.buffer = self.buffer, ''
+                return line
+            self.buffer += data
+        line, self.buffer = self.buffer.split('\n', 1)
+        return line + '\n'
+
+    def raise_terminated(self):
+        self.close()
+        with open(self.stderr_fn) as f:
+            stderr = f.read()
+        if 'Error: Cannot find module' in stderr:
+            msg = 'You have to install the MathJax-node library.'
+            msg += '\nOn Ubuntu, you can install it using:'
+            msg += '\n\n\tsudo apt-get install npm'
+            msg += '\n\n\tnpm install MathJax-node'
+        else:
+            msg = 'The MathJax process terminated.'
+        msg += '\n\n' + indent(stderr, '  |')
+        raise PrerenderError(msg)
+
+    def is_alive(self):
+        return self.process.poll() is None
+
+    def kill(self):
+        if self.is_alive():
+            self.process.kill()
+            self.process.wait()
+        self.stderr.close()
+
+    def close(self):
+        if self.is_alive():
+            self.process.stdin.close()
+            self.process.wait()
+        self.stderr.close()
+
+
+@memoize_simple
+def get_prerender_worker_js():
+    fn = os.path.join(os.path.dirname(get_prerender_js()),
+                      'prerender_worker.js')
+    assert os.path.exists(fn), fn
+    return fn
+
+
+@memoize_simple
+def get_prerender_worker_js_source():
+    with open(get_prerender_worker_js()) as f:
+        return f.read()
+
+
+class _Current(object):
+    worker = None
+    lock = threading.Lock()
+
+
+def get_mathjax_worker(preamble):
+    """
+        Returns the shared worker, starting a new one if the preamble
+        is different.
+    """
+    with _Current.lock:
+        worker = _Current.worker
+        if worker is not None:
+            if worker.preamble == preamble and worker.is_alive():
+                return worker
+            worker.close()
+            _Current.worker = None
+        _Current.worker = MathJaxWorker(preamble)
+        return _Current.worker
+
+
+@atexit.register
+def close_mathjax_worker():
+    with _Current.lock:
+        if _Current.worker is not None:
+            _Current.worker.close()
+            _Current.worker = None
@@ -0,0 +1,68 @@
+// Long-lived MathJax process used by prerender_math_cache.py.
+//
+// Reads one request per line on stdin:
+//     {"id": 1, "math": "x^2", "format": "inline-TeX"}
+// and writes one response per line on stdout, in the same order:
+//     {"id": 1, "svg": "<svg ...>", "errors": null}
+//
+// The macros defined by an equation (\newcommand) remain defined for
+// the following ones, so the preamble is sent only once; until the
+// request
+//     {"id": 2, "reset": true}
+// which forgets them (the answer has "svg": null).
+var mjAPI = require("MathJax-node/lib/mj-single.js");
+var readline = require('readline');
+
+mjAPI.config({
+  MathJax: {
+      TeX: { extensions: ["color.js"] },
+      SVG: {
+            scale: 80,
+     },
+  }
+});
+mjAPI.start();
+
+var queue = [];
+var busy = false;
+
+function next() {
+  if (busy || queue.length == 0) {
+    return;
+  }
+  busy = true;
+  var req = queue.shift();
+  if (req.reset) {
+    // MathJax is started again, with the default definitions
+    mjAPI.start();
+    var res = {'id': req.id, 'svg': null, 'errors': null};
+    process.stdout.write(JSON.stringify(res) + '\n');
+    busy = false;
+    next();
+    return;
+  }
+  mjAPI.typeset({
+    'math': req.math,
+    'format': req.format,
+    'svg': true,
+    // the glyphs are inside each svg
+    'useGlobalCache': false,
+  }, function(data) {
+    var res = {
+      'id': req.id,
+      'svg': data.svg || null,
+      'errors': data.errors || null,
+    };
+    process.stdout.write(JSON.stringify(res) + '\n');
+    busy = false;
+    next();
+  });
+}
+
+var rl = readline.createInterface({input: process.stdin, terminal: false});
+rl.on('line', function(line) {
+  if (line.trim()) {
+    queue.push(JSON.parse(line));
+    next();
+  }
+});
@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+    Evaluation of the MCDP snippets in the documents, with a cache.
+
+    The same snippet (a model, poset, template or value, given either
+    as source code or as the name of a thing in the library) appears
+    many times in the manual, often in different documents. The results
+    (the parsed objects, the figures and the highlighted code) are kept
+    in a cache shared by all the documents rendered by the process,
+    keyed by the content of the snippet.
+
+    Each entry records the things that were loaded from the libraries
+    to compute it (see mcdp_library.record_dependencies), and it is used
+    only if their sources are the same in the library of the document.
+
+    evaluate_figures() is a pre-pass that collects the figures of a
+    document, de-duplicates them, and computes the missing ones using a
+    pool of processes.
+"""
+import multiprocessing
+
+from contracts.utils import raise_desc
+
+from mcdp import MCDPConstants, logger
+from mcdp_figures import MakeFiguresNDP, MakeFiguresPoset, MakeFiguresTemplate
+from mcdp_library.dependencies import note_dependencies, record_dependencies
+from mcdp_library.specs_def import SPEC_TEMPLATES
+from mcdp_report.image_source import ImagesFromPaths
+from mcdp_utils_misc import BoundedCache
+from mocdp.comp.context import Context
+
+
+__all__ = [
+    'SnippetCache',
+    'get_snippet_cache',
+    'set_snippet_cache',
+    'get_snippet',
+    'load_or_parse_cached',
+    'get_figure_kinds',
+    'get_figure_cached',
+    'evaluate_figures',
+]
+
+
+class SnippetCache(object):
+    """
+        key -> (dependencies, value)
+
+        The keys are tuples of strings that identify the snippet and
+        what is computed from it.
+    """
+
+    def __init__(self, max_entries=None):
+        self.cache = BoundedCache(max_entries=max_entries)
+        self.nhits = 0
+        self.nmisses = 0
+
+    def get(self, library, key, compute):
+        """
+            Returns the cached value if its dependencies are up to date
+            in the library; otherwise it calls compute() and stores the
+            result. The exceptions are not cached.
+
+            If library is None the value depends only on the key.
+        """
+        entry = self.cache.get(key)
+        if entry is not None:
+            dependencies, value = entry
+            if library is None or library._dependencies_up_to_date(dependencies):
+                self.nhits += 1
+                # for the recorders of the callers
+                note_dependencies(dependencies)
+                return value
+        self.nmisses += 1
+        with record_dependencies() as dependencies:
+            value = compute()
+        self.put(key, dependencies, value)
+        return value
+
+    def put(self, key, dependencies, value):
+        self.cache.put(key, (frozenset(dependencies), value))
+
+    def is_valid(self, library, key):
+        entry = self.cache.get(key)
+        return (entry is not None and
+                library._dependencies_up_to_date(entry[0]))
+
+    def __repr__(self):
+        return ('SnippetCache(%d entries, %d hits, %d misses)' %
+                (len(self.cache), self.nhits, self.nmisses))
+
+
+class _Current(object):
+    cache = None
+
+
+def get_snippet_cache():
+    """ Returns the cache shared by the documents rendered by the process. """
+    if _Current.cache is None:
+        max_entries = MCDPConstants.docs_snippet_cache_max_entries
+        _Current.cache = SnippetCache(max_entries=max_entries)
+    return _Current.cache
+
+
+def set_snippet_cache(cache):
+    """ Replaces the shared cache (None: create it again when needed). """
+    _Current.cache = cache
+
+
+def get_snippet(tag):
+    """
+        Returns ('load', name) if the tag is empty, or
+        ('parse', source code); see load_or_parse_from_tag().
+    """
+    from .highlight import get_source_code
+    if tag.string is None:
+        if not tag.has_attr('id'):
+            msg = "If <img> is empty then it needs to have an id."
+            raise_desc(ValueError, msg, tag=str(tag))
+        return ('load', tag['id'].encode('utf-8'))
+    else:
+        return ('parse', get_source_code(tag))
+
+
+def load_or_parse_cached(library, kind, snippet, load, parse):
+    """
+        Loads or parses the snippet, using the shared cache.
+
+        kind: identifies the functions load and parse
+    """
+    how, text = snippet
+
+    def compute():
+        if how == 'load':
+            return load(text)
+        else:
+            return parse(text)
+
+    return get_snippet_cache().get(library, (kind, how, text), compute)
+
+
+class _FigureKind(object):
+
+    def __init__(self, name, maker):
+        self.name = name
+        self.maker = maker
+        mf = maker(None)
+        self.available = set(mf.available()) | set(mf.aliases)
+
+
+def get_figure_kinds(library, realpath):
+    """ Returns the list of _FigureKind in the order they are rendered. """
+    images_paths = library.get_images_paths()
+    image_source = ImagesFromPaths(images_paths)
+
+    def make_ndp(ndp):
+        return MakeFiguresNDP(ndp=ndp, image_source=image_source, yourname=None)
+
+    def make_template(template):
+        return MakeFiguresTemplate(template=template, library=library,
+                                   yourname=None)
+
+    def make_poset(poset):
+        return MakeFiguresPoset(poset=poset, image_source=image_source)
+
+    ndp = _FigureKind('ndp', make_ndp)
+    ndp.load = lambda x: library.load_ndp(x, context=Context())
+    ndp.parse = lambda x: library.parse_ndp(x, realpath=realpath,
+                                            context=Context())
+    template = _FigureKind('template', make_template)
+    template.load = lambda x: library.load_spec(SPEC_TEMPLATES, x,
+                                                context=Context())
+    template.parse = lambda x: library.parse_template(x, realpath=realpath,
+                                                      context=Context())
+    poset = _FigureKind('poset', make_poset)
+    poset.load = lambda x: library.load_poset(x, context=Context())
+    poset.parse = lambda x: library.parse_poset(x, realpath=realpath,
+                                                context=Context())
+    kinds = [ndp, template, poset]
+    for kind in kinds:
+        kind.images_paths = tuple(sorted(images_paths))
+    return kinds
+
+
+def get_figure_key(kind, which, formats, snippet):
+    return (('figure', kind.name, which, tuple(formats), kind.images_paths)
+            + snippet)
+
+
+def get_figure_cached(library, kind, which, formats, snippet):
+    """
+        Returns a dict with fields "data" (format -> bytes) and
+        "load_name" (the name of the thing loaded, or None).
+    """
+    def compute():
+        x = load_or_parse_cached(library, kind.name, snippet,
+                                 kind.load, kind.parse)
+        data = kind.maker(x).get_figure(which, formats)
+        load_name = getattr(x, MCDPConstants.ATTR_LOAD_NAME, None)
+        return dict(data=data, load_name=load_name)
+
+    key = get_figure_key(kind, which, formats, snippet)
+    return get_snippet_cache().get(library, key, compute)
+
+
+def get_figure_selector(which):
+    return 'render.%s,pre.%s,img.%s' % (which, which, which)
+
+
+def evaluate_figures(library, soup, realpath, formats, nprocesses):
+    """
+        Computes the figures in the soup that are not in the cache,
+        using nprocesses processes. The errors are ignored here; they
+        are raised again when the figure is requested by make_figures().
+    """
+    if nprocesses <= 1:
+        # make_figures() will compute them one by one
+        return
+    if multiprocessing.current_process().daemon:
+        # already in a worker of a pool; cannot have children
+        return
+
+    cache = get_snippet_cache()
+    kinds = get_figure_kinds(library, realpath)
+    seen = set()
+    tasks = []
+    seen_tasks = set()
+    for i, kind in enumerate(kinds):
+        for which in sorted(kind.available):
+            for tag in soup.select(get_figure_selector(which)):
+                if id(tag) in seen:
+                    continue
+                seen.add(id(tag))
+                try:
+                    snippet = get_snippet(tag)
+                except ValueError:
+                    continue
+                key = get_figure_key(kind, which, formats, snippet)
+                task = (i, which, snippet)
+                if not task in seen_tasks and not cache.is_valid(library, key):
+                    seen_tasks.add(task)
+                    tasks.append(task)
+
+    if len(tasks) <= 1:
+        return
+
+    logger.debug('Computing %d figures using %d processes.' %
+                 (len(tasks), nprocesses))
+    _Worker.library = library
+    _Worker.kinds = kinds
+    _Worker.formats = formats
+    pool = multiprocessing.Pool(min(nprocesses, len(tasks)))
+    try:
+        results = pool.map(_figure_in_worker, tasks, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+        _Worker.library = _Worker.kinds = _Worker.formats = None
+
+    for (i, which, snippet), result in zip(tasks, results):
+        if result is not None:
+            dependencies, value = result
+            key = get_figure_key(kinds[i], which, formats, snippet)
+            cache.put(key, dependencies, value)
+
+
+class _Worker(object):
+    library = None
+    kinds = None
+    formats = None
+
+
+def _figure_in_worker(task):
+    i, which, snippet = task
+    kind = _Worker.kinds[i]
+    try:
+        with record_dependencies() as dependencies:
+            value = get_figure_cached(_Worker.library, kind, which,
+                                      _Worker.formats, snippet)
+    except Exception as e:
+        logger.debug('Cannot compute figure %s: %s' % (which, e))
+        return None
+    return dependencies, value
@@ -14,9 +14,13 @@ from .task_markers_test import *
 from .make_console_pre_tests import *
 from .composing_test import *
 from .biblio import *
+from .prerender_math_cache_test import *
+from .pipeline_stages_test import *
+from .manual_build_cache_test import *
+from .snippets_test import *
 
 def jobs_comptests(context):
     # instantiation
     from comptests import jobs_registrar
     from comptests.registrar import jobs_registrar_simple
-    jobs_registrar_simple(context)
\ No newline at end of file
+    jobs_registrar_simple(context)
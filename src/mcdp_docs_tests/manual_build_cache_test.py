@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+
+from nose.tools import assert_equal
+
+from comptests.registrar import comptest
+from mcdp_docs.manual_build_cache import DocumentBuildCache
+from mcdp_library import MCDPLibrary, record_files_read
+
+
+@comptest
+def manual_build_cache_test():
+    d = tempfile.mkdtemp()
+    try:
+        model = os.path.join(d, 'model1.mcdp')
+        with open(model, 'w') as f:
+            f.write('mcdp { provides f [Nat] provided f <= Nat:1 }')
+        doc = os.path.join(d, 'doc.md')
+        source = 'The model <pre class="mcdp" id="x">`model1</pre>'
+        with open(doc, 'w') as f:
+            f.write(source)
+
+        library = MCDPLibrary()
+        library.add_search_dir(d)
+        with record_files_read() as files_read:
+            library.load_ndp('model1')
+        assert_equal(files_read, set([model]))
+
+        cache = DocumentBuildCache(os.path.join(d, 'cache'))
+        options = dict(use_mathjax=True)
+        assert_equal(cache.get(doc, source, options), None)
+        cache.put(doc, source, options, files_read | set([doc]), '<p>html</p>')
+        assert_equal(cache.get(doc, source, options), '<p>html</p>')
+
+        assert_equal(cache.get(doc, source + ' ', options), None)
+        assert_equal(cache.get(doc, source, dict(use_mathjax=False)), None)
+        with open(model, 'w') as f:
+            f.write('mcdp { provides f [Nat] provided f <= Nat:2 }')
+        assert_equal(cache.get(doc, source, options), None)
+    finally:
+        shutil.rmtree(d)
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+from nose.tools import assert_equal
+
+from comptests.registrar import comptest
+from mcdp_docs.pipeline import (SOUP, TEXT, PipelineContext, Stage,
+                                pipeline_stages, run_pipeline)
+
+
+@comptest
+def pipeline_stages_test():
+    names = [stage.name for stage in pipeline_stages]
+    assert_equal(len(names), len(set(names)))
+    # the document is parsed twice: after markdown, and after substituting
+    # the protected environments
+    kinds = [stage.kind for stage in pipeline_stages]
+    changes = sum(1 for a, b in zip(kinds, kinds[1:]) if a != b)
+    assert_equal(kinds[0], TEXT)
+    assert_equal(changes, 4)
+
+    def upper(s, context):  # @UnusedVariable
+        return s.upper()
+
+    def add_class(soup, context):  # @UnusedVariable
+        for p in soup.select('p'):
+            p['class'] = 'c'
+
+    def rename(soup, context):  # @UnusedVariable
+        for p in soup.select('p'):
+            p.name = 'div'
+
+    stages = [Stage('upper', TEXT, upper),
+              Stage('add_class', SOUP, add_class),
+              Stage('rename', SOUP, rename)]
+    context = PipelineContext(library=None, s0='', raise_errors=True,
+                              realpath='test', generate_pdf=False,
+                              check_refs=False, use_mathjax=False,
+                              filter_soup=None, symbols=None)
+    s = run_pipeline(stages, '<p>a</p><p>b</p>', context)
+    assert_equal(s, '<div class="c">A</div><div class="c">B</div>')
+    timed = [name for name, _ in context.timings]
+    assert_equal(timed, ['upper', '(parse)', 'add_class', 'rename'])
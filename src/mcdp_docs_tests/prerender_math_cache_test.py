@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+import shutil
+import tempfile
+import time
+
+from nose.tools import assert_equal
+
+from comptests.registrar import comptest
+from mcdp_docs.prerender_math import PrerenderError
+from mcdp_docs.prerender_math_cache import (FORMAT_DISPLAY, FORMAT_INLINE,
+                                            MathCache, MathJaxWorker,
+                                            find_math,
+                                            prerender_mathjax_cached)
+
+
+@comptest
+def find_math_test():
+    assert_equal(find_math(u'no math'), [u'no math'])
+    assert_equal(find_math(u'a $x$ b $$y$$ c'),
+                 [u'a ', (FORMAT_INLINE, u'x'), u' b ',
+                  (FORMAT_DISPLAY, u'y'), u' c'])
+    assert_equal(find_math(u'\\(x\\)\\[y\\]'),
+                 [(FORMAT_INLINE, u'x'), (FORMAT_DISPLAY, u'y')])
+    assert_equal(find_math(u'costs \\$3, $\\$x$'),
+                 [u'costs \\$3, ', (FORMAT_INLINE, u'\\$x')])
+    env = u'\\begin{align}x &= y\\end{align}'
+    assert_equal(find_math(u'see ' + env), [u'see ', (FORMAT_DISPLAY, env)])
+    # continues in the next element
+    assert_equal(find_math(u'a $x'), None)
+
+
+class FakeWorker(object):
+
+    def __init__(self):
+        self.typeset_requests = []
+
+    def typeset(self, math_format, tex):
+        self.typeset_requests.append((math_format, tex))
+        return u'<svg>%s</svg>' % tex
+
+    def reset(self):
+        self.typeset_requests.append('reset')
+
+
+@comptest
+def prerender_math_cache_test():
+    d = tempfile.mkdtemp()
+    try:
+        worker = FakeWorker()
+
+        def render(html, preamble='\\newcommand{\\R}{x}'):
+            cache = MathCache(d, preamble, lambda: worker)
+            return prerender_mathjax_cached(html, preamble, cache=cache)
+
+        s = render('<p>Let $a$ be</p><pre>$ ls</pre><p>$$b$$</p>')
+        assert '<span class="MathJax_SVG" style="font-size: 100%; '\
+               'display: inline-block;"><svg>a</svg></span> be' in s, s
+        assert '<pre>$ ls</pre>' in s, s
+        assert 'class="MathJax_SVG_Display"' in s, s
+        assert_equal(worker.typeset_requests,
+                     ['reset', (FORMAT_INLINE, u'a'), (FORMAT_DISPLAY, u'b')])
+
+        # only the new equation is typeset
+        render('<p>Let $a$ be $c$</p><p>$$b$$</p>')
+        assert_equal(worker.typeset_requests[3:],
+                     ['reset', (FORMAT_INLINE, u'c')])
+        # a different preamble invalidates the cache
+        render('<p>Let $a$</p>', preamble='\\newcommand{\\R}{y}')
+        assert_equal(worker.typeset_requests[5:],
+                     ['reset', (FORMAT_INLINE, u'a')])
+
+        s = '<p>no math</p>'
+        assert_equal(render(s), s)
+        assert_equal(render('<p>a $<b>x</b>$</p>'), None)
+    finally:
+        shutil.rmtree(d)
+
+
+@comptest
+def prerender_math_cache_macros():
+    d = tempfile.mkdtemp()
+    try:
+        worker = FakeWorker()
+
+        def render(html):
+            cache = MathCache(d, '', lambda: worker)
+            prerender_mathjax_cached(html, '', cache=cache)
+            res = list(worker.typeset_requests)
+            del worker.typeset_requests[:]
+            return res
+
+        def1 = (FORMAT_INLINE, u'\\newcommand{\\x}{1}')
+        def2 = (FORMAT_INLINE, u'\\newcommand{\\x}{2}')
+        x = (FORMAT_INLINE, u'\\x')
+        y = (FORMAT_INLINE, u'y')
+        assert_equal(render('<p>$%s$ $\\x$</p>' % def1[1]),
+                     ['reset', def1, x])
+        # the macros defined in the document are part of the key
+        assert_equal(render('<p>$%s$ $\\x$</p>' % def2[1]),
+                     ['reset', def2, x])
+        assert_equal(render('<p>$%s$ $\\x$</p>' % def1[1]), [])
+        # the definitions found in the cache are sent to the worker
+        # before the new equations
+        assert_equal(render('<p>$%s$ $\\x$ $y$</p>' % def1[1]),
+                     ['reset', def1, y])
+    finally:
+        shutil.rmtree(d)
+
+
+class HangingWorker(MathJaxWorker):
+
+    def get_command(self):
+        return ['sleep', '60']
+
+
+@comptest
+def prerender_math_worker_timeout():
+    t0 = time.time()
+    try:
+        HangingWorker('', timeout=0.5)
+    except PrerenderError as e:
+        assert 'did not answer' in str(e), e
+    else:
+        raise Exception('Expected PrerenderError')
+    assert time.time() - t0 < 10
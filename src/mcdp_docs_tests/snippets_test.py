@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+from nose.tools import assert_equal
+
+from comptests.registrar import comptest
+from mcdp_docs.highlight import highlight_mcdp_code
+from mcdp_docs.snippets import (SnippetCache, evaluate_figures,
+                                get_figure_kinds, get_snippet, get_figure_key,
+                                load_or_parse_cached, set_snippet_cache)
+from mcdp_library import MCDPLibrary
+from mcdp_utils_xml import bs
+
+
+@comptest
+def check_snippet_cache_dependencies():
+    cache = SnippetCache()
+    set_snippet_cache(cache)
+    try:
+        library = MCDPLibrary()
+        m1 = 'mcdp { provides f [Nat] f <= Nat:1 }'
+        library.file_to_contents['model1.mcdp'] = dict(data=m1, realpath=None)
+
+        snippet = ('parse', '`model1')
+        parse = lambda s: library.parse_ndp(s)
+        ndp1 = load_or_parse_cached(library, 'ndp', snippet, None, parse)
+        ndp2 = load_or_parse_cached(library, 'ndp', snippet, None, parse)
+        assert ndp1 is ndp2
+        assert_equal((cache.nhits, cache.nmisses), (1, 1))
+
+        # another document with the same model
+        library2 = library.clone()
+        parse2 = lambda s: library2.parse_ndp(s)
+        ndp3 = load_or_parse_cached(library2, 'ndp', snippet, None, parse2)
+        assert ndp3 is ndp1
+
+        # a document that defines model1 differently
+        m2 = 'mcdp { provides f [Nat] f <= Nat:2 }'
+        library2.file_to_contents['model1.mcdp'] = dict(data=m2, realpath=None)
+        ndp4 = load_or_parse_cached(library2, 'ndp', snippet, None, parse2)
+        assert ndp4 is not ndp1
+        assert_equal(cache.nmisses, 2)
+    finally:
+        set_snippet_cache(None)
+
+
+@comptest
+def check_snippet_cache_highlight():
+    cache = SnippetCache()
+    set_snippet_cache(cache)
+    try:
+        library = MCDPLibrary()
+        html = ('<pre class="mcdp">mcdp { provides f [Nat] }</pre>'
+                '<p>and again</p>'
+                '<pre class="mcdp">mcdp { provides f [Nat] }</pre>')
+        soup = bs(html)
+        highlight_mcdp_code(library, soup, realpath='doc.md')
+        assert_equal(len(soup.select('div.rendered')), 2)
+        # suggestions and highlighting, once
+        assert_equal((cache.nhits, cache.nmisses), (2, 2))
+    finally:
+        set_snippet_cache(None)
+
+
+@comptest
+def check_snippet_figures_pool():
+    cache = SnippetCache()
+    set_snippet_cache(cache)
+    try:
+        library = MCDPLibrary()
+        m1 = 'mcdp { provides f [Nat] f <= Nat:1 }'
+        library.file_to_contents['model1.mcdp'] = dict(data=m1, realpath=None)
+        html = ('<render class="ndp_repr_long" id="model1"/>'
+                '<render class="dp_repr_long" id="model1"/>'
+                '<render class="ndp_repr_long">`model1</render>'
+                '<render class="ndp_repr_long" id="model1"/>')
+        soup = bs(html)
+        evaluate_figures(library, soup, 'doc.md', ['txt'], nprocesses=2)
+        # three different figures, computed by the workers
+        assert_equal(len(cache.cache), 3)
+        kind = get_figure_kinds(library, 'doc.md')[0]
+        for tag in soup.select('render'):
+            which = tag['class'][0]
+            key = get_figure_key(kind, which, ['txt'], get_snippet(tag))
+            assert cache.is_valid(library, key), tag
+        assert_equal(cache.nmisses, 0)
+    finally:
+        set_snippet_cache(None)
@@ -1,7 +1,10 @@
 # -*- coding: utf-8 -*-
 from .primitive import *
+from .executor import *
+from .solve_cache import *
 from .dp_loop2 import *
 from .dp_series import *
+from .dp_series_fused import *
 from .dp_parallel import *
 from .dp_parallel_n import *
 from .dp_linear import *
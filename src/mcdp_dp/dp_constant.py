@@ -44,6 +44,12 @@ class Constant(PrimitiveDP):
         assert f == (), f
         return self.R.U(self.c)
 
+    def solve_batch(self, fs):
+        for f in fs:
+            assert f == (), f
+        u = self.R.U(self.c)
+        return [u] * len(fs)
+
     def solve_r(self, r):
         F, R, c = self.F, self.R, self.c
         if R.leq(c, r):
@@ -3,10 +3,11 @@ from contracts import contract
 from contracts.utils import check_isinstance, indent, raise_desc
 from mcdp_posets import (
     Coproduct1, NotBelongs, NotEqual, get_types_universe, poset_minima)
-from mcdp_posets.find_poset_minima.baseline_n2 import poset_maxima
+from mcdp_posets.find_poset_minima import poset_maxima
 from mcdp.development import do_extra_checks, mcdp_dev_warning
 
-from .primitive import NotFeasible, PrimitiveDP
+from .executor import map_solve
+from .primitive import NotFeasible, PrimitiveDP, union_of
 
 
 __all__ = [
@@ -92,8 +93,7 @@ class CoProductDP(PrimitiveDP):
         s = []
 
         mcdp_dev_warning('use specific operation on antichains')
-        for dp in self.dps:
-            rs = dp.solve(f)
+        for rs in map_solve([(dp, 'solve', f) for dp in self.dps]):
             s.extend(rs.minimals)
 
         res = R.Us(poset_minima(s, R.leq))
@@ -106,14 +106,25 @@ class CoProductDP(PrimitiveDP):
         s = []
 
         mcdp_dev_warning('use specific operation on antichains')
-        for dp in self.dps:
-            lf = dp.solve_r(r)
+        for lf in map_solve([(dp, 'solve_r', r) for dp in self.dps]):
             s.extend(lf.maximals)
 
         res = F.Ls(poset_maxima(s, F.leq))
 
         return res
 
+    def solve_batch(self, fs):
+        R = self.get_res_space()
+        res = map_solve([(dp, 'solve_batch', fs) for dp in self.dps])
+        return [R.Us(poset_minima(union_of(_.minimals for _ in us), R.leq))
+                for us in zip(*res)]
+
+    def solve_r_batch(self, rs):
+        F = self.get_fun_space()
+        res = map_solve([(dp, 'solve_r_batch', rs) for dp in self.dps])
+        return [F.Ls(poset_maxima(union_of(_.maximals for _ in ls), F.leq))
+                for ls in zip(*res)]
+
     def __repr__(self):
         s = "^".join('%s' % x for x in self.dps)
         return 'CoProduct(%s)' % s
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from contracts import contract
 from contracts.utils import check_isinstance, raise_desc
+from mcdp_maps.map_batch import map_call_batch
 from mcdp_posets import Map, MapNotDefinedHere, Poset
 
 from .primitive import EmptyDP
@@ -74,6 +75,14 @@ class WrapAMap(EmptyDP):
 
         return self.R.U(r)
 
+    def solve_batch(self, fs):
+        """ Uses the map's call_batch() if solve() is not overridden. """
+        if type(self).solve.__func__ is WrapAMap.solve.__func__:
+            rs = map_call_batch(self.amap, fs)
+            if rs is not None:
+                return [self.R.U(r) for r in rs]
+        return EmptyDP.solve_batch(self, fs)
+
     def diagram_label(self):  # XXX
         if hasattr(self.amap, '__name__'):
             return getattr(self.amap, '__name__')
@@ -23,6 +23,11 @@ class IdentityDP(WrapAMap):
         amap_dual = IdentityMap(F, F)
         WrapAMap.__init__(self, amap, amap_dual)
 
+    def solve_batch(self, fs):
+        if type(self).solve.__func__ is WrapAMap.solve.__func__:
+            return [self.R.U(f) for f in fs]
+        return WrapAMap.solve_batch(self, fs)
+
     def __repr__(self):
         return 'Id(%r)' % self.F
 
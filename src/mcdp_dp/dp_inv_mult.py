@@ -5,6 +5,7 @@ from mcdp_maps.repr_map import repr_map_product
 from mcdp_posets import Nat, Poset, PosetProduct, is_top
 from mcdp_posets.nat import Nat_mult_lowersets_continuous
 from mcdp_posets.rcomp import Rcomp_multiply_upper_topology_seq
+from mcdp_posets.uppersets import upperset_from_array
 from mcdp.exceptions import mcdp_dev_warning
 
 from .primitive import ApproximableDP, NotSolvableNeedsApprox, PrimitiveDP
@@ -91,7 +92,7 @@ class InvMult2U(PrimitiveDP):
     def solve(self, f):
         algo = InvMult2.ALGO
         options = invmultU_solve_options(F=self.F, R=self.R, f=f, n=self.n, algo=algo)
-        return self.R.Us(options)
+        return upperset_from_array(options, self.R)
     
     def solve_r(self, r):
         mcdp_dev_warning('this is not coherent with solve()')
@@ -136,7 +137,7 @@ class InvMult2L(PrimitiveDP):
     def solve(self, f):
         algo = InvMult2.ALGO
         options = invmultL_solve_options(F=self.F, R=self.R, f=f, n=self.n, algo=algo)
-        return self.R.Us(options)
+        return upperset_from_array(options, self.R)
         
     def repr_h_map(self):
         return repr_h_map_invmult(len(self.Rs))
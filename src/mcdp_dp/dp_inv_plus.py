@@ -4,6 +4,7 @@ from contracts.utils import check_isinstance, raise_desc
 from mcdp_posets import Nat, Poset, PosetProduct, RcompUnits
 from mcdp_posets import Rcomp, get_types_universe, is_top
 from mcdp_posets.nat import Nat_add
+from mcdp_posets.uppersets import upperset_from_array
 from mcdp.exceptions import DPInternalError, mcdp_dev_warning
 
 from .primitive import ApproximableDP, NotSolvableNeedsApprox, PrimitiveDP
@@ -105,7 +106,7 @@ class InvPlus2L(PrimitiveDP):
 
     def solve(self, f):
         options = sample_sum_lowerbound(self.F, self.R, f, self.nl)
-        return self.R.Us(options)
+        return upperset_from_array(options, self.R)
     
     def solve_r(self, r):
         """ 
@@ -148,7 +149,7 @@ class InvPlus2U(PrimitiveDP):
     def solve(self, f):
         #print('InvPlus2.ALGO : ', InvPlus2.ALGO )
         options = sample_sum_upperbound(self.F, self.R, f, self.nu)
-        return self.R.Us(options)
+        return upperset_from_array(options, self.R)
 
     def solve_r(self, r):
         r1, r2 = r
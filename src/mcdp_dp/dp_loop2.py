@@ -2,13 +2,15 @@
 from collections import namedtuple
 
 from contracts.utils import indent, raise_desc, raise_wrapped
+from mcdp import MCDPConstants
 from mcdp.development import do_extra_checks
 from mcdp_posets import (LowerSet, NotEqual, NotLeq, PosetProduct, UpperSet,
     UpperSets, get_types_universe, poset_maxima, poset_minima)
 from mcdp_posets.uppersets import upperset_project, LowerSets, lowerset_project
 
-from .primitive import Feasible, NotFeasible, PrimitiveDP
-from .tracer import Tracer
+from .primitive import Feasible, NotFeasible, PrimitiveDP, unique_points
+from .solve_cache import get_solve_cache
+from .tracer import Formatted, null_tracer
 
 
 __all__ = [
@@ -69,7 +71,6 @@ class DPLoop2(PrimitiveDP):
         self.R1 = R1
         self.R2 = R2
 
-        self._solve_cache = {}
         PrimitiveDP.__init__(self, F=F, R=R, I=M)
 
 
@@ -111,7 +112,7 @@ class DPLoop2(PrimitiveDP):
         M, M_pack, _ = get_product_compact(self.M0, self.F2, self.R2)
         options = set()
 
-        R = self.solve_all_cached(f1, Tracer())
+        R = self.solve_all_cached(f1, null_tracer)
         res = R['res_all']
 
         for (r1_, r2_) in res.minimals:
@@ -196,31 +197,99 @@ class DPLoop2(PrimitiveDP):
         return s
 
     def solve(self, f1):
-        t = Tracer()
-        res = self.solve_trace(f1, t)
-        return res
+        return self.solve_trace(f1, null_tracer)
     
     def solve_trace(self, f1, trace):
         res = self.solve_all_cached(f1, trace)
         return res['res_r1']
 
+    def solve_batch(self, f1s):
+        """
+            Iterates for all the values together: at each step, the new
+            points of all the iterates are expanded with one call
+            to dp1.solve_batch().
+        """
+        dp0 = self.dp1
+        R = dp0.get_res_space()
+        UR = UpperSets(R)
+        s0 = R.Us(R.get_minimal_elements())
+        cache = get_solve_cache()
+
+        results = {}
+        # f1 -> (current iterate, expanded points)
+        active = {}
+        for f1 in f1s:
+            if f1 in results or f1 in active:
+                continue
+            found, R_all = cache.lookup(self, 'solve_all', f1)
+            if found:
+                results[f1] = R_all['res_r1']
+            else:
+                active[f1] = (s0, {})
+
+        trace = null_tracer
+        while active:
+            todo = []
+            for f1, (s, expanded) in active.items():
+                for ra in s.minimals:
+                    if not ra in expanded:
+                        todo.append((f1, ra[1]))
+            points = unique_points([todo])
+            hrs = dict(zip(points, dp0.solve_batch(points)))
+
+            for f1, (s, expanded) in list(active.items()):
+                for ra in s.minimals:
+                    if not ra in expanded:
+                        expanded[ra] = expand_f_point(R, ra, hrs[(f1, ra[1])])
+                s_next, _ = solve_f_iterate(dp0, f1, R, s, trace,
+                                            expanded=expanded)
+                if UR.leq(s_next, s):
+                    res_r1 = upperset_project(s_next, 0)
+                    cache.store(self, 'solve_all', f1,
+                                dict(res_all=s_next, res_r1=res_r1))
+                    results[f1] = res_r1
+                    del active[f1]
+                else:
+                    active[f1] = (s_next, expanded)
+
+        return [results[f1] for f1 in f1s]
+
     def solve_r(self, r):
-        t = Tracer()
-        res = self.solve_r_trace(r, t)
-        return res
+        return self.solve_r_trace(r, null_tracer)
     
     def solve_r_trace(self, r, trace):
         res = self.solve_r_all(r, trace)
         return res['res_f1']
 
     def solve_all_cached(self, f1, trace):
-        if not f1 in self._solve_cache:
+        cache = get_solve_cache()
+        found, R = cache.lookup(self, 'solve_all', f1)
+        if not found:
             #print('solving again %s' % f1.__str__())
             R = self.solve_all(f1, trace)
-            self._solve_cache[f1] = R
-            
-        return trace.result(self._solve_cache[f1])
+            cache.store(self, 'solve_all', f1, R)
+
+        return trace.result(R)
     
+    def _get_warm_start(self, f1):
+        """
+            Returns a previously computed fixpoint for some f1' <= f1,
+            which is below the fixpoint for f1, or None.
+        """
+        cache = get_solve_cache()
+        best = None
+        for f1b in cache.cached_arguments(self, 'solve_all'):
+            if f1b == f1 or not self.F1.leq(f1b, f1):
+                continue
+            if best is None or self.F1.leq(best, f1b):
+                best = f1b
+        if best is None:
+            return None
+        found, R = cache.lookup(self, 'solve_all', best)
+        if not found:
+            return None
+        return best, R['res_all']
+
     def solve_all(self, f1, trace):
         """ Returns an upperset in UR. You want to project
             it to R1 to use as the output. """
@@ -230,25 +299,48 @@ class DPLoop2(PrimitiveDP):
         UR = UpperSets(R)
 
         # we consider a set of iterates
-        # we start from the bottom
-        trace.log('Iterating in UR = %s' % UR.__str__())
-        
-        s0 = R.Us(R.get_minimal_elements()) 
+        trace.log('Iterating in UR = %s', UR)
+
+        # we start from the bottom, or from the fixpoint of a smaller f1
+        warm = None
+        if MCDPConstants.loop2_warm_start:
+            warm = self._get_warm_start(f1)
+        if warm is not None:
+            trace.log('Starting from the solution for f1 = %s',
+                      Formatted(self.F1, warm[0]))
+            s0 = warm[1]
+        else:
+            s0 = R.Us(R.get_minimal_elements())
+
         S = [KleeneIteration(s=s0, s_converged=R.Us(set()),
                                 r=upperset_project(s0, 0),
                                 r_converged=R1.Us(set()))]
-            
+
+        # point of R -> its contribution to the next iterate;
+        # so we only need to expand the points that are new
+        expanded = {}
         for i in range(1, 1000000):  # XXX
             with trace.iteration(i) as t:
                 si_prev = S[-1].s
-                si_next, converged = solve_f_iterate(dp0, f1, R, si_prev, t)
+                si_next, converged = solve_f_iterate(dp0, f1, R, si_prev, t,
+                                                     expanded=expanded)
+
+                if i == 1 and warm is not None and not UR.leq(si_prev, si_next):
+                    # The iteration map was not monotone here;
+                    # be conservative and start again from the bottom.
+                    t.log('Warm start not valid; starting from the bottom.')
+                    s0 = R.Us(R.get_minimal_elements())
+                    S[0] = S[0]._replace(s=s0, r=upperset_project(s0, 0))
+                    si_prev = s0
+                    si_next, converged = solve_f_iterate(dp0, f1, R, si_prev, t,
+                                                         expanded=expanded)
                 iteration = KleeneIteration(s=si_next, 
                                             s_converged=converged,
                                             r=upperset_project(si_next, 0),
                                             r_converged=upperset_project(converged, 0))
                 S.append(iteration)
                 
-                t.log('R = %s' % UR.format(si_next))
+                t.log('R = %s', Formatted(UR, si_next))
 
                 if do_extra_checks():
                     try:
@@ -261,7 +353,7 @@ class DPLoop2(PrimitiveDP):
                 t.values(state=S[-1])
 
                 if UR.leq(si_next, si_prev):
-                    t.log('Breaking because converged (iteration %s) ' % i)
+                    t.log('Breaking because converged (iteration %s) ', i)
                     #t.log(' solution is %s' % (UR.format(sip)))
                     # todo: add reason why interrupted
                     break
@@ -284,24 +376,26 @@ class DPLoop2(PrimitiveDP):
 
         # we consider a set of iterates
         # we start from the bottom
-        trace.log('Iterating in LF = %s' % LF.__str__())
+        trace.log('Iterating in LF = %s', LF)
         
         s0 = F.Ls(F.get_maximal_elements()) 
         S = [KleeneIteration(s=s0, s_converged=F.Ls(set()),
                                 r=lowerset_project(s0, 0),
                                 r_converged=F1.Ls(set()))]
             
+        expanded = {}
         for i in range(1, 1000000):  # XXX
             with trace.iteration(i) as t:
                 si_prev = S[-1].s
-                si_next, converged = solve_r_iterate(dp0, r1, F, si_prev, t)
+                si_next, converged = solve_r_iterate(dp0, r1, F, si_prev, t,
+                                                     expanded=expanded)
                 iteration = KleeneIteration(s=si_next, 
                                             s_converged=converged,
                                             r=lowerset_project(si_next, 0),
                                             r_converged=lowerset_project(converged, 0))
                 S.append(iteration)
                 
-                t.log('si_next = %s' % LF.format(si_next))
+                t.log('si_next = %s', Formatted(LF, si_next))
 
                 if do_extra_checks():
                     try:
@@ -314,7 +408,7 @@ class DPLoop2(PrimitiveDP):
                 t.values(state=S[-1])
 
                 if LF.leq(si_next, si_prev):
-                    t.log('Breaking because converged (iteration %s) ' % i)
+                    t.log('Breaking because converged (iteration %s) ', i)
                     break
 
         trace.values(type='loop2r', LF=LF, F=F, dp=self, iterations=S)
@@ -326,42 +420,62 @@ class DPLoop2(PrimitiveDP):
         return result
 
 
-def solve_f_iterate(dp0, f1, R, S, trace):
+def solve_f_iterate(dp0, f1, R, S, trace, expanded=None):
     """ 
     
         Returns the next iteration  si \in UR 
 
         Min ( h(f1, r20) \cup  !r20 ) 
         
+        If not None, ``expanded`` is a dictionary that caches the
+        contribution of each point of S, so that across iterations
+        only the points that are new need to be solved for.
     """
     UR = UpperSets(R)
     if do_extra_checks():
         UR.belongs(S)
-    R2 = R[1]
     converged = set()  # subset of solutions for which they converged
     nextit = set()
     # find the set of all r2s
 
     for ra in S.minimals:
-        hr = dp0.solve_trace((f1, ra[1]), trace)
+        if expanded is not None and ra in expanded:
+            valid_ra, converged_ra = expanded[ra]
+        else:
+            hr = dp0.solve_trace((f1, ra[1]), trace)
+            valid_ra, converged_ra = expand_f_point(R, ra, hr)
+            if expanded is not None:
+                expanded[ra] = (valid_ra, converged_ra)
 
-        for rb in hr.minimals:
-            valid = R.leq(ra, rb) 
-
-            if valid:
-                nextit.add(rb)
-
-                feasible = R2.leq(rb[1], ra[1])
-                if feasible:
-                    converged.add(rb)
+        nextit.update(valid_ra)
+        converged.update(converged_ra)
 
     nextit = R.Us(poset_minima(nextit, R.leq))
     converged = R.Us(poset_minima(converged, R.leq))
 
     return nextit, converged
 
-def solve_r_iterate(dp0, r1, F, S, trace):
-    
+def expand_f_point(R, ra, hr):
+    """
+        Given the point ra of the iterate and hr = h(f1, ra[1]),
+        returns the lists of the valid points and of the converged ones.
+    """
+    R2 = R[1]
+    valid_ra = []
+    converged_ra = []
+    for rb in hr.minimals:
+        valid = R.leq(ra, rb)
+
+        if valid:
+            valid_ra.append(rb)
+
+            feasible = R2.leq(rb[1], ra[1])
+            if feasible:
+                converged_ra.append(rb)
+    return valid_ra, converged_ra
+
+def solve_r_iterate(dp0, r1, F, S, trace, expanded=None):
+    """ Dual of solve_f_iterate(). """
     LF = LowerSets(F)
     if do_extra_checks():
         LF.belongs(S)
@@ -371,18 +485,27 @@ def solve_r_iterate(dp0, r1, F, S, trace):
     # find the set of all r2s
 
     for fa in S.maximals:
-        hr = dp0.solve_r_trace((r1, fa[1]), trace)
-
-        for fb in hr.maximals:
-            # valid = R.leq(ra, rb) # ra <= rb
-            valid = F.leq(fb, fa) # fb <= fa 
-
-            if valid:
-                nextit.add(fb)
-
-                feasible = F2.leq(fa[1], fb[1])
-                if feasible:
-                    converged.add(fb)
+        if expanded is not None and fa in expanded:
+            valid_fa, converged_fa = expanded[fa]
+        else:
+            hr = dp0.solve_r_trace((r1, fa[1]), trace)
+            valid_fa = []
+            converged_fa = []
+            for fb in hr.maximals:
+                # valid = R.leq(ra, rb) # ra <= rb
+                valid = F.leq(fb, fa) # fb <= fa
+
+                if valid:
+                    valid_fa.append(fb)
+
+                    feasible = F2.leq(fa[1], fb[1])
+                    if feasible:
+                        converged_fa.append(fb)
+            if expanded is not None:
+                expanded[fa] = (valid_fa, converged_fa)
+
+        nextit.update(valid_fa)
+        converged.update(converged_fa)
 
     nextit = F.Ls(poset_maxima(nextit, F.leq))
     converged = F.Ls(poset_maxima(converged, F.leq))
@@ -8,6 +8,7 @@ from mcdp_posets.uppersets import lowerset_product_good
 from mcdp.development import do_extra_checks
 
 from .dp_series import get_product_compact
+from .executor import map_solve
 from .primitive import PrimitiveDP
 from .repr_strings import repr_h_map_parallel
 
@@ -117,9 +118,9 @@ class Parallel(PrimitiveDP):
 
         f1, f2 = f
 
-        r1 = self.dp1.solve(f1)
-        r2 = self.dp2.solve(f2)
-        
+        r1, r2 = map_solve([(self.dp1, 'solve', f1),
+                            (self.dp2, 'solve', f2)])
+
         R = self.get_res_space()
         s = []
         for m1, m2 in itertools.product(r1.minimals, r2.minimals):
@@ -129,10 +130,31 @@ class Parallel(PrimitiveDP):
 
         return res
 
+    def solve_batch(self, fs):
+        calls = [(self.dp1, 'solve_batch', [f[0] for f in fs]),
+                 (self.dp2, 'solve_batch', [f[1] for f in fs])]
+        u1s, u2s = map_solve(calls)
+        R = self.get_res_space()
+        res = []
+        products = {}
+        for u1, u2 in zip(u1s, u2s):
+            k = (id(u1), id(u2))
+            if not k in products:
+                s = itertools.product(u1.minimals, u2.minimals)
+                products[k] = R.Us(set(s))
+            res.append(products[k])
+        return res
+
+    def solve_r_batch(self, rs):
+        calls = [(self.dp1, 'solve_r_batch', [r[0] for r in rs]),
+                 (self.dp2, 'solve_r_batch', [r[1] for r in rs])]
+        l1s, l2s = map_solve(calls)
+        return [lowerset_product_good(lf1, lf2) for lf1, lf2 in zip(l1s, l2s)]
+
     def solve_r(self, r):
         r1, r2 = r
-        lf1 = self.dp1.solve_r(r1)
-        lf2 = self.dp2.solve_r(r2)
+        lf1, lf2 = map_solve([(self.dp1, 'solve_r', r1),
+                              (self.dp2, 'solve_r', r2)])
         return lowerset_product_good(lf1, lf2)
 
     def __repr__(self):
@@ -9,6 +9,7 @@ from mcdp_posets.uppersets import lowerset_product_multi, upperset_product_multi
 from mcdp.development import do_extra_checks
 
 from .dp_series import get_product_compact
+from .executor import map_solve
 from .primitive import PrimitiveDP
 
 
@@ -61,19 +62,30 @@ class ParallelN(PrimitiveDP):
             F = self.get_fun_space()
             F.belongs(f)
 
-        res = []
-        for i, dp in enumerate(self.dps):
-            ri = dp.solve(f[i])
-            res.append(ri)
-            
+        calls = [(dp, 'solve', f[i]) for i, dp in enumerate(self.dps)]
+        res = map_solve(calls)
         return upperset_product_multi(tuple(res))
-        
+
     def solve_r(self, r):
-        res = []
-        for i, dp in enumerate(self.dps):
-            fi = dp.solve_r(r[i])
-            res.append(fi)
-        return lowerset_product_multi(tuple(res))    
+        calls = [(dp, 'solve_r', r[i]) for i, dp in enumerate(self.dps)]
+        res = map_solve(calls)
+        return lowerset_product_multi(tuple(res))
+
+    def solve_batch(self, fs):
+        if not self.dps:
+            return PrimitiveDP.solve_batch(self, fs)
+        calls = [(dp, 'solve_batch', [f[i] for f in fs])
+                 for i, dp in enumerate(self.dps)]
+        res = map_solve(calls)
+        return [upperset_product_multi(_) for _ in zip(*res)]
+
+    def solve_r_batch(self, rs):
+        if not self.dps:
+            return PrimitiveDP.solve_r_batch(self, rs)
+        calls = [(dp, 'solve_r_batch', [r[i] for r in rs])
+                 for i, dp in enumerate(self.dps)]
+        res = map_solve(calls)
+        return [lowerset_product_multi(_) for _ in zip(*res)]
 
     def evaluate(self, m):
         _, _, unpack = self._get_product()
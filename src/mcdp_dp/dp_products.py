@@ -7,6 +7,7 @@ from mcdp_dp.sequences_invplus import Nat_mult_antichain_Max
 from mcdp_maps import ProductNMap, ProductNNatMap
 from mcdp_posets import Rcomp, RcompUnits
 from mcdp_posets.rcomp_units import check_mult_units_consistency_seq
+from mcdp_posets.uppersets import lowerset_from_array
 from mcdp.exceptions import mcdp_dev_warning
 
 from .dp_generic_unary import WrapAMap
@@ -72,9 +73,10 @@ class ProductNDP_L(WrapAMap):
         WrapAMap.__init__(self, amap, None)
         self.nl = nl
         
-    def solve_r(self, r):  # @UnusedVariable
-        msg = 'ProductNDP_L(%s, %s):solve_r()' % (self.F, self.nl)
-        raise_desc(NotImplementedError, msg)
+    def solve_r(self, r):
+        algo = InvMult2.ALGO
+        options = invmultU_solve_options(F=self.R, R=self.F, f=r, n=self.nl, algo=algo)
+        return lowerset_from_array(options, self.F)
         
     def repr_hd_map(self):
         return repr_hd_map_productn(2, 'L', self.nl)
@@ -86,9 +88,10 @@ class ProductNDP_U(WrapAMap):
         WrapAMap.__init__(self, amap, None)
         self.nl = nl #XXX
         
-    def solve_r(self, r):  # @UnusedVariable
-        msg = 'ProductNDP_U(%s, %s):solve_r()' % (self.F, self.nl)
-        raise_desc(NotImplementedError, msg)
+    def solve_r(self, r):
+        algo = InvMult2.ALGO
+        options = invmultL_solve_options(F=self.R, R=self.F, f=r, n=self.nl, algo=algo)
+        return lowerset_from_array(options, self.F)
 
     def repr_hd_map(self):
         return repr_hd_map_productn(2, 'U', self.nl)
@@ -105,7 +108,7 @@ class Product2DP_L(WrapAMap):
         algo = InvMult2.ALGO
         mcdp_dev_warning('Not sure about this: is it L or U?')
         options = invmultU_solve_options(F=self.R, R=self.F, f=r, n=self.nl, algo=algo)
-        return self.F.Ls(options)
+        return lowerset_from_array(options, self.F)
     
     def repr_hd_map(self):
         return repr_hd_map_productn(2, 'L')
@@ -123,7 +126,7 @@ class Product2DP_U(WrapAMap):
         mcdp_dev_warning('Not sure about this: is it L or U?')
         algo = InvMult2.ALGO
         options = invmultL_solve_options(F=self.R, R=self.F, f=r, n=self.nu, algo=algo)
-        return self.F.Ls(options)
+        return lowerset_from_array(options, self.F)
     
     
     def repr_hd_map(self):
@@ -167,9 +170,10 @@ class ProductNRcompDP_L(WrapAMap):
         WrapAMap.__init__(self, amap, None)
         self.nl = nl
 
-    def solve_r(self, f):  # @UnusedVariable
-        msg = 'ProductNRcompDP_L(%s, %s):solve_r()' % (self.Fs, self.nl)
-        raise_desc(NotImplementedError, msg)
+    def solve_r(self, r):
+        algo = InvMult2.ALGO
+        options = invmultU_solve_options(F=self.R, R=self.F, f=r, n=self.nl, algo=algo)
+        return lowerset_from_array(options, self.F)
         
     def repr_hd_map(self):
         return repr_hd_map_productn(len(self.F), 'L', self.nl)
@@ -184,9 +188,10 @@ class ProductNRcompDP_U(WrapAMap):
         WrapAMap.__init__(self, amap, None)
         self.nu = nu
 
-    def solve_r(self, f):  # @UnusedVariable
-        msg = 'ProductNRcompDP_U(%s, %s):solve_r()' % (self.Fs, self.nl)
-        raise_desc(NotImplementedError, msg)
+    def solve_r(self, r):
+        algo = InvMult2.ALGO
+        options = invmultL_solve_options(F=self.R, R=self.F, f=r, n=self.nu, algo=algo)
+        return lowerset_from_array(options, self.F)
         
     def repr_hd_map(self):
         return repr_hd_map_productn(len(self.F), 'U', self.nu)
@@ -205,7 +210,7 @@ class Product2RcompDP_L(WrapAMap):
         mcdp_dev_warning('Not sure about this')
         algo = InvMult2.ALGO
         options = invmultU_solve_options(F=self.R, R=self.F, f=r, n=self.nl, algo=algo)
-        return self.F.Ls(options)
+        return lowerset_from_array(options, self.F)
 
     def repr_hd_map(self):
         return repr_hd_map_productn(2, 'L', self.nl)
@@ -224,7 +229,7 @@ class Product2RcompDP_U(WrapAMap):
         mcdp_dev_warning('Not sure about this')
         algo = InvMult2.ALGO
         options = invmultL_solve_options(F=self.R, R=self.F, f=r, n=self.nl, algo=algo)
-        return self.F.Ls(options)
+        return lowerset_from_array(options, self.F)
 
     def repr_hd_map(self):
         return repr_hd_map_productn(2, 'U', self.nl)
@@ -3,11 +3,14 @@ from contracts.utils import indent, raise_desc, raise_wrapped
 from mcdp_posets import (NotBelongs, UpperSet,
     UpperSets, get_product_compact, poset_minima)
 from mcdp_posets import LowerSets, LowerSet
-from mcdp_posets.find_poset_minima.baseline_n2 import poset_maxima
+from mcdp_posets.find_poset_minima import poset_maxima
 from mcdp.exceptions import DPInternalError
-from mcdp_utils_misc.memoize_simple_imp import memoize_simple
-from .primitive import NotFeasible, PrimitiveDP
-from .tracer import Tracer
+from .dp_series_fused import get_fused_chain
+from .executor import get_dp_executor, map_solve
+from .primitive import (NotFeasible, PrimitiveDP, batch_apply_by_id, union_of,
+    unique_points)
+from .solve_cache import get_solve_cache, solve_cached
+from .tracer import null_tracer
 from mcdp.development import do_extra_checks, mcdp_dev_warning
 
 
@@ -38,12 +41,12 @@ class Series(PrimitiveDP):
         self.M2 = self.dp2.get_imp_space()
 
         M, _, _ = self._get_product()
-        self._solve_cache = {}
         PrimitiveDP.__init__(self, F=F1, R=R2, I=M)
 
     def __getstate__(self):
         state = dict(**self.__dict__)
         state.pop('prod', None)
+        state.pop('fused', None)
         return state
 
     def _get_product(self):
@@ -53,6 +56,12 @@ class Series(PrimitiveDP):
 
         return self.prod
 
+    def _get_fused(self):
+        """ Returns the FusedChain, or None. """
+        if not hasattr(self, 'fused'):
+            self.fused = get_fused_chain(self)
+        return self.fused
+
     def _unpack_m(self, m):
         M, _, unpack = self._get_product()
         if do_extra_checks():
@@ -66,7 +75,7 @@ class Series(PrimitiveDP):
         _, rs = self.dp2.evaluate(m2)
         return fs, rs
 
-    @memoize_simple
+    @solve_cached
     def get_implementations_f_r(self, f, r):
         # print('%s get_implementaion(%s, %s)' % (id(self), f, r))
         f1 = f
@@ -154,13 +163,21 @@ class Series(PrimitiveDP):
 
     # @memoize_simple
     def solve(self, func):
-        trace = Tracer()
-        return self.solve_trace(func, trace)
+        return self.solve_trace(func, null_tracer)
 
     def solve_trace(self, func, trace):
-        if func in self._solve_cache:
+        cache = get_solve_cache()
+        found, us = cache.lookup(self, 'solve', func)
+        if found:
             # trace.log('using cache for %s' % str(func))
-            return trace.result(self._solve_cache[func])
+            return trace.result(us)
+
+        fused = self._get_fused()
+        if fused is not None:
+            trace.values(type='series_fused')
+            us = fused.solve_trace(func, trace)
+            cache.store(self, 'solve', func, us)
+            return trace.result(us)
 
         trace.values(type='series')
 
@@ -174,20 +191,61 @@ class Series(PrimitiveDP):
 
         mcdp_dev_warning('rewrite this keeping structure')
         mins = set([])
-        for u in u1.minimals:
-            with trace.child('dp2') as t:
-                v = self.dp2.solve_trace(u, t)
-            mins.update(v.minimals)
+        if get_dp_executor() is not None and len(u1.minimals) > 1:
+            # The sub-traces are not recorded, only the results.
+            calls = [(self.dp2, 'solve', u) for u in u1.minimals]
+            for v in map_solve(calls):
+                with trace.child('dp2') as t:
+                    t.result(v)
+                mins.update(v.minimals)
+        else:
+            for u in u1.minimals:
+                with trace.child('dp2') as t:
+                    v = self.dp2.solve_trace(u, t)
+                mins.update(v.minimals)
 
         R = self.get_res_space()
         minimals = poset_minima(mins, R.leq)
 
         us = UpperSet(minimals, R)
 
-        self._solve_cache[func] = us
+        cache.store(self, 'solve', func, us)
         return trace.result(us)
 
+    def solve_batch(self, fs):
+        fused = self._get_fused()
+        if fused is not None:
+            return fused.solve_batch(fs)
+
+        u1s = self.dp1.solve_batch(fs)
+        # each intermediate point is solved only once
+        points = unique_points(u.minimals for u in u1s)
+        u2s = dict(zip(points, self.dp2.solve_batch(points)))
+        R = self.get_res_space()
+
+        def combine(u1):
+            mins = union_of(u2s[_].minimals for _ in u1.minimals)
+            return UpperSet(poset_minima(mins, R.leq), R)
+
+        return batch_apply_by_id(combine, u1s)
+
+    def solve_r_batch(self, rs):
+        l2s = self.dp2.solve_r_batch(rs)
+        points = unique_points(l.maximals for l in l2s)
+        l1s = dict(zip(points, self.dp1.solve_r_batch(points)))
+        F = self.get_fun_space()
+
+        def combine(l2):
+            maxs = union_of(l1s[_].maximals for _ in l2.maximals)
+            return LowerSet(poset_maxima(maxs, F.leq), F)
+
+        return batch_apply_by_id(combine, l2s)
+
     def solve_r(self, r):
+        fused = self._get_fused()
+        if fused is not None and fused.has_dual():
+            return fused.solve_r(r)
+
         l2 = self.dp2.solve_r(r)
 
         if do_extra_checks():
@@ -198,8 +256,8 @@ class Series(PrimitiveDP):
         maxs = set([])
         
         # todo: express as operation on antichains
-        for l in l2.maximals:    
-            v = self.dp1.solve_r(l)
+        calls = [(self.dp1, 'solve_r', l) for l in l2.maximals]
+        for v in map_solve(calls):
             maxs.update(v.maximals)
 
         F = self.get_fun_space()
@@ -229,6 +287,7 @@ class Series(PrimitiveDP):
 
 
 Series0 = Series 
+
 # 
 # if False:
 #     # Huge product spaces
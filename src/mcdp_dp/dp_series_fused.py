@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+    Fused evaluation of the single-valued maps (WrapAMap) at the two ends
+    of a chain of Series.
+
+    For a chain  m1 ; m2 ; ... ; X ; ... ; mk, solve() applies the maps
+    directly to the points, without creating an UpperSet, computing
+    the minima and recording a trace for each of them.
+    The Series objects are not changed.
+"""
+from mcdp import MCDPConstants
+from mcdp_posets import LowerSet, MapNotDefinedHere, UpperSet, poset_minima
+from mcdp_posets.find_poset_minima import poset_maxima
+
+from .dp_generic_unary import WrapAMap
+from .primitive import batch_apply, unique_points
+
+
+__all__ = [
+    'FusedChain',
+    'get_fused_chain',
+    'is_fusible_map',
+]
+
+
+def is_fusible_map(dp):
+    """ True if dp.solve(f) = {amap(f)} and dp.solve_r(r) = {amap_dual(r)}. """
+    if not isinstance(dp, WrapAMap):
+        return False
+    t = type(dp)
+    return (t.solve.__func__ is WrapAMap.solve.__func__ and
+            t.solve_r.__func__ is WrapAMap.solve_r.__func__ and
+            t.solve_trace.__func__ is WrapAMap.solve_trace.__func__)
+
+
+def get_fused_chain(series):
+    """
+        Returns a FusedChain for the Series, or None if there are
+        not at least two maps to fuse at either end.
+    """
+    if not MCDPConstants.series_fuse_maps:
+        return None
+    dps = unwrap_chain(series)
+    i = 0
+    while i < len(dps) and is_fusible_map(dps[i]):
+        i += 1
+    j = len(dps)
+    while j > i and is_fusible_map(dps[j - 1]):
+        j -= 1
+    first = dps[:i]
+    last = dps[j:]
+    if len(first) < 2 and len(last) < 2:
+        return None
+    middle = dps[i:j]
+    if not middle:
+        middle = None
+    elif len(middle) == 1:
+        middle = middle[0]
+    else:
+        from .dp_series import Series
+        middle = reduce(lambda a, b: Series(b, a), reversed(middle))
+    return FusedChain(series.get_fun_space(), series.get_res_space(),
+                      first, middle, last)
+
+
+def unwrap_chain(dp):
+    from .dp_series import Series
+    if not isinstance(dp, Series):
+        return [dp]
+    return unwrap_chain(dp.dp1) + unwrap_chain(dp.dp2)
+
+
+class FusedChain(object):
+    """ first ; middle ; last, where first and last are lists of WrapAMap. """
+
+    def __init__(self, F, R, first, middle, last):
+        self.F = F
+        self.R = R
+        self.first = [_.amap for _ in first]
+        self.last = [_.amap for _ in last]
+        # None if some map does not have the dual
+        duals_first = [_.amap_dual for _ in reversed(first)]
+        duals_last = [_.amap_dual for _ in reversed(last)]
+        if None in duals_first or None in duals_last:
+            self.first_dual = self.last_dual = None
+        else:
+            self.first_dual = duals_first
+            self.last_dual = duals_last
+        self.middle = middle
+
+    def has_dual(self):
+        return self.first_dual is not None
+
+    def solve_trace(self, f, trace):
+        try:
+            x = apply_maps(self.first, f)
+        except MapNotDefinedHere:
+            return self.R.Us([])
+        if self.middle is None:
+            points = [x]
+        else:
+            with trace.child('middle') as t:
+                points = self.middle.solve_trace(x, t).minimals
+        return self._finish_f(points)
+
+    def _finish_f(self, points):
+        if self.last:
+            images = set()
+            for p in points:
+                try:
+                    images.add(apply_maps(self.last, p))
+                except MapNotDefinedHere:
+                    pass
+            points = poset_minima(images, self.R.leq)
+        return UpperSet(points, self.R)
+
+    def solve_r(self, r):
+        try:
+            x = apply_maps(self.last_dual, r)
+        except MapNotDefinedHere:
+            return self.F.Ls([])
+        if self.middle is None:
+            points = [x]
+        else:
+            points = self.middle.solve_r(x).maximals
+        return self._finish_r(points)
+
+    def _finish_r(self, points):
+        if self.first_dual:
+            images = set()
+            for p in points:
+                try:
+                    images.add(apply_maps(self.first_dual, p))
+                except MapNotDefinedHere:
+                    pass
+            points = poset_maxima(images, self.F.leq)
+        return LowerSet(points, self.F)
+
+    def solve_batch(self, fs):
+        if self.middle is None:
+            return batch_apply(lambda f: self.solve_trace(f, None), fs)
+        xs = {}
+        for f in fs:
+            if not f in xs:
+                try:
+                    xs[f] = apply_maps(self.first, f)
+                except MapNotDefinedHere:
+                    xs[f] = None
+        points = unique_points([[_ for _ in xs.values() if _ is not None]])
+        us = dict(zip(points, self.middle.solve_batch(points)))
+
+        def finish(f):
+            if xs[f] is None:
+                return self.R.Us([])
+            return self._finish_f(us[xs[f]].minimals)
+
+        return batch_apply(finish, fs)
+
+
+def apply_maps(maps, x):
+    """ Might raise MapNotDefinedHere. """
+    for m in maps:
+        x = m(x)
+    return x
@@ -3,6 +3,7 @@ from contracts.utils import raise_desc
 from mcdp_dp import NotSolvableNeedsApprox, ApproximableDP
 from mcdp_maps import SumNIntMap, SumNNatsMap, SumNMap, SumNRcompMap
 from mcdp_posets import Int, is_top
+from mcdp_posets.uppersets import lowerset_from_array
 from mcdp.exceptions import DPNotImplementedError, mcdp_dev_warning
 
 from .dp_generic_unary import WrapAMap
@@ -108,13 +109,8 @@ class SumNUDP(WrapAMap):
         WrapAMap.__init__(self, amap)
         
     def solve_r(self, r):
-         
-        if len(self.Fs) > 2:
-            msg = 'Cannot invert more than two terms.'
-            raise_desc(NotImplementedError, msg)
-
         options = sample_sum_upperbound(self.R, self.F, r, self.n)
-        return self.F.Ls(options)
+        return lowerset_from_array(options, self.F)
     
     def repr_hd_map(self):
         return repr_hd_map_sumn(len(self.Fs), 'U', self.n)
@@ -135,12 +131,8 @@ class SumNLDP(WrapAMap):
         WrapAMap.__init__(self, amap)
         
     def solve_r(self, r):
-        if len(self.Fs) > 2:
-            msg = 'SumNLDP:solve_r: Cannot invert more than two terms.'
-            raise_desc(NotImplementedError, msg)
-            
         options = sample_sum_lowersets(self.R, self.F, r, self.n)
-        return self.F.Ls(options)
+        return lowerset_from_array(options, self.F)
 
     def repr_hd_map(self):
         return repr_hd_map_sumn(len(self.Fs), 'L', self.n)
@@ -183,13 +175,9 @@ class SumNRcompUDP(WrapAMap):
         WrapAMap.__init__(self, amap)
         
     def solve_r(self, r):
-        if self.n > 2:
-            msg = 'SumNRcompUDP: Cannot invert more than two terms.'
-            raise_desc(NotImplementedError, msg)
-
         mcdp_dev_warning('not sure')
         options = sample_sum_upperbound(self.R, self.F, r, self.nu)
-        return self.F.Ls(options)
+        return lowerset_from_array(options, self.F)
     
     
     def repr_hd_map(self):
@@ -212,13 +200,9 @@ class SumNRcompLDP(WrapAMap):
         WrapAMap.__init__(self, amap)
         
     def solve_r(self, r):
-        if self.n > 2:
-            msg = 'SumNRcompLDP:solve_r: Cannot invert more than two terms.'
-            raise_desc(NotImplementedError, msg)
-            
         mcdp_dev_warning('not sure')
         options = sample_sum_lowersets(self.R, self.F, r, self.nl)
-        return self.F.Ls(options)
+        return lowerset_from_array(options, self.F)
 
     def repr_hd_map(self):
         return repr_hd_map_sumn(self.n, 'L', self.nl)
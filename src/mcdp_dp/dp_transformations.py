@@ -11,31 +11,56 @@ from .primitive import ApproximableDP, PrimitiveDP
 @contract(dp=PrimitiveDP, returns=PrimitiveDP)
 def dp_transform(dp, f):
     """ Recursive application of a map f that is equivariant with
-        series and parallel operations. """
+        series and parallel operations.
+
+        The subtrees that f does not change are returned as they are
+        (not copied), so that the results cached for them are reused. """
     from .dp_series import Series0
     from .dp_parallel import Parallel
     from .dp_series_simplification import check_same_spaces
 
     if isinstance(dp, Series0):
-        return Series0(dp_transform(dp.dp1, f),
-                       dp_transform(dp.dp2, f))
+        dp1 = dp_transform(dp.dp1, f)
+        dp2 = dp_transform(dp.dp2, f)
+        if dp1 is dp.dp1 and dp2 is dp.dp2:
+            return dp
+        return Series0(dp1, dp2)
     elif isinstance(dp, Parallel):
-        return Parallel(dp_transform(dp.dp1, f),
-                       dp_transform(dp.dp2, f))
+        dp1 = dp_transform(dp.dp1, f)
+        dp2 = dp_transform(dp.dp2, f)
+        if dp1 is dp.dp1 and dp2 is dp.dp2:
+            return dp
+        return Parallel(dp1, dp2)
     elif isinstance(dp, ParallelN):
         dps = tuple(dp_transform(_, f) for _ in dp.dps)
+        if same_objects(dps, dp.dps):
+            return dp
         return ParallelN(dps)
     elif isinstance(dp, CoProductDPLabels):
-        return CoProductDPLabels(dp_transform(dp.dp, f), dp.labels)
+        dp1 = dp_transform(dp.dp, f)
+        if dp1 is dp.dp:
+            return dp
+        return CoProductDPLabels(dp1, dp.labels)
     elif isinstance(dp, CoProductDP):
         dps2 = tuple(dp_transform(_, f) for _ in dp.dps)
-        return CoProductDP(dps2) 
+        if same_objects(dps2, dp.dps):
+            return dp
+        return CoProductDP(dps2)
     elif isinstance(dp, DPLoop2):
-        return DPLoop2(dp_transform(dp.dp1, f))
+        dp1 = dp_transform(dp.dp1, f)
+        if dp1 is dp.dp1:
+            return dp
+        return DPLoop2(dp1)
     elif isinstance(dp, OpaqueDP):
-        return OpaqueDP(dp_transform(dp.dp, f))
+        dp1 = dp_transform(dp.dp, f)
+        if dp1 is dp.dp:
+            return dp
+        return OpaqueDP(dp1)
     elif isinstance(dp, LabelerDP):
-        return LabelerDP(dp_transform(dp.dp, f), dp.recname)
+        dp1 = dp_transform(dp.dp, f)
+        if dp1 is dp.dp:
+            return dp
+        return LabelerDP(dp1, dp.recname)
     else:
         dp2 = f(dp)
         try:
@@ -46,6 +71,10 @@ def dp_transform(dp, f):
         return dp2
 
 
+def same_objects(a, b):
+    return len(a) == len(b) and all(x is y for x, y in zip(a, b))
+
+
 @contract(dp=PrimitiveDP, nl='int,>=1', nu='int,>=1')
 def get_dp_bounds(dp, nl, nu):
     """ Returns a pair of design problems that are a lower and upper bound. """
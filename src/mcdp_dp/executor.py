@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+    Opt-in parallel evaluation of independent sub-problems.
+
+    The composite DPs (Parallel, ParallelN, CoProductDP, Series) describe
+    their independent sub-solves as a list of calls (dp, method, argument)
+    and pass them to map_solve(). By default the calls are executed
+    serially; if an executor was installed with set_dp_executor() or
+    the context manager use_dp_executor(), they are fanned out to
+    the workers.
+
+    The results are always returned in the order of the calls, so that
+    the antichains are merged exactly as in the serial case.
+
+    Nested composites run serially inside a worker; the parallelism is
+    exploited at the outermost level only.
+"""
+from abc import ABCMeta, abstractmethod
+from contextlib import contextmanager
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+import threading
+
+from contracts.utils import raise_desc
+
+
+__all__ = [
+    'DPExecutor',
+    'SerialExecutor',
+    'ThreadPoolDPExecutor',
+    'ProcessPoolDPExecutor',
+    'make_dp_executor',
+    'get_dp_executor',
+    'set_dp_executor',
+    'use_dp_executor',
+    'map_solve',
+]
+
+
+class DPExecutor(object):
+    __metaclass__ = ABCMeta
+
+    @abstractmethod
+    def map_calls(self, calls):
+        """
+            Executes the list of calls (dp, method, x) and returns the
+            list of results, in the same order.
+        """
+
+    def close(self):
+        pass
+
+
+class SerialExecutor(DPExecutor):
+    """ Executes the calls one after the other. """
+
+    def map_calls(self, calls):
+        return [_run_call(c) for c in calls]
+
+
+class ThreadPoolDPExecutor(DPExecutor):
+    """
+        Uses a pool of threads. Useful when the sub-solves are dominated by
+        code that releases the GIL (numpy).
+    """
+
+    def __init__(self, nworkers):
+        self.nworkers = nworkers
+        self.pool = ThreadPool(nworkers)
+
+    def map_calls(self, calls):
+        return self.pool.map(_run_call_in_worker, calls, chunksize=1)
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def __repr__(self):
+        return 'ThreadPoolDPExecutor(%s)' % self.nworkers
+
+
+class ProcessPoolDPExecutor(DPExecutor):
+    """
+        Uses a pool of processes. The DPs are pickled for each call,
+        so this is convenient only for expensive sub-solves.
+    """
+
+    def __init__(self, nworkers):
+        self.nworkers = nworkers
+        self.pool = multiprocessing.Pool(nworkers,
+                                         initializer=_process_initializer)
+
+    def map_calls(self, calls):
+        return self.pool.map(_run_call, calls, chunksize=1)
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def __repr__(self):
+        return 'ProcessPoolDPExecutor(%s)' % self.nworkers
+
+
+def make_dp_executor(kind, nworkers):
+    """ Creates an executor; kind is one of 'serial', 'thread', 'process'. """
+    if kind == 'serial':
+        return SerialExecutor()
+    if kind == 'thread':
+        return ThreadPoolDPExecutor(nworkers)
+    if kind == 'process':
+        return ProcessPoolDPExecutor(nworkers)
+    msg = 'Unknown executor kind.'
+    raise_desc(ValueError, msg, kind=kind,
+               available=['serial', 'thread', 'process'])
+
+
+class _Current(object):
+    executor = None
+
+
+_worker_state = threading.local()
+
+
+def get_dp_executor():
+    """ Returns the executor to use from this thread, or None. """
+    if getattr(_worker_state, 'in_worker', False):
+        return None
+    return _Current.executor
+
+
+def set_dp_executor(executor):
+    """ Installs the executor (None for serial execution). """
+    if executor is not None:
+        assert isinstance(executor, DPExecutor), executor
+    _Current.executor = executor
+
+
+@contextmanager
+def use_dp_executor(executor):
+    """
+        Installs the executor for the duration of the block,
+        and closes it at the end.
+    """
+    previous = _Current.executor
+    set_dp_executor(executor)
+    try:
+        yield executor
+    finally:
+        set_dp_executor(previous)
+        if executor is not None:
+            executor.close()
+
+
+def map_solve(calls):
+    """
+        Executes the list of calls (dp, method, x), where method is
+        the name of a method of dp such as 'solve' or 'solve_r',
+        and returns the list of results, in order.
+    """
+    executor = get_dp_executor()
+    if executor is None or len(calls) <= 1:
+        return [_run_call(c) for c in calls]
+    return executor.map_calls(calls)
+
+
+def _run_call(call):
+    dp, method, x = call
+    return getattr(dp, method)(x)
+
+
+def _run_call_in_worker(call):
+    _worker_state.in_worker = True
+    try:
+        return _run_call(call)
+    finally:
+        _worker_state.in_worker = False
+
+
+def _process_initializer():
+    # the executor was inherited from the parent by fork()
+    _Current.executor = None
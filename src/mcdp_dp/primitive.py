@@ -22,10 +22,53 @@ __all__ = [
     'EmptyDP',
     'ApproximableDP',
     'WrongUseOfUncertain',
+    'batch_apply',
 ]
 
 
 
+def batch_apply(function, xs):
+    """ Returns [function(x) for x in xs], calling function once per value. """
+    results = {}
+    res = []
+    for x in xs:
+        if not x in results:
+            results[x] = function(x)
+        res.append(results[x])
+    return res
+
+
+def unique_points(antichains):
+    """ Returns the list of the distinct points in the antichains. """
+    seen = set()
+    res = []
+    for a in antichains:
+        for x in a:
+            if not x in seen:
+                seen.add(x)
+                res.append(x)
+    return res
+
+
+def union_of(antichains):
+    res = set()
+    for a in antichains:
+        res.update(a)
+    return res
+
+
+def batch_apply_by_id(function, obs):
+    """ Returns [function(x) for x in obs], calling function once per object. """
+    results = {}
+    res = []
+    for x in obs:
+        k = id(x)
+        if not k in results:
+            results[k] = function(x)
+        res.append(results[k])
+    return res
+
+
 class NotFeasible(Exception):
     pass
 
@@ -202,6 +245,20 @@ class PrimitiveDP(WithInternalLog):
         minima = poset_minima(res, ressp.leq)
         return ressp.Us(minima)
 
+    def solve_batch(self, fs):
+        """
+            Solves for a sequence of functionality values.
+            Returns the list of the UpperSets, in the same order.
+
+            Repeated values are solved only once; subclasses override this
+            to compose the batches of their children.
+        """
+        return batch_apply(self.solve, fs)
+
+    def solve_r_batch(self, rs):
+        """ Dual of solve_batch(): returns a list of LowerSets. """
+        return batch_apply(self.solve_r, rs)
+
 #     def get_normal_form(self):
 #         """
 #             S is a Poset
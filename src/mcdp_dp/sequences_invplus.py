@@ -1,128 +1,182 @@
 # -*- coding: utf-8 -*-
+"""
+    Samples of the curves r1 * ... * rk = f and r1 + ... + rk = f used by
+    the approximations of InvMult2, InvPlus2, ProductN and SumN.
+
+    The samples are computed as arrays. The ones on the unit curve depend
+    only on (n, algo) and are memoised; each query scales them by f.
+    Products and sums of k > 2 terms are sampled recursively as
+    r1 * (r2 * ... * rk) and r1 + (r2 + ... + rk).
+
+    The functions return an (m, k) array, in which the top is represented
+    by +inf, to be converted with upperset_from_array() or
+    lowerset_from_array().
+"""
 from contracts import contract
-from contracts.utils import check_isinstance, raise_desc, raise_wrapped
+from contracts.utils import check_isinstance, raise_desc
 from mcdp_posets import PosetProduct, is_top, Nat
 from mcdp_posets.rcomp import finfo
-from mcdp_posets.utils import check_minimal
 from mcdp import MCDPConstants
 from mcdp.development import mcdp_dev_warning, do_extra_checks
+from mcdp_utils_misc import memoize_simple
 import numpy as np
 
 
 def invmultU_solve_options(F, R, f, n, algo):
-    """ Returns a set of points in R that are on the line r1*r2=f. """
+    """ Returns the points in R that are on the curve r1*...*rk = f. """
     from .dp_inv_mult import InvMult2
 
     assert algo in [InvMult2.ALGO_UNIFORM, InvMult2.ALGO_VAN_DER_CORPUT]
+    k = len(R)
     if is_top(F, f):
         mcdp_dev_warning('FIXME Need much more thought about this')
-        top1 = R[0].get_top()
-        top2 = R[1].get_top()
-        s = set([(top1, top2)])
-        return s
+        return np.full((1, k), np.inf)
 
     check_isinstance(f, float)
-            
+
     if f == 0.0:
-        return set([(0.0, 0.0)])
-
-    if algo == InvMult2.ALGO_UNIFORM:
-        mcdp_dev_warning('TODO: add ALGO as parameter. ')
-        ps = samplec(n, f)
-    elif algo == InvMult2.ALGO_VAN_DER_CORPUT:
-        x1, x2 = generate_exp_van_der_corput_sequence(n=n, C=f)
-        ps = zip(x1, x2)
-    else: # pragma: no cover
-        assert False
-    return ps
+        return np.zeros((1, k))
+
+    return _invmult_points(n, np.array(f), algo, k, lower=False)
+
 
 def invmultL_solve_options(F, R, f, n, algo):
-    """ Returns a set of points that are *below* r1*r2 = f """
+    """ Returns n points that are *below* r1*...*rk = f """
     from .dp_inv_mult import InvMult2
     assert algo in [InvMult2.ALGO_UNIFORM, InvMult2.ALGO_VAN_DER_CORPUT]
-    
+    k = len(R)
     if f == 0.0:
-        return set([(0.0, 0.0)])
+        return np.zeros((1, k))
 
     if is_top(F, f):
         mcdp_dev_warning('FIXME Need much more thought about this')
-        top1 = R[0].get_top()
-        top2 = R[1].get_top()
-        s = set([(top1, top2)])
-        return s
+        return np.full((1, k), np.inf)
 
-    if algo == InvMult2.ALGO_UNIFORM:
-        if n == 1:
-            points = [(0.0, 0.0)]
-        elif n == 2:
-            points = [(0.0, 0.0)]
-        else:
-            pu = sorted(samplec(n - 1, f), key=lambda _: _[0])
-            assert len(pu) == n - 1, (len(pu), n - 1)
-            nu = len(pu)
+    points = _invmult_points(n, np.array(f), algo, k, lower=True)
+    if k == 2:
+        assert len(points) == n, (n, len(points), points)
+    return points
 
-            points = set()
-            points.add((0.0, pu[0][1]))
-            points.add((pu[-1][0], 0.0))
-            for i in range(nu - 1):
-                p = (pu[i][0], pu[i + 1][1])
-                points.add(p)
 
-    elif algo == InvMult2.ALGO_VAN_DER_CORPUT:
+def _invmult_points(n, c, algo, k, lower):
+    """ c: array of products; returns an array of shape c.shape + (m, k) """
+    if lower:
+        first = _invmult2_below(_first_factor_samples(n, k), c, algo)
+    else:
+        first = _invmult2_on(_first_factor_samples(n, k), c, algo)
+    if k == 2:
+        return first
+    nrest = max(1, n // first.shape[-2])
+    rest = _invmult_points(nrest, first[..., 1], algo, k - 1, lower)
+    return _combine(first[..., 0], rest)
 
-        if n == 1:
-            points = set([(0.0, 0.0)])
-        else:
-            x1, x2 = generate_exp_van_der_corput_sequence(n=n - 1, C=f)
-            pu = zip(x1, x2)
-            assert len(pu) == n - 1, pu
 
-            if do_extra_checks():
-                check_minimal(pu, R)
+def _invmult2_on(n, c, algo):
+    """ n points on each curve r1 * r2 = c, sorted by r1. """
+    from .dp_inv_mult import InvMult2
+    with np.errstate(under='ignore', divide='ignore'):
+        if algo == InvMult2.ALGO_UNIFORM:
+            unit = sample_unit_hyperbola(n)
+            s = np.sqrt(c)[..., np.newaxis, np.newaxis]
+            res = unit * s
+        elif algo == InvMult2.ALGO_VAN_DER_CORPUT:
+            logx1 = _van_der_corput_tan(n)
+            x1 = _exp_van_der_corput_tan(n)
+            M = np.log(c)[..., np.newaxis]
+            x2 = exp_bounded(M - logx1)
+            x1 = np.broadcast_to(x1, x2.shape)
+            res = np.stack((x1, x2), axis=-1)
+        else:  # pragma: no cover
+            assert False, algo
+    # the only minimal point with product 0
+    res[c == 0] = 0.0
+    return res
+
+
+def _invmult2_below(n, c, algo):
+    """
+        n points below each curve r1 * r2 = c, such that the curve is
+        contained in their upper closure: the corners between the n - 1
+        points on the curve, and two points on the axes.
+    """
+    if n == 1:
+        return np.zeros(c.shape + (1, 2))
+    pu = _invmult2_on(n - 1, c, algo)
+    zero = np.zeros(c.shape + (1,))
+    x = np.concatenate((zero, pu[..., 0]), axis=-1)
+    y = np.concatenate((pu[..., 1], zero), axis=-1)
+    return np.stack((x, y), axis=-1)
 
-            nu = len(pu)
-            points = []
-            points.append((0.0, pu[0][1]))
 
-            for i in range(nu - 1):
-                p = (pu[i][0], pu[i + 1][1])
-                points.append(p)
+def _first_factor_samples(n, k):
+    """ Number of samples for r1, so that there are about n in total. """
+    if k == 2:
+        return n
+    return max(1, int(round(n ** (1.0 / (k - 1)))))
 
-            points.append((pu[-1][0], 0.0))
 
-            points = set(points)
-    else: # pragma: no cover
-        assert False
+def _combine(first, rest):
+    """
+        first: values of r1, shape S + (n1,)
+        rest: for each, the values of (r2, ..., rk), shape S + (n1, m, k-1)
 
-    assert len(points) == n, (n, len(points), points)
+        Returns the array of shape S + (n1 * m, k).
+    """
+    a = np.broadcast_to(first[..., np.newaxis, np.newaxis],
+                        rest.shape[:-1] + (1,))
+    res = np.concatenate((a, rest), axis=-1)
+    n1, m, k1 = rest.shape[-3:]
+    return res.reshape(rest.shape[:-3] + (n1 * m, k1 + 1))
 
-    return points
 
-def samplec(n, c):
-    """ Samples n points on the curve xy=c """
-    ps = sample(n)
-    assert len(ps) == n, (n, len(ps), ps)
-    s = np.sqrt(c)
-    ps = [(x * s, y * s) for x, y in ps]
-    return ps
-
-@contract(n='int,>=1', returns='list(tuple(float, float))')
-def sample(n):
-    """ Samples n points on the curve xy=1 """
+@memoize_simple
+def sample_unit_hyperbola(n):
+    """ Samples n points on the curve xy=1; returns an (n, 2) array sorted by x. """
     assert n >= 1
-    points = set()
-
     # divide the interval [0,1] equally in n/2 intervals
     m = n / 2
     xs = np.linspace(0.0, 1.0, m + 2)[1:-1]
     ys = 1.0 / xs
+    parts = [np.column_stack((xs, ys))]
     if m * 2 < n:  # odd
-        points.add((1.0, 1.0))
-    points.update(zip(xs, ys))
-    points.update(zip(ys, xs))
-    return list(points)
+        parts.append(np.array([[1.0, 1.0]]))
+    parts.append(np.column_stack((ys[::-1], xs[::-1])))
+    res = np.vstack(parts)
+    res.flags.writeable = False
+    return res
+
+
+def exp_bounded(x):
+    """
+        np.exp(x), in which the values that overflow (underflow) are
+        replaced by 1/eps (eps), with eps = MCDPConstants.inv_relations_eps.
+    """
+    eps = MCDPConstants.inv_relations_eps
+    with np.errstate(over='ignore', under='ignore'):
+        y = np.exp(x)
+    y = np.where(y == np.inf, 1.0 / eps, y)
+    return np.where(y < finfo.tiny, eps, y)
+
+
+def _default_mapping_function(x):
+    return np.tan(((x - 0.5) * 2) * (np.pi / 2))
+
+
+@memoize_simple
+def _van_der_corput_tan(n):
+    v = np.array(van_der_corput_sequence(n))
+    res = _default_mapping_function(v)
+    res.flags.writeable = False
+    return res
+
+
+@memoize_simple
+def _exp_van_der_corput_tan(n):
+    res = exp_bounded(_van_der_corput_tan(n))
+    res.flags.writeable = False
+    return res
+
 
-        
 @contract(n='int,>=1', returns='tuple(*,*)')
 def generate_exp_van_der_corput_sequence(n, C=1.0, mapping_function=None):
     """
@@ -131,36 +185,20 @@ def generate_exp_van_der_corput_sequence(n, C=1.0, mapping_function=None):
         Returns a pair of numpy arrays
         
         so that x1*x2 = C.
-        
-        
     """
     if C <= 0.0: # pragma: no cover
         raise_desc(ValueError, 'Need positive C, got %r.' % C)
 
-    v = np.array(van_der_corput_sequence(n))
-
     if mapping_function is None:
-        mapping_function = lambda x: np.tan(((x - 0.5) * 2) * (np.pi / 2))
-    v2 = np.array(map(mapping_function, v))
+        v2 = _van_der_corput_tan(n)
+        x1 = _exp_van_der_corput_tan(n)
+    else:
+        v = np.array(van_der_corput_sequence(n))
+        v2 = np.array(map(mapping_function, v))
+        x1 = exp_bounded(v2)
     M = np.log(C)
-    logx1 = v2
-    logx2 = M - v2
-
-    eps = MCDPConstants.inv_relations_eps 
-    maxi = 1 / eps
-     
-    def myexp(x):
-        try:
-            return np.exp(x)
-        except FloatingPointError:
-            if x < 0:
-                return eps
-            else:
-                return maxi
-
-    x1 = np.array(map(myexp, logx1))
-    x2 = np.array(map(myexp, logx2))
-    return x1, x2
+    x2 = exp_bounded(M - v2)
+    return np.array(x1), x2
 
 def Nat_mult_antichain_Min(m):
     """ 
@@ -229,162 +267,127 @@ def Nat_mult_antichain_Max(m):
     return s
 
 
+
 def sample_sum_lowerbound(F, R, f, n):
     """ 
-        Returns a set of points in R below the line {(a,b) | a + b = f } 
-        such that the line is contained in the upperclosure of the points.
+        Returns n points in R below the plane {r | r1 + ... + rk = f }
+        such that the plane is contained in the upperclosure of the points.
         
         It uses the variable InvPlus2.ALGO to decide the type 
         of sampling.
     """
-    check_isinstance(R, PosetProduct) 
-    assert len(R) == 2
-    
-    if is_top(F, f):
-            # +infinity
-        top1 = R[0].get_top()
-        top2 = R[1].get_top()
-        return set([(top1, 0.0), (0.0, top2)])
-        
-    if F.leq(f, 0.0): # f == 0
-        return set([(0.0, 0.0)])
-        
-         
-    from mcdp_dp.dp_inv_plus import InvPlus2
-    if InvPlus2.ALGO == InvPlus2.ALGO_VAN_DER_CORPUT:
-        options = van_der_corput_sequence(n + 1)
-    elif InvPlus2.ALGO == InvPlus2.ALGO_UNIFORM:
-        options = np.linspace(0.0, 1.0, n + 1)
-    else:
-        assert False, InvPlus2.ALGO
-
-    s = []
-    for o in options:
-        s.append((f * o, f * (1.0 - o)))
-
-    options = set()
-    for i in range(n):
-        x = s[i][0]
-        y = s[i + 1][1]
-        
-        a = R.meet(s[i], s[i+1])
-        assert (x,y) == a, ((x,y), a)
-        
-        options.add((x, y))    
-
-    return options
+    check_isinstance(R, PosetProduct)
+    k = len(R)
 
+    if is_top(F, f):
+        # +infinity: (top, 0, ..., 0), ..., (0, ..., 0, top)
+        return np.diag([np.inf] * k)
 
-def van_der_corput_sequence(n):
-    return sorted([1.0] + [float(van_der_corput(_)) for _ in range(n - 1)])
+    if F.leq(f, 0.0): # f == 0
+        return np.zeros((1, k))
 
-def van_der_corput(n, base=2):
-    vdc, denom = 0, 1
-    while n:
-        denom *= base
-        n, remainder = divmod(n, base)
-        vdc += remainder * 1.0 / denom
-    return vdc
+    return _invplus_points(n, np.array(f), k, 'below')
 
 
 def sample_sum_lowersets(F, R, f, n):
     """ 
-        Returns a set of points in R *above* the line {(a,b) | a + b = f } 
-        such that the line is contained in the downclosure of the points.
+        Returns n points in R *above* the plane {r | r1 + ... + rk = f }
+        such that the plane is contained in the downclosure of the points.
         
         It uses the variable InvPlus2.ALGO to decide the type of sampling.
     """
-    check_isinstance(R, PosetProduct) 
-    assert len(R) == 2
-    
+    check_isinstance(R, PosetProduct)
+    k = len(R)
+
     if is_top(F, f):
         # this is not correct, however it does not form a monotone sequence
-            # +infinity
-        top1 = R[0].get_top()
-        top2 = R[1].get_top()
-        return set([(top1, top2)])
-        
+        return np.full((1, k), np.inf)
+
     if F.leq(f, 0.0): # f == 0
-        return set([(0.0, 0.0)])
-         
-    from mcdp_dp.dp_inv_plus import InvPlus2
-    if InvPlus2.ALGO == InvPlus2.ALGO_VAN_DER_CORPUT:
-        options = van_der_corput_sequence(n + 1)
-    elif InvPlus2.ALGO == InvPlus2.ALGO_UNIFORM:
-        options = np.linspace(0.0, 1.0, n + 1)
-    else:
-        assert False, InvPlus2.ALGO
-
-    s = []
-    for o in options:
-        try:
-            s.append((f * o, f * (1.0 - o)))
-        except FloatingPointError as e:
-            if 'underflow' in str(e):
-                # assert f <= finfo.tiny, (f, finfo.tiny) 
-                mcdp_dev_warning('not sure about this')
-                s.append((finfo.eps, finfo.eps))
-            else:
-                raise_wrapped(FloatingPointError, e, 'error', f=f, o=o)
-
-    # the sequence s[] is ordered
-    for i in range(len(s)-1):
-        xs = [_[0] for _ in s]
-        ys = [_[1] for _ in s]
-        
-        if not xs[i] < xs[i+1]:
-            msg = 'Invalid sequence (s[%s].x = %s !< s[%s].x = %s.' % (i, xs[i],
-                                                                   i+1, xs[i+1])
-            xs2 = map(R[0].format, xs)
-            ys2 = map(R[1].format, ys)
-            raise_desc(AssertionError, msg, s=s, xs=xs, ys=ys, xs2=xs2, ys2=ys2)
-        
-    options = set()
-    for i in range(n):
-        x = s[i + 1][0]
-        y = s[i][1] # join
-        
-        a = R.join(s[i], s[i+1])
-        
-        if (x,y) != a:
-            msg = 'Numerical error'
-            raise_desc(AssertionError, msg,
-                       x=x, y=y, a=a, s_i=s[i], s_i_plus=s[i+1])
-        options.add((x, y))    
+        return np.zeros((1, k))
+
+    res = _invplus_points(n, np.array(f), k, 'above')
+    if do_extra_checks() and k == 2:
+        xs = res[:, 0]
+        if not np.all(xs[:-1] < xs[1:]):
+            msg = 'Invalid sequence.'
+            raise_desc(AssertionError, msg, f=f, xs=xs)
+    return res
 
-    return options
 
 def sample_sum_upperbound(F, R, f, nu):
     """ 
         F = X
-        R = PosetProduct((X, X))
+        R = PosetProduct((X, ..., X))
         
-        Returns a set of points in R on the line {(a,b) | a + b = f }.
+        Returns nu points in R on the plane {r | r1 + ... + rk = f }.
         
         If f = Top, F = Top.
     
         It uses the variable InvPlus2.ALGO to decide the type 
         of sampling.
     """
-
+    k = len(R)
     if is_top(F, f):
         # +infinity
-        top1 = R[0].get_top()
-        top2 = R[1].get_top()
-        return set([(top1, top2)])
+        return np.full((1, k), np.inf)
     
     if F.leq(f, 0.0): # f == 0
-        return set([(0.0, 0.0)])
-    
+        return np.zeros((1, k))
+
+    return _invplus_points(nu, np.array(f), k, 'on')
+
+
+def _invplus_points(n, c, k, kind):
+    """ c: array of sums; returns an array of shape c.shape + (m, k) """
     from mcdp_dp.dp_inv_plus import InvPlus2
-    if InvPlus2.ALGO == InvPlus2.ALGO_VAN_DER_CORPUT:
-        options = van_der_corput_sequence(nu)
-    elif InvPlus2.ALGO == InvPlus2.ALGO_UNIFORM:
-        options = np.linspace(0.0, 1.0, nu)
+    unit = _sample_unit_sum(_first_factor_samples(n, k), InvPlus2.ALGO, kind)
+    with np.errstate(under='ignore'):
+        first = c[..., np.newaxis, np.newaxis] * unit
+    if k == 2:
+        return first
+    nrest = max(1, n // unit.shape[0])
+    rest = _invplus_points(nrest, first[..., 1], k - 1, kind)
+    return _combine(first[..., 0], rest)
+
+
+@memoize_simple
+def _sample_unit_sum(n, algo, kind):
+    """
+        Points on, below or above the segment a + b = 1, sorted by a:
+
+            on: n points on the segment;
+            below: n corners below, between n + 1 points on the segment;
+            above: n corners above, between n + 1 points on the segment.
+    """
+    from mcdp_dp.dp_inv_plus import InvPlus2
+    m = n if kind == 'on' else n + 1
+    if algo == InvPlus2.ALGO_VAN_DER_CORPUT:
+        options = np.array(van_der_corput_sequence(m))
+    elif algo == InvPlus2.ALGO_UNIFORM:
+        options = np.linspace(0.0, 1.0, m)
     else:
-        assert False, InvPlus2.ALGO
+        assert False, algo
 
-    s = set()
-    for o in options:
-        s.add((f * o, f * (1.0 - o)))
-    return s
\ No newline at end of file
+    if kind == 'on':
+        res = np.column_stack((options, 1.0 - options))
+    elif kind == 'below':
+        res = np.column_stack((options[:-1], 1.0 - options[1:]))
+    elif kind == 'above':
+        res = np.column_stack((options[1:], 1.0 - options[:-1]))
+    else:  # pragma: no cover
+        assert False, kind
+    res.flags.writeable = False
+    return res
+
+
+def van_der_corput_sequence(n):
+    return sorted([1.0] + [float(van_der_corput(_)) for _ in range(n - 1)])
+
+def van_der_corput(n, base=2):
+    vdc, denom = 0, 1
+    while n:
+        denom *= base
+        n, remainder = divmod(n, base)
+        vdc += remainder * 1.0 / denom
+    return vdc
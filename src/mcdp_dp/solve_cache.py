@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+    A cache shared by all the DPs for the results of solve(), solve_r()
+    and similar methods.
+
+    The entries are keyed by (node, method, argument), where node is
+    a token that identifies the DP instance. The cache is bounded
+    (number of entries and/or estimated size) and the per-node hit/miss
+    counters can be inspected with get_solve_cache().get_stats().
+"""
+from itertools import count
+import sys
+import threading
+import weakref
+
+from decorator import decorator
+
+from mcdp import MCDPConstants
+from mcdp_posets import LowerSet, UpperSet
+from mcdp_utils_misc import BoundedCache
+
+
+__all__ = [
+    'SolveCache',
+    'get_solve_cache',
+    'set_solve_cache',
+    'solve_cached',
+]
+
+
+class SolveCacheNodeStats(object):
+
+    def __init__(self, token, description):
+        self.token = token
+        self.description = description
+        self.hits = 0
+        self.misses = 0
+        # method -> set of arguments currently cached
+        self.cached = {}
+
+
+class SolveCache(object):
+
+    def __init__(self, max_entries=None, max_bytes=None, policy='lru'):
+        self.cache = BoundedCache(max_entries=max_entries,
+                                  max_bytes=max_bytes,
+                                  policy=policy,
+                                  on_evict=self._on_evict)
+        self.lock = threading.RLock()
+        self.tokens = count()
+        # dp -> SolveCacheNodeStats; forgotten when the dp is collected
+        self.nodes = weakref.WeakKeyDictionary()
+        # token -> SolveCacheNodeStats
+        self.by_token = weakref.WeakValueDictionary()
+
+    def _get_node(self, dp):
+        with self.lock:
+            node = self.nodes.get(dp, None)
+            if node is None:
+                token = next(self.tokens)
+                node = SolveCacheNodeStats(token, type(dp).__name__)
+                self.nodes[dp] = node
+                self.by_token[token] = node
+            return node
+
+    def lookup(self, dp, method, x):
+        """ Returns a tuple (found, value). """
+        node = self._get_node(dp)
+        key = (node.token, method, x)
+        with self.lock:
+            if key in self.cache:
+                node.hits += 1
+                return True, self.cache.get(key)
+            node.misses += 1
+            return False, None
+
+    def store(self, dp, method, x, value):
+        node = self._get_node(dp)
+        key = (node.token, method, x)
+        size = estimate_nbytes(value)
+        with self.lock:
+            self.cache.put(key, value, size)
+            if key in self.cache:
+                node.cached.setdefault(method, set()).add(x)
+
+    def cached_arguments(self, dp, method):
+        """ Returns the arguments for which dp.method() is cached. """
+        node = self._get_node(dp)
+        with self.lock:
+            return list(node.cached.get(method, ()))
+
+    def _on_evict(self, key, value):  # @UnusedVariable
+        token, method, x = key
+        node = self.by_token.get(token, None)
+        if node is not None:
+            node.cached.get(method, set()).discard(x)
+
+    def clear(self):
+        """ Removes all entries (the statistics are preserved). """
+        with self.lock:
+            self.cache.clear()
+            for node in self.by_token.values():
+                node.cached = {}
+
+    def get_stats(self):
+        """ Returns a dict with global and per-node statistics. """
+        with self.lock:
+            nodes = []
+            for node in sorted(self.by_token.values(), key=lambda _: _.token):
+                ncached = sum(len(_) for _ in node.cached.values())
+                nodes.append(dict(node=node.token,
+                                  description=node.description,
+                                  hits=node.hits,
+                                  misses=node.misses,
+                                  entries=ncached))
+            return dict(entries=len(self.cache),
+                        nbytes=self.cache.nbytes,
+                        evictions=self.cache.nevictions,
+                        max_entries=self.cache.max_entries,
+                        max_bytes=self.cache.max_bytes,
+                        policy=self.cache.policy,
+                        hits=sum(_['hits'] for _ in nodes),
+                        misses=sum(_['misses'] for _ in nodes),
+                        nodes=nodes)
+
+    def format_stats(self):
+        stats = self.get_stats()
+        s = ('solve cache: %d entries (%d bytes), %d evictions, '
+             '%d hits, %d misses' % (stats['entries'], stats['nbytes'],
+                                     stats['evictions'], stats['hits'],
+                                     stats['misses']))
+        for n in stats['nodes']:
+            if n['hits'] or n['misses']:
+                s += ('\n %5d %-30s hits %6d misses %6d entries %6d' %
+                      (n['node'], n['description'], n['hits'], n['misses'],
+                       n['entries']))
+        return s
+
+
+def estimate_nbytes(ob, _depth=0):
+    """ Rough estimate of the memory used by ob. """
+    if isinstance(ob, UpperSet):
+        return estimate_nbytes(ob.minimals, _depth)
+    if isinstance(ob, LowerSet):
+        return estimate_nbytes(ob.maximals, _depth)
+    n = sys.getsizeof(ob)
+    if _depth < 3:
+        if isinstance(ob, dict):
+            for k, v in ob.items():
+                n += estimate_nbytes(k, _depth + 1)
+                n += estimate_nbytes(v, _depth + 1)
+        elif isinstance(ob, (tuple, list, set, frozenset)):
+            for x in ob:
+                n += estimate_nbytes(x, _depth + 1)
+    return n
+
+
+class _Current(object):
+    cache = None
+
+
+def get_solve_cache():
+    """ Returns the shared cache, created from MCDPConstants if needed. """
+    if _Current.cache is None:
+        _Current.cache = SolveCache(
+            max_entries=MCDPConstants.solve_cache_max_entries,
+            max_bytes=MCDPConstants.solve_cache_max_bytes,
+            policy=MCDPConstants.solve_cache_policy)
+    return _Current.cache
+
+
+def set_solve_cache(cache):
+    """ Replaces the shared cache. """
+    assert isinstance(cache, SolveCache), cache
+    _Current.cache = cache
+
+
+def solve_cached(method):
+    """
+        Decorator for methods of PrimitiveDP that caches the results
+        in the shared cache. Exceptions are not cached.
+    """
+    name = method.__name__
+
+    def wrapper(f, self, *args):
+        x = args[0] if len(args) == 1 else args
+        cache = get_solve_cache()
+        found, value = cache.lookup(self, name, x)
+        if not found:
+            value = f(self, *args)
+            cache.store(self, name, x, value)
+        return value
+
+    return decorator(wrapper, method)
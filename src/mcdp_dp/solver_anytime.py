@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+    Anytime solving of DPs that need approximations.
+
+    Rather than choosing the resolutions nl, nu for get_dp_bounds() in
+    advance, solve_anytime() starts from a coarse resolution and doubles
+    it, yielding the successive lower and upper bounds, until the gap
+    between them is below a tolerance or the time budget is exhausted.
+"""
+from collections import namedtuple
+import time
+
+from contracts.utils import raise_desc
+from mcdp_posets import (Nat, NotJoinable, PosetProduct, Rcomp, RcompUnits,
+                         UpperSets, is_top, poset_minima)
+
+from .dp_transformations import get_dp_bounds
+
+
+__all__ = [
+    'solve_anytime',
+    'AnytimeBounds',
+    'bounds_gap',
+    'upperset_intersection',
+]
+
+AnytimeBounds = namedtuple('AnytimeBounds',
+                           ['n', 'lower', 'upper', 'gap', 'elapsed'])
+
+
+def solve_anytime(dp, f, tolerance=None, deadline=None, n0=1, n_max=None):
+    """
+        Generator of AnytimeBounds(n, lower, upper, gap, elapsed),
+        with n = n0, 2 n0, 4 n0, ...
+
+        lower and upper are the best bounds found so far for dp.solve(f):
+        the bounds for different n are not necessarily nested, so lower
+        is the intersection of the lower bounds and upper is the union
+        (the meet in UpperSets(R)) of the upper bounds.
+        gap = bounds_gap(R, lower, upper) and elapsed is the time
+        since the start.
+
+        Stops when gap <= tolerance, when n would exceed n_max, or when
+        the next refinement is not expected to finish within deadline
+        seconds from the start (the duration of the next refinement is
+        extrapolated from the last two). At least one refinement is
+        always computed.
+
+        The deadline is only checked between refinements: a refinement
+        that has started is not interrupted, so the first one, or one
+        that takes longer than extrapolated, can end after the deadline.
+    """
+    if tolerance is None and deadline is None and n_max is None:
+        msg = 'Need at least one of tolerance, deadline, n_max.'
+        raise_desc(ValueError, msg)
+
+    R = dp.get_res_space()
+    UR = UpperSets(R)
+    t0 = time.time()
+    n = n0
+    lower = upper = None
+    previous_duration = None
+    while True:
+        t_start = time.time()
+        dpL, dpU = get_dp_bounds(dp, n, n)
+        lower_n = dpL.solve(f)
+        upper_n = dpU.solve(f)
+        if lower is None:
+            lower, upper = lower_n, upper_n
+        else:
+            lower = combine_lower_bounds(R, lower, lower_n)
+            upper = UR.meet(upper, upper_n)
+        gap = bounds_gap(R, lower, upper)
+        t_end = time.time()
+        yield AnytimeBounds(n=n, lower=lower, upper=upper, gap=gap,
+                            elapsed=t_end - t0)
+
+        if dpL is dp and dpU is dp:
+            # nothing to approximate
+            break
+        if tolerance is not None and gap <= tolerance:
+            break
+        if n_max is not None and 2 * n > n_max:
+            break
+        if deadline is not None:
+            duration = t_end - t_start
+            if previous_duration:
+                growth = max(2.0, duration / previous_duration)
+            else:
+                growth = 2.0
+            if (t_end - t0) + growth * duration > deadline:
+                break
+            previous_duration = duration
+        n *= 2
+
+
+def combine_lower_bounds(R, lower1, lower2):
+    """ Returns the tightest lower bound given by the two. """
+    UR = UpperSets(R)
+    if UR.leq(lower1, lower2):
+        return lower2
+    if UR.leq(lower2, lower1):
+        return lower1
+    both = upperset_intersection(R, lower1, lower2)
+    return lower2 if both is None else both
+
+
+def upperset_intersection(R, a, b):
+    """
+        Returns the intersection of the two UpperSets of R, whose minimals
+        are the minimal joins of the pairs of minimals; or None if
+        the joins do not exist in R.
+    """
+    joins = set()
+    try:
+        for x in a.minimals:
+            for y in b.minimals:
+                joins.add(R.join(x, y))
+    except NotJoinable:
+        return None
+    return R.Us(poset_minima(joins, R.leq))
+
+
+def bounds_gap(R, lower, upper):
+    """
+        Returns a measure of the distance between the two UpperSets
+        lower <= upper: the largest distance of a minimal point of
+        upper from the closest minimal point of lower.
+
+        The distance between two points is the largest difference among
+        their numeric components, relative for values larger than 1
+        and absolute below (0 or 1 for the other components);
+        it is infinite if only one of the two is Top.
+    """
+    if not upper.minimals:
+        return 0.0 if not lower.minimals else float('inf')
+    if not lower.minimals:
+        return float('inf')
+    gap = 0.0
+    for u in upper.minimals:
+        d = min(point_distance(R, l, u) for l in lower.minimals)
+        gap = max(gap, d)
+    return gap
+
+
+def point_distance(P, a, b):
+    if isinstance(P, PosetProduct):
+        d = 0.0
+        for Pi, ai, bi in zip(P.subs, a, b):
+            d = max(d, point_distance(Pi, ai, bi))
+        return d
+    if isinstance(P, (Rcomp, RcompUnits, Nat)):
+        a_top = is_top(P, a)
+        b_top = is_top(P, b)
+        if a_top or b_top:
+            return 0.0 if a_top and b_top else float('inf')
+        scale = max(abs(a), abs(b), 1)
+        return abs(b - a) / float(scale)
+    return 0.0 if P.equal(a, b) else 1.0
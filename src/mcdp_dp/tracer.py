@@ -44,25 +44,24 @@ class Tracer(object):
     def _log_event(self, e):
         self.chronology.append(e)
             
-    def log(self, s):
-        """ Records a string """
+    def log(self, s, *args):
+        """
+            Records a string. If args are given, the string is
+            s % args, and it is formatted only when needed;
+            use Formatted(P, x) to defer also P.format(x):
+
+                t.log('R = %s', Formatted(UR, si_next))
+        """
+        e = TracerLog(s, args)
         if self.logger is not None:
-            self.logger.info(self.prefix + ":" + s)
-        self._log_event(TracerLog(s))
+            self.logger.info(self.prefix + ":" + e.format())
+        self._log_event(e)
         
     @contextmanager
     def child(self, name):
         t = Tracer(prefix=self.prefix + ":" + name, logger=self.logger)
         yield t
-        if t.chronology:
-            last = t.chronology[-1]
-            if isinstance(last, TracerResult):
-                result = last.value
-            else:
-                result = None
-        else:
-            result = None
-        self._log_event(TracerRecursion(name, t, result))
+        self._log_event(TracerRecursion(name, t, _last_result(t)))
         
     @contextmanager
     def iteration(self, i):
@@ -140,6 +139,14 @@ class Tracer(object):
             if isinstance(x, TracerValue) and x.name == name:
                 yield x.value
 
+def _last_result(t):
+    if t.chronology:
+        last = t.chronology[-1]
+        if isinstance(last, TracerResult):
+            return last.value
+    return None
+
+
 class TracerRecursion(TracerEvent):
     @contract(name='str', trace=Tracer)
     def __init__(self, name, trace, result):
@@ -175,8 +182,102 @@ class TracerResult(TracerValue):
         return 'return %s' % str(self.value)
 
 class TracerLog(TracerEvent):
+    """ The message s % args; args are kept as they are. """
     @contract(s='str')
-    def __init__(self, s):
+    def __init__(self, s, args=()):
         self.s = s
+        self.args = args
+    def format(self):
+        if not self.args:
+            return self.s
+        return self.s % self.args
+
+
+class Formatted(object):
+    """ Formats x using P.format(x), when converted to a string. """
+
+    def __init__(self, P, x):
+        self.P = P
+        self.x = x
+
+    def __str__(self):
+        s = self.P.format(self.x)
+        if isinstance(s, unicode):
+            s = s.encode('utf-8')
+        return s
+
+
+class NullTracer(Tracer):
+    """
+        A Tracer that does not record anything. child() and iteration()
+        return the tracer itself, so nothing is allocated.
+
+        Use the instance null_tracer.
+    """
+
+    def __init__(self):
+        Tracer.__init__(self, prefix='')
+
+    def __repr__(self):
+        return 'NullTracer()'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def _log_event(self, e):
+        pass
+
+    def log(self, s, *args):
+        pass
+
+    def child(self, name):  # @UnusedVariable
+        return self
+
+    def iteration(self, i):  # @UnusedVariable
+        return self
+
+    def values(self, **args):
+        pass
+
+    def value(self, name, value):
+        pass
+
+    def result(self, ob):
+        return ob
+
     def format(self):
-        return self.s
+        return '(not recorded)'
+
+
+null_tracer = NullTracer()
+
+
+class SamplingTracer(Tracer):
+    """
+        A Tracer that records only one iteration every `every`
+        (the others get the null tracer).
+    """
+
+    def __init__(self, every, prefix="", logger=None):
+        Tracer.__init__(self, prefix=prefix, logger=logger)
+        self.every = every
+
+    def __getstate__(self):
+        state = Tracer.__getstate__(self)
+        state['every'] = self.every
+        return state
+
+    @contextmanager
+    def child(self, name):
+        t = SamplingTracer(self.every, prefix=self.prefix + ":" + name,
+                           logger=self.logger)
+        yield t
+        self._log_event(TracerRecursion(name, t, _last_result(t)))
+
+    def iteration(self, i):
+        if i % self.every == 1 or self.every == 1:
+            return self.child('it%d' % i)
+        return null_tracer
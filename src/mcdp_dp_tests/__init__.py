@@ -8,6 +8,13 @@ from .approx import *
 from .approximation import *
 
 from .invmult2_tests import *
+from .sequences_invplus_tests import *
 from .products import *
 from .corner_case import *
-from .dual import *
\ No newline at end of file
+from .dual import *
+from .parallel_executor import *
+from .solve_cache_tests import *
+from .batch_solving import *
+from .anytime_solving import *
+from .series_fused import *
+from .tracing import *
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+from nose.tools import assert_equal
+
+from comptests.registrar import comptest
+from mcdp_dp.dp_transformations import get_dp_bounds
+from mcdp_dp.solver_anytime import solve_anytime, upperset_intersection
+from mcdp_lang import parse_ndp, parse_poset
+from mcdp_posets import UpperSets
+
+
+@comptest
+def check_anytime_refinement():
+    ndp = parse_ndp("""
+mcdp {
+  provides f [dimensionless]
+  requires a [dimensionless]
+  requires b [dimensionless]
+  a * b >= f
+}""")
+    dp = ndp.get_dp()
+    UR = UpperSets(dp.get_res_space())
+    steps = list(solve_anytime(dp, 2.0, tolerance=0.3, n_max=1024))
+    assert_equal([_.n for _ in steps], [1, 2, 4, 8, 16])
+    assert steps[-1].gap <= 0.3 < steps[-2].gap
+    for b in steps:
+        UR.check_leq(b.lower, b.upper)
+    for b1, b2 in zip(steps, steps[1:]):
+        assert b2.gap <= b1.gap
+        # the bounds only get tighter
+        UR.check_leq(b1.lower, b2.lower)
+        UR.check_leq(b2.upper, b1.upper)
+
+    steps = list(solve_anytime(dp, 2.0, n_max=4))
+    assert_equal([_.n for _ in steps], [1, 2, 4])
+
+
+@comptest
+def check_anytime_nothing_to_approximate():
+    ndp = parse_ndp("""
+mcdp {
+  provides f [Nat]
+  requires r [Nat]
+  r >= f + Nat:1
+}""")
+    dp = ndp.get_dp()
+    # the transformation does not copy what it does not change
+    dpL, dpU = get_dp_bounds(dp, 10, 10)
+    assert dpL is dp and dpU is dp
+    steps = list(solve_anytime(dp, 2, deadline=100.0))
+    assert_equal(len(steps), 1)
+    assert_equal(steps[0].lower.minimals, set([3]))
+    assert_equal(steps[0].gap, 0.0)
+
+
+@comptest
+def check_anytime_upperset_intersection():
+    R = parse_poset('dimensionless x dimensionless')
+    UR = UpperSets(R)
+    a = R.Us([(1.0, 3.0), (2.0, 2.0)])
+    b = R.Us([(3.0, 1.0)])
+    c = upperset_intersection(R, a, b)
+    assert_equal(c.minimals, set([(3.0, 2.0)]))
+    UR.check_leq(a, c)
+    UR.check_leq(b, c)
+    assert_equal(upperset_intersection(R, a, a).minimals, a.minimals)
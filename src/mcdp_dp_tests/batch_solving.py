@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+from nose.tools import assert_equal
+
+from comptests.registrar import comptest
+from mcdp_dp import (Constant, IdentityDP, JoinNDP, MaxF1DP, MeetNDP,
+                     MinF1DP, MultValueDP, MultValueNatDP, PlusValueDP,
+                     PlusValueNatDP, PlusValueRcompDP, ProductNDP,
+                     ProductNNatDP, ProductNRcompDP, SumNDP, SumNNatDP,
+                     SumNRcompDP)
+from mcdp_dp.solve_cache import SolveCache, get_solve_cache, set_solve_cache
+from mcdp_lang import parse_ndp
+from mcdp_maps import map_call_batch
+from mcdp_posets import Nat, PosetProduct, Rcomp
+from mcdp_posets.rcomp_units import make_rcompunit
+
+
+def check_batch_same_as_solve(ndp, fs, rs=None):
+    previous = get_solve_cache()
+    try:
+        set_solve_cache(SolveCache(max_entries=0))
+        dp = ndp.get_dp()
+        expected = [dp.solve(f) for f in fs]
+        set_solve_cache(SolveCache(max_entries=0))
+        dp = ndp.get_dp()
+        obtained = dp.solve_batch(fs)
+        assert_equal([_.minimals for _ in expected],
+                     [_.minimals for _ in obtained])
+        if rs is not None:
+            expected = [dp.solve_r(r) for r in rs]
+            obtained = dp.solve_r_batch(rs)
+            assert_equal([_.maximals for _ in expected],
+                         [_.maximals for _ in obtained])
+    finally:
+        set_solve_cache(previous)
+
+
+@comptest
+def check_batch_series_parallel():
+    ndp = parse_ndp("""
+mcdp {
+  provides f1 [Nat]
+  provides f2 [Nat]
+  requires r1 [Nat]
+  requires r2 [Nat]
+  r1 >= (f1 + Nat:1) * Nat:2
+  r2 >= f1 + f2
+}""")
+    fs = [(0, 0), (1, 2), (0, 0), (3, 1), (1, 2)]
+    rs = [(0, 0), (4, 3), (10, 2), (4, 3)]
+    check_batch_same_as_solve(ndp, fs, rs)
+
+
+@comptest
+def check_batch_loop():
+    ndp = parse_ndp("""
+mcdp {
+  provides f [Nat]
+  requires r [Nat]
+  variable x, y [Nat]
+  x >= max(provided f, min(y + Nat:1, Nat:10))
+  y >= min(x * Nat:2, Nat:12)
+  required r >= x + y
+}""")
+    check_batch_same_as_solve(ndp, [0, 3, 1, 3, 11, 0])
+
+
+@comptest
+def check_batch_coproduct():
+    ndp = parse_ndp("""
+choose(
+    a: (mcdp {
+        provides f [Nat]
+        requires r [Nat]
+        r >= f + Nat:2
+    }),
+    b: (mcdp {
+        provides f [Nat]
+        requires r [Nat]
+        r >= f * Nat:2
+    })
+)""")
+    check_batch_same_as_solve(ndp, [0, 1, 2, 5, 1], [0, 4, 9])
+
+
+def check_vectorised_same_as_solve(dp, fs, vectorised=True):
+    """ Checks solve_batch(fs) against solve() on each point. """
+    expected = [dp.solve(f) for f in fs]
+    obtained = dp.solve_batch(fs)
+    assert_equal([_.minimals for _ in expected],
+                 [_.minimals for _ in obtained])
+    if hasattr(dp, 'amap'):
+        used = map_call_batch(dp.amap, fs) is not None
+        assert_equal(used, vectorised)
+
+
+@comptest
+def check_batch_vectorised_unary():
+    N = Nat()
+    R = Rcomp()
+    top_n = N.get_top()
+    top_r = R.get_top()
+    ns = [0, 1, 3, 1, top_n, 2 ** 40]
+    xs = [0.0, 1.5, 3.0, 1.5, top_r, 1e10]
+    m = make_rcompunit('m')
+    cm = make_rcompunit('cm')
+    s = make_rcompunit('s')
+    m_s = make_rcompunit('m*s')
+
+    check_vectorised_same_as_solve(PlusValueNatDP(2), ns)
+    check_vectorised_same_as_solve(PlusValueNatDP(top_n), ns)
+    check_vectorised_same_as_solve(PlusValueRcompDP(2.5), xs)
+    check_vectorised_same_as_solve(PlusValueRcompDP(top_r), xs)
+    check_vectorised_same_as_solve(PlusValueDP(m, 12.0, cm), xs)
+    check_vectorised_same_as_solve(MultValueNatDP(3), ns)
+    check_vectorised_same_as_solve(MultValueNatDP(0), ns)
+    check_vectorised_same_as_solve(MultValueNatDP(top_n), ns)
+    check_vectorised_same_as_solve(MultValueDP(m, m_s, s, 2.0), xs)
+    check_vectorised_same_as_solve(MultValueDP(m, m_s, s, 0.0), xs)
+    check_vectorised_same_as_solve(MultValueDP(m, m_s, s, s.get_top()), xs)
+    check_vectorised_same_as_solve(MaxF1DP(N, 2), ns)
+    check_vectorised_same_as_solve(MinF1DP(N, 2), ns)
+    check_vectorised_same_as_solve(MaxF1DP(R, 2.0), xs)
+    check_vectorised_same_as_solve(MinF1DP(R, top_r), xs)
+    check_vectorised_same_as_solve(IdentityDP(N), ns, vectorised=False)
+    check_vectorised_same_as_solve(Constant(N, 3), [(), ()])
+
+
+@comptest
+def check_batch_vectorised_nary():
+    N = Nat()
+    R = Rcomp()
+    top_n = N.get_top()
+    top_r = R.get_top()
+    ns = [(0, 0), (1, 2), (top_n, 0), (top_n, 3), (2, 5), (1, 2)]
+    xs = [(0.0, 0.0), (1.5, 2.0), (top_r, 0.0), (top_r, 3.0), (2.0, 5.0)]
+    m = make_rcompunit('m')
+    cm = make_rcompunit('cm')
+    m2 = make_rcompunit('m*m')
+
+    check_vectorised_same_as_solve(SumNNatDP(2), ns)
+    check_vectorised_same_as_solve(ProductNNatDP(2), ns)
+    check_vectorised_same_as_solve(SumNRcompDP(2), xs)
+    check_vectorised_same_as_solve(ProductNRcompDP(2), xs)
+    check_vectorised_same_as_solve(SumNDP((m, cm), m), xs)
+    check_vectorised_same_as_solve(ProductNDP((m, m), m2), xs)
+    check_vectorised_same_as_solve(JoinNDP(2, N), ns)
+    check_vectorised_same_as_solve(MeetNDP(2, N), ns)
+    check_vectorised_same_as_solve(JoinNDP(2, R), xs)
+    check_vectorised_same_as_solve(MeetNDP(2, R), xs)
+    P = PosetProduct((N, N, N))
+    check_vectorised_same_as_solve(JoinNDP(2, P), [((1, 2, 3), (3, 2, 1))],
+                                   vectorised=False)
+
+
+@comptest
+def check_batch_vectorised_overflow():
+    N = Nat()
+    R = Rcomp()
+    # results that are not exact as floats are computed by solve()
+    big = 2 ** 52 + 1
+    check_vectorised_same_as_solve(PlusValueNatDP(big), [0, 1, big],
+                                   vectorised=False)
+    check_vectorised_same_as_solve(ProductNNatDP(2), [(2 ** 30, 2 ** 30)],
+                                   vectorised=False)
+    check_vectorised_same_as_solve(MultValueNatDP(2 ** 62), [0, 1, 3],
+                                   vectorised=False)
+    check_vectorised_same_as_solve(SumNNatDP(2), [(2 ** 62, 2 ** 62)],
+                                   vectorised=False)
+    # a float overflow is not top in Rcomp
+    check_vectorised_same_as_solve(PlusValueRcompDP(1e308), [0.0, 1e308],
+                                   vectorised=False)
+    check_vectorised_same_as_solve(ProductNRcompDP(2), [(1e200, 1e200)],
+                                   vectorised=False)
+    m = make_rcompunit('m')
+    s = make_rcompunit('s')
+    m_s = make_rcompunit('m*s')
+    check_vectorised_same_as_solve(MultValueDP(m, m_s, s, 1e300), [1e10],
+                                   vectorised=False)
@@ -447,6 +447,38 @@ mcdp {
     res = dp.solve(())
     print res
     UNat.check_equal(res, N.U(2))
+
+
+@comptest
+def check_loop_warm_start():
+    from mcdp import MCDPConstants
+    ndp = parse_ndp("""
+mcdp {
+  provides f [Nat]
+  requires r [Nat]
+  requires q [Nat]
+  variable x, y [Nat]
+  x >= max(provided f, min(x + Nat:1, Nat:20))
+  y >= min(x + Nat:1, Nat:30)
+  x >= min(y, Nat:25)
+  required r >= x
+  required q >= y
+}"""
+    )
+    fs = [0, 3, 1, 2, 30, 22]
+    results = {}
+    before = MCDPConstants.loop2_warm_start
+    try:
+        for warm in [False, True]:
+            MCDPConstants.loop2_warm_start = warm
+            dp = ndp.get_dp()
+            results[warm] = [dp.solve(f).minimals for f in fs]
+    finally:
+        MCDPConstants.loop2_warm_start = before
+    assert_equal(results[False], results[True])
+    assert_equal(results[True][0], set([(25, 26)]))
+    assert_equal(results[True][4], set([(30, 30)]))
+
 # 
 # @comptest
 # def check_loop_result4():
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+from nose.tools import assert_equal
+
+from comptests.registrar import comptest
+from mcdp_dp.executor import make_dp_executor, use_dp_executor
+from mcdp_lang import parse_ndp
+
+
+def get_ndp_with_branches():
+    return parse_ndp("""
+mcdp {
+  provides f [Nat]
+  requires r [Nat]
+  requires s [Nat]
+  c = instance catalogue {
+    provides x [Nat]
+    requires y [Nat]
+    requires z [Nat]
+    m1 | 1 | 10 | 2
+    m2 | 2 | 5 | 5
+    m3 | 3 | 3 | 8
+  }
+  d = instance choose(
+    a: (mcdp { provides p [Nat] requires q [Nat] q >= p + Nat:1 }),
+    b: (mcdp { provides p [Nat] requires q [Nat] q >= 2 * p })
+  )
+  c.x >= provided f
+  d.p >= c.y
+  required r >= d.q + c.z
+  required s >= c.z
+}""")
+
+
+def check_executor_same_results(kind):
+    ndp = get_ndp_with_branches()
+    fs = [0, 1, 2, 3]
+    rs = [(11, 5), (13, 2), (0, 0), (20, 20)]
+
+    dp = ndp.get_dp()
+    expected_r = [dp.solve(f).minimals for f in fs]
+    expected_f = [dp.solve_r(r).maximals for r in rs]
+
+    with use_dp_executor(make_dp_executor(kind, 3)):
+        dp = ndp.get_dp()
+        obtained_r = [dp.solve(f).minimals for f in fs]
+        obtained_f = [dp.solve_r(r).maximals for r in rs]
+
+    assert_equal(expected_r, obtained_r)
+    assert_equal(expected_f, obtained_f)
+    assert_equal(obtained_r[0], set([(13, 2), (11, 5)]))
+
+
+@comptest
+def check_executor_threads():
+    check_executor_same_results('thread')
+
+
+@comptest
+def check_executor_processes():
+    check_executor_same_results('process')
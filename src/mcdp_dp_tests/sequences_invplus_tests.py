@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import itertools
+
+from numpy.testing.utils import assert_allclose
+import numpy as np
+
+from comptests.registrar import comptest
+from mcdp_dp import InvMult2, ProductNRcompDP, SumNRcompDP
+from mcdp_dp.sequences_invplus import (invmultL_solve_options,
+    invmultU_solve_options, sample_sum_lowersets, sample_sum_upperbound)
+from mcdp_posets import PosetProduct, Rcomp
+
+
+def random_points_on_product(k, f, n):
+    """ n random points with r1 * ... * rk = f """
+    logs = np.random.uniform(-3, 3, size=(n, k - 1))
+    last = np.log(f) - logs.sum(axis=1)
+    return np.exp(np.column_stack((logs, last)))
+
+
+@comptest
+def check_invmult_nary():
+    F = Rcomp()
+    f = 8.0
+    for k in [2, 3, 4]:
+        R = PosetProduct((F,) * k)
+        for algo in [InvMult2.ALGO_UNIFORM, InvMult2.ALGO_VAN_DER_CORPUT]:
+            U = invmultU_solve_options(F, R, f, 30, algo)
+            L = invmultL_solve_options(F, R, f, 30, algo)
+            assert U.shape[1] == k and L.shape[1] == k
+            if algo == InvMult2.ALGO_UNIFORM:
+                assert_allclose(np.prod(U, axis=1), f)
+            assert np.all(np.prod(L, axis=1) <= f * (1 + 1e-12))
+
+            # the curve is in the upper closure of the lower bound
+            for z in random_points_on_product(k, f, 50):
+                assert np.any(np.all(L <= z, axis=1)), z
+
+
+@comptest
+def check_invplus_nary():
+    F = Rcomp()
+    f = 2.0
+    for k in [2, 3]:
+        R = PosetProduct((F,) * k)
+        U = sample_sum_upperbound(F, R, f, 20)
+        A = sample_sum_lowersets(F, R, f, 20)
+        assert_allclose(np.sum(U, axis=1), f)
+        assert np.all(np.sum(A, axis=1) >= f * (1 - 1e-12))
+
+        # the plane is in the lower closure of the points above it
+        for w in itertools.product(np.linspace(0, 1, 7), repeat=k):
+            w = np.array(w)
+            if w.sum() == 0:
+                continue
+            z = f * w / w.sum()
+            assert np.any(np.all(z <= A + 1e-12, axis=1)), z
+
+
+@comptest
+def check_productn_sumn_solve_r():
+    for dp in [ProductNRcompDP(3), SumNRcompDP(3)]:
+        L = dp.get_lower_bound(10)
+        U = dp.get_upper_bound(10)
+        lf_L = L.solve_r(2.0)
+        lf_U = U.solve_r(2.0)
+        assert lf_L.maximals
+        assert lf_U.maximals
+        for x in lf_L.maximals:
+            assert len(x) == 3
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+from nose.tools import assert_equal
+
+from comptests.registrar import comptest
+from mcdp_dp import Series, get_fused_chain
+from mcdp_dp.dp_series_fused import unwrap_chain
+from mcdp_lang import parse_ndp
+from mcdp_posets import LowerSet, UpperSet, poset_maxima
+
+
+@comptest
+def check_series_fused_maps():
+    ndp = parse_ndp("""
+mcdp {
+  provides f [m]
+  requires r [km]
+  r >= ((f * 3 s/m + 1 s) * 3 m/s + 2 m) * 2
+}""")
+    dp = ndp.get_dp()
+    assert isinstance(dp, Series), dp
+    fused = get_fused_chain(dp)
+    assert fused is not None
+    assert fused.middle is None
+    dps = unwrap_chain(dp)
+    assert_equal(len(fused.first), len(dps))
+
+    F = dp.get_fun_space()
+    R = dp.get_res_space()
+    # one DP at a time
+    for f in F.get_test_chain(n=5):
+        u = UpperSet([f], F)
+        for x in dps:
+            u = x.solveU(u)
+        assert_equal(dp.solve(f).minimals, u.minimals)
+    for r in R.get_test_chain(n=5):
+        l = LowerSet([r], R)
+        for x in reversed(dps):
+            maxs = set()
+            for p in l.maximals:
+                maxs.update(x.solve_r(p).maximals)
+            l = LowerSet(poset_maxima(maxs, x.get_fun_space().leq),
+                         x.get_fun_space())
+        assert_equal(dp.solve_r(r).maximals, l.maximals)
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+from nose.tools import assert_equal
+
+from comptests.registrar import comptest
+from mcdp_dp.solve_cache import SolveCache, get_solve_cache, set_solve_cache
+from mcdp_lang import parse_ndp
+from mcdp_utils_misc import BoundedCache
+
+
+@comptest
+def check_bounded_cache_lru():
+    evicted = []
+    c = BoundedCache(max_entries=3, policy='lru',
+                     on_evict=lambda k, _: evicted.append(k))
+    for i in range(3):
+        c.put(i, i * 10)
+    assert_equal(c.get(0), 0)  # 1 is now the least recently used
+    c.put(3, 30)
+    assert_equal(evicted, [1])
+    assert_equal(sorted(c.keys()), [0, 2, 3])
+
+    c = BoundedCache(max_bytes=100)
+    c.put('a', None, size=60)
+    c.put('b', None, size=60)
+    assert_equal(c.keys(), ['b'])
+    assert_equal(c.nbytes, 60)
+    c.put('c', None, size=1000)
+    assert not 'c' in c
+
+
+@comptest
+def check_bounded_cache_lfu():
+    c = BoundedCache(max_entries=2, policy='lfu')
+    c.put('a', 1)
+    c.put('b', 2)
+    c.get('a')
+    c.get('a')
+    c.get('b')
+    c.put('c', 3)
+    assert_equal(sorted(c.keys()), ['a', 'c'])
+    c.put('d', 4)
+    assert_equal(sorted(c.keys()), ['a', 'd'])
+    assert_equal(c.nevictions, 2)
+
+
+@comptest
+def check_solve_cache_bounded():
+    ndp = parse_ndp("""
+mcdp {
+  provides f [Nat]
+  requires r [Nat]
+  r >= (f + Nat:1) * Nat:2
+}""")
+    previous = get_solve_cache()
+    cache = SolveCache(max_entries=5)
+    set_solve_cache(cache)
+    try:
+        dp = ndp.get_dp()
+        for i in range(20):
+            assert_equal(dp.solve(i).minimals, set([2 * (i + 1)]))
+        assert_equal(dp.solve(19).minimals, set([40]))
+        stats = cache.get_stats()
+        assert stats['entries'] <= 5, stats
+        assert stats['hits'] >= 1, stats
+        assert stats['misses'] >= 20, stats
+        assert stats['evictions'] >= 15, stats
+        for n in stats['nodes']:
+            assert n['entries'] <= 5, n
+        cache.clear()
+        assert_equal(cache.get_stats()['entries'], 0)
+        assert_equal(dp.solve(3).minimals, set([8]))
+    finally:
+        set_solve_cache(previous)
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+from nose.tools import assert_equal
+
+from comptests.registrar import comptest
+from mcdp_dp.solve_cache import SolveCache, get_solve_cache, set_solve_cache
+from mcdp_dp.tracer import (Formatted, SamplingTracer, Tracer, TracerLog,
+                            null_tracer)
+from mcdp_lang import parse_ndp
+
+
+class CountFormat(object):
+
+    def __init__(self):
+        self.n = 0
+
+    def format(self, x):
+        self.n += 1
+        return 'x=%s' % x
+
+
+@comptest
+def check_tracer_lazy_format():
+    P = CountFormat()
+    t = Tracer()
+    t.log('value %s', Formatted(P, 42))
+    assert_equal(P.n, 0)
+    e = t.chronology[-1]
+    assert isinstance(e, TracerLog)
+    assert_equal(e.format(), 'value x=42')
+    assert_equal(P.n, 1)
+
+    null_tracer.log('value %s', Formatted(P, 42))
+    with null_tracer.child('dp1') as t2:
+        assert t2 is null_tracer
+        t2.values(a=1)
+    assert_equal(null_tracer.result(3), 3)
+    assert_equal(null_tracer.chronology, [])
+    assert_equal(P.n, 1)
+
+
+@comptest
+def check_tracer_loop():
+    ndp = parse_ndp("""
+mcdp {
+  provides f [Nat]
+  requires r [Nat]
+  variable x [Nat]
+  x >= max(provided f, min(x + Nat:1, Nat:10))
+  required r >= x
+}""")
+    previous = get_solve_cache()
+    try:
+        set_solve_cache(SolveCache(max_entries=0))
+        dp = ndp.get_dp()
+        res = dp.solve(0)
+
+        t = Tracer()
+        assert_equal(dp.solve_trace(0, t).minimals, res.minimals)
+        loop, = t.find_loops()
+        n = len(list(loop.get_iterations()))
+
+        t = SamplingTracer(every=3)
+        assert_equal(dp.solve_trace(0, t).minimals, res.minimals)
+        loop, = t.find_loops()
+        its = [_.name for _ in loop.get_iterations()]
+        assert_equal(its, ['it%d' % i for i in range(1, n + 1, 3)])
+        # all the iterates are still available
+        assert_equal(len(loop.get_value1('iterations')), n + 1)
+    finally:
+        set_solve_cache(previous)
@@ -180,6 +180,36 @@ def disk_event_interpret(disk_rep, disk_event):
         raise_wrapped(InvalidOperation, e, msg)
 
 
+def disk_event_paths(disk_event):
+    ''' Returns the paths (joined with "/") changed by the event. '''
+    arguments = disk_event['arguments']
+    if disk_event['operation'] == DiskEvents.disk_event_group:
+        res = []
+        for e in arguments['events']:
+            res.extend(disk_event_paths(e))
+        return res
+    dirname = tuple(arguments['dirname'])
+    res = ['/'.join(dirname + (arguments['name'],))]
+    if 'name2' in arguments:
+        res.append('/'.join(dirname + (arguments['name2'],)))
+    return res
+
+
+def disk_event_interpret_copy(disk_rep, disk_event):
+    '''
+        Returns a copy of disk_rep with the event applied; disk_rep is not
+        modified, and only the directories along the paths of the event
+        are copied.
+    '''
+    if disk_event['operation'] == DiskEvents.disk_event_group:
+        for e in disk_event['arguments']['events']:
+            disk_rep = disk_event_interpret_copy(disk_rep, e)
+        return disk_rep
+    disk_rep = disk_rep.copy_path(disk_event['arguments']['dirname'])
+    disk_event_interpret(disk_rep, disk_event)
+    return disk_rep
+
+
 def apply_disk_event_to_filesystem(wd, disk_event, repo=None):
     '''
         Applies the disk events to the filesystem.
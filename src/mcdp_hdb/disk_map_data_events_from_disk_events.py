@@ -1,5 +1,3 @@
-from copy import deepcopy
-
 from contracts import contract, describe_value
 from contracts.utils import raise_wrapped, indent
 
@@ -7,7 +5,7 @@ from mcdp import logger
 from mcdp_utils_misc import yaml_dump
 
 from .disk_events import DiskEvents
-from .disk_events import disk_event_interpret
+from .disk_events import disk_event_interpret_copy
 from .disk_map import DiskMap
 from .disk_struct import ProxyFile
 from .hints import HintDir, HintFileYAML
@@ -95,10 +93,10 @@ def data_events_from_dir_create(schema, disk_map, disk_rep, disk_events_queue, _
             # get more events that create file in this directory
             related_disk_events = get_disk_events_for_dir(dirname, disk_events_queue)
             logger.warning('Adding key %r, related disk events:\n%s' % (key, yaml_dump(related_disk_events)))
-            disk_rep = deepcopy(disk_rep)
+            disk_rep = disk_rep.copy_path(dirname)
             disk_rep.get_descendant(dirname).dir_create(name)
             for re in related_disk_events:
-                disk_event_interpret(disk_rep, re)
+                disk_rep = disk_event_interpret_copy(disk_rep, re)
             disk_rep_child = disk_rep.get_descendant(dirname + (name,))
             value = disk_map.interpret_hierarchy_(schema_child, disk_rep_child)
 
@@ -115,13 +113,13 @@ def data_events_from_dir_create(schema, disk_map, disk_rep, disk_events_queue, _
         related_disk_events = get_disk_events_for_dir(dirname, disk_events_queue) # XXX
         logger.debug('Creating directory, related: \n %s'  % yaml_dump(related_disk_events))
         # we apply all of them to a copy of the disk rep
-        # (XXX here we are copying the entire db)
-        disk_rep = deepcopy(disk_rep)
+        # (only the directories that change are copied)
+        disk_rep = disk_rep.copy_path(dirname)
         # create the dir
         disk_rep.get_descendant(dirname).dir_create(name)
         # apply the others
         for re in related_disk_events:
-            disk_event_interpret(disk_rep, re)
+            disk_rep = disk_event_interpret_copy(disk_rep, re)
         # get the folder just created
         disk_rep_child = disk_rep.get_descendant(dirname + (name,))
         # interpret it
@@ -161,8 +159,6 @@ def a_is_prefix_of_b(l1, l2):
     
 def data_events_from_dir_rename(schema, disk_map, disk_rep, disk_events_queue, _id, who, dirname, name, name2):  # @UnusedVariable
     parent, schema_parent, hint = get_parent_data(schema, disk_map, dirname, name)
-    
-    disk_rep = deepcopy(disk_rep)
 
     if isinstance(schema_parent, SchemaHash):
         if isinstance(hint, HintDir):
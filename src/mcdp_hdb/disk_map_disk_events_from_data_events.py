@@ -1,7 +1,6 @@
 from collections import namedtuple
 from contracts import contract
 from contracts.utils import raise_wrapped, indent, check_isinstance
-from copy import deepcopy
 from mcdp import logger
 from mcdp.exceptions import DPInternalError
 from mcdp_utils_misc import format_list, yaml_dump
@@ -13,6 +12,7 @@ from .hints import HintDir
 from .memdata_events import DataEvents, get_view_node, event_interpret_
 from .memdataview import InvalidOperation, ViewBase
 from .memdataview_manager import ViewManager
+from .memdata_utils import data_copy_path
 from .schema import SchemaHash, SchemaContext, SchemaList, SchemaBase
 
 
@@ -20,7 +20,6 @@ from .schema import SchemaHash, SchemaContext, SchemaList, SchemaBase
 def disk_events_from_data_event(disk_map, schema, data_rep, data_event):
     viewmanager = ViewManager(schema) 
     view = viewmanager.create_view_instance(schema, data_rep)
-    view._schema.validate(data_rep  )
 
     # As a preliminary check, we check whether this change happened 
     # inside a YAML representation.
@@ -68,10 +67,10 @@ def disk_events_from_data_event_inside_yaml(disk_map, data_event, view, p):
     assert isinstance(p_hint, HintFileYAML)
     
     # make the data_event relative
-    relative_data_event = deepcopy(data_event)
     name = data_event['arguments']['name']
     relative_name = name[len(p):]
-    relative_data_event['arguments']['name'] = relative_name
+    relative_arguments = dict(data_event['arguments'], name=relative_name)
+    relative_data_event = dict(data_event, arguments=relative_arguments)
     
     parent_of_yaml = p[:-1]
     parent_of_yaml_schema = view._schema.get_descendant(parent_of_yaml)
@@ -81,8 +80,9 @@ def disk_events_from_data_event_inside_yaml(disk_map, data_event, view, p):
     
     # this is the current data to go in yaml
     relative_data_view = view.get_descendant(p)
-    # make a copy of the data
-    relative_data_view._data = deepcopy(relative_data_view._data)
+    # make a copy of the data (only the part that changes)
+    relative_data_view._data = data_copy_path(relative_data_view._data,
+                                              relative_name)
     # now make the change by applying the relative_data_event
     relative_data_view.set_root()
     event_interpret_(relative_data_view, relative_data_event)
@@ -120,22 +120,17 @@ def disk_events_from_hash_set(disk_map, view, _id, who, name, value):
     from .memdata_events import event_dict_setitem, event_dict_delitem
     # let's break it down to delete keys and add keys
     equiv_events = []
-    # let's work on a copy of the data
-    data = deepcopy(view._data)
     # delete the ones that should not be there
     for k in v:
         if not k in value:
             logger.debug('Deleting element k = %r' % k)
             e = event_dict_delitem(name=name, key=k, _id=_id,  who=who)
-            # simulate
-            del data[k]
             equiv_events.append(e)
     # add the ones that
     for k in value:
         if (not k in v) or (v[k] != value[k]):
             logger.debug('Setting element k = %r' % k)
             e = event_dict_setitem(name=name, key=k, value=value[k], _id=_id, who=who)
-            data[k] = value
             equiv_events.append(e)
     de = []
     for e in equiv_events:
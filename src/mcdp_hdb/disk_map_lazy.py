@@ -0,0 +1,199 @@
+'''
+    Reads the data of a schema from a directory, on demand.
+
+    interpret_directory_lazily() is the equivalent of
+
+        disk_map.interpret_hierarchy_(schema, ProxyDirectory.from_disk(dirname))
+
+    except that the hashes serialized as directories or as files with
+    extensions are returned as LazyHash: only their keys are listed,
+    and each value is read from disk when it is first accessed.
+'''
+import fnmatch
+import os
+import sys
+
+from contracts.utils import raise_wrapped
+
+from mcdp import logger
+from mcdp.constants import MCDPConstants
+
+from .disk_map import raise_incorrect_format
+from .disk_struct import ProxyDirectory, ProxyFile
+from .exceptions import IncorrectFormat, NotKey
+from .gitrepo_map import DUMMY_FILE, get_disk_rep_with_added_files_inverse
+from .hints import HintDir, HintExtensions
+from .lazy_hash import LazyHash
+from .schema import SchemaContext, SchemaHash
+
+
+__all__ = [
+    'interpret_directory_lazily',
+]
+
+
+def interpret_directory_lazily(disk_map, schema, dirname):
+    hint = disk_map.get_hint(schema)
+    if isinstance(schema, SchemaHash):
+        if isinstance(hint, HintDir):
+            return read_SchemaHash_SER_DIR_lazily(disk_map, schema, dirname)
+        if isinstance(hint, HintExtensions):
+            return read_SchemaHash_Extensions_lazily(disk_map, schema, dirname)
+    if isinstance(schema, SchemaContext) and isinstance(hint, HintDir):
+        return read_SchemaContext_SER_DIR_lazily(disk_map, schema, dirname)
+    # everything else is read at once
+    fh = ProxyDirectory.from_disk(dirname)
+    fh = get_disk_rep_with_added_files_inverse(fh)
+    return disk_map.interpret_hierarchy_(schema, fh)
+
+
+def interpret_path_lazily(disk_map, schema, path):
+    ''' path: a directory or a file. '''
+    if os.path.isdir(path):
+        return interpret_directory_lazily(disk_map, schema, path)
+    else:
+        return disk_map.interpret_hierarchy_(schema, ProxyFile.from_disk(path))
+
+
+def list_directory(dirname):
+    return list_directory_filter(sorted(os.listdir(dirname)))
+
+
+def list_directory_filter(filenames):
+    ''' Same files as ProxyDirectory.from_disk(), without the ones
+        added by get_disk_rep_with_added_files(). '''
+    ignore_patterns = MCDPConstants.locate_files_ignore_patterns
+    return [fn for fn in filenames if fn != DUMMY_FILE and
+            not any(fnmatch.fnmatch(fn, ip) for ip in ignore_patterns)]
+
+
+def read_SchemaHash_SER_DIR_lazily(disk_map, schema, dirname):
+    hint = disk_map.get_hint(schema)
+    if hint.pattern == '%':
+        seq = list_directory(dirname)
+    else:
+        seq = list(recursive_list_dir_lazily(dirname, hint))
+
+    paths = {}
+    for filename in seq:
+        try:
+            k = hint.key_from_filename(os.path.basename(filename))
+        except NotKey:
+            logger.warning('Ignoring file "%s": not a key' % filename)
+            continue
+        assert not k in paths, (k, hint.pattern, filename)
+        paths[k] = os.path.join(dirname, filename)
+
+    load = LoadFromDir(disk_map, schema, dirname, paths)
+    return LazyHash(paths, load)
+
+
+class LoadFromDir(object):
+    ''' The load function of read_SchemaHash_SER_DIR_lazily()
+        (a class, so that the LazyHash can be pickled). '''
+
+    def __init__(self, disk_map, schema, dirname, paths):
+        self.disk_map = disk_map
+        self.schema = schema
+        self.dirname = dirname
+        self.paths = paths
+
+    def __call__(self, k):
+        hint = self.disk_map.get_hint(self.schema)
+        path = self.paths.get(k)
+        if path is None or not os.path.exists(path):
+            # added after listing
+            path = os.path.join(self.dirname, hint.filename_for_key(k))
+        try:
+            return interpret_path_lazily(self.disk_map, self.schema.prototype,
+                                         path)
+        except IncorrectFormat as e:
+            msg = 'While interpreting filename "%s":' % path
+            raise_wrapped(IncorrectFormat, e, msg, compact=True,
+                          exc=sys.exc_info())
+
+
+def recursive_list_dir_lazily(dirname, hint, prefix=''):
+    ''' Yields the relative paths; same as disk_map.recursive_list_dir(). '''
+    for fn in list_directory(dirname):
+        full = os.path.join(dirname, fn)
+        if os.path.isdir(full):
+            for x in recursive_list_dir_lazily(full, hint, prefix + fn + '/'):
+                yield x
+        try:
+            hint.key_from_filename(fn)
+            yield prefix + fn
+        except NotKey:
+            pass
+
+
+def read_SchemaHash_Extensions_lazily(disk_map, schema, dirname):
+    extensions = disk_map.get_hint(schema).extensions
+    # name -> ext -> path
+    paths = {}
+    for root, dirs, files in os.walk(dirname):
+        dirs[:] = list_directory_filter(dirs)
+        for filename in list_directory_filter(files):
+            name, ext = os.path.splitext(filename)
+            if not ext:
+                continue
+            ext = ext[1:]
+            if ext in extensions:
+                paths.setdefault(name, {})[ext] = os.path.join(root, filename)
+
+    load = LoadFromExtensions(disk_map, schema, dirname, paths)
+    return LazyHash(paths, load)
+
+
+class LoadFromExtensions(object):
+    ''' The load function of read_SchemaHash_Extensions_lazily(). '''
+
+    def __init__(self, disk_map, schema, dirname, paths):
+        self.disk_map = disk_map
+        self.schema = schema
+        self.dirname = dirname
+        self.paths = paths
+
+    def __call__(self, name):
+        extensions = self.disk_map.get_hint(self.schema).extensions
+        res = {}
+        for ext in extensions:
+            path = self.paths.get(name, {}).get(ext)
+            if path is None or not os.path.exists(path):
+                # added after listing
+                path = os.path.join(self.dirname, '%s.%s' % (name, ext))
+            if os.path.exists(path):
+                f = ProxyFile.from_disk(path)
+                prototype = self.schema.prototype[ext]
+                res[ext] = self.disk_map.interpret_hierarchy_(prototype, f)
+            else:
+                res[ext] = None
+        return res
+
+
+def read_SchemaContext_SER_DIR_lazily(disk_map, schema, dirname):
+    res = {}
+    hint = disk_map.get_hint(schema)
+    for k, schema_child in schema.children.items():
+        filename = hint.filename_for_key(k)
+        if filename is None:
+            res[k] = interpret_directory_lazily(disk_map, schema_child, dirname)
+            continue
+        path = os.path.join(dirname, filename)
+        if not os.path.exists(path):
+            if schema_child.can_be_none:
+                res[k] = None
+            else:
+                msg = 'Expected filename "%s" in %s.' % (filename, dirname)
+                raise_incorrect_format(msg, schema, dirname)
+        else:
+            try:
+                res[k] = interpret_path_lazily(disk_map, schema_child, path)
+            except IncorrectFormat as e:
+                msg = ('While interpreting child "%s", filename "%s":' %
+                       (k, filename))
+                raise_wrapped(IncorrectFormat, e, msg, compact=True,
+                              exc=sys.exc_info())
+    schema.validate(res)
+    return res
+
@@ -1,5 +1,6 @@
 import fnmatch
 import os
+import weakref
 
 from contracts import contract
 from contracts.utils import indent, raise_desc, check_isinstance, raise_wrapped
@@ -13,7 +14,14 @@ class NoSuchDescendant(Exception):
     pass
 
 class ProxyDirectory(object):
-    
+    '''
+        The hash codes are cached (Merkle tree): each directory remembers
+        its parents, and the changes invalidate the cached hash codes of
+        the directory and of its ancestors only.
+
+        The ProxyFiles are not modified: they are replaced.
+    '''
+
     @contract(files='dict(str:*)|None', directories='dict(str:*)|None')
     def __init__(self, files=None, directories=None):
         if files is None:
@@ -29,7 +37,18 @@ class ProxyDirectory(object):
 
         self._files = files
         self._directories = directories
-    
+        self._hash = None
+        # the directories that contain this one (or did, at some point)
+        self._parents = weakref.WeakSet()
+        for d in directories.values():
+            d._parents.add(self)
+
+    def __getstate__(self):
+        return dict(_files=self._files, _directories=self._directories)
+
+    def __setstate__(self, state):
+        self.__init__(files=state['_files'], directories=state['_directories'])
+
     def get_files(self):
         return self._files
     
@@ -37,12 +56,28 @@ class ProxyDirectory(object):
         return self._directories
     
     def hash_code(self):
-        codes = []
-        for f in sorted(self._files):
-            codes.append([f, self._files[f].hash_code()])
-        for d in sorted(self._directories):
-            codes.append([d, self._directories[d].hash_code()])
-        return get_md5(yaml_dump(codes))
+        if self._hash is None:
+            codes = []
+            for f in sorted(self._files):
+                codes.append([f, self._files[f].hash_code()])
+            for d in sorted(self._directories):
+                codes.append([d, self._directories[d].hash_code()])
+            self._hash = get_md5(yaml_dump(codes))
+        return self._hash
+
+    def _invalidate(self):
+        ''' Forgets the hash code of this directory and its ancestors. '''
+        if self._hash is None:
+            # then the ancestors do not have it either
+            return
+        self._hash = None
+        for parent in list(self._parents):
+            parent._invalidate()
+
+    def _set_directory(self, name, d):
+        self._directories[name] = d
+        d._parents.add(self)
+        self._invalidate()
     
     def __len__(self):
         return len(self._files) + len(self._directories)
@@ -56,11 +91,12 @@ class ProxyDirectory(object):
     
     def __setitem__(self, key, x):
         if isinstance(x, ProxyDirectory):
-            self._directories[key] =x
+            self._set_directory(key, x)
             if key in self._files:
                 raise ValueError('duplicated key %r' % key)
         elif isinstance(x, ProxyFile):
             self._files[key] =x
+            self._invalidate()
             if key in self._directories:
                 raise ValueError('duplicated key %r' % key)
         else:
@@ -169,17 +205,35 @@ class ProxyDirectory(object):
             raise_wrapped(NoSuchDescendant, e, msg, compact=True)
    
     
+    @contract(prefix='seq(str)')
+    def copy_path(self, prefix):
+        '''
+            Returns a copy that shares the files and the directories
+            with this one, except the directories along prefix, which
+            are copied (one level each), so that the descendant at prefix
+            can be modified without changing this one.
+        '''
+        res = ProxyDirectory(files=dict(self._files),
+                             directories=dict(self._directories))
+        prefix = tuple(prefix)
+        if prefix and prefix[0] in self._directories:
+            first = prefix[0]
+            res._set_directory(first, self._directories[first].copy_path(prefix[1:]))
+        return res
+
     def file_modify(self, name, contents):
         if not name in self._files:
             msg = 'Cannot modify file %r that does not exist.' % name
             raise InvalidDiskOperation(msg)
         self._files[name] = ProxyFile(contents)
+        self._invalidate()
 
     def file_delete(self, name):
         if not name in self._files:
             msg = 'Cannot delete file %r that does not exist.' % name
             raise InvalidDiskOperation(msg)
         del self._files[name]
+        self._invalidate()
     
     def file_rename(self, name, name2):
         if not name in self._files:
@@ -189,24 +243,27 @@ class ProxyDirectory(object):
             msg = 'Cannot rename file %r to %r because %r already exists' % (name, name2)
             raise InvalidDiskOperation(msg)
         self._files[name2] = self._files.pop(name)
+        self._invalidate()
         
     def file_create(self, name, contents):
         if name in self._files or name in self._directories:
             msg = 'Cannot create file that already exists  %r.' % name
             raise InvalidDiskOperation(msg)
         self._files[name] = ProxyFile(contents)
+        self._invalidate()
 
     def dir_delete(self, name):
         if not name in self._directories:
             msg = 'Cannot delete directory that does not exist %r.' % name
             raise InvalidDiskOperation(msg)
-        del self._directories[name]
+        self._directories.pop(name)._parents.discard(self)
+        self._invalidate()
 
     def dir_create(self, name):
         if name in self._directories:
             msg = 'Cannot create directory %s that already exists.' % name
             raise InvalidDiskOperation(msg)
-        self._directories[name] = ProxyDirectory()
+        self._set_directory(name, ProxyDirectory())
     
     def dir_rename(self, name, name2):    
         if not name in self._directories:
@@ -218,6 +275,7 @@ class ProxyDirectory(object):
                     (name, name2, name2))
             raise InvalidDiskOperation(msg)
         self._directories[name2] = self._directories.pop(name)
+        self._invalidate()
 
     def create_file_path(self, path, contents):
         ''' Creates files and required directories 
@@ -242,9 +300,20 @@ class ProxyFile(object):
     @contract(contents=str)
     def __init__(self, contents):
         self.contents = contents
-        
+        self._hashed = None
+        self._hash = None
+
+    def __getstate__(self):
+        return dict(contents=self.contents)
+
+    def __setstate__(self, state):
+        self.__init__(state['contents'])
+
     def hash_code(self):
-        return get_md5(self.contents)
+        if self._hashed is not self.contents:
+            self._hash = get_md5(self.contents)
+            self._hashed = self.contents
+        return self._hash
     
     @staticmethod
     def from_disk(fn):
@@ -1,5 +1,3 @@
-from copy import deepcopy
-
 from contracts import contract
 from git import Repo
 from git.util import Actor
@@ -32,12 +30,12 @@ def get_disk_rep_with_added_files(disk_rep):
         have a file called DUMMY_FILE containing DUMMY_FILE_CONTENTS.
     '''
     def map_d(d):
-        d = deepcopy(d)
+        # the files are shared, they are not modified
+        files = dict(d._files)
         if not d._files and not d._directories:
-            d[DUMMY_FILE] = ProxyFile(DUMMY_FILE_CONTENTS)
-        for d2n, d2 in d._directories.items():
-            d._directories[d2n] = map_d(d2) 
-        return d
+            files[DUMMY_FILE] = ProxyFile(DUMMY_FILE_CONTENTS)
+        directories = dict((d2n, map_d(d2)) for d2n, d2 in d._directories.items())
+        return ProxyDirectory(files=files, directories=directories)
     return map_d(disk_rep)
 
 @contract(disk_rep=ProxyDirectory, returns=ProxyDirectory)
@@ -45,14 +43,12 @@ def get_disk_rep_with_added_files_inverse(disk_rep):
     ''' Inverse of get_disk_rep_with_added_files():
         removes DUMMY_FILES. '''
     
-    d0 = deepcopy(disk_rep)
     def remove_it(d):
-        if DUMMY_FILE in d:
-            d.file_delete(DUMMY_FILE)
-        for dd in d.get_directories().values():
-            remove_it(dd)
-    remove_it(d0)
-    return d0
+        files = dict(d._files)
+        files.pop(DUMMY_FILE, None)
+        directories = dict((n, remove_it(dd)) for n, dd in d._directories.items())
+        return ProxyDirectory(files=files, directories=directories)
+    return remove_it(disk_rep)
     
     
 @contract(disk_rep=ProxyDirectory)
@@ -0,0 +1,274 @@
+'''
+    LazyHash: the data for a SchemaHash whose values are read from disk
+    when they are first accessed (see disk_map_lazy).
+
+    The values loaded by all the LazyHash are kept in a BoundedCache;
+    when they are evicted, they are read again at the next access.
+    This is correct as long as the disk is kept in sync with the data
+    (which is what the callbacks in pipes do).
+
+    Copies, deep copies and pickles of a LazyHash are also lazy:
+    they read the values that were not loaded from the same place.
+'''
+import itertools
+import threading
+import weakref
+
+from mcdp.constants import MCDPConstants
+from mcdp_utils_misc import BoundedCache
+
+
+__all__ = [
+    'LazyHash',
+    'lazy_data_forget',
+    'get_lazy_cache',
+    'set_lazy_cache',
+]
+
+
+class LazyHash(dict):
+    '''
+        A dict with the given keys, whose values are computed by
+        load(key) when needed.
+
+        Only the loaded values are stored in the underlying dict;
+        use the methods, not the C API (dict(x), dict.update(y, x)).
+    '''
+
+    def __init__(self, keys, load):
+        dict.__init__(self)
+        self._keys = set(keys)
+        self._load = load
+        # unlike id(self), never reused for another instance
+        self._cache_id = next(_cache_ids)
+
+    def _cache_key(self, key):
+        return (self._cache_id, key)
+
+    def __repr__(self):
+        return 'LazyHash(%d keys, %d loaded)' % (len(self._keys),
+                                                 dict.__len__(self))
+
+    def is_loaded(self, key):
+        return dict.__contains__(self, key)
+
+    def loaded_items(self):
+        return dict.items(self)
+
+    def forget(self, key):
+        ''' Forgets the value, which will be loaded again. '''
+        dict.pop(self, key, None)
+        get_lazy_cache().pop(self._cache_key(key))
+
+    def __getitem__(self, key):
+        cache = get_lazy_cache()
+        with _load_lock:
+            if dict.__contains__(self, key):
+                cache.get(self._cache_key(key))
+                return dict.__getitem__(self, key)
+            if not key in self._keys:
+                raise KeyError(key)
+            value = self._load(key)
+            self._store(key, value)
+            return value
+
+    def _store(self, key, value):
+        cache = get_lazy_cache()
+        entry = (weakref.ref(self), key)
+        cache.put(self._cache_key(key), entry, size=data_size(value))
+        if self._cache_key(key) in cache:
+            dict.__setitem__(self, key, value)
+        else:
+            # too big to keep
+            dict.pop(self, key, None)
+
+    def __setitem__(self, key, value):
+        with _load_lock:
+            self._keys.add(key)
+            self._store(key, value)
+
+    def __delitem__(self, key):
+        if not key in self._keys:
+            raise KeyError(key)
+        self._keys.remove(key)
+        self.forget(key)
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    has_key = __contains__
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __iter__(self):
+        return iter(list(self._keys))
+
+    iterkeys = __iter__
+
+    def keys(self):
+        return list(self._keys)
+
+    def get(self, key, default=None):
+        if key in self._keys:
+            return self[key]
+        return default
+
+    def iteritems(self):
+        for k in self.keys():
+            yield k, self[k]
+
+    def items(self):
+        return list(self.iteritems())
+
+    def itervalues(self):
+        for k in self.keys():
+            yield self[k]
+
+    def values(self):
+        return list(self.itervalues())
+
+    def pop(self, key, *default):
+        if key in self._keys:
+            value = self[key]
+            del self[key]
+            return value
+        if default:
+            return default[0]
+        raise KeyError(key)
+
+    def popitem(self):
+        if not self._keys:
+            raise KeyError('popitem(): dictionary is empty')
+        key = next(iter(self._keys))
+        return key, self.pop(key)
+
+    def setdefault(self, key, default=None):
+        if not key in self._keys:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        for k, v in dict(*args, **kwargs).items():
+            self[k] = v
+
+    def clear(self):
+        for k in self.keys():
+            del self[k]
+
+    def _lazy_copy(self, copy_value):
+        ''' Returns a LazyHash with the same keys and load function,
+            with copy_value(x) of the loaded values. '''
+        res = LazyHash(self._keys, self._load)
+        with _load_lock:
+            for k, v in self.loaded_items():
+                res._store(k, copy_value(v))
+        return res
+
+    def copy(self):
+        ''' Returns a LazyHash that shares the loaded values. '''
+        return self._lazy_copy(lambda x: x)
+
+    __copy__ = copy
+
+    def __deepcopy__(self, memo):
+        from copy import deepcopy
+        return self._lazy_copy(lambda x: deepcopy(x, memo))
+
+    def __reduce__(self):
+        # the load function must be picklable
+        return (LazyHash, (list(self._keys), self._load),
+                dict(self.loaded_items()))
+
+    def __setstate__(self, loaded):
+        with _load_lock:
+            for k, v in loaded.items():
+                self._store(k, v)
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, dict):
+            return False
+        if self._keys != set(other.keys()):
+            return False
+        # the values not loaded by either are read from the same place
+        same_load = isinstance(other, LazyHash) and other._load is self._load
+        for k in self._keys:
+            if (same_load and not self.is_loaded(k) and
+                    not other.is_loaded(k)):
+                continue
+            if self[k] != other[k]:
+                return False
+        return True
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    __hash__ = None
+
+
+def data_size(data):
+    ''' Number of bytes in the strings of the data (excluding LazyHash). '''
+    if isinstance(data, LazyHash):
+        return 0
+    if isinstance(data, (str, unicode)):
+        return len(data)
+    if isinstance(data, dict):
+        return sum(data_size(v) for v in data.values())
+    if isinstance(data, list):
+        return sum(data_size(v) for v in data)
+    return 0
+
+
+def lazy_data_forget(data, name):
+    '''
+        Forgets the value of the first LazyHash along the path name,
+        so that the changes just written to disk are read again.
+    '''
+    for k in name:
+        if isinstance(data, LazyHash):
+            if data.is_loaded(k):
+                data.forget(k)
+            return
+        try:
+            if isinstance(data, list):
+                data = data[int(k)]
+            else:
+                data = data[k]
+        except (KeyError, IndexError, ValueError, TypeError):
+            return
+
+
+def _on_evict(_key, entry):
+    ref, key = entry
+    lazy = ref()
+    if lazy is not None:
+        dict.pop(lazy, key, None)
+
+
+class _Current(object):
+    cache = None
+
+
+# protects the loading
+_load_lock = threading.RLock()
+
+_cache_ids = itertools.count()
+
+
+def get_lazy_cache():
+    ''' Returns the cache of the values loaded by LazyHash. '''
+    if _Current.cache is None:
+        C = MCDPConstants
+        _Current.cache = BoundedCache(max_entries=C.hdb_lazy_max_entries,
+                                      max_bytes=C.hdb_lazy_max_bytes,
+                                      on_evict=_on_evict)
+    return _Current.cache
+
+
+def set_lazy_cache(cache):
+    ''' Replaces the cache (None: create it again when needed). '''
+    if cache is not None:
+        cache.on_evict = _on_evict
+    _Current.cache = cache
@@ -1,4 +1,4 @@
-from copy import deepcopy
+from copy import deepcopy, copy
 
 from contracts.utils import indent
 
@@ -7,6 +7,25 @@ from mcdp_utils_misc import yaml_dump
 from .memdata_events import event_interpret_
 from .memdataview_manager import ViewManager
 
+def data_copy_path(data, name):
+    '''
+        Returns a copy of data that shares everything with it, except
+        the dicts and lists along the path name (including the one at
+        name), which are copied (one level each).
+
+        An event for the node at name can then be applied to the copy
+        without changing data.
+    '''
+    res = copy(data)
+    node = res
+    for k in name:
+        if isinstance(node, list):
+            k = int(k)
+        child = copy(node[k])
+        node[k] = child
+        node = child
+    return res
+
 def assert_data_equal(schema, data1, data2):  # @UnusedVariable
     ''' 
         Checks that two datas are the same, by checking the hashcode. 
@@ -12,7 +12,7 @@ from mcdp import logger
 from mcdp_hdb.schema import NotValid, SchemaContext, SchemaHash, SchemaList
 from mcdp_shelf import ACL
 from mcdp_shelf.access import acl_from_yaml
-from mcdp_utils_misc import format_list, memoize_simple
+from mcdp_utils_misc import format_list
 
 from .memdataview_exceptions import InsufficientPrivileges, InvalidOperation, EntryNotFound
 from .memdataview_utils import special_string_interpret
@@ -344,13 +344,15 @@ class ViewHash0(ViewMount):
         object.__setattr__(self, 'children_already_provided', {})
         
 
-    @memoize_simple
     def child(self, name):
-        if name in self.children_already_provided:
-            return self.children_already_provided[name]
-        
         if name in self.mount_points:
             return self.mount_points[name]
+
+        if name in self.children_already_provided and name in self._data:
+            c = self.children_already_provided[name]
+            # the data might have been changed or loaded again
+            c._data = self._data[name]
+            return c
         
         if not name in self._data:
             msg = 'Cannot get child "%s"; known: %s.' % (name, format_list(self.keys()))
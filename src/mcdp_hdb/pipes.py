@@ -1,18 +1,20 @@
 from contracts import contract
 from mcdp import logger
+from mcdp.constants import MCDPConstants
 from mcdp_utils_misc import yaml_dump
 import os
 
 from contracts.utils import indent, raise_wrapped
 from git.repo.base import Repo
-from git.util import Actor
 
 from .disk_map import DiskMap
+from .disk_map_lazy import interpret_directory_lazily
 from .disk_struct import ProxyDirectory
 from .exceptions import HDBInternalError
 from .gitrepo_map import diskrep_from_gitrep
+from .lazy_hash import lazy_data_forget
 from .memdataview import ViewMount
-from .memdataview_utils import host_name
+from .write_behind import WriteBehind, get_commit_actors
 
 
 @contract(view0=ViewMount, child_name=str, disk_map=DiskMap, repo=Repo)
@@ -23,9 +25,15 @@ def mount_git_repo(view0, child_name, disk_map, repo):
     # first, is the child well defined?
     child_schema = view0._schema.get_descendant((child_name,))
     # load the data in the repo
-    disk_rep = diskrep_from_gitrep(repo)
-    # is the data in the repo conformant to the schema?
-    data = disk_map.interpret_hierarchy_(child_schema, disk_rep)
+    if MCDPConstants.hdb_lazy_mount:
+        if repo.working_tree_dir is None:
+            msg = 'This is a bare repository'
+            raise ValueError(msg)
+        data = interpret_directory_lazily(disk_map, child_schema, repo.working_tree_dir)
+    else:
+        disk_rep = diskrep_from_gitrep(repo)
+        # is the data in the repo conformant to the schema?
+        data = disk_map.interpret_hierarchy_(child_schema, disk_rep)
     # now create a view for this
     view_manager = view0._view_manager
     view = view_manager.create_view_instance(child_schema, data)
@@ -42,9 +50,12 @@ def mount_directory(view0, child_name, disk_map, dirname):
     '''
     child_schema = view0._schema.get_descendant((child_name,))
     # load the data in the repo
-    disk_rep = ProxyDirectory.from_disk(dirname)
-    # is the data in the repo conformant to the schema?
-    data = disk_map.interpret_hierarchy_(child_schema, disk_rep)
+    if MCDPConstants.hdb_lazy_mount:
+        data = interpret_directory_lazily(disk_map, child_schema, dirname)
+    else:
+        disk_rep = ProxyDirectory.from_disk(dirname)
+        # is the data in the repo conformant to the schema?
+        data = disk_map.interpret_hierarchy_(child_schema, disk_rep)
     # now create a view for this
     view_manager = view0._view_manager
     try:
@@ -118,21 +129,35 @@ class WriteToDiskCallback(object):
         for disk_event in disk_events:
             # logger.debug('Disk event:\n%s' % yaml_dump(disk_event))
             apply_disk_event_to_filesystem(self.dirname, disk_event)
+        # if the data is lazy, read it again from disk
+        lazy_data_forget(self.view._data, data_event['arguments']['name'])
             
     
 class WriteToRepoCallback(object):
+    '''
+        Applies the events to the working tree of the repo and commits.
+
+        If MCDPConstants.hdb_write_behind, the commits are made in
+        batches by a background thread (see WriteBehind); otherwise,
+        one for each event, before returning.
+    '''
     def __init__(self, repo, disk_map, view):
         self.repo = repo
         self.disk_map = disk_map
         self.view = view 
         self.data_events = []
+        if MCDPConstants.hdb_write_behind:
+            self.write_behind = WriteBehind(repo)
+        else:
+            self.write_behind = None
         
     def __repr__(self):
         return 'WriteToRepo(%s; %s so far)' % (self.repo.working_dir, len(self.data_events))
          
     def __call__(self, data_event):
         from mcdp_hdb.disk_map_disk_events_from_data_events import disk_events_from_data_event
-        from mcdp_hdb.disk_events import apply_disk_event_to_filesystem
+        from mcdp_hdb.disk_events import (apply_disk_event_to_filesystem,
+                                          disk_event_paths)
         s = yaml_dump(data_event)
         logger.debug('Event #%d:\n%s' % (len(self.data_events), indent(s, '> ')) )
         self.data_events.append(data_event)
@@ -140,25 +165,24 @@ class WriteToRepoCallback(object):
                                                  schema=self.view._schema, 
                                                  data_rep=self.view._data, 
                                                  data_event=data_event)
-        
-        for disk_event in disk_events:
-            logger.debug('Disk event:\n%s' % yaml_dump(disk_event))
-            wd = self.repo.working_dir
-            apply_disk_event_to_filesystem(wd, disk_event, repo=self.repo)
-            
-        message = yaml_dump(data_event)
+        wd = self.repo.working_dir
         who = data_event['who']
-        if who is not None:
-            actor = who['actor']
-            host = who['host']
-            instance = who['instance']
-        else:
-            actor = 'system'
-            host = host_name()
-            instance = 'unspecified'
-            
-        author = Actor(actor, '%s@%s' % (actor, instance))
-        committer = Actor(instance, '%s@%s' % (instance, host))
-        _commit = self.repo.index.commit(message, author=author, committer=committer)
         
-        
\ No newline at end of file
+        if self.write_behind is not None:
+            def apply_changes():
+                for disk_event in disk_events:
+                    apply_disk_event_to_filesystem(wd, disk_event)
+            paths = []
+            for disk_event in disk_events:
+                paths.extend(disk_event_paths(disk_event))
+            self.write_behind.write(who, s, apply_changes, paths)
+        else:
+            for disk_event in disk_events:
+                logger.debug('Disk event:\n%s' % yaml_dump(disk_event))
+                apply_disk_event_to_filesystem(wd, disk_event, repo=self.repo)
+                
+            message = s
+            author, committer = get_commit_actors(who)
+            _commit = self.repo.index.commit(message, author=author, committer=committer)
+        # if the data is lazy, read it again from disk
+        lazy_data_forget(self.view._data, data_event['arguments']['name'])
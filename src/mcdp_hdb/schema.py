@@ -12,6 +12,8 @@ import random
 from contracts.interface import describe_value, describe_type
 from contracts.utils import indent, check_isinstance, raise_desc, raise_wrapped
 
+from .lazy_hash import LazyHash
+
 
 class NotValid(Exception):
     ''' Raised by SchemaBase::validate() ''' 
@@ -127,9 +129,14 @@ class SchemaHash(SchemaRecursive):
             msg = 'Expected a dictionary object.'
             raise_desc(NotValid, msg, data=describe_value(data))
         
-        for k in data:
+        if isinstance(data, LazyHash):
+            # the others are validated when loaded
+            items = data.loaded_items()
+        else:
+            items = data.items()
+        for k, v in items:
             try:
-                self.prototype.validate(data[k])
+                self.prototype.validate(v)
             except NotValid as e:
                 msg = 'For entry "%s":' % k
                 raise_wrapped(NotValid, e, msg) 
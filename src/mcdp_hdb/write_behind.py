@@ -0,0 +1,344 @@
+'''
+    Write-behind of the changes to a git repository.
+
+    Each data event is applied to the working tree, and its description
+    and the paths that it changes are appended to a journal in the .git
+    directory (flushed to disk) before the call returns. A background
+    thread commits the events in batches, when there are max_events of
+    them or the first one is max_delay seconds old. Only the paths in the
+    journal are committed. The events of different authors are never in
+    the same commit.
+
+    If push() is enabled, another thread pushes after the commits,
+    retrying with exponential backoff if it fails.
+
+    The writers wait if there are max_pending events not committed or
+    max_unpushed commits not pushed (backpressure).
+
+    If the process dies before committing, the changes to the paths in
+    the journal are committed at the next start, with the journal as
+    message.
+'''
+import atexit
+import os
+import threading
+import time
+import weakref
+
+from contracts.utils import raise_wrapped
+from git.util import Actor
+
+from mcdp.constants import MCDPConstants
+from mcdp.logs import logger
+
+from .memdataview_utils import host_name
+
+
+__all__ = [
+    'WriteBehind',
+    'get_commit_actors',
+]
+
+
+def get_commit_actors(who):
+    ''' Returns author, committer for the events of who (may be None). '''
+    if who is not None:
+        actor = who['actor']
+        host = who['host']
+        instance = who['instance']
+    else:
+        actor = 'system'
+        host = host_name()
+        instance = 'unspecified'
+
+    author = Actor(actor, '%s@%s' % (actor, instance))
+    committer = Actor(instance, '%s@%s' % (instance, host))
+    return author, committer
+
+
+class WriteBehind(object):
+    journal_name = 'hdb_journal.yaml'
+    journal_paths_name = 'hdb_journal.paths'
+
+    def __init__(self, repo, max_events=None, max_delay=None,
+                 max_pending=None, max_unpushed=None,
+                 retry_delay=None, retry_max_delay=None):
+        C = MCDPConstants
+        def default(x, value):
+            return value if x is None else x
+        self.repo = repo
+        self.max_events = default(max_events, C.hdb_commit_max_events)
+        self.max_delay = default(max_delay, C.hdb_commit_max_delay)
+        self.max_pending = default(max_pending, C.hdb_write_behind_max_pending)
+        self.max_unpushed = default(max_unpushed, C.hdb_push_max_unpushed)
+        self.retry_delay = default(retry_delay, C.hdb_push_retry_delay)
+        self.retry_max_delay = default(retry_max_delay,
+                                       C.hdb_push_retry_max_delay)
+        self.journal = os.path.join(repo.git_dir, self.journal_name)
+        self.journal_paths = os.path.join(repo.git_dir,
+                                          self.journal_paths_name)
+
+        # protects everything below, the working tree and the journal
+        self.cond = threading.Condition()
+        # list of (time, who) for the events not committed
+        self.pending = []
+        self.flush_requested = False
+        self.closing = False
+        self.ncommits = 0
+        self.npushed = 0
+        self.nfailures = 0
+        self.push = None
+        self.committer_thread = None
+        self.pusher_thread = None
+
+        self._recover()
+        _instances.add(self)
+
+    def __repr__(self):
+        return ('WriteBehind(%s; %d pending, %d commits, %d pushed)' %
+                (self.repo.working_dir, len(self.pending), self.ncommits,
+                 self.npushed))
+
+    def write(self, who, message, apply_changes, paths):
+        '''
+            Applies the changes to the working tree with apply_changes()
+            and journals the message; they are committed later.
+
+            paths: the files or directories (relative to the working tree,
+            with "/" as separator) changed by apply_changes().
+        '''
+        with self.cond:
+            if self.closing:
+                msg = 'The write-behind for %s is closed.' % self.repo.working_dir
+                raise ValueError(msg)
+            self._start_committer()
+            while True:
+                if (len(self.pending) >= self.max_pending or
+                        self.ncommits - self.npushed >= self.max_unpushed
+                        and self.push is not None):
+                    logger.debug('Waiting for the commits and pushes.')
+                    self.cond.wait()
+                elif self.pending and self.pending[0][1] != who:
+                    # do not mix the authors
+                    self.flush_requested = True
+                    self.cond.notify_all()
+                    self.cond.wait()
+                else:
+                    break
+
+            self._journal_append(message, paths)
+            try:
+                apply_changes()
+            finally:
+                self.pending.append((time.time(), who))
+                self.cond.notify_all()
+
+    def flush(self):
+        ''' Waits until the events written so far are committed. '''
+        with self.cond:
+            if not self.pending:
+                return
+            self._start_committer()
+            self.flush_requested = True
+            self.cond.notify_all()
+            nfailures = self.nfailures
+            while self.pending:
+                if self.nfailures > nfailures:
+                    msg = 'Could not commit to %s.' % self.repo.working_dir
+                    raise ValueError(msg)
+                self.cond.wait()
+
+    def sync(self):
+        ''' Flushes, and then waits until the commits are pushed. '''
+        self.flush()
+        with self.cond:
+            while self.push is not None and self.npushed < self.ncommits:
+                self.cond.wait()
+
+    def enable_push(self, push):
+        ''' push: function of the repo, called after the commits. '''
+        with self.cond:
+            self.push = push
+            if self.pusher_thread is None:
+                self.pusher_thread = _start_thread(self._pusher_loop,
+                                                   'hdb-pusher')
+            self.cond.notify_all()
+
+    def close(self):
+        ''' Commits and pushes what is pending, and stops the threads. '''
+        with self.cond:
+            self.closing = True
+            self.cond.notify_all()
+        for t in [self.committer_thread, self.pusher_thread]:
+            if t is not None:
+                t.join()
+
+    def _start_committer(self):
+        if self.committer_thread is None:
+            self.committer_thread = _start_thread(self._committer_loop,
+                                                  'hdb-committer')
+
+    def _committer_loop(self):
+        while True:
+            with self.cond:
+                while True:
+                    if self.pending:
+                        if (self.closing or self.flush_requested or
+                                len(self.pending) >= self.max_events):
+                            break
+                        age = time.time() - self.pending[0][0]
+                        if age >= self.max_delay:
+                            break
+                        self.cond.wait(self.max_delay - age)
+                    elif self.closing:
+                        return
+                    else:
+                        self.cond.wait()
+
+                who = self.pending[0][1]
+                try:
+                    self._commit(self._journal_read(),
+                                 self._journal_read_paths(), who)
+                except Exception as e:
+                    logger.error('Could not commit to %s: %s' %
+                                 (self.repo.working_dir, e))
+                    self.nfailures += 1
+                    self.flush_requested = False
+                    self.cond.notify_all()
+                    if self.closing:
+                        return
+                    self.cond.wait(self.retry_delay)
+                    continue
+                self.pending = []
+                self.flush_requested = False
+                self.cond.notify_all()
+
+    def _pusher_loop(self):
+        delay = self.retry_delay
+        while True:
+            with self.cond:
+                while self.npushed >= self.ncommits and not self.closing:
+                    self.cond.wait()
+                if self.npushed >= self.ncommits:
+                    return
+                ncommits = self.ncommits
+                push = self.push
+            try:
+                push(self.repo)
+            except Exception as e:
+                logger.error('Could not push %s (retrying in %s s): %s' %
+                             (self.repo.working_dir, delay, e))
+                with self.cond:
+                    if self.closing:
+                        return
+                    deadline = time.time() + delay
+                    while not self.closing and time.time() < deadline:
+                        self.cond.wait(deadline - time.time())
+                delay = min(delay * 2, self.retry_max_delay)
+                continue
+            delay = self.retry_delay
+            with self.cond:
+                self.npushed = ncommits
+                self.cond.notify_all()
+
+    def _commit(self, message, paths, who):
+        ''' Commits the changes to the paths; called with the lock held. '''
+        self._stage(paths)
+        author, committer = get_commit_actors(who)
+        self.repo.index.commit(message, author=author, committer=committer)
+        self._journal_clear()
+        self.ncommits += 1
+
+    def _stage(self, paths):
+        ''' Adds to the index the changes to the paths (and only those). '''
+        wd = self.repo.working_dir
+        files = []
+        dirs = []
+        missing = []
+        for p in paths:
+            fn = os.path.join(wd, p)
+            if os.path.isdir(fn):
+                dirs.append(p)
+            elif os.path.lexists(fn):
+                files.append(p)
+            else:
+                missing.append(p)
+        # in chunks, to keep the command lines short
+        n = 100
+        for i in range(0, len(missing), n):
+            self.repo.git.rm('--cached', '-r', '-q', '--ignore-unmatch',
+                             '--', *missing[i:i + n])
+        # the files written are added even if ignored, as index.add() does
+        for i in range(0, len(files), n):
+            self.repo.git.add('--all', '--force', '--', *files[i:i + n])
+        for i in range(0, len(dirs), n):
+            self.repo.git.add('--all', '--', *dirs[i:i + n])
+
+    def _recover(self):
+        ''' Commits the changes left by a process that did not finish. '''
+        if not (os.path.exists(self.journal) or
+                os.path.exists(self.journal_paths)):
+            return
+        if not self.repo.head.is_valid():
+            # no commits yet
+            return
+        logger.info('Committing the uncommitted changes in %s.' %
+                    self.repo.working_dir)
+        message = self._journal_read()
+        message = 'Uncommitted changes found at start.\n\n' + message
+        try:
+            self._commit(message, self._journal_read_paths(), None)
+        except Exception as e:
+            msg = 'Could not commit the changes in %s.' % self.repo.working_dir
+            raise_wrapped(ValueError, e, msg)
+
+    def _journal_append(self, message, paths):
+        if isinstance(message, unicode):
+            message = message.encode('utf-8')
+        # the paths first: they are needed to commit
+        with open(self.journal_paths, 'ab') as f:
+            for p in paths:
+                if isinstance(p, unicode):
+                    p = p.encode('utf-8')
+                f.write(p + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        with open(self.journal, 'ab') as f:
+            f.write('---\n' + message)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _journal_read(self):
+        if not os.path.exists(self.journal):
+            return ''
+        with open(self.journal, 'rb') as f:
+            return f.read()
+
+    def _journal_read_paths(self):
+        ''' Returns the paths in the journal, without duplicates. '''
+        if not os.path.exists(self.journal_paths):
+            return []
+        with open(self.journal_paths, 'rb') as f:
+            lines = f.read().split('\n')
+        return sorted(set(l for l in lines if l))
+
+    def _journal_clear(self):
+        for fn in [self.journal, self.journal_paths]:
+            if os.path.exists(fn):
+                os.unlink(fn)
+
+
+def _start_thread(target, name):
+    t = threading.Thread(target=target, name=name)
+    t.daemon = True
+    t.start()
+    return t
+
+
+_instances = weakref.WeakSet()
+
+
+@atexit.register
+def close_write_behinds():
+    for w in list(_instances):
+        w.close()
@@ -144,6 +144,10 @@ class HostInstance(object):
         u.info.groups.append('admin')
         
 class PushCallback(object):
+    ''' 
+        Pushes to origin after the commits. With the write-behind, 
+        the pushes are done by its background thread. 
+    '''
     @staticmethod
     def add_to(view):
         view._notify_callback = PushCallback(view._notify_callback)
@@ -151,12 +155,25 @@ class PushCallback(object):
     @contract(other=WriteToRepoCallback)
     def __init__(self, other):
         self.other = other
+        if other.write_behind is not None:
+            other.write_behind.enable_push(push_to_origin)
         
     def __call__(self, event):
         self.other(event)
-        repo  = self.other.repo
-        logger.debug('pushing')
-        repo.remotes.origin.push()
+        if self.other.write_behind is None:
+            repo = self.other.repo
+            logger.debug('pushing')
+            repo.remotes.origin.push()
+        
+
+def push_to_origin(repo):
+    ''' Used by the write-behind pusher: raises if the push was 
+        rejected, so that it is retried later. '''
+    logger.debug('pushing')
+    for info in repo.remotes.origin.push():
+        if info.flags & info.ERROR:
+            msg = 'Could not push %s: %s' % (repo.working_dir, info.summary)
+            raise_desc(Exception, msg)
         
         
 #     hi_config = Schema()
@@ -8,4 +8,6 @@ from .test_yaml_repr import *
 from .functoriality_memdata_to_diskrep import *
 from .functoriality_gitrepo_to_diskrep import *
 from .functoriality_diskrep_to_gitrep import *
-from .testcases_run import *
\ No newline at end of file
+from .testcases_run import *
+from .test_write_behind import *
+from .test_lazy_mount import *
\ No newline at end of file
@@ -0,0 +1,68 @@
+from copy import deepcopy
+
+from comptests.registrar import comptest, run_module_tests
+from nose.tools import assert_equal
+
+from mcdp_hdb.disk_events import disk_event_dir_create, disk_event_file_create,\
+    disk_event_interpret_copy
+from mcdp_hdb.disk_struct import ProxyDirectory, ProxyFile
+from mcdp_hdb.memdata_utils import data_copy_path
+
+
+def who():
+    return dict(actor='system', host='host', instance='instance')
+
+
+@comptest
+def check_copy_path():
+    d0 = ProxyDirectory(files={'f': ProxyFile('f')},
+                        directories={'a': ProxyDirectory(), 'b': ProxyDirectory()})
+    h0 = d0.hash_code()
+    e1 = disk_event_dir_create('1', who(), dirname=('a',), name='c')
+    e2 = disk_event_file_create('2', who(), dirname=('a', 'c'), name='g',
+                                contents='g')
+    d1 = disk_event_interpret_copy(d0, e1)
+    d1 = disk_event_interpret_copy(d1, e2)
+    assert_equal(d0.hash_code(), h0)
+    assert_equal(d1['a']['c']['g'].contents, 'g')
+    # the rest is shared
+    assert d1['b'] is d0['b']
+    assert d1['f'] is d0['f']
+
+
+@comptest
+def check_data_copy_path():
+    data = {'users': {'john': {'name': 'John', 'groups': ['a']}},
+            'other': {'x': 'y'}}
+    data2 = data_copy_path(data, ['users', 'john', 'groups'])
+    data2['users']['john']['groups'].append('b')
+    data2['users']['john']['name'] = 'Jack'
+    assert_equal(data['users']['john'], {'name': 'John', 'groups': ['a']})
+    assert data2['other'] is data['other']
+
+
+@comptest
+def check_hash_cache():
+    def create(contents):
+        d = ProxyDirectory()
+        d.create_file_path('a/b/f', contents)
+        d.create_file_path('c/g', 'g')
+        return d
+    d0 = create('f1')
+    h0 = d0.hash_code()
+    d1 = deepcopy(d0)
+    assert_equal(d1.hash_code(), h0)
+    d1.get_descendant(('a', 'b')).file_modify('f', 'f2')
+    # only the path to the change was invalidated
+    assert d1._hash is None and d1['a']._hash is None
+    assert d1['c']._hash is not None
+    assert_equal(d0.hash_code(), h0)
+    assert_equal(d1.hash_code(), create('f2').hash_code())
+    d1.get_descendant(('a',)).dir_delete('b')
+    d1['a'].dir_create('b')
+    d1['a']['b'].file_create('f', 'f1')
+    assert_equal(d1.hash_code(), h0)
+
+
+if __name__ == '__main__':
+    run_module_tests()
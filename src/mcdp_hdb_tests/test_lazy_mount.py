@@ -0,0 +1,145 @@
+from copy import deepcopy
+import os
+import pickle
+
+from comptests.registrar import comptest, run_module_tests
+from nose.tools import assert_equal
+
+from mcdp_hdb import (DiskMap, ProxyDirectory, Schema, SchemaHash,
+                      SchemaString, ViewManager, data_hash_code)
+from mcdp_hdb.disk_map_lazy import interpret_directory_lazily
+from mcdp_hdb.lazy_hash import LazyHash, get_lazy_cache, set_lazy_cache
+from mcdp_hdb.pipes import mount_directory
+from mcdp_hdb_tests.testcase_minilibrary import testcases_minilibrary
+from mcdp_hdb_tests.testcase_simpleuserdb import testcases_SimpleUserDB
+from mcdp_hdb_tests.testcase_translatenone import testcases_TranslateNone
+from mcdp_utils_misc import BoundedCache, tmpdir
+
+
+@comptest
+def check_lazy_interpretation():
+    tcs = {}
+    tcs.update(testcases_minilibrary())
+    tcs.update(testcases_TranslateNone())
+    tcs.update(testcases_SimpleUserDB())
+    for k, tc in tcs.items():
+        schema = tc.get_schema()
+        disk_map = tc.get_disk_map()
+        with tmpdir(prefix='check_lazy') as d:
+            disk_map.create_hierarchy_(schema, tc.get_data1()).to_disk(d)
+            eager = disk_map.interpret_hierarchy_(schema,
+                                                  ProxyDirectory.from_disk(d))
+            lazy = interpret_directory_lazily(disk_map, schema, d)
+            assert_equal(data_hash_code(lazy), data_hash_code(eager), k)
+
+
+def get_minilibrary():
+    lib = Schema()
+    things = Schema()
+    models = SchemaHash(SchemaString())
+    things._add_child('models', models)
+    lib._add_child('things', things)
+    dm = DiskMap()
+    dm.hint_directory(lib, translations={'things': None})
+    dm.hint_directory(things, translations={'models': None})
+    dm.hint_directory(models, pattern='%.mcdp')
+    db = Schema()
+    db._add_child('lib', lib)
+    return db, dm
+
+
+@comptest
+def check_lazy_mount():
+    db, dm = get_minilibrary()
+    set_lazy_cache(BoundedCache(max_entries=2))
+    try:
+        with tmpdir(prefix='check_lazy') as d:
+            for i in range(5):
+                with open(os.path.join(d, 'model%d.mcdp' % i), 'w') as f:
+                    f.write('mcdp { %d }' % i)
+            view_manager = ViewManager(db)
+            view0 = view_manager.create_view_instance(db, db.generate_empty())
+            view0.set_root()
+            mount_directory(view0, 'lib', dm, d)
+
+            models = view0.lib.things.models
+            assert isinstance(models._data, LazyHash)
+            assert_equal(len(models), 5)
+            assert_equal(len(get_lazy_cache()), 0)
+            for i in range(5):
+                assert_equal(models['model%d' % i], 'mcdp { %d }' % i)
+            assert_equal(len(get_lazy_cache()), 2)
+
+            models['model1'] = 'mcdp { changed }'
+            models['model5'] = 'mcdp { 5 }'
+            del models['model0']
+            with open(os.path.join(d, 'model1.mcdp')) as f:
+                assert_equal(f.read(), 'mcdp { changed }')
+            # read again from disk after being evicted
+            models = view0.lib.things.models
+            assert_equal(models['model1'], 'mcdp { changed }')
+            assert_equal(models['model5'], 'mcdp { 5 }')
+            assert_equal(sorted(models), ['model%d' % i for i in range(1, 6)])
+    finally:
+        set_lazy_cache(None)
+
+
+@comptest
+def check_lazy_copies():
+    loaded = []
+
+    def load(k):
+        loaded.append(k)
+        return {'value': k}
+    a = LazyHash(['x', 'y', 'z'], load)
+    assert_equal(a['x'], {'value': 'x'})
+    b = a.copy()
+    c = deepcopy(a)
+    assert_equal(loaded, ['x'])
+    assert isinstance(b, LazyHash) and isinstance(c, LazyHash)
+    assert b['x'] is a['x']
+    assert c['x'] is not a['x']
+    # the keys are compared first; the values are loaded only if needed
+    assert a != LazyHash(['x', 'y'], load)
+    assert a == b
+    assert_equal(loaded, ['x'])
+    assert a == {'x': {'value': 'x'}, 'y': {'value': 'y'},
+                 'z': {'value': 'z'}}
+    assert_equal(sorted(loaded), ['x', 'y', 'z'])
+    b['y'] = {'value': 'changed'}
+    assert a != b
+    assert_equal(a['y'], {'value': 'y'})
+
+    # different instances never share the cache entries
+    b.forget('x')
+    assert a.is_loaded('x')
+
+
+@comptest
+def check_lazy_pickle():
+    tcs = testcases_minilibrary()
+    tc = tcs[sorted(tcs)[0]]
+    schema = tc.get_schema()
+    disk_map = tc.get_disk_map()
+    with tmpdir(prefix='check_lazy') as d:
+        disk_map.create_hierarchy_(schema, tc.get_data1()).to_disk(d)
+        lazy = interpret_directory_lazily(disk_map, schema, d)
+        s = pickle.dumps(lazy, pickle.HIGHEST_PROTOCOL)
+        lazy2 = pickle.loads(s)
+        hashes = [x for x in _find_lazy(lazy2)]
+        assert hashes
+        assert all(not x.loaded_items() for x in hashes)
+        assert_equal(data_hash_code(lazy2), data_hash_code(lazy))
+
+
+def _find_lazy(data):
+    if isinstance(data, LazyHash):
+        yield data
+    elif isinstance(data, dict):
+        for v in data.values():
+            for x in _find_lazy(v):
+                yield x
+
+
+if __name__ == '__main__':
+    run_module_tests()
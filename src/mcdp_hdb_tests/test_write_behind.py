@@ -0,0 +1,113 @@
+import os
+
+from comptests.registrar import comptest, run_module_tests
+from git.repo.base import Repo
+from nose.tools import assert_equal
+
+from mcdp_hdb.write_behind import WriteBehind
+from mcdp_utils_misc import tmpdir
+
+
+def create_repo(d):
+    repo = Repo.init(d)
+    fn = os.path.join(d, 'README')
+    with open(fn, 'w') as f:
+        f.write('readme')
+    repo.index.add(['README'])
+    repo.index.commit('initial')
+    return repo
+
+
+def writer(d, fn, contents):
+    def apply_changes():
+        with open(os.path.join(d, fn), 'w') as f:
+            f.write(contents)
+    return apply_changes
+
+
+def who(actor):
+    return dict(actor=actor, host='host', instance='instance')
+
+
+@comptest
+def check_write_behind_batches():
+    with tmpdir(prefix='check_write_behind') as d:
+        repo = create_repo(d)
+        wb = WriteBehind(repo, max_events=100, max_delay=100)
+        for i in range(5):
+            wb.write(who('john'), 'event %d\n' % i,
+                     writer(d, 'f%d' % i, 'x%d' % i), ['f%d' % i])
+        assert os.path.exists(wb.journal)
+        wb.flush()
+        assert not os.path.exists(wb.journal)
+        commits = list(repo.iter_commits())
+        assert_equal(len(commits), 2)
+        assert_equal(commits[0].author.name, 'john')
+        assert 'event 4' in commits[0].message
+        assert_equal(len(commits[0].tree.blobs), 6)
+        assert not repo.is_dirty(untracked_files=True)
+
+        # only the paths of the events are committed
+        writer(d, 'stray', 'x')()
+        wb.write(who('john'), 'c\n', writer(d, 'f0', 'z'), ['f0'])
+        os.unlink(os.path.join(d, 'f1'))
+        wb.write(who('john'), 'd\n', lambda: None, ['f1'])
+        wb.flush()
+        assert_equal(repo.untracked_files, ['stray'])
+        assert not repo.is_dirty()
+        os.unlink(os.path.join(d, 'stray'))
+
+        # different authors are not in the same commit
+        wb.write(who('john'), 'a\n', writer(d, 'f0', 'y'), ['f0'])
+        wb.write(who('jack'), 'b\n', writer(d, 'f1', 'y'), ['f1'])
+        wb.close()
+        commits = list(repo.iter_commits())
+        assert_equal([c.author.name for c in commits[:2]], ['jack', 'john'])
+
+
+@comptest
+def check_write_behind_recover():
+    with tmpdir(prefix='check_write_behind') as d:
+        repo = create_repo(d)
+        # changes not in a journal are not committed
+        writer(d, 'stray', 'x')()
+        WriteBehind(repo).close()
+        assert_equal(len(list(repo.iter_commits())), 1)
+
+        # as left by a process that did not commit
+        with open(os.path.join(repo.git_dir, WriteBehind.journal_paths_name), 'w') as f:
+            f.write('f\n')
+        with open(os.path.join(repo.git_dir, WriteBehind.journal_name), 'w') as f:
+            f.write('---\nevent\n')
+        writer(d, 'f', 'x')()
+        wb = WriteBehind(repo)
+        commits = list(repo.iter_commits())
+        assert_equal(len(commits), 2)
+        assert 'event' in commits[0].message
+        assert_equal(repo.untracked_files, ['stray'])
+        assert not repo.is_dirty()
+        wb.close()
+
+
+@comptest
+def check_write_behind_push_retry():
+    with tmpdir(prefix='check_write_behind') as d:
+        repo = create_repo(d)
+        wb = WriteBehind(repo, max_events=1, retry_delay=0.01)
+        attempts = []
+
+        def push(_repo):
+            attempts.append(wb.ncommits)
+            if len(attempts) < 3:
+                raise Exception('network down')
+
+        wb.enable_push(push)
+        wb.write(who('john'), 'event\n', writer(d, 'f', 'x'), ['f'])
+        wb.sync()
+        assert_equal(wb.npushed, 1)
+        assert_equal(len(attempts), 3)
+        wb.close()
+
+
+if __name__ == '__main__':
+    run_module_tests()
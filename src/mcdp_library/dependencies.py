@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+from contextlib import contextmanager
+import hashlib
+import threading
+
+
+__all__ = [
+    'record_dependencies',
+    'record_files_read',
+    'dependencies_digest',
+]
+
+
+class _Recorders(threading.local):
+    def __init__(self):
+        self.stack = []
+        self.files = []
+
+
+_recorders = _Recorders()
+
+
+@contextmanager
+def record_dependencies():
+    """
+        Records the things loaded by the libraries inside the block,
+        including the indirect dependencies.
+
+            with record_dependencies() as deps:
+                ndp = library.load_ndp('model')
+
+        deps is a set of tuples (library_name, spec_name, thing_name, digest)
+        where digest is the hash of the source.
+    """
+    deps = set()
+    _recorders.stack.append(deps)
+    try:
+        yield deps
+    finally:
+        _recorders.stack.pop()
+
+
+def note_dependencies(deps):
+    for recorder in _recorders.stack:
+        recorder.update(deps)
+
+
+@contextmanager
+def record_files_read():
+    """
+        Records the realpath of the files (models, images, ...) read
+        by the libraries inside the block.
+
+            with record_files_read() as realpaths:
+                ...
+    """
+    realpaths = set()
+    _recorders.files.append(realpaths)
+    try:
+        yield realpaths
+    finally:
+        _recorders.files.pop()
+
+
+def note_file_read(realpath):
+    for recorder in _recorders.files:
+        recorder.add(realpath)
+
+
+def source_digest(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+# realpath -> (mtime, size, digest)
+_file_digests = {}
+
+
+def file_source_digest(data, realpath=None, mtime=None, size=None):
+    """
+        Same as source_digest(data), but the hash is recomputed only if
+        the mtime or the size of the file changed since the last call.
+    """
+    if realpath is None or mtime is None or size is None:
+        return source_digest(data)
+    known = _file_digests.get(realpath)
+    if known is not None and known[:2] == (mtime, size):
+        return known[2]
+    digest = source_digest(data)
+    _file_digests[realpath] = (mtime, size, digest)
+    return digest
+
+
+def dependencies_digest(deps, **params):
+    """
+        Returns a hash of the set of dependencies and of the
+        (repr of the) other parameters.
+    """
+    h = hashlib.sha1()
+    for d in sorted(deps):
+        h.update(repr(d))
+    for k in sorted(params):
+        h.update(repr((k, params[k])))
+    return h.hexdigest()
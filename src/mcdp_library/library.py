@@ -14,6 +14,9 @@ import os
 import shutil
 import sys
 
+from .dependencies import (file_source_digest, note_dependencies,
+                           note_file_read, record_dependencies)
+
 
 __all__ = [
     'MCDPLibrary', 
@@ -157,7 +160,14 @@ class MCDPLibrary(object):
         f = self._get_file_data(filename)
         data = f['data']
         realpath = f['realpath']
-        return dict(data=data, realpath=realpath)
+        return dict(data=data, realpath=realpath,
+                    mtime=f.get('mtime', None), size=f.get('size', None))
+
+    def _spec_digest(self, spec_name, thing_name):
+        """ Returns the hash of the source of the thing. """
+        x = self._load_spec_data(spec_name, thing_name)
+        return file_source_digest(x['data'], x['realpath'],
+                                  x.get('mtime', None), x.get('size', None))
         
     @contract(name=str)
     def _load_generic(self, name, spec_name, parsing_function, context):
@@ -173,20 +183,26 @@ class MCDPLibrary(object):
         x =  self._load_spec_data(spec_name, name)
         data = x['data']
         realpath = x['realpath']
+        library_name = getattr(self, 'library_name', None)
+        digest = file_source_digest(data, realpath, x.get('mtime', None),
+                                    x.get('size', None))
+        dependency = (library_name, spec_name, name, digest)
 
-        current_generation = 3
+        current_generation = 4
         
         def actual_load():
             # maybe we should clone
             l = self.clone()
             #logger.debug('Parsing %r' % (name))
             context_mine = Context()
-            res = parsing_function(l, data, realpath, context=context_mine)
+            with record_dependencies() as dependencies:
+                res = parsing_function(l, data, realpath, context=context_mine)
 
             setattr(res, MCDPConstants.ATTR_LOAD_NAME, name)
             return dict(res=res, 
                         context_warnings=context_mine.warnings,
-                        generation=current_generation)
+                        generation=current_generation,
+                        dependencies=dependencies)
 
         if not self.cache_dir:
             res_data = actual_load()
@@ -199,7 +215,8 @@ class MCDPLibrary(object):
             cached = True
             
             if not isinstance(res_data, dict) or not 'generation' in res_data \
-                or res_data['generation'] < current_generation: # outdated cache
+                or res_data['generation'] < current_generation \
+                or not self._dependencies_up_to_date(res_data['dependencies']): # outdated cache
                 logger.debug('Removing stale cache %r.' % cache_file)
                 res_data = actual_load()
                 try: 
@@ -208,6 +225,9 @@ class MCDPLibrary(object):
                     pass
                 cached = False
         
+        note_dependencies([dependency])
+        note_dependencies(res_data['dependencies'])
+
         res = res_data['res']
         context_warnings = res_data['context_warnings']
 
@@ -226,6 +246,23 @@ class MCDPLibrary(object):
         
         return res
 
+    def _dependencies_up_to_date(self, dependencies):
+        """ Checks that the sources of the dependencies did not change.
+            The sources are hashed again only if their mtime or size
+            changed. """
+        for library_name, spec_name, name, digest in dependencies:
+            try:
+                if library_name == getattr(self, 'library_name', None):
+                    library = self
+                else:
+                    library = self.load_library(library_name)
+                current = library._spec_digest(spec_name, name)
+            except Exception:
+                return False
+            if current != digest:
+                return False
+        return True
+
     def parse_ndp(self, string, realpath=None, context=None):
         """ This is the wrapper around parse_ndp that adds the hooks. """
         result = self._parse_with_hooks(parse_ndp, string, realpath, context)
@@ -387,6 +424,7 @@ class MCDPLibrary(object):
                 
             raise_desc(DPSemanticError, msg)
         found = self.file_to_contents[match]
+        note_file_read(found['realpath'])
         return found
 
     @contract(d=str)
@@ -451,7 +489,9 @@ class MCDPLibrary(object):
         # data = codecs.open(f, encoding='utf-8').read()
         data = open(f).read()
         realpath = os.path.realpath(f)
-        res = dict(data=data, realpath=realpath, path=f, from_search_dir=from_search_dir)
+        st = os.stat(f)
+        res = dict(data=data, realpath=realpath, path=f, from_search_dir=from_search_dir,
+                   mtime=st.st_mtime, size=st.st_size)
 
         strict = False
         if basename in self.file_to_contents:
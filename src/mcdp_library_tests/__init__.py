@@ -1,3 +1,4 @@
 # -*- coding: utf-8 -*-
 from .tests import *
 from .semantics_import import *
+from .dependencies_cache import *
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import os
+import tempfile
+
+from nose.tools import assert_equal
+
+from comptests.registrar import comptest
+from mcdp_library import Librarian, dependencies_digest, record_dependencies
+from mcdp_library.dependencies import file_source_digest, source_digest
+from mcdp_posets import Nat, Rcomp
+from mcdp_utils_misc import get_mcdp_tmp_dir
+from mcdp_utils_misc.create_mockups import create_hierarchy, write_hierarchy
+
+
+def load_with_cache(d, cache_dir, libname, model):
+    librarian = Librarian()
+    librarian.find_libraries(d)
+    library = librarian.load_library(libname)
+    library.use_cache_dir(cache_dir)
+    with record_dependencies() as deps:
+        ndp = library.load_ndp(model)
+    return ndp, deps
+
+
+@comptest
+def feat_dependencies_cache():
+    data = {
+        'lib1.mcdplib/model1.mcdp': "mcdp { provides f [Nat] }",
+        'lib2.mcdplib/model2.mcdp': """\
+        mcdp {
+            a = instance `lib1.model1
+            provides f using a
+        }
+        """,
+    }
+    d = create_hierarchy(data)
+    cache_dir = tempfile.mkdtemp(dir=get_mcdp_tmp_dir(),
+                                 prefix='feat_dependencies_cache')
+
+    ndp, deps = load_with_cache(d, cache_dir, 'lib2', 'model2')
+    names = sorted((_[0], _[2]) for _ in deps)
+    assert_equal(names, [('lib1', 'model1'), ('lib2', 'model2')])
+    assert isinstance(ndp.get_ftype('f'), Nat)
+
+    # loaded from the cache: same dependencies
+    _, deps2 = load_with_cache(d, cache_dir, 'lib2', 'model2')
+    assert_equal(deps, deps2)
+
+    # changing the dependency invalidates the cached model2
+    data['lib1.mcdplib/model1.mcdp'] = "mcdp { provides f [Rcomp] }"
+    write_hierarchy(d, data)
+    ndp3, deps3 = load_with_cache(d, cache_dir, 'lib2', 'model2')
+    assert isinstance(ndp3.get_ftype('f'), Rcomp)
+    assert dependencies_digest(deps) != dependencies_digest(deps3)
+
+
+@comptest
+def check_file_source_digest():
+    d = tempfile.mkdtemp(dir=get_mcdp_tmp_dir(),
+                         prefix='check_file_source_digest')
+    fn = os.path.join(d, 'model1.mcdp')
+    with open(fn, 'w') as f:
+        f.write('data1')
+    st = os.stat(fn)
+    digest1 = file_source_digest('data1', fn, st.st_mtime, st.st_size)
+    assert_equal(digest1, source_digest('data1'))
+    # same mtime and size: the data is not hashed again
+    digest2 = file_source_digest('data2', fn, st.st_mtime, st.st_size)
+    assert_equal(digest2, digest1)
+    digest3 = file_source_digest('data23', fn, st.st_mtime, st.st_size + 1)
+    assert_equal(digest3, source_digest('data23'))
+    # without the stat, always hashed
+    assert_equal(file_source_digest('data2', fn), source_digest('data2'))
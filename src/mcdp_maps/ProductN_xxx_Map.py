@@ -6,6 +6,8 @@ from mcdp_posets import Map, PosetProduct, RcompUnits, Nat, Rcomp
 from mcdp_posets.nat import Nat_mult_uppersets_continuous_seq
 from mcdp_posets.rcomp import Rcomp_multiply_upper_topology_seq
 
+from .map_batch import mult_batch, reduce_batch
+
 
 __all__ = [
     'ProductNMap',
@@ -28,6 +30,9 @@ class ProductNMap(Map):
     def _call(self, f):
         return Rcomp_multiply_upper_topology_seq(self.F.subs, f, self.R)
 
+    def call_batch(self, values):
+        return reduce_batch(mult_batch, values)
+
     def repr_map(self, letter):
         return repr_map_product(letter, len(self.F))
 
@@ -52,6 +57,9 @@ class ProductNNatMap(Map):
     def _call(self, x):
         return Nat_mult_uppersets_continuous_seq(x)
 
+    def call_batch(self, values):
+        return reduce_batch(mult_batch, values)
+
     def __repr__(self):
         return 'ProductNNatMap(%s)' % (self.n)
 
@@ -9,6 +9,8 @@ from mcdp_posets import (Int, Poset, Space, get_types_universe, Map, Nat, PosetP
 from mcdp_posets.rcomp_units import rcomp_add
 import numpy as np
 
+from .map_batch import add_batch, reduce_batch
+
 
 __all__ = [
     'SumNMap',
@@ -41,6 +43,14 @@ class SumNMap(Map):
     def _call(self, x):
         res = sum_units(self.Fs, x, self.R)
         return res
+
+    def call_batch(self, values):
+        # same operations as sum_units(), where +inf is top
+        res = np.zeros(values.shape[0])
+        for Fi, column in zip(self.Fs, values.T):
+            factor = 1.0 / float(self.R.units / Fi.units)
+            res = res + factor * column
+        return res
     
     def __repr__(self):
         return 'SumNMap(%s → %s)' % (self.dom, self.cod)
@@ -63,6 +73,9 @@ class SumNRcompMap(Map):
     def _call(self, x):
         return functools.reduce(rcomp_add, x)
 
+    def call_batch(self, values):
+        return reduce_batch(add_batch, values)
+
     def __repr__(self):
         return 'SumNRcompMap(%s)' % self.n
     
@@ -172,6 +185,9 @@ class SumNNatsMap(Map):
             return top
 
         return res
+
+    def call_batch(self, values):
+        return reduce_batch(add_batch, values)
     
     def repr_map(self, letter):
         return sumn_repr_map(letter, self.n)
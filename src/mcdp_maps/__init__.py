@@ -11,3 +11,4 @@ from .SumN_xxx_Map import *
 from .ProductN_xxx_Map import *
 
 
+from .map_batch import *
@@ -40,6 +40,9 @@ class JoinNMap(Map):
             raise_wrapped(MapNotDefinedHere, e, msg, res=res, x=x) 
 
 
+    def call_batch(self, values):
+        return values.max(axis=1)
+
     def repr_map(self, letter):
         return repr_map_joinn(letter, len(self.dom))
     
\ No newline at end of file
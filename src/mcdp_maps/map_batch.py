@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+    Evaluation of the numeric maps on many points at once.
+
+    A map can define call_batch(values), where values is an (n, k) float
+    array with n points of its domain (a product of k numeric posets,
+    or a numeric poset for k = 1) and the top of each factor is +inf,
+    as in mcdp_posets.numeric_antichain. It returns the array of the n
+    results, or None if it cannot compute them exactly as _call() would
+    (for example, on overflow); the caller then calls the map on each
+    point.
+"""
+import numpy as np
+
+from mcdp_posets import Nat, is_top
+from mcdp_posets.numeric_antichain import (antichain_from_elements,
+                                           is_numeric_poset,
+                                           numeric_product_factors)
+
+
+__all__ = [
+    'map_call_batch',
+]
+
+# Ints larger than this cannot be represented exactly as floats.
+_max_exact_int = 2 ** 53
+
+
+def map_call_batch(amap, xs):
+    """
+        Returns [amap(x) for x in xs], or None if the map does not have
+        call_batch() or the values cannot be represented as an array.
+    """
+    call_batch = getattr(amap, 'call_batch', None)
+    if call_batch is None:
+        return None
+    cod = amap.get_codomain()
+    if not is_numeric_poset(cod):
+        return None
+    values = numeric_array_from_values(amap.get_domain(), xs)
+    if values is None:
+        return None
+    with np.errstate(all='ignore'):
+        res = call_batch(values)
+    if res is None:
+        return None
+    return numeric_values_from_array(cod, res)
+
+
+def numeric_array_from_values(P, xs):
+    """ Returns the (n, k) array of the values, or None. """
+    subs = numeric_product_factors(P)
+    if subs is not None:
+        elements = xs
+    elif is_numeric_poset(P):
+        subs = (P,)
+        elements = [(x,) for x in xs]
+    else:
+        return None
+    a = antichain_from_elements(subs, elements)
+    if a is None:
+        return None
+    return a.values
+
+
+def numeric_values_from_array(P, values):
+    """ Converts the 1-D array back to values of P, or returns None. """
+    if np.any(np.isnan(values)):
+        return None
+    is_nat = isinstance(P, Nat)
+    if is_nat and np.any((values > _max_exact_int) & (values != np.inf)):
+        return None
+    top = P.get_top()
+    res = []
+    for x in values.tolist():
+        if x == np.inf:
+            res.append(top)
+        elif is_nat:
+            res.append(int(x))
+        else:
+            res.append(x)
+    return res
+
+
+def numeric_value(P, x):
+    """ Returns x as a float, with +inf for top, or None. """
+    if is_top(P, x):
+        return np.inf
+    if isinstance(x, (int, long)) and abs(x) > _max_exact_int:
+        return None
+    return float(x)
+
+
+def overflowed(res, *args):
+    """ True if some results are +inf but none of their arguments is. """
+    inf = np.isinf(res)
+    for a in args:
+        inf = inf & ~np.isinf(a)
+    return bool(np.any(inf))
+
+
+def add_batch(a, b):
+    """ a + b, with top + x = top; None on overflow. """
+    res = a + b
+    if overflowed(res, a, b):
+        return None
+    return res
+
+
+def mult_batch(a, b):
+    """ a * b, with 0 * top = 0 and top * x = top; None on overflow. """
+    res = a * b
+    res[(a == 0) | (b == 0)] = 0.0
+    if overflowed(res, a, b):
+        return None
+    return res
+
+
+def reduce_batch(op, values):
+    """ Applies op to the columns from left to right; None on overflow. """
+    res = values[:, 0]
+    for j in range(1, values.shape[1]):
+        res = op(res, values[:, j])
+        if res is None:
+            return None
+    return res
@@ -2,6 +2,9 @@
 from contracts.utils import raise_wrapped, raise_desc
 from mcdp_posets import Map, MapNotDefinedHere, NotJoinable
 from mcdp.development import do_extra_checks
+import numpy as np
+
+from .map_batch import numeric_value
 
 
 __all__ = [
@@ -28,6 +31,10 @@ class Max1Map(Map):
             msg = 'Cannot compute join of elements.'
             raise_wrapped(MapNotDefinedHere, e, msg, value=self.value, x=x)
         return r
+
+    def call_batch(self, values):
+        c = numeric_value(self.F, self.value)
+        return None if c is None else np.maximum(values[:, 0], c)
     
     def repr_map(self, letter):
         return "%s ⟼ %s ∧ %s" % (letter, letter, self.F.format(self.value))
@@ -51,6 +58,10 @@ class Min1Map(Map):
             msg = 'Cannot compute meet of elements.'
             raise_wrapped(MapNotDefinedHere, e, msg, value=self.value, x=x)
         return r
+
+    def call_batch(self, values):
+        c = numeric_value(self.F, self.value)
+        return None if c is None else np.minimum(values[:, 0], c)
     
     def repr_map(self, letter):
         return "%s ⟼ %s v %s" % (letter, letter, self.F.format(self.value))
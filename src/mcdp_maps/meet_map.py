@@ -34,6 +34,9 @@ class MeetNMap(Map):
             msg = 'Cannot meet all elements.'
             raise_wrapped(MapNotDefinedHere, e, msg, res=res, x=x)
 
+    def call_batch(self, values):
+        return values.min(axis=1)
+
     def repr_map(self, letter):
         n = len(self.dom)
         return repr_map_meetn(letter, n)
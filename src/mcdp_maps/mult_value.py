@@ -8,6 +8,7 @@ from mcdp_posets.rcomp import Rcomp_multiply_upper_topology, Rcomp
 from mcdp_posets.rcomp_units import check_mult_units_consistency
 import numpy as np
 
+from .map_batch import mult_batch, numeric_value
 from .repr_map import repr_map_invmultvalue, repr_map_multvalue
 
 
@@ -60,6 +61,10 @@ class MultValueMap(Map):
         return Rcomp_multiply_upper_topology(self.dom, x, 
                                              self.unit, self.value, 
                                              self.cod)
+
+    def call_batch(self, values):
+        c = numeric_value(self.unit, self.value)
+        return None if c is None else mult_batch(values[:, 0], c)
         
 class MultValueNatMap(Map):
     """ Multiplies using the upper set topology. """
@@ -72,6 +77,10 @@ class MultValueNatMap(Map):
 
     def _call(self, x):
         return Nat_mult_uppersets_continuous(self.value, x) 
+
+    def call_batch(self, values):
+        c = numeric_value(self.dom, self.value)
+        return None if c is None else mult_batch(values[:, 0], c)
     
     def repr_map(self, letter):
         return repr_map_multvalue(letter, self.dom, self.value)
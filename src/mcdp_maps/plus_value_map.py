@@ -8,6 +8,8 @@ from mcdp_posets import (Map, RcompUnits, Nat,
 from mcdp_posets.nat import Nat_add
 from mcdp_posets.rcomp_units import rcomp_add, rcompunits_add
 
+from .map_batch import add_batch, numeric_value
+
 
 __all__ = [
     'PlusValueMap',
@@ -50,6 +52,10 @@ class PlusValueMap(Map):
 
     def _call(self, x):
         return rcompunits_add(self.dom, x, self.c) 
+
+    def call_batch(self, values):
+        c = numeric_value(self.dom, self.c)
+        return None if c is None else add_batch(values[:, 0], c)
     
     def repr_map(self, letter):
         return plusvaluemap_repr(letter, self.c_space, self.c_value)
@@ -200,6 +206,10 @@ class PlusValueRcompMap(Map):
     def _call(self, x):
         return rcomp_add(x, self.c_value)
 
+    def call_batch(self, values):
+        c = numeric_value(self.dom, self.c_value)
+        return None if c is None else add_batch(values[:, 0], c)
+
 class MinusValueRcompMap(Map):
     """ 
         Implements _ -> _ - c  for Rcomp.    
@@ -306,6 +316,10 @@ class PlusValueNatMap(Map):
     def _call(self, x):
         return Nat_add(x, self.value) 
 
+    def call_batch(self, values):
+        c = numeric_value(self.N, self.value)
+        return None if c is None else add_batch(values[:, 0], c)
+
     def diagram_label(self):  
         return self.__str__()
 
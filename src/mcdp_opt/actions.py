@@ -30,7 +30,14 @@ class ActionCreate(Action):
 
     def __call__(self, opt, s):
         s2 = self.call(opt, s)
-
+        return self.add_result(opt, s, s2)
+
+    def add_result(self, opt, s, s2):
+        """ 
+            Adds the state s2 = self.call(opt, s) to opt.
+            Returns a list of (state, action). 
+        """
+        s2.set_opt(opt, opt.get_next_creation())
         s.info('Created from #%s.' % s.creation_order)
         s.info('Using action %s' % self)
 
@@ -47,6 +54,13 @@ class ActionCreate(Action):
             opt.mark_abandoned(s2)
             return []
 
+        dominated, by_what = opt.is_dominated_by_done(s2)
+        if dominated:
+            s2.info('Pruned: dominated by solution #%s' % by_what.creation_order)
+            opt.mark_abandoned(s2)
+            opt.note_domination_relation(dominated=s2, dominator=by_what)
+            return []
+
         dominated, by_what = opt.is_dominated_by_open(s2)
 
         if dominated:
@@ -58,14 +72,17 @@ class ActionCreate(Action):
         s.info('Expanded.')
 
         opt.mark_expanded(s)
-        opt.states.append(s2)
+        opt.mark_open(s2)
 
         from mcdp_opt.optimization import ActionExpand
         return [(s2, ActionExpand())]
 
     @abstractmethod
     def call(self, opt, s):
-        pass
+        """ 
+            Returns the new OptimizationState. This does not change opt, 
+            so it can be executed in a worker (see mcdp_opt.parallel_expansion).
+        """
 
 class ActionConnect(ActionCreate):
     
@@ -94,7 +111,7 @@ class ActionConnect(ActionCreate):
         s2 = OptimizationState(opt=opt, options=c.options,
                                  context=context, executed=executed,
                                  forbidden=forbidden, lower_bounds=lower_bounds,
-                                 ur=ur, creation_order=opt.get_next_creation())
+                                 ur=ur, creation_order=None)
         return s2
 
 
@@ -165,7 +182,7 @@ class ActionAddNDP(ActionCreate):
         s2 = OptimizationState(opt=opt, options=c.options,
                                  context=context, executed=executed,
                                  forbidden=forbidden, lower_bounds=lower_bounds, ur=ur,
-                                 creation_order=opt.get_next_creation())
+                                 creation_order=None)
 
         s2.info('Parent: #%s' % c.creation_order)
         s2.info('Action: #%s' % self)
@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 from mcdp_dp import PrimitiveDP
-from mcdp_utils_misc.memoize_simple_imp import memoize_simple
+from mcdp_dp.solve_cache import solve_cached
 
 
 __all__ = [
@@ -17,11 +17,11 @@ class CacheDP(PrimitiveDP):
         I = dp.I
         PrimitiveDP.__init__(self, F, R, I)
 
-    @memoize_simple
+    @solve_cached
     def solve(self, f):
         return self.dp.solve(f)
 
-    @memoize_simple
+    @solve_cached
     def evaluate(self, i):
         return self.dp.evaluate(i)
 
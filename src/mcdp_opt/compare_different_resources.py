@@ -4,7 +4,7 @@ import itertools
 from mcdp_dp import MuxMap
 from mcdp_posets import (express_value_in_isomorphic_space,
                          get_types_universe)
-from mcdp_posets import PosetProduct
+from mcdp_posets import Nat, PosetProduct, Rcomp, RcompUnits, is_top
 from mcdp_posets import Space, UpperSet, UpperSets
 from mcdp_posets.uppersets import upperset_project_map
 
@@ -17,24 +17,14 @@ def less_resources2(ua, ub):
     
         ua must be <= ub
     """
+    ua = upperset_as_product(ua)
+    ub = upperset_as_product(ub)
     Pa = ua.P
     Pb = ub.P
 
-    if not isinstance(Pa, PosetProduct) or not isinstance(Pb, PosetProduct):
-        raise NotImplementedError((Pa, Pb))
-
-    tu = get_types_universe()
-
-    matches = []
-    for i, P in enumerate(Pa.subs):
-        for j, Q in enumerate(Pb.subs):
-            if j in matches: continue
-            if tu.leq(P, Q):
-                matches.append(j)
-                break
-        else:
-            # msg = 'Could not find match.'
-            return False
+    matches = get_embedding_matches(Pa, Pb)
+    if matches is None:
+        return False
 
     # now we have found an embedding
 
@@ -46,6 +36,7 @@ def less_resources2(ua, ub):
     UPb2 = UpperSets(Pb2)
 
     # now we create the embedding
+    tu = get_types_universe()
     A_to_B, _ = tu.get_embedding(Pa, Pb2)
     ua2 = upperset_project_map(ua, A_to_B)
 
@@ -57,6 +48,65 @@ def less_resources2(ua, ub):
     return UPb2.leq(ua2, ub2)
 
 
+@contract(u=UpperSet, returns=UpperSet)
+def upperset_as_product(u):
+    """ Returns u itself, or its copy in PosetProduct((u.P,)). """
+    if isinstance(u.P, PosetProduct):
+        return u
+    P1 = PosetProduct((u.P,))
+    return P1.Us(set((m,) for m in u.minimals))
+
+
+def get_embedding_matches(Pa, Pb):
+    """
+        Returns the list of the indices of the components of Pb
+        in which the components of Pa are embedded, or None if they
+        cannot be. A poset that is not a PosetProduct counts as
+        a product of one component.
+    """
+    subs_a = Pa.subs if isinstance(Pa, PosetProduct) else (Pa,)
+    subs_b = Pb.subs if isinstance(Pb, PosetProduct) else (Pb,)
+
+    tu = get_types_universe()
+
+    matches = []
+    for P in subs_a:
+        for j, Q in enumerate(subs_b):
+            if j in matches: continue
+            if tu.leq(P, Q):
+                matches.append(j)
+                break
+        else:
+            # msg = 'Could not find match.'
+            return None
+    return matches
+
+
+@contract(u=UpperSet, returns=float)
+def resources_lower_key(u):
+    """
+        A number that is monotone in u: if ua <= ub in UpperSets(P),
+        then resources_lower_key(ua) <= resources_lower_key(ub).
+
+        It is the smallest, among the minimal points, of the sum of
+        the numeric components (inf if u is empty).
+    """
+    key = float('inf')
+    for m in u.minimals:
+        key = min(key, point_numeric_sum(u.P, m))
+    return key
+
+
+def point_numeric_sum(P, x):
+    if isinstance(P, PosetProduct):
+        return sum(point_numeric_sum(Pi, xi) for Pi, xi in zip(P.subs, x))
+    if isinstance(P, (Rcomp, RcompUnits, Nat)):
+        if is_top(P, x):
+            return float('inf')
+        return float(x)
+    return 0.0
+
+
 
 class CompareDifferentResources():
 
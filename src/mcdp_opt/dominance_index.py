@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+from bisect import bisect_right
+
+from .compare_different_resources import (get_embedding_matches,
+                                          resources_lower_key)
+
+
+__all__ = [
+    'DominanceIndex',
+]
+
+
+class DominanceIndex(object):
+    """
+        Index of the states used by Optimization.is_dominated_by_open().
+
+        The states are grouped by the space of their lower bound ur and
+        by their extra counters; inside a group they are sorted by
+        resources_lower_key(ur). A state s can only dominate s1 if:
+
+        - the space of s.ur can be embedded in the space of s1.ur;
+        - the counters of s are less or equal than those of s1;
+        - if the spaces are equal, key(s.ur) <= key(s1.ur).
+
+        so only those states are compared using opt.dominates().
+    """
+
+    def __init__(self):
+        self.groups = []
+
+    def add(self, s, counters):
+        group = self._get_group(s.ur.P, counters)
+        if group is None:
+            group = _Group(s.ur.P, counters)
+            self.groups.append(group)
+        group.add(s)
+
+    def find_dominating(self, s1, counters, dominates):
+        """ Returns a state s with dominates(s, s1), or None. """
+        P1 = s1.ur.P
+        key1 = None
+        for group in self.groups:
+            if not all(a <= b for a, b in zip(group.counters, counters)):
+                continue
+            if group.P == P1:
+                if key1 is None:
+                    key1 = resources_lower_key(s1.ur)
+                candidates = group.states_up_to(key1)
+            elif group.embeds_into(P1):
+                candidates = group.states
+            else:
+                continue
+            for s in candidates:
+                if dominates(s, s1):
+                    return s
+        return None
+
+    def _get_group(self, P, counters):
+        for group in self.groups:
+            if group.counters == counters and group.P == P:
+                return group
+        return None
+
+
+class _Group(object):
+
+    def __init__(self, P, counters):
+        self.P = P
+        self.counters = counters
+        self.keys = []
+        self.states = []
+        # list of (P1, bool)
+        self._embeds = []
+
+    def add(self, s):
+        key = resources_lower_key(s.ur)
+        i = bisect_right(self.keys, key)
+        self.keys.insert(i, key)
+        self.states.insert(i, s)
+
+    def states_up_to(self, key):
+        return self.states[:bisect_right(self.keys, key)]
+
+    def embeds_into(self, P1):
+        for P, res in self._embeds:
+            if P == P1:
+                return res
+        res = get_embedding_matches(self.P, P1) is not None
+        self._embeds.append((P1, res))
+        return res
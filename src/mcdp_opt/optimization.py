@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 import gc
+import heapq
+import itertools
 import os
 import shutil
 
@@ -11,10 +13,12 @@ from mcdp.exceptions import mcdp_dev_warning
 from mcdp_dp import Limit
 from mcdp_library import MCDPLibrary
 from mcdp_opt.cachedp import CacheDP
-from mcdp_opt.compare_different_resources import less_resources2
+from mcdp_opt.compare_different_resources import (less_resources2,
+                                                   resources_lower_key)
 from mcdp_opt.context_utils import create_context0
+from mcdp_opt.dominance_index import DominanceIndex
 from mcdp_opt.report_utils import get_optim_state_report
-from mcdp_posets import Nat, NotBounded, Poset, get_types_universe, PosetProduct, UpperSet, upperset_project, express_value_in_isomorphic_space
+from mcdp_posets import NotBounded, Poset, get_types_universe, UpperSet, upperset_project, express_value_in_isomorphic_space
 from mcdp_report import my_gvgen
 from mcdp_report.gg_utils import gg_figure
 from mcdp_utils_misc import memoize_simple
@@ -100,8 +104,10 @@ class Optimization(object):
 
         self.root = s0
         # open nodes
-        self.states = [s0]
-        self.actions = [(s0, ActionExpand())]  # tuples of state, action
+        self.states = []
+        # heap of (priority, n, state, action); see push_action()
+        self.actions = []
+        self._action_counter = itertools.count()
         
         # connected
         self.done = []
@@ -110,6 +116,13 @@ class Optimization(object):
         # expanded
         self.expanded = []
 
+        # all the states above
+        self.known = set()
+        self.dominance_index = DominanceIndex()
+
+        self.mark_open(s0)
+        self.push_action(s0, ActionExpand())
+
         # extra ndps not present in library
         self.additional = {}  # str -> NamedDP
 
@@ -119,14 +132,38 @@ class Optimization(object):
         self.G = nx.DiGraph()
         self.G_dom = nx.DiGraph()  # domination graph
 
+    def mark_open(self, s):
+        self.states.append(s)
+        self.known.add(s)
+        self.dominance_index.add(s, get_dominance_counters(s))
+
     def mark_abandoned(self, s):
         self.abandoned.append(s)
+        self.known.add(s)
 
     def mark_done(self, s):
         self.done.append(s)
+        self.known.add(s)
 
     def mark_expanded(self, s):
         self.expanded.append(s)
+        self.known.add(s)
+
+    def push_action(self, s, a):
+        """
+            Best-first: the connect actions come first, then the actions
+            of the states with the smallest lower bound on the resources;
+            the ties are broken in order of insertion.
+        """
+        from mcdp_opt.actions import ActionConnect
+        priority = (0 if isinstance(a, ActionConnect) else 1,
+                    resources_lower_key(s.ur))
+        n = next(self._action_counter)
+        heapq.heappush(self.actions, (priority, n, s, a))
+
+    def get_open_actions(self):
+        """ Returns the list of (state, action) still to execute. """
+        return [(s, a) for (_, _, s, a) in sorted(self.actions)]
 
     @contract(s='isinstance(OptimizationState)',
               s1='isinstance(OptimizationState)')
@@ -194,7 +231,7 @@ class Optimization(object):
 
     def draw_tree_get_tree_compact(self):
         def label_for_node(n):
-            nactions = len([() for (s, _) in self.actions if s is n])
+            nactions = len([() for (_, _, s, _) in self.actions if s is n])
             s = '#%s' % n.creation_order
 
             #             s += ' (%d)' % len(n.context.names)
@@ -212,7 +249,7 @@ class Optimization(object):
         n2ggn = {}
         G = self.G
 
-        open_states = [s for (s, _) in self.actions]
+        open_states = [s for (_, _, s, _) in self.actions]
         def get_ggn_node(n):
             assert n in G.nodes()
             if not n in n2ggn:
@@ -268,63 +305,107 @@ class Optimization(object):
         return not self.actions
 
     def step(self):
-        gc.collect()
-        self.iteration += 1
-        
         if not self.actions:
             print('Done - no actions left')
             return
             
-        (s0, a0) = self.choose_action()
-        s0.info('Popped at iteration %d with %s' % (self.iteration, a0))
-        
-        new_actions = a0.__call__(self, s0)
+        popped = self.pop_actions(1)
+        for (s0, a0) in popped:
+            new_actions = a0.__call__(self, s0)
+            self._push_new_actions(a0, new_actions)
 
-        for (s, a) in new_actions:
+    def step_frontier(self, expander):
+        """
+            Pops up to expander.frontier_size actions; the states created
+            by the ActionCreate ones are computed by the expander,
+            possibly concurrently (see mcdp_opt.parallel_expansion).
+
+            The results are then added in the order in which the actions
+            were popped, so that the search does not depend on the number
+            of workers. The states that are equal to one already known
+            (same _compute_hash()) are discarded.
+        """
+        from mcdp_opt.actions import ActionCreate
+        if not self.actions:
+            print('Done - no actions left')
+            return
 
+        popped = self.pop_actions(expander.frontier_size)
+        creates = [(s, a) for (s, a) in popped if isinstance(a, ActionCreate)]
+        created = iter(expander.expand(self, creates))
+        for (s0, a0) in popped:
+            if isinstance(a0, ActionCreate):
+                s2 = next(created)
+                new_actions = a0.add_result(self, s0, s2)
+            else:
+                new_actions = a0.__call__(self, s0)
+            self._push_new_actions(a0, new_actions)
+
+    def pop_actions(self, n):
+        """ 
+            Pops up to n actions, skipping the ones whose state is
+            dominated by a solution already found. 
+        """
+        popped = []
+        while self.actions and len(popped) < n:
+            self.iteration += 1
+            if self.iteration % 100 == 0:
+                gc.collect()
+
+            (s0, a0) = self.choose_action()
+            s0.info('Popped at iteration %d with %s' % (self.iteration, a0))
+
+            # the incumbent might have improved since it was pushed
+            dominated, by_what = self.is_dominated_by_done(s0)
+            if dominated:
+                s0.info('Pruned: dominated by solution #%s' % by_what.creation_order)
+                if not s0 in self.abandoned:
+                    self.mark_abandoned(s0)
+                continue
+            popped.append((s0, a0))
+        return popped
+
+    def _push_new_actions(self, a0, new_actions):
+        for (s, a) in new_actions:
             print('%s -> %s' % (a0, a))
-            self.actions.append((s,a))
-            
+            self.push_action(s, a)
+
     def already_known(self, s1): 
-        if ((not s1 in self.states) and
-            (not s1 in self.done) and
-            (not s1 in self.abandoned) and
-            (not s1 in self.expanded)):
-            return False
-        else:
-            return True
+        return s1 in self.known
 
     def choose_action(self):
-        # choose connect actions first
+        """ Pops the (s, a) with the smallest priority (see push_action()). """
         if not self.actions: raise ValueError('no actions')
-        for i, (_s, a) in enumerate(self.actions):
-            from mcdp_opt.actions import ActionConnect
-            if isinstance(a, ActionConnect):
-                return self.actions.pop(i)  # (s, a)
-        # otherwise breadth-first
-        return self.actions.pop(0)
+        (_, _, s, a) = heapq.heappop(self.actions)
+        return s, a
 
     def is_dominated_by_open(self, s1):
-        for s in self.states:
-            if s1 is s:
-                raise ValueError('same state')
-            if s1.creation_order == s.creation_order:
-                raise ValueError('same id, different state?')
-            if self.dominates(s, s1):
+        counters = get_dominance_counters(s1)
+        s = self.dominance_index.find_dominating(s1, counters, self.dominates)
+        if s is None:
+            return False, None
+        if s1 is s:
+            raise ValueError('same state')
+        if s1.creation_order == s.creation_order:
+            raise ValueError('same id, different state?')
+        return True, s
+
+    def is_dominated_by_done(self, s1):
+        """ 
+            Bound: s1 can be pruned if some solution found uses at most
+            the resources of the lower bound s1.ur. 
+        """
+        for s in self.done:
+            if s is not s1 and less_resources2(s.ur, s1.ur):
                 return True, s
         return False, None
 
     def dominates(self, s1, s2):
-        
-        n1 = (40 - s1.num_connection_options, s1.num_resources_need_connecting)
-        n2 = (40 - s2.num_connection_options, s2.num_resources_need_connecting)
-        N = PosetProduct((Nat(), Nat()))
-        # create a joint one
-        from mcdp_opt_tests.test_basic import add_extra
-        l1b = add_extra(s1.ur, N, n1)
-        l2b = add_extra(s2.ur, N, n2)
-        # cdr = CompareDifferentResources()
-        return less_resources2(l1b, l2b)
+        n1 = get_dominance_counters(s1)
+        n2 = get_dominance_counters(s2)
+        if not all(a <= b for a, b in zip(n1, n2)):
+            return False
+        return less_resources2(s1.ur, s2.ur)
 
     def does_provider_provide(self, id_ndp, fname, R, lb):
         assert lb.P == R
@@ -483,6 +564,10 @@ class Optimization(object):
         self.num_created += 1
         return n
         
+def get_dominance_counters(s):
+    return (40 - s.num_connection_options, s.num_resources_need_connecting)
+
+
 class ActionExpand(object):
     def __init__(self):
         pass
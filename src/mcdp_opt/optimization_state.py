@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from contracts import contract
 from contracts.utils import raise_desc
+from mcdp import logger
 from mcdp_lang import parse_poset
 from mcdp_lang.blocks import get_missing_connections
 from mcdp_posets import UpperSet, UpperSets
@@ -24,11 +25,13 @@ class OptimizationState(object):
     
     """
     @contract(opt=Optimization, lower_bounds='dict($CResource:$UpperSet)',
-              creation_order=int, forbidden='set')
+              creation_order='int|None', forbidden='set')
     def __init__(self, opt, options, context, executed, forbidden, lower_bounds, ur,
                  creation_order):
-
-        print('CREATED %s' % creation_order)
+        """ creation_order is None for the states that are not yet
+            added to opt (see ActionCreate.add_result()). """
+        if creation_order is not None:
+            logger.debug('CREATED %s' % creation_order)
         self.opt = opt
         self.options = options
 
@@ -70,6 +73,18 @@ class OptimizationState(object):
         self.num_resources_need_connecting = self.compute_num_resources_need_connecting()
         self.creation_order = creation_order
 
+    def __getstate__(self):
+        # the snapshot does not include the optimization; see set_opt()
+        d = dict(self.__dict__)
+        d['opt'] = None
+        return d
+
+    def set_opt(self, opt, creation_order):
+        """ Attaches the state (possibly an unpickled snapshot) to opt. """
+        logger.debug('CREATED %s' % creation_order)
+        self.opt = opt
+        self.creation_order = creation_order
+
     def compute_num_resources_need_connecting(self):
         n = 0
         for r, lb in self.lower_bounds.items():
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+    Concurrent expansion of the frontier of Optimization.
+
+    Most of the time of the search is spent in ActionCreate.call(), which
+    compiles and solves the lower-bound DP of the new state. These calls
+    are independent, so Optimization.step_frontier() passes a list of them
+    to a FrontierExpander, which executes them in a pool of processes.
+
+    The workers are forked when the FrontierExpander is created, and
+    inherit a copy of the Optimization (library, options, loaded models).
+    Each job is a pickled snapshot of the parent state (without the
+    Optimization, see OptimizationState.__getstate__), the action, and
+    the extra models in Optimization.additional that it needs; the result
+    is the snapshot of the new state. The new states are numbered by the
+    parent when they are added (ActionCreate.add_result()), in the order
+    of the jobs, so the search is deterministic for a given frontier_size,
+    whatever the number of workers.
+"""
+import multiprocessing
+
+from contracts.utils import raise_desc
+
+from .actions import ActionAddNDP
+
+
+__all__ = [
+    'FrontierExpander',
+]
+
+
+class FrontierExpander(object):
+    """
+        Computes the states created by a list of (state, ActionCreate).
+
+        With nworkers = 0 the actions are executed in this process.
+    """
+
+    def __init__(self, opt, nworkers, frontier_size=None):
+        if nworkers < 0:
+            msg = 'Invalid number of workers.'
+            raise_desc(ValueError, msg, nworkers=nworkers)
+        if frontier_size is None:
+            frontier_size = max(1, 2 * nworkers)
+        self.nworkers = nworkers
+        self.frontier_size = frontier_size
+        if nworkers > 0:
+            # inherited by the workers
+            _Worker.opt = opt
+            self.pool = multiprocessing.Pool(nworkers)
+        else:
+            self.pool = None
+
+    def expand(self, opt, creates):
+        """ Returns the list of the new states, in order. """
+        if self.pool is None or len(creates) <= 1:
+            return [a.call(opt, s) for (s, a) in creates]
+        jobs = [(s, a, get_additional_needed(opt, a)) for (s, a) in creates]
+        return self.pool.map(_expand_in_worker, jobs, chunksize=1)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def __repr__(self):
+        return ('FrontierExpander(nworkers=%s, frontier_size=%s)' %
+                (self.nworkers, self.frontier_size))
+
+
+def get_additional_needed(opt, a):
+    """ The models created after the workers were forked. """
+    if isinstance(a, ActionAddNDP) and a.id_ndp in opt.additional:
+        return {a.id_ndp: opt.additional[a.id_ndp]}
+    return {}
+
+
+class _Worker(object):
+    opt = None
+
+
+def _expand_in_worker(job):
+    s, a, additional = job
+    opt = _Worker.opt
+    opt.additional.update(additional)
+    s.opt = opt
+    return a.call(opt, s)
@@ -4,10 +4,15 @@ import shutil
 
 from comptests.registrar import comptest, comptest_fails
 from contracts import contract
+from nose.tools import assert_equal
 from mcdp_lang import parse_constant, parse_poset
 from mcdp_library import Librarian, MCDPLibrary
-from mcdp_opt.compare_different_resources import less_resources2
+from mcdp_opt.compare_different_resources import (get_embedding_matches,
+                                                   less_resources2,
+                                                   resources_lower_key)
+from mcdp_opt.dominance_index import DominanceIndex
 from mcdp_opt.optimization import Optimization
+from mcdp_opt.parallel_expansion import FrontierExpander
 from mcdp_posets import Nat, Poset, PosetProduct, UpperSet
 from mcdp_posets.types_universe import express_value_in_isomorphic_space
 from mcdp_report.gdc import STYLE_GREENREDSYM
@@ -397,3 +402,148 @@ def opt_basic_8():
     ndp = library.load_ndp('DaguChassis')
     R = ndp.get_rtype('pwm1')
     assert getattr(R, MCDPConstants.ATTR_LOAD_NAME) == 'PWM'
+
+
+@comptest
+def opt_basic_9():
+    """ resources_lower_key() is monotone """
+    u1 = parse_constant('upperclosure { < 10 g, 2 J >, < 3 g, 5 J > }').value
+    u2 = parse_constant('upperclosure { < 10 g, 3 J > }').value
+    u3 = parse_constant('upperclosure { < 1 g, 1 J > }').value
+    assert less_resources2(u1, u2)
+    assert resources_lower_key(u1) <= resources_lower_key(u2)
+    assert resources_lower_key(u3) <= resources_lower_key(u1)
+    assert_equal(resources_lower_key(u1.P.Us([])), float('inf'))
+
+    l1 = parse_poset('J').U(1.0)
+    l2 = parse_poset('m x J').U((1.0, 1.0))
+    N = PosetProduct((Nat(),))
+    assert_equal(get_embedding_matches(add_extra(l1, N, (1,)).P,
+                                       add_extra(l2, N, (1,)).P), [1, 2])
+    assert get_embedding_matches(l2.P, add_extra(l1, N, (1,)).P) is None
+
+
+@comptest
+def opt_basic_10():
+    """ DominanceIndex finds the same dominating states as a full scan """
+    class S(object):
+        def __init__(self, ur, counters):
+            self.ur = ur
+            self.counters = counters
+
+    def dominates(s1, s2):
+        return (all(a <= b for a, b in zip(s1.counters, s2.counters)) and
+                less_resources2(s1.ur, s2.ur))
+
+    P = parse_poset('g x J')
+    Q = parse_poset('g x J x m')
+    states = []
+    for i in range(4):
+        for j in range(4):
+            states.append(S(P.U((float(i), float(j))), (i % 2, 0)))
+            states.append(S(Q.U((float(i), float(j), 1.0)), (0, j % 2)))
+
+    index = DominanceIndex()
+    for k, s1 in enumerate(states):
+        s = index.find_dominating(s1, s1.counters, dominates)
+        expected = [s0 for s0 in states[:k] if dominates(s0, s1)]
+        if expected:
+            assert s is not None and dominates(s, s1)
+        else:
+            assert s is None
+        index.add(s1, s1.counters)
+
+
+def _small_synthesis_problem():
+    library = MCDPLibrary()
+
+    def add(name, data):
+        library.file_to_contents['%s.mcdp' % name] = dict(realpath='#',
+                                                          data=data)
+
+    add('MotorA', """mcdp {
+        provides torque [N*m]
+        requires cost [USD]
+        requires power [W]
+        cost >= 10 USD
+        power >= provided torque * 2 Hz
+    }""")
+    add('MotorB', """mcdp {
+        provides torque [N*m]
+        requires cost [USD]
+        requires power [W]
+        cost >= 5 USD
+        power >= provided torque * 5 Hz
+    }""")
+    add('Battery1', """mcdp {
+        provides power [W]
+        requires cost [USD]
+        cost >= provided power * 1 USD/W
+    }""")
+    add('Battery2', """mcdp {
+        provides power [W]
+        requires cost [USD]
+        cost >= provided power * 0.5 USD/W + 3 USD
+    }""")
+    initial = library.parse_ndp("""mcdp {
+        provides torque [N*m]
+        add_budget = instance abstract mcdp {
+            provides b1 [USD]
+            provides b2 [USD]
+            provides b3 [USD]
+            requires budget [USD]
+            required budget >= provided b1 + provided b2 + provided b3
+        }
+        requires budget >= budget required by add_budget
+    }""")
+    options = ['MotorA', 'MotorB', 'Battery1', 'Battery2']
+    return Optimization(library=library, options=options,
+                        flabels=('torque',),
+                        F0s=(library.parse_poset('N*m'),), f0s=(2.0,),
+                        rlabels=('budget',),
+                        R0s=(library.parse_poset('USD'),), r0s=(100.0,),
+                        initial=initial)
+
+
+@comptest
+def opt_basic_single_resource():
+    """ The lower bounds of models with a single resource are not products """
+    l1 = parse_poset('USD').U(1.0)
+    l2 = parse_poset('USD').U(2.0)
+    assert less_resources2(l1, l2)
+    assert not less_resources2(l2, l1)
+    assert less_resources2(l1, parse_poset('USD x J').U((2.0, 1.0)))
+    assert_equal(get_embedding_matches(l1.P, l2.P), [0])
+
+    opt = _small_synthesis_problem()
+    while not opt.is_done():
+        opt.step()
+    assert_equal([str(s.ur) for s in opt.done][-1], '↑{13 USD}')
+
+
+def _optimization_summary(opt):
+    def summary(states):
+        return [(s.creation_order, s.hash, sorted(s.ur.minimals))
+                for s in states]
+    return summary(opt.done), summary(opt.abandoned), summary(opt.expanded)
+
+
+@comptest
+def opt_basic_11():
+    """ The frontier expansion is deterministic """
+    opt = _small_synthesis_problem()
+    while not opt.is_done():
+        opt.step()
+    serial = _optimization_summary(opt)
+    assert_equal([str(s.ur) for s in opt.done][-1], '↑{13 USD}')
+
+    results = {}
+    for nworkers, frontier_size in [(0, 1), (0, 4), (2, 4)]:
+        opt = _small_synthesis_problem()
+        with FrontierExpander(opt, nworkers, frontier_size) as expander:
+            while not opt.is_done():
+                opt.step_frontier(expander)
+        results[(nworkers, frontier_size)] = _optimization_summary(opt)
+
+    assert_equal(results[(0, 1)], serial)
+    assert_equal(results[(0, 4)], results[(2, 4)])
@@ -6,18 +6,19 @@ from .utils import time_poset_minima_func
 from mcdp_utils_misc.timing import timeit
 
 __all__ = [
-    'poset_minima',
-    'poset_maxima',
+    'poset_minima_baseline',
+    'poset_maxima_baseline',
+    'poset_minima_n2',
 ]
 
-def poset_maxima(elements, leq):
+def poset_maxima_baseline(elements, leq):
     geq = lambda a, b: leq(b, a)
-    return poset_minima(elements, geq)
+    return poset_minima_baseline(elements, geq)
 
 
 @time_poset_minima_func
 @contract(elements='seq|set|$frozenset')
-def poset_minima(elements, leq):
+def poset_minima_baseline(elements, leq):
     """ Find the minima of a poset according to given comparison 
         function. For small sets only - O(n^2). """
     n = len(elements)
@@ -47,4 +48,4 @@ def poset_minima(elements, leq):
 def poset_minima_n2(poset, elements):
     """ Baseline implementation of "poset_minima" with 
         complexity n^2. """
-    return poset_minima(elements, poset.leq)
+    return poset_minima_baseline(elements, poset.leq)
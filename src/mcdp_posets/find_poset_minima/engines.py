@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+from abc import ABCMeta, abstractmethod
+
+from mcdp_posets.numeric_antichain import (is_numeric_poset,
+    numeric_product_factors)
+from mcdp_posets.poset import Poset
+from mcdp_posets.poset_product import PosetProduct
+
+from .baseline_n2 import poset_maxima_baseline, poset_minima_baseline
+from .numeric import (minima_1d, minima_2d_sweep, minima_kd_klp,
+    minima_kd_sfs)
+
+
+__all__ = [
+    'poset_minima',
+    'poset_maxima',
+    'MinimaEngine',
+    'NumericProductMinima',
+    'register_minima_engine',
+    'get_minima_engine',
+]
+
+
+class MinimaEngine(object):
+    """
+        A specialized algorithm for computing minimal elements in some
+        class of posets.
+    """
+    __metaclass__ = ABCMeta
+
+    @abstractmethod
+    def accepts(self, poset):
+        """ Returns True if this engine can work with the given poset. """
+
+    @abstractmethod
+    def poset_minima(self, poset, elements):
+        """
+            Returns the set of minimal elements, or None if the engine
+            cannot deal with these particular elements (in which case the
+            baseline algorithm is used).
+        """
+
+    @abstractmethod
+    def poset_maxima(self, poset, elements):
+        """ Same as poset_minima(), for the maximal elements. """
+
+
+class _Engines(object):
+    """ Static storage for the registered engines, in order of priority. """
+    engines = []
+
+
+def register_minima_engine(engine):
+    """ Registers an engine; later registrations take priority. """
+    assert isinstance(engine, MinimaEngine), engine
+    _Engines.engines.insert(0, engine)
+
+
+def get_minima_engine(poset):
+    """ Returns the engine to use for the poset, or None for the baseline. """
+    for engine in _Engines.engines:
+        if engine.accepts(poset):
+            return engine
+    return None
+
+
+def _poset_from_leq(leq):
+    """ If leq is the bound method Poset.leq, returns the poset. """
+    poset = getattr(leq, '__self__', None)
+    if isinstance(poset, Poset) and getattr(leq, '__name__', None) == 'leq':
+        return poset
+    return None
+
+
+def poset_minima(elements, leq):
+    """
+        Find the minima of a poset according to given comparison function.
+
+        If leq is the method of a poset for which there is a registered
+        engine, the specialized algorithm is used; otherwise we fall back
+        on the baseline O(n^2) algorithm.
+    """
+    if len(elements) > 1:
+        poset = _poset_from_leq(leq)
+        if poset is not None:
+            engine = get_minima_engine(poset)
+            if engine is not None:
+                res = engine.poset_minima(poset, elements)
+                if res is not None:
+                    return res
+    return poset_minima_baseline(elements, leq)
+
+
+def poset_maxima(elements, leq):
+    """ Find the maxima of a poset according to given comparison function. """
+    if len(elements) > 1:
+        poset = _poset_from_leq(leq)
+        if poset is not None:
+            engine = get_minima_engine(poset)
+            if engine is not None:
+                res = engine.poset_maxima(poset, elements)
+                if res is not None:
+                    return res
+    return poset_maxima_baseline(elements, leq)
+
+
+class NumericProductMinima(MinimaEngine):
+    """
+        Products of Rcomp, RcompUnits and Nat (and the spaces themselves).
+
+        Uses sort-and-sweep for 1 and 2 dimensions and the
+        Kung-Luccio-Preparata divide-and-conquer for more dimensions.
+    """
+
+    # Below this number of points, use the sort-filter algorithm
+    # rather than the divide-and-conquer.
+    klp_threshold = 64
+
+    def accepts(self, poset):
+        if is_numeric_poset(poset):
+            return True
+        return numeric_product_factors(poset) is not None
+
+    def poset_minima(self, poset, elements):
+        return self._extrema(poset, elements, sign=+1)
+
+    def poset_maxima(self, poset, elements):
+        return self._extrema(poset, elements, sign=-1)
+
+    def _extrema(self, poset, elements, sign):
+        if isinstance(poset, PosetProduct):
+            tops = [_.get_top() for _ in poset.subs]
+            scalar = False
+        else:
+            tops = [poset.get_top()]
+            scalar = True
+
+        inf = float('inf') * sign
+        key2element = {}
+        for e in elements:
+            coords = (e,) if scalar else e
+            if not isinstance(coords, tuple) or len(coords) != len(tops):
+                return None
+            key = []
+            for x, top in zip(coords, tops):
+                t = type(x)
+                if t is float or t is int or t is long:
+                    key.append(x * sign)
+                elif x == top:
+                    key.append(inf)
+                else:
+                    return None
+            key2element.setdefault(tuple(key), e)
+
+        keys = list(key2element)
+        ndim = len(tops)
+        if ndim == 1:
+            res = minima_1d(keys)
+        elif ndim == 2:
+            res = minima_2d_sweep(keys)
+        elif len(keys) < self.klp_threshold:
+            res = minima_kd_sfs(keys)
+        else:
+            res = minima_kd_klp(keys)
+        return set(key2element[k] for k in res)
+
+
+register_minima_engine(NumericProductMinima())
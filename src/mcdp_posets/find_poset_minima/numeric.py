@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+    Minima of finite sets of points in R^k, with the componentwise order.
+
+    All functions here work on "keys": tuples of numbers (int, long, float)
+    that can be compared with the usual Python operators. The top elements
+    of the numeric posets are represented by inf.
+
+    The input must not contain duplicates.
+"""
+from bisect import bisect_right
+
+
+__all__ = [
+    'minima_1d',
+    'minima_2d_sweep',
+    'minima_kd_klp',
+    'minima_kd_sfs',
+]
+
+# Below this size, the sort-filter algorithm is faster than the recursion.
+KLP_BASE_SIZE = 32
+# Below this number of pairs, filter() uses brute force.
+KLP_FILTER_BRUTE_PAIRS = 256
+
+
+def minima_1d(keys):
+    """ Returns the (unique) minimal element of a list of 1-tuples. """
+    return [min(keys)]
+
+
+def minima_2d_sweep(keys):
+    """
+        Sort-and-sweep, O(n log n).
+
+        After sorting lexicographically, a point is minimal iff its second
+        coordinate is strictly smaller than that of all the points before.
+    """
+    res = []
+    best = None
+    for k in sorted(keys):
+        y = k[1]
+        if best is None or y < best:
+            res.append(k)
+            best = y
+    return res
+
+
+def minima_kd_sfs(keys):
+    """
+        Sort-filter: after sorting lexicographically, a point can only be
+        dominated by points that come before it. O(n m) where m is
+        the number of minima.
+    """
+    return _sfs(sorted(keys))
+
+
+def minima_kd_klp(keys):
+    """
+        Divide-and-conquer algorithm by Kung, Luccio and Preparata (1975),
+        O(n log^(k-2) n) for k >= 3.
+    """
+    return _klp(sorted(keys))
+
+
+def _dominates(a, b):
+    for x, y in zip(a, b):
+        if not x <= y:
+            return False
+    return True
+
+
+def _sfs(sorted_keys):
+    res = []
+    for p in sorted_keys:
+        for q in res:
+            if _dominates(q, p):
+                break
+        else:
+            res.append(p)
+    return res
+
+
+def _klp(sorted_keys):
+    n = len(sorted_keys)
+    if n <= KLP_BASE_SIZE:
+        return _sfs(sorted_keys)
+    half = n // 2
+    # Because of the lexicographic sort, nothing in the second half
+    # can dominate something in the first half, and everything in the first
+    # half is <= everything in the second half on the first coordinate.
+    lo = _klp(sorted_keys[:half])
+    hi = _klp(sorted_keys[half:])
+    return lo + _filter(lo, hi, 1)
+
+
+def _filter(A, B, d):
+    """
+        Returns the elements of B that are not dominated by any element of A
+        on coordinates d, d+1, ..., assuming that on coordinates 0..d-1
+        every element of A is <= every element of B.
+    """
+    if not A or not B:
+        return list(B)
+
+    k = len(B[0])
+    if d == k - 1:
+        m = min(a[d] for a in A)
+        return [b for b in B if b[d] < m]
+
+    if d == k - 2:
+        return _filter_sweep(A, B, d)
+
+    if len(A) * len(B) <= KLP_FILTER_BRUTE_PAIRS:
+        return [b for b in B
+                if not any(_dominates(a[d:], b[d:]) for a in A)]
+
+    values = sorted(a[d] for a in A)
+    m = values[len(values) // 2]
+
+    A_lt = [a for a in A if a[d] < m]
+    A_le = [a for a in A if a[d] <= m]
+    A_gt = [a for a in A if a[d] > m]
+    B_lt = [b for b in B if b[d] < m]
+    B_ge = [b for b in B if b[d] >= m]
+
+    # For b[d] < m, only the points of A with a[d] < m can dominate it.
+    res_lo = _filter(A_lt, B_lt, d)
+    # For b[d] >= m, the points with a[d] <= m are below on coordinate d,
+    # so we can forget about it; the others still need to be checked.
+    res_hi = _filter(A_gt, _filter(A_le, B_ge, d + 1), d)
+    return res_lo + res_hi
+
+
+def _filter_sweep(A, B, d):
+    """ Filter on the last two coordinates, O((|A| + |B|) log |A|). """
+    As = sorted(A, key=lambda a: a[d])
+    xs = [a[d] for a in As]
+    prefix_min = []
+    cur = None
+    for a in As:
+        y = a[d + 1]
+        if cur is None or y < cur:
+            cur = y
+        prefix_min.append(cur)
+
+    res = []
+    for b in B:
+        i = bisect_right(xs, b[d])
+        if i > 0 and prefix_min[i - 1] <= b[d + 1]:
+            continue
+        res.append(b)
+    return res
@@ -91,7 +91,7 @@ class FinitePoset(FiniteCollectionAsSpace, Poset):
         return d
 
     def join(self, a, b):
-        from mcdp_posets.find_poset_minima.baseline_n2 import poset_minima
+        from mcdp_posets.find_poset_minima import poset_minima
         # find all descendants
         da = self._get_upper_closure(a)
         db = self._get_upper_closure(b)
@@ -108,7 +108,7 @@ class FinitePoset(FiniteCollectionAsSpace, Poset):
         return list(minima)[0]
 
     def meet(self, a, b):
-        from mcdp_posets.find_poset_minima.baseline_n2 import poset_maxima
+        from mcdp_posets.find_poset_minima import poset_maxima
 
         # find all descendants
         da = self._get_lower_closure(a)
@@ -138,13 +138,13 @@ class FinitePoset(FiniteCollectionAsSpace, Poset):
             return self._top
 
     def get_minimal_elements(self):
-        from mcdp_posets.find_poset_minima.baseline_n2 import poset_minima
+        from mcdp_posets.find_poset_minima import poset_minima
         minima = poset_minima(self.elements, self.leq)
         return minima
 
     def get_maximal_elements(self):
         geq = lambda a, b: self.leq(b, a)
-        from mcdp_posets.find_poset_minima.baseline_n2 import poset_minima
+        from mcdp_posets.find_poset_minima import poset_minima
         maxima = poset_minima(self.elements, geq)
         return maxima
 
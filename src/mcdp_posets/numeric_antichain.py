@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+    Array representation of antichains in products of Rcomp, RcompUnits
+    and Nat.
+
+    An antichain of n points in a product of k numeric posets is stored as
+    an (n, k) float array; the top element of each factor is represented
+    by +inf (the finite values never are, so nothing is lost).
+"""
+import numpy as np
+
+from .nat import Nat
+from .poset_product import PosetProduct
+from .rcomp import Rcomp
+from .rcomp_units import RcompUnits
+
+
+__all__ = [
+    'NumericAntichain',
+    'is_numeric_poset',
+    'numeric_product_factors',
+    'antichain_from_elements',
+    'antichain_minima',
+    'antichain_maxima',
+    'antichain_covers',
+    'antichain_contains_below',
+]
+
+# Ints larger than this cannot be represented exactly as floats.
+_max_exact_int = 2 ** 53
+
+# Maximum number of booleans allocated at once in pairwise comparisons.
+_max_chunk = 2 ** 20
+
+
+def is_numeric_poset(P):
+    """ True if P is exactly one of Rcomp, RcompUnits, Nat. """
+    if not type(P) in (Rcomp, RcompUnits, Nat):
+        return False
+    return not Rcomp.tolerate_numerical_errors
+
+
+def numeric_product_factors(P):
+    """
+        If P is a product of numeric posets with the usual product order,
+        returns the tuple of factors; otherwise returns None.
+    """
+    if not isinstance(P, PosetProduct):
+        return None
+    if type(P).leq.__func__ is not PosetProduct.leq.__func__:
+        return None
+    if not P.subs:
+        return None
+    for sub in P.subs:
+        if not is_numeric_poset(sub):
+            return None
+    return P.subs
+
+
+class NumericAntichain(object):
+    """ An (n, k) array of points, together with the k numeric factors. """
+
+    def __init__(self, values, subs):
+        assert values.ndim == 2 and values.shape[1] == len(subs), \
+            (values.shape, subs)
+        self.values = values
+        self.subs = subs
+
+    def __len__(self):
+        return self.values.shape[0]
+
+    def to_elements(self):
+        """ Converts back to a list of tuples. """
+        columns = []
+        for j, sub in enumerate(self.subs):
+            top = sub.get_top()
+            is_nat = isinstance(sub, Nat)
+            col = []
+            for x in self.values[:, j].tolist():
+                if x == np.inf:
+                    col.append(top)
+                elif is_nat:
+                    col.append(int(x))
+                else:
+                    col.append(x)
+            columns.append(col)
+        return list(zip(*columns))
+
+
+def antichain_from_elements(subs, elements):
+    """
+        Converts a sequence of tuples to a NumericAntichain. Returns None
+        if some value cannot be represented exactly.
+    """
+    k = len(subs)
+    tops = [_.get_top() for _ in subs]
+    rows = []
+    for e in elements:
+        if not isinstance(e, tuple) or len(e) != k:
+            return None
+        row = []
+        for x, top in zip(e, tops):
+            t = type(x)
+            if t is float:
+                row.append(x)
+            elif t is int or t is long:
+                if abs(x) > _max_exact_int:
+                    return None
+                row.append(x)
+            elif x == top:
+                row.append(np.inf)
+            else:
+                return None
+        rows.append(row)
+    values = np.array(rows, dtype='float64').reshape((len(rows), k))
+    return NumericAntichain(values, subs)
+
+
+def _unique_rows_sorted(values):
+    """ Sorts the rows lexicographically and removes duplicates. """
+    if values.shape[0] <= 1:
+        return values
+    order = np.lexsort(values.T[::-1])
+    s = values[order]
+    # note: we cannot use np.diff() because inf - inf = nan
+    different = np.any(s[1:] != s[:-1], axis=1)
+    keep = np.concatenate(([True], different))
+    return s[keep]
+
+
+def antichain_minima(values):
+    """ Returns the minimal rows of the (n, k) array. """
+    s = _unique_rows_sorted(values)
+    n, k = s.shape
+    if n <= 1:
+        return s
+    if k == 1:
+        return s[:1]
+    if k == 2:
+        # after the sort, a point is minimal iff its second coordinate is
+        # strictly smaller than all the previous ones
+        prev_min = np.minimum.accumulate(s[:, 1])
+        keep = np.concatenate(([True], s[1:, 1] < prev_min[:-1]))
+        return s[keep]
+
+    # After the sort, a point can only be dominated by an earlier point.
+    keep = np.ones(n, dtype=bool)
+    chunk = max(1, _max_chunk // (n * k))
+    for start in range(0, n, chunk):
+        end = min(n, start + chunk)
+        B = s[start:end]
+        before = s[:end]
+        le = np.all(before[np.newaxis, :, :] <= B[:, np.newaxis, :], axis=2)
+        earlier = (np.arange(end)[np.newaxis, :] <
+                   np.arange(start, end)[:, np.newaxis])
+        keep[start:end] = ~np.any(le & earlier, axis=1)
+    return s[keep]
+
+
+def antichain_maxima(values):
+    """ Returns the maximal rows of the (n, k) array. """
+    return -antichain_minima(-values)
+
+
+def antichain_covers(A, B):
+    """
+        Returns True if for each row b of B there is a row a of A
+        such that a <= b. This is the order of UpperSets.
+    """
+    nA, k = A.shape
+    nB = B.shape[0]
+    if nB == 0:
+        return True
+    if nA == 0:
+        return False
+    chunk = max(1, _max_chunk // (nA * k))
+    for start in range(0, nB, chunk):
+        Bc = B[start:start + chunk]
+        le = np.all(A[np.newaxis, :, :] <= Bc[:, np.newaxis, :], axis=2)
+        if not np.all(np.any(le, axis=1)):
+            return False
+    return True
+
+
+def antichain_contains_below(A, x):
+    """ Returns True if some row of A is <= the (k,) array x. """
+    return bool(np.any(np.all(A <= x, axis=1)))
+
@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 from contracts import contract
 from contracts.utils import raise_desc, raise_wrapped, check_isinstance
+from mcdp.constants import MCDPConstants
 from mcdp.exceptions import DPInternalError, mcdp_dev_warning
+from mcdp_utils_misc import BoundedCache
 
 from .nat import Int, Nat
 from .poset import NotLeq, Preorder
@@ -17,6 +19,8 @@ from .uppersets import UpperSets, LowerSets
 
 __all__ = [
     'get_types_universe',
+    'get_types_universe_memo',
+    'set_types_universe_memo',
     'express_value_in_isomorphic_space',
 ]
 
@@ -28,7 +32,9 @@ class TypesUniverse(Preorder):
         f: A -> B and g: B -> A such that g(f(x)) = x.
         
         For example,  int <= float, and embedding = (float(), int())
-    
+        
+        The results of check_equal, check_leq, get_super_conversion and
+        get_embedding are memoized (see get_types_universe_memo()).
     """
 
     def witness(self):
@@ -39,6 +45,65 @@ class TypesUniverse(Preorder):
         return isinstance(x, Space)
 
     def check_equal(self, A, B):
+        return self._memoized(self._check_equal, A, B)
+
+    def check_leq(self, A, B):
+        return self._memoized(self._check_leq, A, B)
+
+    def get_super_conversion(self, A, B):
+        """ 
+            Returns a pair of maps (f,g), 
+        
+                f : A ⟶ B,
+                g : B ⟶ A,
+        
+            such that:
+            
+                f(a) = min { b ∈ B: a ≼ b }
+                g(b) = max { a ∈ A: a ≼ b }
+                
+            These two maps then can be used as a pair (h, h*)
+            to create a DP to be used as a "conversion" between
+            the two spaces.
+            
+            Raises NotLeq if it is not possible to create this 
+            pair of functions (either because the space are 
+            not comparable or because the implementation is not available). 
+        """
+        return self._memoized(self._get_super_conversion, A, B)
+
+    def get_embedding(self, A, B):
+        return self._memoized(self._get_embedding, A, B)
+
+    def _memoized(self, f, A, B):
+        """
+            Returns f(A, B), or raises the same NotLeq/NotEqual, using
+            the results for the same pair of spaces.
+
+            The spaces are compared by identity: they are not modified,
+            but they are not hashable by value, and equal spaces are not
+            interchangeable (they can have different attributes).
+            The entries keep a reference to the spaces, so that the ids
+            are not reused while in the cache.
+        """
+        memo = get_types_universe_memo()
+        key = (f.__name__, id(A), id(B))
+        entry = memo.get(key)
+        if entry is None or entry[0] is not A or entry[1] is not B:
+            try:
+                entry = (A, B, f(A, B), None)
+            except (NotLeq, NotEqual) as e:
+                entry = (A, B, None, e)
+            memo.put(key, entry)
+        _, _, res, e = entry
+        if e is not None:
+            raise e
+        return res
+
+    def _check_equal(self, A, B):
+        if A is B:
+            return
+
         if isinstance(A, PosetProduct) and isinstance(B, PosetProduct):
             if len(A) != len(B):
                 msg = 'Different length.'
@@ -75,7 +140,7 @@ class TypesUniverse(Preorder):
             msg = 'Different by direct comparison.'
             raise_desc(NotEqual, msg, A=A, B=B)
 
-    def check_leq(self, A, B):
+    def _check_leq(self, A, B):
         from mcdp_posets.space import Space
         from mcdp_posets import FiniteCollectionsInclusion
         from mcdp_posets import RcompUnits
@@ -84,7 +149,7 @@ class TypesUniverse(Preorder):
         check_isinstance(A, Space)
         check_isinstance(B, Space)
         
-        if A == B:
+        if A is B or A == B:
             return
         
         if isinstance(A, Nat) and isinstance(B, Nat):
@@ -190,26 +255,7 @@ class TypesUniverse(Preorder):
         msg = "Do not know how to compare types."
         raise_desc(NotLeq, msg, A=A, B=B)
             
-    def get_super_conversion(self, A, B):
-        """ 
-            Returns a pair of maps (f,g), 
-        
-                f : A ⟶ B,
-                g : B ⟶ A,
-        
-            such that:
-            
-                f(a) = min { b ∈ B: a ≼ b }
-                g(b) = max { a ∈ A: a ≼ b }
-                
-            These two maps then can be used as a pair (h, h*)
-            to create a DP to be used as a "conversion" between
-            the two spaces.
-            
-            Raises NotLeq if it is not possible to create this 
-            pair of functions (either because the space are 
-            not comparable or because the implementation is not available). 
-        """
+    def _get_super_conversion(self, A, B):
         from .rcomp_units import RcompUnits
         from .maps.coerce_to_int import FloorRNMap, CeilRNMap
         from .maps.promote_to_float import PromoteToFloat
@@ -287,7 +333,7 @@ class TypesUniverse(Preorder):
         msg = 'Super conversion not available.'
         raise_desc(NotLeq, msg, A=A, B=B)
              
-    def get_embedding(self, A, B):
+    def _get_embedding(self, A, B):
         try:
             self.check_leq(A, B)
         except NotLeq as e:
@@ -503,3 +549,21 @@ tu = TypesUniverse()
 
 def get_types_universe():
     return tu
+
+
+class _Current(object):
+    memo = None
+
+
+def get_types_universe_memo():
+    ''' Returns the cache used by TypesUniverse. '''
+    if _Current.memo is None:
+        n = MCDPConstants.types_universe_memo_max_entries
+        _Current.memo = BoundedCache(max_entries=n)
+    return _Current.memo
+
+
+def set_types_universe_memo(memo):
+    ''' Replaces the cache (None: create it again when needed). '''
+    _Current.memo = memo
+
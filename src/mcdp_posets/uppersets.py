@@ -4,10 +4,15 @@ import random
 
 from contracts import contract
 from contracts.utils import raise_desc, check_isinstance
+from mcdp import MCDPConstants
 from mcdp.development import do_extra_checks, mcdp_dev_warning
 from mcdp_utils_misc.memoize_simple_imp import memoize_simple
+import numpy as np
 
-from .find_poset_minima.baseline_n2 import poset_maxima, poset_minima
+from .find_poset_minima import poset_maxima, poset_minima
+from .numeric_antichain import (NumericAntichain, antichain_contains_below,
+    antichain_covers, antichain_from_elements, antichain_maxima,
+    antichain_minima, numeric_product_factors)
 from .poset import NotLeq, Poset
 from .poset_product import PosetProduct
 from .space import Map, NotBelongs, NotEqual, Space, Uninhabited
@@ -22,10 +27,19 @@ __all__ = [
     'upperset_product',
     'lowerset_project',
     'upperset_project',
+    'upperset_from_array',
+    'lowerset_from_array',
 ]
 
 class UpperSet(Space):
-    
+    """
+        An upper set, represented by its minimal elements.
+
+        If P is a product of Rcomp/RcompUnits/Nat, the minimal elements
+        can also be represented as an array (see get_antichain()); either
+        representation is computed lazily from the other.
+    """
+
     @contract(minimals='set|list|$frozenset', P=Poset)
     def __init__(self, minimals, P):
         self.minimals = frozenset(minimals)
@@ -47,6 +61,30 @@ class UpperSet(Space):
             from mcdp_posets import check_minimal
             check_minimal(self.minimals, P)
 
+    def _get_minimals(self):
+        if self._minimals is None:
+            self._minimals = frozenset(self._antichain.to_elements())
+        return self._minimals
+
+    def _set_minimals(self, minimals):
+        self._minimals = minimals
+        self._antichain = None
+
+    minimals = property(_get_minimals, _set_minimals)
+
+    def __setstate__(self, state):
+        _setstate_antichain(self, state, 'minimals')
+
+    def get_antichain(self):
+        """
+            Returns the minimal elements as a NumericAntichain,
+            or None if they cannot be represented as an array.
+        """
+        return _get_antichain(self, '_minimals')
+
+    def _npoints(self):
+        return _npoints(self, '_minimals')
+
     def witness(self):
         if not self.minimals:
             raise Uninhabited()
@@ -63,9 +101,11 @@ class UpperSet(Space):
 
     def belongs(self, x):
         self.P.belongs(x)
-        for p in self.minimals:
-            if self.P.leq(p, x):
-                return
+        is_below = _antichain_is_below(self, x)
+        if is_below is None:
+            is_below = any(self.P.leq(p, x) for p in self.minimals)
+        if is_below:
+            return
         msg = 'The point {} does not belong to this upperset.'.format(x)
         raise_desc(NotBelongs, msg)
 
@@ -141,6 +181,14 @@ class UpperSets(Poset):
         if a_is_top:
             raise NotLeq('a = my ⊤')
 
+        if _use_antichains(a, b):
+            aa = a.get_antichain()
+            ba = b.get_antichain()
+            # if it fails, we use my_leq_() below for the error message
+            if aa is not None and ba is not None:
+                if antichain_covers(aa.values, ba.values):
+                    return
+
         # XXX: still might not be good, if this
         # thing does not have a bottom
 #         bot = self.get_bottom()
@@ -176,6 +224,12 @@ class UpperSets(Poset):
                 raise NotLeq(msg)
 
     def _my_leq_fast(self, A, B):
+        if _use_antichains(A, B):
+            a = A.get_antichain()
+            b = B.get_antichain()
+            if a is not None and b is not None:
+                return antichain_covers(a.values, b.values)
+
         # there exists an a in A that a <= b
         def dominated(b):
             for a in A.minimals:
@@ -192,6 +246,18 @@ class UpperSets(Poset):
         return True
 
     def meet(self, a, b):  # "min" ∨
+        if _use_antichains(a, b):
+            aa = a.get_antichain()
+            ba = b.get_antichain()
+            if aa is not None and ba is not None:
+                values = antichain_minima(np.vstack((aa.values, ba.values)))
+                r = _upperset_from_antichain(NumericAntichain(values, aa.subs),
+                                             self.P)
+                if do_extra_checks():
+                    self.check_leq(r, a)
+                    self.check_leq(r, b)
+                return r
+
         # To compute the meet (min) of two upper sets
         # just take the union of the minimal elements
         # (without redundant elements)
@@ -278,6 +344,13 @@ class LowerSets(Poset):
             self.belongs(b)
         if a == b:
             return True
+        if _use_antichains(a, b):
+            aa = a.get_antichain()
+            ba = b.get_antichain()
+            # if it fails, we use my_leq_() below for the error message
+            if aa is not None and ba is not None:
+                if antichain_covers(-aa.values, -ba.values):
+                    return True
         if False:
             if a == self.bot:
                 return True
@@ -312,6 +385,18 @@ class LowerSets(Poset):
                 raise NotLeq(msg)
 
     def meet(self, a, b):  # "min" ∨
+        if _use_antichains(a, b):
+            aa = a.get_antichain()
+            ba = b.get_antichain()
+            if aa is not None and ba is not None:
+                values = antichain_maxima(np.vstack((aa.values, ba.values)))
+                r = _lowerset_from_antichain(NumericAntichain(values, aa.subs),
+                                             self.P)
+                if do_extra_checks():
+                    self.check_leq(r, a)
+                    self.check_leq(r, b)
+                return r
+
         # To compute the meet (min) of two upper sets
         # just take the union of the minimal elements
         # (without redundant elements)
@@ -338,6 +423,7 @@ class LowerSets(Poset):
 
 
 class LowerSet(Space):
+    """ A lower set, represented by its maximal elements. See UpperSet. """
 
     @contract(maximals='set|list|$frozenset', P=Poset)
     def __init__(self, maximals, P):
@@ -359,6 +445,30 @@ class LowerSet(Space):
 
             mcdp_dev_warning('check_maximal()')
 
+    def _get_maximals(self):
+        if self._maximals is None:
+            self._maximals = frozenset(self._antichain.to_elements())
+        return self._maximals
+
+    def _set_maximals(self, maximals):
+        self._maximals = maximals
+        self._antichain = None
+
+    maximals = property(_get_maximals, _set_maximals)
+
+    def __setstate__(self, state):
+        _setstate_antichain(self, state, 'maximals')
+
+    def get_antichain(self):
+        """
+            Returns the maximal elements as a NumericAntichain,
+            or None if they cannot be represented as an array.
+        """
+        return _get_antichain(self, '_maximals')
+
+    def _npoints(self):
+        return _npoints(self, '_maximals')
+
     def witness(self):
         if not self.maximals:
             raise Uninhabited()
@@ -372,9 +482,11 @@ class LowerSet(Space):
 
     def belongs(self, x):
         self.P.belongs(x)
-        for p in self.maximals:
-            if self.P.leq(x, p):
-                return
+        is_above = _antichain_is_below(self, x, sign=-1)
+        if is_above is None:
+            is_above = any(self.P.leq(x, p) for p in self.maximals)
+        if is_above:
+            return
         raise_desc(NotBelongs, 'Point does not belong to lower set.')
 
     def __repr__(self):
@@ -383,6 +495,101 @@ class LowerSet(Space):
 
         return "↓{%s}" % contents
 
+#
+# Helpers for the array representation
+#
+
+def _setstate_antichain(s, state, name):
+    # Sets pickled before the array representation was introduced
+    if name in state:
+        state['_' + name] = state.pop(name)
+        state['_antichain'] = None
+    s.__dict__.update(state)
+
+
+def _get_antichain(s, name):
+    if s._antichain is None:
+        a = None
+        subs = numeric_product_factors(s.P)
+        if subs is not None:
+            a = antichain_from_elements(subs, getattr(s, name))
+        # False means "not representable"
+        s._antichain = a if a is not None else False
+    if s._antichain is False:
+        return None
+    return s._antichain
+
+
+def _npoints(s, name):
+    points = getattr(s, name)
+    if points is None:
+        return len(s._antichain)
+    return len(points)
+
+
+def _use_antichains(a, b):
+    """ Decides whether it is worth to use the array representation. """
+    n = a._npoints() + b._npoints()
+    return n >= MCDPConstants.numeric_antichain_min_size
+
+
+def _antichain_is_below(s, x, sign=+1):
+    """
+        Returns whether some point of the antichain is below x
+        (above, if sign = -1), or None if the arrays cannot be used.
+    """
+    if s._npoints() < MCDPConstants.numeric_antichain_min_size:
+        return None
+    a = s.get_antichain()
+    if a is None:
+        return None
+    xa = antichain_from_elements(a.subs, [x])
+    if xa is None:
+        return None
+    return antichain_contains_below(sign * a.values, sign * xa.values[0])
+
+
+def upperset_from_array(values, P):
+    """
+        Returns the UpperSet generated by the rows of the (n, k) array,
+        where P is a product of k posets and the top of each factor is
+        represented by +inf. The dominated rows are discarded.
+    """
+    check_isinstance(P, PosetProduct)
+    values = antichain_minima(values)
+    subs = numeric_product_factors(P)
+    if subs is None or do_extra_checks():
+        return UpperSet(NumericAntichain(values, P.subs).to_elements(), P)
+    return _upperset_from_antichain(NumericAntichain(values, subs), P)
+
+
+def lowerset_from_array(values, P):
+    """ Returns the LowerSet generated by the rows of the array. """
+    check_isinstance(P, PosetProduct)
+    values = antichain_maxima(values)
+    subs = numeric_product_factors(P)
+    if subs is None or do_extra_checks():
+        return LowerSet(NumericAntichain(values, P.subs).to_elements(), P)
+    return _lowerset_from_antichain(NumericAntichain(values, subs), P)
+
+
+def _upperset_from_antichain(antichain, P):
+    """ Creates an UpperSet whose minimals are converted lazily. """
+    res = UpperSet.__new__(UpperSet)
+    res._minimals = None
+    res._antichain = antichain
+    res.P = P
+    return res
+
+
+def _lowerset_from_antichain(antichain, P):
+    """ Creates a LowerSet whose maximals are converted lazily. """
+    res = LowerSet.__new__(LowerSet)
+    res._maximals = None
+    res._antichain = antichain
+    res.P = P
+    return res
+
 # 
 @contract(s1=UpperSet, s2=UpperSet, returns=UpperSet)
 def upperset_product(s1, s2):
@@ -445,8 +652,15 @@ def upperset_project(ur, i):
     if not (0 <= i < len(ur.P)):
         msg = 'Index %d not valid.' % i
         raise_desc(ValueError, msg, P=ur.P)
-    minimals = set()
     Pi = ur.P.subs[i]
+    if ur._npoints() >= MCDPConstants.numeric_antichain_min_size:
+        a = ur.get_antichain()
+        if a is not None:
+            values = a.values[:, i:i + 1].min(axis=0).reshape((1, 1))
+            m = NumericAntichain(values, (Pi,)).to_elements()[0][0]
+            return UpperSet(set([m]), P=Pi)
+
+    minimals = set()
     for m in ur.minimals:
         mi = m[i]
         minimals.add(mi)
@@ -459,8 +673,15 @@ def lowerset_project(lf, i):
     if not (0 <= i < len(lf.P)):
         msg = 'Index %d not valid.' % i
         raise_desc(ValueError, msg, P=lf.P)
-    maximals = set()
     Pi = lf.P.subs[i]
+    if lf._npoints() >= MCDPConstants.numeric_antichain_min_size:
+        a = lf.get_antichain()
+        if a is not None:
+            values = a.values[:, i:i + 1].max(axis=0).reshape((1, 1))
+            m = NumericAntichain(values, (Pi,)).to_elements()[0][0]
+            return LowerSet(set([m]), P=Pi)
+
+    maximals = set()
     for m in lf.maximals:
         mi = m[i]
         maximals.add(mi)
@@ -1,9 +1,9 @@
 # -*- coding: utf-8 -*-
 from contracts import raise_wrapped
 from mcdp_posets import NotLeq
-from mcdp_posets.find_poset_minima.baseline_n2 import poset_maxima
+from mcdp_posets.find_poset_minima import poset_maxima
 
-from .find_poset_minima.baseline_n2 import poset_minima
+from .find_poset_minima import poset_minima
 
 
 __all__ = [
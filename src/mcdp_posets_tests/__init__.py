@@ -9,3 +9,4 @@ from .joins import *
 from .coproducts import *
 from .advanced_embedding import *
 from .test_find_poset_minima import *
+from .numeric_antichains import *
@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 from comptests.registrar import comptest
 from mcdp_lang import parse_poset
-from mcdp_posets import NotLeq, get_types_universe
+from mcdp_posets import (NotLeq, get_types_universe, get_types_universe_memo,
+                         set_types_universe_memo)
+from mcdp_utils_misc import BoundedCache
 
 
 @comptest
@@ -93,3 +95,30 @@ def adv_embed_15():
 @comptest
 def adv_embed_16():
     pass
+
+
+@comptest
+def adv_embed_memo():
+    set_types_universe_memo(BoundedCache(max_entries=100))
+    try:
+        tu = get_types_universe()
+        m = parse_poset('m')
+        km = parse_poset('km')
+        J = parse_poset('J')
+        conv = tu.get_super_conversion(m, km)
+        assert tu.get_super_conversion(m, km) is conv
+        for _ in range(2):
+            try:
+                tu.check_leq(m, J)
+            except NotLeq:
+                pass
+            else:
+                assert False
+        # equal spaces are not interchangeable
+        m2 = parse_poset('m')
+        conv2 = tu.get_super_conversion(m2, km)
+        assert conv2 is not conv
+        assert conv2[0].get_domain() is m2
+        assert len(get_types_universe_memo()) > 0
+    finally:
+        set_types_universe_memo(None)
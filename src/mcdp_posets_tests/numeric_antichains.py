@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+import pickle
+import random
+
+from comptests.registrar import comptest
+from mcdp import MCDPConstants
+from mcdp_posets import (LowerSet, LowerSets, Nat, PosetProduct, Rcomp,
+    UpperSet, UpperSets, lowerset_project, poset_maxima, poset_minima,
+    upperset_project)
+
+
+def random_points(P, n, m):
+    res = []
+    for _ in range(n):
+        p = []
+        for sub in P.subs:
+            if random.random() < 0.05:
+                x = sub.get_top()
+            elif isinstance(sub, Nat):
+                x = random.randint(0, m)
+            else:
+                x = float(random.randint(0, m))
+            p.append(x)
+        res.append(tuple(p))
+    return res
+
+
+class without_antichains(object):
+    """ Context manager that disables the array representation. """
+    def __enter__(self):
+        self.before = MCDPConstants.numeric_antichain_min_size
+        MCDPConstants.numeric_antichain_min_size = 10 ** 9
+
+    def __exit__(self, *_):
+        MCDPConstants.numeric_antichain_min_size = self.before
+
+
+def get_test_posets():
+    return [PosetProduct((Rcomp(), Rcomp())),
+            PosetProduct((Nat(), Rcomp(), Nat())),
+            PosetProduct((Rcomp(),) * 4)]
+
+
+@comptest
+def check_antichain_roundtrip():
+    for P in get_test_posets():
+        minimals = poset_minima(random_points(P, 100, 10), P.leq)
+        u = UpperSet(minimals, P)
+        a = u.get_antichain()
+        assert a is not None
+        assert len(a) == len(minimals)
+        assert set(a.to_elements()) == minimals
+        for x, y in zip(sorted(a.to_elements()), sorted(minimals)):
+            assert map(type, x) == map(type, y), (x, y)
+
+
+@comptest
+def check_antichain_not_numeric():
+    # products of products are not numeric
+    P = PosetProduct((PosetProduct((Rcomp(), Rcomp())), Rcomp()))
+    u = UpperSet([((1.0, 2.0), 3.0)], P)
+    assert u.get_antichain() is None
+    # huge ints cannot be represented exactly
+    P = PosetProduct((Nat(), Nat()))
+    u = UpperSet([(2 ** 60, 1), (2 ** 60 + 1, 0)], P)
+    assert u.get_antichain() is None
+
+
+@comptest
+def check_antichain_uppersets_ops():
+    random.seed(2)
+    for P in get_test_posets():
+        U = UpperSets(P)
+        sets = []
+        for _ in range(6):
+            points = random_points(P, 60, 6)
+            sets.append(UpperSet(poset_minima(points, P.leq), P))
+
+        for a in sets:
+            for b in sets:
+                leq = U.leq(a, b)
+                meet = U.meet(a, b)
+                with without_antichains():
+                    leq2 = U.leq(a, b)
+                    meet2 = U.meet(a, b)
+                assert leq == leq2
+                assert meet.minimals == meet2.minimals
+
+            for i in range(len(P)):
+                p = upperset_project(a, i)
+                with without_antichains():
+                    p2 = upperset_project(a, i)
+                assert p.minimals == p2.minimals
+
+            for x in random_points(P, 20, 6):
+                def belongs(s):
+                    try:
+                        s.belongs(x)
+                        return True
+                    except Exception:
+                        return False
+                b1 = belongs(a)
+                with without_antichains():
+                    b2 = belongs(a)
+                assert b1 == b2
+
+
+@comptest
+def check_antichain_lowersets_ops():
+    random.seed(3)
+    for P in get_test_posets():
+        L = LowerSets(P)
+        sets = []
+        for _ in range(6):
+            points = random_points(P, 60, 6)
+            sets.append(LowerSet(poset_maxima(points, P.leq), P))
+
+        for a in sets:
+            for b in sets:
+                leq = L.leq(a, b)
+                meet = L.meet(a, b)
+                with without_antichains():
+                    leq2 = L.leq(a, b)
+                    meet2 = L.meet(a, b)
+                assert leq == leq2
+                assert meet.maximals == meet2.maximals
+
+            for i in range(len(P)):
+                p = lowerset_project(a, i)
+                with without_antichains():
+                    p2 = lowerset_project(a, i)
+                assert p.maximals == p2.maximals
+
+
+@comptest
+def check_antichain_pickle():
+    P = PosetProduct((Rcomp(), Nat()))
+    points = [(float(i), 100 - i) for i in range(50)]
+    U = UpperSets(P)
+    a = UpperSet(points, P)
+    b = U.meet(a, UpperSet([(0.5, 200)], P))
+    # b has only the array representation
+    assert b._minimals is None
+    b2 = pickle.loads(pickle.dumps(b))
+    assert b2.minimals == b.minimals
+
+    # state saved before the array representation
+    c = UpperSet.__new__(UpperSet)
+    c.__setstate__(dict(minimals=frozenset(points), P=P))
+    assert c.minimals == a.minimals
+    assert c.get_antichain() is not None
+
+
+
+@comptest
+def check_antichain_repr():
+    P = PosetProduct((Nat(), Nat()))
+    assert repr(LowerSet([(1, 2)], P)) == '↓{⟨1, 2⟩}'
+    assert repr(UpperSet([(1, 2)], P)) == '↑{⟨1, 2⟩}'
@@ -1,8 +1,12 @@
 # -*- coding: utf-8 -*-
 from comptests.registrar import comptest
 from contracts import contract
-from mcdp_posets import Poset, PosetProduct, Rcomp
+from mcdp_posets import Nat, Poset, PosetProduct, Rcomp
+from mcdp_posets.find_poset_minima import (get_minima_engine, poset_maxima,
+    poset_maxima_baseline, poset_minima, poset_minima_baseline)
 from mcdp_posets.find_poset_minima.baseline_n2 import poset_minima_n2
+from mcdp_posets.find_poset_minima.numeric import (minima_kd_klp,
+    minima_kd_sfs)
 import numpy as np
 import random
 
@@ -199,6 +203,86 @@ def poset_minima_n2_optimizedPP(P, ps):
 
 
 
+def get_random_points_with_ties(P, n, m):
+    """ Random points on a coarse grid, with some tops. """
+    res = []
+    for _ in range(n):
+        p = []
+        for sub in P.subs:
+            if random.random() < 0.05:
+                x = sub.get_top()
+            elif isinstance(sub, Nat):
+                x = random.randint(0, m)
+            else:
+                x = float(random.randint(0, m))
+            p.append(x)
+        res.append(tuple(p))
+    return res
+
+
+def check_engine_same_as_baseline(P, elements):
+    assert get_minima_engine(P) is not None
+    minima = poset_minima(elements, P.leq)
+    expected = poset_minima_baseline(elements, P.leq)
+    assert minima == expected, (minima, expected)
+    maxima = poset_maxima(elements, P.leq)
+    expected = poset_maxima_baseline(elements, P.leq)
+    assert maxima == expected, (maxima, expected)
+
+
+@comptest
+def pmin_engine_numeric_products():
+    random.seed(0)
+    for ndim in [1, 2, 3, 4, 5]:
+        for sub in [Rcomp(), Nat()]:
+            P = PosetProduct((sub,) * ndim)
+            for n in [2, 10, 100, 300]:
+                for m in [3, 100]:
+                    elements = get_random_points_with_ties(P, n, m)
+                    check_engine_same_as_baseline(P, elements)
+
+
+@comptest
+def pmin_engine_scalars():
+    P = Rcomp()
+    elements = [1.0, 0.5, P.get_top(), 2.0]
+    assert poset_minima(elements, P.leq) == set([0.5])
+    assert poset_maxima(elements, P.leq) == set([P.get_top()])
+    N = Nat()
+    elements = [3, 1, 2, N.get_top()]
+    assert poset_minima(elements, N.leq) == set([1])
+    assert poset_maxima(elements, N.leq) == set([N.get_top()])
+
+
+@comptest
+def pmin_engine_fallback():
+    # The wrapped posets are not recognized and use the baseline
+    Pbase = wrap_with_counts(Rcomp())
+    P = PosetProduct((Pbase, Pbase))
+    assert get_minima_engine(P) is None
+    elements = set([(1.0, 2.0), (2.0, 1.0), (2.0, 2.0)])
+    assert poset_minima(elements, P.leq) == set([(1.0, 2.0), (2.0, 1.0)])
+    assert Pbase.nleq > 0
+
+
+@comptest
+def pmin_klp_large():
+    random.seed(1)
+    for ndim in [3, 4]:
+        keys = set()
+        while len(keys) < 2000:
+            # points close to the simplex so that there are many minima
+            p = [random.random() for _ in range(ndim - 1)]
+            p.append(ndim - sum(p) + random.random() * 0.1)
+            keys.add(tuple(p))
+        keys = list(keys)
+        res1 = set(minima_kd_klp(keys))
+        res2 = set(minima_kd_sfs(keys))
+        assert res1 == res2
+        # there are 1190 (ndim = 3) and 1965 (ndim = 4)
+        assert len(res1) > 1000, (ndim, len(res1))
+
+
 @comptest
 def pmin4():
     pass
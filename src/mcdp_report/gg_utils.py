@@ -6,7 +6,7 @@ import traceback
 
 from contracts import contract
 from contracts.utils import check_isinstance, raise_desc, indent
-from system_cmd import CmdException, system_cmd_result
+from system_cmd import CmdException
 
 from mcdp import logger, MCDPConstants
 from mcdp.exceptions import mcdp_dev_warning, DPSemanticError
@@ -14,35 +14,22 @@ from mcdp_utils_misc.fileutils import tmpfile
 from mcdp_utils_misc.string_utils import get_md5
 from mcdp_utils_misc.timing import timeit_wall
 from mcdp_utils_xml import bs
+from mcdp_report.graphviz_render import graphviz_formats, render_dot
 import networkx as nx
 from reprep.constants import MIME_PDF, MIME_PLAIN, MIME_PNG, MIME_SVG
 
 
 def graphviz_run(filename_dot, output, prog='dot'):
+    """ Renders the file filename_dot using the cache of render_dot(). """
     suff = os.path.splitext(output)[1][1:]
-    if not suff in ['png', 'pdf', 'ps', 'svg']:
+    if not suff in graphviz_formats:
         raise ValueError((output, suff))
 
-    encoder = suff
-
-    cmd = [prog, '-T%s' % encoder, '-o', output, filename_dot]
-    
-    with timeit_wall('running graphviz on %s' % filename_dot, 1.0):
-        try:
-            # print('running graphviz')
-            system_cmd_result(cwd='.', cmd=cmd,
-                     display_stdout=False,
-                     display_stderr=False,
-                     raise_on_error=True,
-                     )
-            # print('done')
-        except (CmdException, KeyboardInterrupt):
-            emergency = 'emergency.dot'
-            logger.error('saving to %r' % emergency)  # XXX
-            contents = open(filename_dot).read()
-            with open(emergency, 'w') as f:
-                f.write(contents)
-            raise
+    with open(filename_dot, 'rb') as f:
+        dot = f.read()
+    data = render_dot(dot, [suff], prog=prog)[suff]
+    with open(output, 'wb') as f:
+        f.write(data)
     
 
 def gg_deepcopy(ggraph):
@@ -95,57 +82,57 @@ def gg_figure(r, name, ggraph, do_png=True, do_pdf=True, do_svg=True,
         and also its source. """
     f = r.figure(name, cols=1)
 
-    # save file in dot file
-    with tmpfile(".dot") as filename_dot:
-        with open(filename_dot, 'w') as fo:
-            s = get_dot_string(ggraph)
-            fo.write(s)
+    s = get_dot_string(ggraph)
 
-#         if False:
-#             ff = '%s.dot' % id(r)
-#             print('writing to %r' % ff)
-#             with open(ff, 'w') as f2:
-#                 f2.write(s)
+    formats = []
+    if do_png:
+        formats.append('png')
+    if do_pdf:
+        formats.append('pdf')
+    if do_svg:
+        formats.append('svg')
 
-        prog = 'dot'
-        try:
-                
-            if do_png:
-                with f.data_file('graph', MIME_PNG) as filename:
-                    graphviz_run(filename_dot, filename, prog=prog)
-    
-            if do_pdf:
-                with f.data_file('graph_pdf', MIME_PDF) as filename:
-                    graphviz_run(filename_dot, filename, prog=prog)
-    
-            if do_svg:
-                with f.data_file('graph_svg', MIME_SVG) as filename:
-                    graphviz_run(filename_dot, filename, prog=prog)
-                    
-                    from mcdp_report.embedded_images import embed_svg_images
-                    data = open(filename).read()
-                    soup = bs(data)
-                    embed_svg_images(soup)
-                    # does not keep doctype: s = to_html_stripping_fragment(soup)
-                    # this will keep the doctype
-                    s = str(soup)
-                    s = s.replace('<fragment>','')
-                    s = s.replace('</fragment>','')
-                    write_bytes_to_file_as_utf8(s, filename)
-
-        except CmdException:
-            if MCDPConstants.test_ignore_graphviz_errors:
-                mcdp_dev_warning('suppressing errors from graphviz')
-                logger.error('Graphivz failed, but I will ignore it '
-                             'because of MCDPConstants.test_ignore_graphviz_errors.')
-            else:
-                raise
+    prog = 'dot'
+    try:
+        # one layout for all the formats
+        outputs = render_dot(s, formats, prog=prog) if formats else {}
+
+        if do_png:
+            with f.data_file('graph', MIME_PNG) as filename:
+                with open(filename, 'wb') as fo:
+                    fo.write(outputs['png'])
+
+        if do_pdf:
+            with f.data_file('graph_pdf', MIME_PDF) as filename:
+                with open(filename, 'wb') as fo:
+                    fo.write(outputs['pdf'])
+
+        if do_svg:
+            with f.data_file('graph_svg', MIME_SVG) as filename:
+                from mcdp_report.embedded_images import embed_svg_images
+                data = outputs['svg']
+                soup = bs(data)
+                embed_svg_images(soup)
+                # does not keep doctype: s = to_html_stripping_fragment(soup)
+                # this will keep the doctype
+                svg = str(soup)
+                svg = svg.replace('<fragment>','')
+                svg = svg.replace('</fragment>','')
+                write_bytes_to_file_as_utf8(svg, filename)
+
+    except CmdException:
+        if MCDPConstants.test_ignore_graphviz_errors:
+            mcdp_dev_warning('suppressing errors from graphviz')
+            logger.error('Graphivz failed, but I will ignore it '
+                         'because of MCDPConstants.test_ignore_graphviz_errors.')
+        else:
+            raise
 
-        # MIME_GRAPHVIZ
-        if do_dot:
-            with f.data_file('dot', MIME_PLAIN) as filename:
-                with open(filename, 'w') as f:
-                    f.write(s)
+    # MIME_GRAPHVIZ
+    if do_dot:
+        with f.data_file('dot', MIME_PLAIN) as filename:
+            with open(filename, 'w') as fo:
+                fo.write(s)
         
     return f
 
@@ -162,54 +149,47 @@ allowed_formats = ['png', 'pdf', 'svg', 'dot']
 
 @contract(returns='tuple')
 def gg_get_formats(gg, data_formats):
+    """ Returns the data for each format; graphviz is run only once. """
     check_isinstance(data_formats, (list, tuple))
-    res = []
-    mcdp_dev_warning('TODO: optimize gg_get_formats')
     for data_format in data_formats:
         if not data_format in allowed_formats:
             msg = 'Invalid data format.' 
             raise_desc(ValueError, msg, data_formats=data_formats)
 
-        if data_format == 'dot':
-            d = get_dot_string(gg)
+    from reprep import Report
+    r = Report()
+    with timeit_wall('gg_figure %s' % list(data_formats)): 
+        gg_figure(r, 'graph', gg,
+                  do_dot='dot' in data_formats,
+                  do_png='png' in data_formats,
+                  do_pdf='pdf' in data_formats,
+                  do_svg='svg' in data_formats)
+
+    res = []
+    for data_format in data_formats:
+        if data_format == 'pdf':
+            d = r.resolve_url('graph_pdf').get_raw_data()
+        elif data_format == 'png':
+            d = r.resolve_url('graph/graph').get_raw_data()
+        elif data_format == 'dot':
+            d = r.resolve_url('dot').get_raw_data()
+        elif data_format == 'svg':
+            d = r.resolve_url('graph_svg').get_raw_data()
+            if '<html>' in d:
+                msg = 'I did not expect a tag <html> in the SVG output'
+                d = indent(d, '> ')
+                raise_desc(Exception, msg, svg=d) 
         else:
-            d = gg_get_format(gg, data_format)
-            
+            raise ValueError('No known format %r.' % data_format)
         res.append(d)
     return tuple(res)
- 
      
     
 def gg_get_format(gg, data_format):
-    from reprep import Report
-    r = Report()
-    do_dot = data_format == 'dot'
-    do_png = data_format == 'png'
-    do_pdf = data_format == 'pdf'
-    do_svg = data_format == 'svg'
-
-    with timeit_wall('gg_figure %s' % data_format): 
-        gg_figure(r, 'graph', gg, do_dot=do_dot,
-                    do_png=do_png, do_pdf=do_pdf, do_svg=do_svg)
-
-    if data_format == 'pdf':
-        pdf = r.resolve_url('graph_pdf').get_raw_data()
-        return pdf
-    elif data_format == 'png':
-        png = r.resolve_url('graph/graph').get_raw_data()
-        return png
-    elif data_format == 'dot':
-        dot = r.resolve_url('dot').get_raw_data()
-        return dot
-    elif data_format == 'svg':
-        svg = r.resolve_url('graph_svg').get_raw_data()
-        if '<html>' in svg:
-            msg = 'I did not expect a tag <html> in the SVG output'
-            svg = indent(svg, '> ')
-            raise_desc(Exception, msg, svg=svg) 
-        return svg
-    else:
+    if not data_format in allowed_formats:
         raise ValueError('No known format %r.' % data_format)
+    d, = gg_get_formats(gg, [data_format])
+    return d
 
 
 def embed_images_from_library2(soup, library, raise_errors):
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+    Rendering of DOT text with graphviz.
+
+    render_dot(dot, formats) returns the outputs for all the formats
+    requested, computed with one run of graphviz (one layout), as in
+
+        dot -Tpng -o graph.png -Tsvg -o graph.svg graph.dot
+
+    The outputs are cached by the hash of (program, format, DOT text),
+    in memory and optionally in a directory. The graphviz processes are
+    started by a bounded pool of long-lived worker threads, shared by all
+    the callers (for example the threads of the web server); concurrent
+    requests for the same outputs wait for the same run.
+
+    The threads do not survive fork(): a process forked after the shared
+    renderer was created gets a new one (see get_graphviz_renderer()).
+"""
+from multiprocessing.pool import ThreadPool
+import os
+import threading
+import time
+
+from contracts.utils import raise_desc
+from system_cmd import CmdException, system_cmd_result
+
+from mcdp import MCDPConstants, logger
+from mcdp_utils_misc import BoundedCache
+from mcdp_utils_misc.fileutils import tmpdir
+from mcdp_utils_misc.string_utils import get_sha1
+from mcdp_utils_misc.timing import timeit_wall
+
+
+__all__ = [
+    'GraphvizRenderer',
+    'render_dot',
+    'get_graphviz_renderer',
+    'set_graphviz_renderer',
+]
+
+graphviz_formats = ['png', 'pdf', 'ps', 'svg']
+
+
+def render_dot(dot, formats, prog='dot'):
+    """ Returns a dict format -> bytes, using the shared renderer. """
+    return get_graphviz_renderer().render(dot, formats, prog=prog)
+
+
+class GraphvizRenderer(object):
+    """
+        max_workers: maximum number of concurrent graphviz processes
+        max_bytes: bound for the size of the outputs kept in memory
+        cache_dir: if not None, the outputs are also stored there
+        runner: function (dot, formats, prog) -> dict format -> bytes
+        timeout: maximum time in seconds waiting for a run
+    """
+
+    def __init__(self, max_workers, max_bytes=None, cache_dir=None,
+                 runner=None, timeout=None):
+        if timeout is None:
+            timeout = MCDPConstants.graphviz_timeout
+        self.max_workers = max_workers
+        self.timeout = timeout
+        # the process that owns the pool
+        self.pid = os.getpid()
+        self.pool = ThreadPool(max_workers)
+        self.cache = BoundedCache(max_bytes=max_bytes)
+        self.cache_dir = cache_dir
+        self.runner = runner if runner is not None else run_graphviz
+        self.lock = threading.Lock()
+        # key -> _Run that is computing it
+        self.inflight = {}
+        self.nruns = 0
+
+    def render(self, dot, formats, prog='dot'):
+        """ Returns a dict format -> bytes. """
+        for f in formats:
+            if not f in graphviz_formats:
+                msg = 'Invalid format.'
+                raise_desc(ValueError, msg, format=f,
+                           available=graphviz_formats)
+        if isinstance(dot, unicode):
+            dot = dot.encode('utf-8')
+
+        key2format = dict((self.get_key(dot, prog, f), f) for f in formats)
+        res = {}
+        waiting = {}  # key -> _Run
+        with self.lock:
+            missing = []
+            for key, f in key2format.items():
+                data = self._get_cached(key)
+                if data is not None:
+                    res[f] = data
+                elif key in self.inflight:
+                    waiting[key] = self.inflight[key]
+                else:
+                    missing.append(f)
+            if missing:
+                missing.sort()
+                run = _Run()
+                self.pool.apply_async(self._run, (run, dot, missing, prog))
+                for f in missing:
+                    key = self.get_key(dot, prog, f)
+                    self.inflight[key] = run
+                    waiting[key] = run
+
+        for key, run in waiting.items():
+            outputs = run.get(self.timeout)
+            res[key2format[key]] = outputs[key2format[key]]
+        return res
+
+    def _run(self, run, dot, formats, prog):
+        try:
+            outputs = self.runner(dot, formats, prog)
+            with self.lock:
+                self.nruns += 1
+                for f, data in outputs.items():
+                    self._put_cached(self.get_key(dot, prog, f), data)
+            run.set(outputs, None)
+        except BaseException as e:
+            run.set(None, e)
+        finally:
+            with self.lock:
+                for f in formats:
+                    self.inflight.pop(self.get_key(dot, prog, f), None)
+
+    @staticmethod
+    def get_key(dot, prog, data_format):
+        return get_sha1('%s\n%s\n%s' % (prog, data_format, dot))
+
+    def _get_cached(self, key):
+        data = self.cache.get(key)
+        if data is None and self.cache_dir is not None:
+            fn = os.path.join(self.cache_dir, key)
+            if os.path.exists(fn):
+                with open(fn, 'rb') as f:
+                    data = f.read()
+                self.cache.put(key, data, size=len(data))
+        return data
+
+    def _put_cached(self, key, data):
+        self.cache.put(key, data, size=len(data))
+        if self.cache_dir is not None:
+            if not os.path.exists(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            fn = os.path.join(self.cache_dir, key)
+            tmp = '%s.tmp%s' % (fn, threading.current_thread().ident)
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.rename(tmp, fn)
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def __repr__(self):
+        return 'GraphvizRenderer(%s)' % self.max_workers
+
+
+class _Run(object):
+    """
+        The result of a run, waited for by all the requests that need it.
+        (AsyncResult.get() of Python 2 wakes up only one of the waiters.)
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.outputs = None
+        self.exception = None
+
+    def set(self, outputs, exception):
+        self.outputs = outputs
+        self.exception = exception
+        self.event.set()
+
+    def get(self, timeout):
+        """
+            Returns the outputs, or raises the exception of the run;
+            raises CmdException if it does not finish within timeout seconds.
+        """
+        t_end = time.time() + timeout
+        # in short waits, so that the wait can be interrupted
+        while not self.event.wait(min(60, max(0, t_end - time.time()))):
+            if time.time() >= t_end:
+                msg = 'Graphviz did not finish in %s seconds.' % timeout
+                raise CmdException(msg)
+        if self.exception is not None:
+            raise self.exception
+        return self.outputs
+
+
+def run_graphviz(dot, formats, prog):
+    """ Runs graphviz once for all the formats. """
+    with tmpdir(prefix='graphviz') as d:
+        filename_dot = os.path.join(d, 'graph.dot')
+        with open(filename_dot, 'wb') as f:
+            f.write(dot)
+        cmd = [prog]
+        for data_format in formats:
+            cmd.extend(['-T%s' % data_format,
+                        '-o', os.path.join(d, 'graph.%s' % data_format)])
+        cmd.append(filename_dot)
+
+        with timeit_wall('running graphviz for %s' % formats, 1.0):
+            try:
+                system_cmd_result(cwd=d, cmd=cmd,
+                                  display_stdout=False,
+                                  display_stderr=False,
+                                  raise_on_error=True)
+            except (CmdException, KeyboardInterrupt):
+                emergency = 'emergency.dot'
+                logger.error('saving to %r' % emergency)  # XXX
+                with open(emergency, 'wb') as f:
+                    f.write(dot)
+                raise
+
+        res = {}
+        for data_format in formats:
+            with open(os.path.join(d, 'graph.%s' % data_format), 'rb') as f:
+                res[data_format] = f.read()
+        return res
+
+
+class _Current(object):
+    renderer = None
+    lock = threading.Lock()
+    pid = os.getpid()
+
+
+def get_graphviz_renderer():
+    """
+        Returns the shared renderer, creating it if necessary,
+        or if it was created by another process (before a fork).
+    """
+    if _Current.pid != os.getpid():
+        # the lock might have been held by a thread of the parent
+        _Current.lock = threading.Lock()
+        _Current.pid = os.getpid()
+    with _Current.lock:
+        if (_Current.renderer is not None and
+                _Current.renderer.pid != os.getpid()):
+            # its threads are in the parent
+            _Current.renderer = None
+        if _Current.renderer is None:
+            _Current.renderer = GraphvizRenderer(
+                max_workers=MCDPConstants.graphviz_max_workers,
+                max_bytes=MCDPConstants.graphviz_cache_max_bytes,
+                cache_dir=MCDPConstants.graphviz_cache_dir)
+        return _Current.renderer
+
+
+def set_graphviz_renderer(renderer):
+    """ Replaces the shared renderer (None: create it again when needed). """
+    _Current.renderer = renderer
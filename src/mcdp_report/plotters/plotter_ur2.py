@@ -5,7 +5,7 @@ from contracts import contract
 from contracts.utils import raise_desc, raise_wrapped
 from mcdp_posets import (NotLeq, PosetProduct, Rcomp, UpperSets,
     get_types_universe)
-from mcdp_posets.find_poset_minima.baseline_n2 import poset_minima
+from mcdp_posets.find_poset_minima import poset_minima
 from mcdp_posets.rcomp_units import RcompUnits
 from mcdp_report.axis_algebra import get_bounds, reduce_bounds
 from mcdp_report.drawing import plot_upset_R2
@@ -6,3 +6,4 @@ if 'raise_if_test_included' in os.environ:
 
 from .test0 import *
 from .test1 import *
+from .test_graphviz_render import *
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from nose.tools import assert_equal
+
+from comptests.registrar import comptest
+from mcdp_report.graphviz_render import (GraphvizRenderer,
+    get_graphviz_renderer, set_graphviz_renderer)
+from system_cmd import CmdException
+
+
+class FakeGraphviz(object):
+    """ Records the runs instead of calling graphviz. """
+
+    def __init__(self, delay=0):
+        self.runs = []
+        self.delay = delay
+
+    def __call__(self, dot, formats, prog):
+        self.runs.append((dot, tuple(formats)))
+        time.sleep(self.delay)
+        return dict((f, '%s:%s:%s' % (prog, f, dot)) for f in formats)
+
+
+@comptest
+def check_graphviz_render_cache():
+    d = tempfile.mkdtemp()
+    try:
+        fake = FakeGraphviz()
+        r = GraphvizRenderer(max_workers=2, cache_dir=d, runner=fake)
+        res = r.render('digraph { a -> b }', ['png', 'svg'])
+        assert_equal(res['svg'], 'dot:svg:digraph { a -> b }')
+        # one layout for both formats
+        assert_equal(fake.runs, [('digraph { a -> b }', ('png', 'svg'))])
+
+        r.render('digraph { a -> b }', ['svg'])
+        assert_equal(len(fake.runs), 1)
+        r.render('digraph { a -> b }', ['pdf', 'png'])
+        assert_equal(fake.runs[1], ('digraph { a -> b }', ('pdf',)))
+        r.render('digraph { a -> b }', ['png'], prog='neato')
+        assert_equal(len(fake.runs), 3)
+        r.close()
+
+        # the outputs are found in the directory
+        fake2 = FakeGraphviz()
+        r2 = GraphvizRenderer(max_workers=2, cache_dir=d, runner=fake2)
+        res = r2.render('digraph { a -> b }', ['png', 'pdf', 'svg'])
+        assert_equal(res['pdf'], 'dot:pdf:digraph { a -> b }')
+        assert_equal(fake2.runs, [])
+        r2.close()
+    finally:
+        shutil.rmtree(d)
+
+
+@comptest
+def check_graphviz_render_concurrent():
+    fake = FakeGraphviz(delay=0.2)
+    r = GraphvizRenderer(max_workers=2, runner=fake)
+    results = []
+
+    def f():
+        results.append(r.render('digraph { x }', ['svg']))
+
+    threads = [threading.Thread(target=f) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # the requests waited for the same run
+    assert_equal(len(fake.runs), 1)
+    assert_equal(results, [{'svg': 'dot:svg:digraph { x }'}] * 5)
+    r.close()
+
+
+@comptest
+def check_graphviz_render_timeout():
+    r = GraphvizRenderer(max_workers=1, runner=FakeGraphviz(delay=1),
+                         timeout=0.1)
+    try:
+        r.render('digraph { x }', ['svg'])
+    except CmdException:
+        pass
+    else:
+        assert False
+    r.close()
+
+
+@comptest
+def check_graphviz_render_fork():
+    r = GraphvizRenderer(max_workers=1, runner=FakeGraphviz())
+    set_graphviz_renderer(r)
+    try:
+        get_graphviz_renderer().render('digraph { x }', ['svg'])
+        pid = os.fork()
+        if pid == 0:
+            # the child does not use the threads of the parent
+            r2 = get_graphviz_renderer()
+            os._exit(0 if r2 is not r and r2.pid == os.getpid() else 1)
+        _, status = os.waitpid(pid, 0)
+        assert_equal(status, 0)
+        assert get_graphviz_renderer() is r
+    finally:
+        set_graphviz_renderer(None)
+        r.close()
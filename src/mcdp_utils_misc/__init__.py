@@ -1,5 +1,6 @@
 from .fileutils import *
 from .memoize_simple_imp import *
+from .bounded_cache import *
 from .natsort import *
 from .string_repr import *
 from .string_utils import *
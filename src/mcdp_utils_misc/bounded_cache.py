@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+from collections import OrderedDict
+import threading
+
+from contracts.utils import raise_desc
+
+
+__all__ = [
+    'BoundedCache',
+]
+
+
+class BoundedCache(object):
+    """
+        A dictionary with a bounded number of entries and/or total size,
+        with LRU (least recently used) or LFU (least frequently used)
+        eviction.
+
+        The size of each entry is given by the user when calling put().
+
+        on_evict(key, value) is called for each entry that is evicted.
+
+        It is safe to use it from multiple threads.
+    """
+
+    policies = ['lru', 'lfu']
+
+    def __init__(self, max_entries=None, max_bytes=None, policy='lru',
+                 on_evict=None):
+        if not policy in BoundedCache.policies:
+            msg = 'Invalid eviction policy.'
+            raise_desc(ValueError, msg, policy=policy,
+                       available=BoundedCache.policies)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.on_evict = on_evict
+        self.lock = threading.RLock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            # key -> [value, size, frequency]
+            self.data = {}
+            # LRU: key -> None, in order of use
+            self.order = OrderedDict()
+            # LFU: frequency -> OrderedDict(key -> None)
+            self.buckets = {}
+            self.nbytes = 0
+            self.nevictions = 0
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def get(self, key, default=None):
+        """ Returns the value (and marks it as used), or default. """
+        with self.lock:
+            if not key in self.data:
+                return default
+            self._touch(key)
+            return self.data[key][0]
+
+    def put(self, key, value, size=0):
+        """ Stores the value and evicts other entries if necessary. """
+        with self.lock:
+            if key in self.data:
+                self._remove(key)
+            if self.max_entries is not None and self.max_entries <= 0:
+                return
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            # make room before inserting, otherwise with LFU
+            # the new entry would be the first to go
+            while self.data and self._too_big(1, size):
+                self._evict_one()
+            self.data[key] = [value, size, 0]
+            self.nbytes += size
+            self._touch(key)
+
+    def pop(self, key):
+        """ Removes the entry if present. """
+        with self.lock:
+            if key in self.data:
+                self._remove(key)
+
+    def keys(self):
+        with self.lock:
+            return list(self.data)
+
+    def _too_big(self, extra_entries, extra_bytes):
+        n = len(self.data) + extra_entries
+        if self.max_entries is not None and n > self.max_entries:
+            return True
+        nbytes = self.nbytes + extra_bytes
+        if self.max_bytes is not None and nbytes > self.max_bytes:
+            return True
+        return False
+
+    def _touch(self, key):
+        entry = self.data[key]
+        if self.policy == 'lru':
+            self.order.pop(key, None)
+            self.order[key] = None
+        else:
+            freq = entry[2]
+            if freq > 0:
+                self._bucket_remove(freq, key)
+            entry[2] = freq + 1
+            self.buckets.setdefault(freq + 1, OrderedDict())[key] = None
+
+    def _bucket_remove(self, freq, key):
+        bucket = self.buckets[freq]
+        del bucket[key]
+        if not bucket:
+            del self.buckets[freq]
+
+    def _remove(self, key):
+        _, size, freq = self.data.pop(key)
+        self.nbytes -= size
+        if self.policy == 'lru':
+            del self.order[key]
+        else:
+            self._bucket_remove(freq, key)
+
+    def _evict_one(self):
+        if self.policy == 'lru':
+            key = next(iter(self.order))
+        else:
+            # among the least frequently used, the oldest
+            bucket = self.buckets[min(self.buckets)]
+            key = next(iter(bucket))
+        value = self.data[key][0]
+        self._remove(key)
+        self.nevictions += 1
+        if self.on_evict is not None:
+            self.on_evict(key, value)
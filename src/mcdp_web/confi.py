@@ -32,6 +32,13 @@ def describe_mcdpweb_params(dp):
         dp.add_string('%s_consumer_key' % p, default=None)
         dp.add_string('%s_consumer_secret' % p, default=None)
     
+    dp.add_int('solve_cache_max_entries', default=None,
+               help='Maximum number of entries in the solve cache.')
+    dp.add_int('solve_cache_max_mb', default=None,
+               help='Maximum size of the solve cache in MB.')
+    dp.add_string('solve_cache_policy', default=None,
+                  help='Eviction policy for the solve cache (lru, lfu).')
+
     # deprecated
     dp.add_bool('delete_cache', default=True, help='(deprecated)')
     return dp
@@ -5,6 +5,7 @@ import datetime
 from mcdp import MCDPConstants
 from mcdp import logger
 from mcdp.exceptions import DPSemanticError, DPSyntaxError
+from mcdp_dp.solve_cache import SolveCache, set_solve_cache
 from mcdp_docs import render_complete
 from mcdp_hdb.schema import SchemaContext, SchemaHash
 from mcdp_hdb_mcdp.host_instance import HostInstance
@@ -97,6 +98,8 @@ class WebApp(AppVisualization, AppStatus,
 
         WebApp.singleton = self
 
+        self.configure_solve_cache()
+
         dirname = options.libraries
         if dirname is None:
             package = dir_from_package_name('mcdp_data')
@@ -526,6 +529,21 @@ class WebApp(AppVisualization, AppStatus,
         howlong = duration_compact(self.get_uptime_s())
         return "Bye. Uptime: %s." % howlong
 
+    def configure_solve_cache(self):
+        options = self.options
+        max_entries = MCDPConstants.solve_cache_max_entries
+        max_bytes = MCDPConstants.solve_cache_max_bytes
+        policy = MCDPConstants.solve_cache_policy
+        if options.solve_cache_max_entries is not None:
+            max_entries = options.solve_cache_max_entries
+        if options.solve_cache_max_mb is not None:
+            max_bytes = options.solve_cache_max_mb * 1024 * 1024
+        if options.solve_cache_policy is not None:
+            policy = options.solve_cache_policy
+        cache = SolveCache(max_entries=max_entries, max_bytes=max_bytes,
+                           policy=policy)
+        set_solve_cache(cache)
+
     def get_uptime_s(self):
         return time.time() - self.time_start
 
@@ -118,6 +118,8 @@ class MCDPResourceRoot(Resource):
     __acl__ = [
         (Allow, Authenticated, Privileges.VIEW_USER_LIST),
         (Allow, Authenticated, Privileges.VIEW_USER_PROFILE_PUBLIC),
+        # e.g. clearing the solve cache (see AppStatus)
+        (Allow, 'group:admin', Privileges.ADMIN),
     ]
     def __init__(self, request):  # @UnusedVariable
         self.name = 'root'
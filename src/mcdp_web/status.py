@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 import json
 import mcdp
+from mcdp_dp.solve_cache import get_solve_cache
 from mcdp_utils_misc import duration_compact, memoize_simple
 import os
 import socket
@@ -10,10 +11,14 @@ import time
 from dateutil.parser import parse
 import pyramid
 
+Privileges = mcdp.MCDPConstants.Privileges
+
 
 class AppStatus(object):
     """
        /status/status.json
+       /status/solve_cache.json
+       /status/solve_cache_clear.json  (POST, admins only)
     """
 
     def __init__(self):
@@ -24,6 +29,14 @@ class AppStatus(object):
         config.add_route(route,'/status/status.json')
         config.add_view(self.view_status, route_name=route, renderer='jsonp',
                         permission=pyramid.security.NO_PERMISSION_REQUIRED)
+        route = 'solve_cache_json'
+        config.add_route(route, '/status/solve_cache.json')
+        config.add_view(self.view_solve_cache, route_name=route, renderer='jsonp',
+                        permission=pyramid.security.NO_PERMISSION_REQUIRED)
+        route = 'solve_cache_clear_json'
+        config.add_route(route, '/status/solve_cache_clear.json')
+        config.add_view(self.view_solve_cache_clear, route_name=route, renderer='jsonp',
+                        request_method='POST', permission=Privileges.ADMIN)
 
 
     def view_status(self, request):  # @UnusedVariable
@@ -48,6 +61,14 @@ class AppStatus(object):
             'branch-topic': mcdp.BranchInfo.branch_topic,
         }
         return res
+
+    def view_solve_cache(self, request):  # @UnusedVariable
+        return get_solve_cache().get_stats()
+
+    def view_solve_cache_clear(self, request):  # @UnusedVariable
+        cache = get_solve_cache()
+        cache.clear()
+        return cache.get_stats()
     
 @memoize_simple
 def geoip(): 
@@ -1,13 +1,14 @@
 # -*- coding: utf-8 -*-
-from networkx.algorithms.cycles import simple_cycles
+from networkx import is_directed_acyclic_graph, strongly_connected_components
 
 from contracts import contract
 from contracts.utils import raise_desc
 from mcdp_dp import DPLoop2, Mux
 from mcdp_dp.dp_series_simplification import make_series
 from mcdp_posets import PosetProduct, get_types_universe
-from mcdp import logger
+from mcdp import MCDPConstants, logger
 from mocdp.comp.composite import CompositeNamedDP
+from mocdp.comp.context import Connection, Context
 from mocdp.comp.context_functions import dpgraph_making_sure_no_reps
 from mocdp.comp.wrap import SimpleWrap
 from mcdp.exceptions import mcdp_dev_warning
@@ -18,13 +19,107 @@ def cndp_abstract(ndp):
     from .connection import get_connection_multigraph
     
     G = get_connection_multigraph(ndp.get_connections())
-    cycles = list(simple_cycles(G))
-    if len(cycles) > 0:
-        logger.debug('cndp_abstract: %d cycles' % len(cycles))
-    if not cycles:
+    if is_directed_acyclic_graph(G):
         return dpgraph_making_sure_no_reps(ndp.context)
-    else:
-        return cndp_abstract_loop2(ndp)
+
+    if MCDPConstants.loops_per_scc:
+        sccs = get_loops_sccs(ndp, G)
+        if sccs is not None:
+            logger.debug('cndp_abstract: %d loops' % len(sccs))
+            ndp2 = cndp_encapsulate_sccs(ndp, sccs)
+            return dpgraph_making_sure_no_reps(ndp2.context)
+
+    return cndp_abstract_loop2(ndp)
+
+
+def get_loops_sccs(ndp, G):
+    """
+        Returns the list of strongly connected components of G that
+        contain cycles, or None if there is only one and it contains
+        all the nodes of ndp (in which case there is nothing to separate).
+    """
+    sccs = []
+    for nodes in strongly_connected_components(G):
+        if len(nodes) > 1 or G.has_edge(list(nodes)[0], list(nodes)[0]):
+            sccs.append(set(nodes))
+
+    context = ndp.context
+    regular = set(name for name in context.names
+                  if not context.is_new_function(name)
+                  and not context.is_new_resource(name))
+    if len(sccs) == 1 and sccs[0] == regular:
+        return None
+    return sorted(sccs, key=sorted)
+
+
+@contract(ndp=CompositeNamedDP, returns=CompositeNamedDP)
+def cndp_encapsulate_sccs(ndp, sccs):
+    """
+        Returns an equivalent CompositeNamedDP in which the nodes of each
+        of the sccs are replaced by one CompositeNamedDP node,
+        so that each of them is abstracted to its own DPLoop2 and
+        the rest of the graph is acyclic.
+    """
+    name2ndp = dict(ndp.get_name2ndp())
+    connections = ndp.get_connections()
+
+    for nodes in sccs:
+        loop_name = _fresh_loop_name(name2ndp)
+
+        inner = Context()
+        for n in nodes:
+            inner.add_ndp(n, name2ndp.pop(n))
+
+        # (dp2, s2) -> fname and (dp1, s1) -> rname of the new node
+        port2fname = {}
+        port2rname = {}
+        outside = []
+        for c in sorted(connections):
+            into = c.dp2 in nodes
+            outof = c.dp1 in nodes
+            if into and outof:
+                inner.add_connection(c)
+                continue
+            if not into and not outof:
+                outside.append(c)
+                continue
+            if into:
+                port = (c.dp2, c.s2)
+                if not port in port2fname:
+                    fname = '%s_f%d' % (loop_name[1:], len(port2fname) + 1)
+                    F = inner.names[c.dp2].get_ftype(c.s2)
+                    fn = inner.add_ndp_fun_node(fname, F)
+                    inner.add_connection(Connection(fn, fname, c.dp2, c.s2))
+                    port2fname[port] = fname
+                outside.append(Connection(c.dp1, c.s1,
+                                          loop_name, port2fname[port]))
+            else:
+                port = (c.dp1, c.s1)
+                if not port in port2rname:
+                    rname = '%s_r%d' % (loop_name[1:], len(port2rname) + 1)
+                    R = inner.names[c.dp1].get_rtype(c.s1)
+                    rn = inner.add_ndp_res_node(rname, R)
+                    inner.add_connection(Connection(c.dp1, c.s1, rn, rname))
+                    port2rname[port] = rname
+                outside.append(Connection(loop_name, port2rname[port],
+                                          c.dp2, c.s2))
+
+        name2ndp[loop_name] = CompositeNamedDP.from_context(inner)
+        connections = set(outside)
+
+    return CompositeNamedDP.from_parts(name2ndp, connections,
+                                       ndp.get_fnames(), ndp.get_rnames())
+
+
+def _fresh_loop_name(names):
+    """ Returns a name "_loopN" that is not used by any of the nodes,
+        also as part of the names of the inner function/resource nodes. """
+    for i in range(1, len(names) + 2):
+        cand = '_loop%d' % i
+        if any(_ == cand or (cand[1:] + '_') in _ for _ in names):
+            continue
+        return cand
+    assert False, names  # pragma: no cover
 
 
 @contract(ndp=CompositeNamedDP, returns=SimpleWrap)
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 from collections import namedtuple
 
-from networkx.algorithms.cycles import simple_cycles
+from networkx import is_directed_acyclic_graph
 
 from contracts import contract
 from contracts.utils import raise_desc, raise_wrapped
@@ -10,6 +10,7 @@ from mcdp_posets import PosetProduct, get_types_universe
 from mcdp import logger
 from mocdp.comp.composite import CompositeNamedDP
 from mocdp.comp.connection import get_connection_multigraph
+from mocdp.comp.feedback_arc_set import minimal_feedback_arc_set
 from mocdp.comp.context import (CResource, Connection, get_name_for_fun_node,
     get_name_for_res_node, is_fun_node_name, is_res_node_name)
 from mocdp.comp.flattening.flatten import cndp_flatten
@@ -60,8 +61,7 @@ def cndp_makecanonical(ndp, name_inner_muxed='_inner_muxed', s_muxed='_muxed'):
 
     # Check that we have some cycles
     G = get_connection_multigraph(ndp.get_connections())
-    cycles = list(simple_cycles(G))
-    if not cycles:
+    if is_directed_acyclic_graph(G):
         ndp_inner = ndp
         cycles_names = []
     else:
@@ -288,7 +288,7 @@ def choose_connections_to_cut(connections, name2dp):
         R = name2dp[c.dp1].get_rtype(c.s1)
         return space_weight(R)
 
-    edges_to_remove = enumerate_minimal_solution(G, edge_weight)
+    edges_to_remove = minimal_feedback_arc_set(G, edge_weight)
     connection_to_remove = [_ for _ in connections if (_.dp1, _.dp2) in edges_to_remove]
 
     return connection_to_remove
@@ -298,6 +298,9 @@ def enumerate_minimal_solution(G, edge_weight):
     """
         G: a graph
         edge_weight: a map from edge (i,j) of G to nonnegative weight
+
+        Exhaustive search over the simple cycles; exponential in their
+        number. See minimal_feedback_arc_set() for the one used.
     """
     # Next optimization: consider equivalence classes of edges:
     # edges that belong to the same cycle. Then only keep the small ones.
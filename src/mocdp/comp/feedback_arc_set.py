@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+    Minimum-weight feedback arc set: a set of edges of minimal total
+    weight whose removal leaves the graph without cycles.
+
+    The graph is split into strongly connected components, which are
+    solved independently. For each one, a greedy ordering gives a
+    first solution, which is then improved by a branch and bound that
+    branches on the edges of a shortest cycle. The search expands at
+    most max_nodes nodes (rather than running for some time, so that
+    the result does not depend on the load of the machine); then the
+    best solution found so far is returned.
+"""
+from collections import deque
+
+from networkx import DiGraph, strongly_connected_components
+
+from mcdp import MCDPConstants, logger
+from mcdp_utils_misc import BoundedCache
+
+
+__all__ = [
+    'minimal_feedback_arc_set',
+]
+
+_cache = BoundedCache(max_entries=1000)
+
+
+def minimal_feedback_arc_set(G, edge_weight, max_nodes=None):
+    """
+        G: a directed (multi)graph
+        edge_weight: a map from edge (i,j) of G to nonnegative weight
+        max_nodes: maximum number of nodes expanded by the exact search
+                   of each component
+                   (default: MCDPConstants.feedback_arc_set_max_nodes)
+
+        Returns a frozenset of edges (i, j).
+
+        The results are cached, keyed by the weighted edges of each
+        strongly connected component (and by max_nodes, for the
+        solutions that are not known to be optimal).
+    """
+    if max_nodes is None:
+        max_nodes = MCDPConstants.feedback_arc_set_max_nodes
+
+    G = DiGraph(G)
+    res = set()
+    for nodes in strongly_connected_components(G):
+        H = G.subgraph(nodes)
+        edges = H.edges()
+        if len(nodes) == 1 and not edges:
+            continue
+        weights = dict((e, edge_weight(e)) for e in edges)
+        key = tuple(sorted(weights.items()))
+        key_budget = (key, max_nodes)
+        solution = _cache.get(key)
+        if solution is None:
+            solution = _cache.get(key_budget)
+        if solution is None:
+            solution, optimal = scc_feedback_arc_set(H, weights, max_nodes)
+            if optimal:
+                _cache.put(key, solution)
+            else:
+                logger.debug('Feedback arc set: search stopped after %d '
+                             'nodes for a component with %d edges; using '
+                             'the best solution found.' %
+                             (max_nodes, len(edges)))
+                _cache.put(key_budget, solution)
+        res.update(solution)
+    return frozenset(res)
+
+
+def scc_feedback_arc_set(G, weights, max_nodes):
+    """
+        Returns (solution, optimal) for the strongly connected
+        DiGraph G, expanding at most max_nodes nodes.
+    """
+    succ = dict((n, set(G.successors(n))) for n in G.nodes())
+    best = improve_solution(succ, weights, greedy_solution(succ, weights))
+    best_weight = sum(weights[e] for e in best)
+    optimal = True
+
+    # stack of (removed edges, kept edges, weight of removed)
+    stack = [(frozenset(), frozenset(), 0.0)]
+    nexpanded = 0
+    while stack:
+        if nexpanded >= max_nodes:
+            optimal = False
+            break
+        nexpanded += 1
+        removed, kept, w = stack.pop()
+        if w + disjoint_cycles_bound(succ, removed, weights) >= best_weight:
+            continue
+        cycle = shortest_cycle(succ, removed)
+        if cycle is None:
+            best, best_weight = removed, w
+            continue
+        candidates = [e for e in cycle if not e in kept]
+        # cheapest first, explored first
+        candidates.sort(key=lambda e: weights[e], reverse=True)
+        for i, e in enumerate(candidates):
+            # the ones explored before are kept in this branch
+            kept2 = kept | frozenset(candidates[i + 1:])
+            stack.append((removed | frozenset([e]), kept2, w + weights[e]))
+    return frozenset(best), optimal
+
+
+def greedy_solution(succ, weights):
+    """
+        Weighted variant of the Eades-Lin-Smyth heuristic: orders the
+        nodes and returns the edges that go backwards.
+    """
+    out_w = dict((n, 0.0) for n in succ)
+    in_w = dict((n, 0.0) for n in succ)
+    pred = dict((n, set()) for n in succ)
+    for (a, b), w in weights.items():
+        out_w[a] += w
+        in_w[b] += w
+        pred[b].add(a)
+    remaining = set(succ)
+    left = []
+    right = []
+
+    def remove(n):
+        remaining.discard(n)
+        for m in succ[n]:
+            if m in remaining:
+                in_w[m] -= weights[(n, m)]
+        for m in pred[n]:
+            if m in remaining:
+                out_w[m] -= weights[(m, n)]
+
+    while remaining:
+        changed = True
+        while changed:
+            changed = False
+            for n in sorted(remaining):
+                if not any(m in remaining for m in succ[n] if m != n):
+                    right.append(n)
+                    remove(n)
+                    changed = True
+                elif not any(m in remaining for m in pred[n] if m != n):
+                    left.append(n)
+                    remove(n)
+                    changed = True
+        if remaining:
+            n = max(sorted(remaining), key=lambda x: out_w[x] - in_w[x])
+            left.append(n)
+            remove(n)
+    order = left + list(reversed(right))
+    position = dict((n, i) for i, n in enumerate(order))
+    return set(e for e in weights if position[e[0]] >= position[e[1]])
+
+
+def improve_solution(succ, weights, solution):
+    """ Puts back the edges that do not create cycles, heaviest first. """
+    solution = set(solution)
+    for e in sorted(solution, key=lambda e: weights[e], reverse=True):
+        solution.remove(e)
+        if shortest_cycle(succ, solution) is not None:
+            solution.add(e)
+    return solution
+
+
+def shortest_cycle(succ, removed):
+    """
+        Returns a shortest cycle (as a list of edges) of the graph
+        without the removed edges, or None if it is acyclic.
+    """
+    best = None
+    for s in sorted(succ):
+        # BFS from s, looking for an edge back to s
+        parent = {s: None}
+        queue = deque([s])
+        found = None
+        while queue and found is None:
+            n = queue.popleft()
+            for m in succ[n]:
+                if (n, m) in removed:
+                    continue
+                if m == s:
+                    found = n
+                    break
+                if not m in parent:
+                    parent[m] = n
+                    queue.append(m)
+        if found is None:
+            continue
+        path = [found]
+        while path[-1] != s:
+            path.append(parent[path[-1]])
+        path.reverse()
+        cycle = list(zip(path, path[1:] + [s]))
+        if best is None or len(cycle) < len(best):
+            best = cycle
+            if len(best) == 1:
+                break
+    return best
+
+
+def disjoint_cycles_bound(succ, removed, weights):
+    """
+        A lower bound for the weight of the edges that still need to be
+        removed: the sum of the lightest edge of edge-disjoint cycles.
+    """
+    removed = set(removed)
+    bound = 0.0
+    while True:
+        cycle = shortest_cycle(succ, removed)
+        if cycle is None:
+            return bound
+        bound += min(weights[e] for e in cycle)
+        removed.update(cycle)